@@ -0,0 +1,89 @@
+# benchmarks/bench_batch_triage.py
+"""Throughput benchmark: LeadTriageAgent.process_batch vs per-lead process.
+
+Runs on the embedded memory backends (no servers) with a client that records
+RPCs instead of sending them. Per-lead triage runs on a --sample subset;
+the batch path triages the whole file. Both paths are also run on the same
+fresh subset and their results compared.
+
+    python benchmarks/bench_batch_triage.py --data data/leads.csv --sample 500
+"""
+import os
+os.environ.setdefault('MEMORY_BACKEND', 'embedded')
+
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+from collections import Counter
+from agents.lead_triage.agent import LeadTriageAgent
+from agents.lead_triage.sources import load_leads_csv
+from memory.backends import reset_embedded_backends
+
+
+class RecordingClient:
+    """Stands in for MCPClient; counts RPCs by method"""
+
+    def __init__(self):
+        self.calls = Counter()
+
+    async def request(self, method, params):
+        self.calls[method] += 1
+        return {'status': 'completed'}
+
+
+def fresh_agent():
+    reset_embedded_backends()
+    client = RecordingClient()
+    with contextlib.redirect_stdout(io.StringIO()):
+        agent = LeadTriageAgent(client)
+    return agent, client
+
+
+async def per_lead(agent, leads):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return [await agent.process(dict(lead)) for lead in leads]
+
+
+async def batched(agent, leads):
+    with contextlib.redirect_stdout(io.StringIO()):
+        return await agent.process_batch([dict(lead) for lead in leads])
+
+
+def comparable(results):
+    return [{k: v for k, v in r.items() if k != 'handoff'} for r in results]
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default='data/leads.csv')
+    parser.add_argument('--sample', type=int, default=500)
+    args = parser.parse_args()
+
+    leads = load_leads_csv(args.data)
+    sample = leads[:args.sample]
+
+    agent, client = fresh_agent()
+    start = time.perf_counter()
+    single = await per_lead(agent, sample)
+    elapsed = time.perf_counter() - start
+    print(f"per-lead: {len(sample)} leads in {elapsed:.2f}s "
+          f"({elapsed / len(sample) * 1000:.2f}ms/lead, {sum(client.calls.values())} RPCs)")
+
+    agent, client = fresh_agent()
+    parity = await batched(agent, sample)
+    assert comparable(parity) == comparable(single), "batch results differ from per-lead results"
+    print(f"parity: batch results match per-lead on {len(sample)} leads")
+
+    agent, client = fresh_agent()
+    start = time.perf_counter()
+    results = await batched(agent, leads)
+    elapsed = time.perf_counter() - start
+    print(f"batch: {len(results)} leads in {elapsed:.2f}s "
+          f"({elapsed / len(results) * 1000:.3f}ms/lead, RPCs: {dict(client.calls)})")
+    print(f"categories: {dict(Counter(r['category'] for r in results))}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,74 @@
+# benchmarks/bench_episodic_retrieval.py
+"""Recall/latency benchmark for episode retrieval over data/memory_episodic.csv.
+
+Compares the vector index used by EpisodicMemory.find_similar_episodes against
+the old first-keyword CONTAINS match. An episode counts as relevant when it
+shares the query's scenario.
+
+    python benchmarks/bench_episodic_retrieval.py --k 5
+"""
+import argparse
+import random
+import time
+from memory.embeddings import VectorIndex
+from memory.episodic import EpisodicMemory, load_episode_corpus
+
+QUERY_TEMPLATES = [
+    "{notes} ({scenario})",
+    "playbook for a {scenario} lead",
+    "{scenario} deal where the team says it {notes}",
+]
+
+
+def keyword_search(corpus, description, k):
+    keyword = description.split()[0]
+    return [ep['id'] for ep in corpus if keyword in ep['problem']][:k]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default='data/memory_episodic.csv')
+    parser.add_argument('--k', type=int, default=5)
+    parser.add_argument('--queries', type=int, default=500)
+    args = parser.parse_args()
+
+    corpus = load_episode_corpus(args.data)
+    scenario_of = {ep['id']: ep['metadata']['scenario'] for ep in corpus}
+    memory = EpisodicMemory('benchmark')
+
+    start = time.perf_counter()
+    index = VectorIndex(memory.embedder.dim)
+    for ep in corpus:
+        index.add(ep['id'], memory.embed_episode(ep['problem'], ep['solution']))
+    build_ms = (time.perf_counter() - start) * 1000
+
+    rng = random.Random(7)
+    queries = []
+    for _ in range(args.queries):
+        ep = rng.choice(corpus)
+        scenario = ep['metadata']['scenario']
+        notes = ep['problem'].split(': ', 1)[1]
+        text = rng.choice(QUERY_TEMPLATES).format(scenario=scenario.replace('_', ' '), notes=notes)
+        queries.append((text, scenario))
+
+    for name, search in (
+        ('vector', lambda q: [key for key, _ in index.search(memory.embed_episode(q), args.k)]),
+        ('keyword', lambda q: keyword_search(corpus, q, args.k)),
+    ):
+        precision, hits, elapsed = 0.0, 0, 0.0
+        for text, scenario in queries:
+            start = time.perf_counter()
+            found = search(text)
+            elapsed += time.perf_counter() - start
+            relevant = sum(scenario_of[key] == scenario for key in found)
+            precision += relevant / args.k
+            hits += relevant > 0
+        n = len(queries)
+        print(f"{name:>8}: precision@{args.k}={precision / n:.3f} hit_rate={hits / n:.3f} "
+              f"latency={elapsed / n * 1e6:.1f}us/query")
+
+    print(f"index build: {len(corpus)} episodes in {build_ms:.1f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,95 @@
+# benchmarks/bench_follow_up_scheduler.py
+"""Follow-up scheduling cost as the pending backlog grows, and timer wheel throughput.
+
+Pre-loads the store with N pending jobs, then times schedule_sequence
+for a 3-step template; times adding and expiring timers in the wheel;
+and times two workers racing to claim the same due jobs. Runs on the
+embedded store by default, or against REDIS_URL with --redis.
+
+    python benchmarks/bench_follow_up_scheduler.py --pending 10000 1000000
+"""
+import argparse
+import asyncio
+import random
+import time
+from memory.backends import InMemoryTTLStore, RedisShortTermBackend
+from scheduling.follow_ups import DUE_KEY, JOBS_KEY, LEASE_KEY, FollowUpScheduler
+from scheduling.timer_wheel import TimerWheel
+
+STEPS = ['day_3', 'day_7', 'day_14']
+CHUNK = 50_000
+
+
+async def noop(job):
+    pass
+
+
+async def preload(store, pending, now):
+    for start in range(0, pending, CHUNK):
+        ids = [f"bench{n}" for n in range(start, min(pending, start + CHUNK))]
+        await store.zadd(DUE_KEY, {job_id: now + random.uniform(3600, 30 * 86400) for job_id in ids})
+        await store.hset(JOBS_KEY, {job_id: '{}' for job_id in ids})
+
+
+async def schedule_cost(store, pending, sequences):
+    await store.delete(DUE_KEY, LEASE_KEY, JOBS_KEY)
+    scheduler = FollowUpScheduler(noop, store=store)
+    await preload(store, pending, time.time())
+    start = time.perf_counter()
+    for n in range(sequences):
+        await scheduler.schedule_sequence(f"lead{n}@example.com", STEPS, {'n': n})
+    return (time.perf_counter() - start) / (sequences * len(STEPS)) * 1e6
+
+
+def wheel_throughput(timers):
+    wheel = TimerWheel(tick=1.0, start=0)
+    due = [random.uniform(0, 86400) for _ in range(timers)]
+    start = time.perf_counter()
+    for n, at in enumerate(due):
+        wheel.add(n, at)
+    added = time.perf_counter() - start
+    start, fired = time.perf_counter(), 0
+    for second in range(0, 86401, 10):
+        fired += len(wheel.advance(second))
+    return added / timers * 1e6, (time.perf_counter() - start) / fired * 1e6
+
+
+async def claim_race(store, jobs):
+    await store.delete(DUE_KEY, LEASE_KEY, JOBS_KEY)
+    now = time.time()
+    workers = [FollowUpScheduler(noop, store=store, horizon=60, prefetch=jobs, clock=lambda: now + 120)
+               for _ in range(2)]
+    for n in range(jobs):
+        await workers[0].schedule(f"lead{n % 1000}@example.com", now + random.uniform(0, 60), {'n': n})
+    for worker in workers:
+        await worker.poll()
+    start = time.perf_counter()
+    fired = await asyncio.gather(*(worker.fire_due() for worker in workers))
+    return sum(fired) / (time.perf_counter() - start), fired
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--pending', type=int, nargs='+', default=[10_000, 1_000_000])
+    parser.add_argument('--sequences', type=int, default=2000)
+    parser.add_argument('--timers', type=int, default=1_000_000)
+    parser.add_argument('--claims', type=int, default=20_000)
+    parser.add_argument('--redis', action='store_true', help='use REDIS_URL instead of the embedded store')
+    args = parser.parse_args()
+    random.seed(0)
+    store = RedisShortTermBackend() if args.redis else InMemoryTTLStore()
+
+    for pending in args.pending:
+        cost = await schedule_cost(store, pending, args.sequences)
+        print(f"schedule with {pending:>9,} pending: {cost:6.1f} us/job")
+
+    add_us, fire_us = wheel_throughput(args.timers)
+    print(f"timer wheel ({args.timers:,} timers over a day): add {add_us:.2f} us, expire {fire_us:.2f} us per timer")
+
+    rate, fired = await claim_race(store, args.claims)
+    print(f"2 workers claiming {sum(fired):,} due jobs (split {fired[0]:,}/{fired[1]:,}): {rate:,.0f} jobs/s")
+    await store.delete(DUE_KEY, LEASE_KEY, JOBS_KEY)
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
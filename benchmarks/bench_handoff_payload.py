@@ -0,0 +1,77 @@
+# benchmarks/bench_handoff_payload.py
+"""Wire cost of a handoff: inline context + history (old) vs a handle (new).
+
+Triages CSV leads on the embedded backends so the agent has real
+short-term history, then compares the bytes each handoff puts on the
+wire. The old protocol sent the context plus the last 10 STM items and
+the server echoed all of it back; now the context is written once to the
+shared store and only the handle crosses the wire.
+
+    python benchmarks/bench_handoff_payload.py --leads 500
+"""
+import os
+os.environ.setdefault('MEMORY_BACKEND', 'embedded')
+
+import argparse
+import asyncio
+import contextlib
+import io
+import json
+import statistics
+import time
+from agents.engagement.agent import EngagementAgent
+from agents.lead_triage.agent import LeadTriageAgent
+from agents.lead_triage.sources import load_leads_csv
+
+
+class SizingClient:
+    """Answers RPCs locally and records request + response bytes for agent_handoff"""
+
+    def __init__(self):
+        self.handoff_bytes = []
+
+    async def request(self, method, params):
+        if method != 'agent_handoff':
+            return {'status': 'completed'}
+        response = {**params, 'status': 'completed'}
+        self.handoff_bytes.append(len(json.dumps(params)) + len(json.dumps(response)))
+        return response
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default='data/leads.csv')
+    parser.add_argument('--leads', type=int, default=500)
+    args = parser.parse_args()
+
+    client = SizingClient()
+    with contextlib.redirect_stdout(io.StringIO()):
+        triage = LeadTriageAgent(client)
+        engagement = EngagementAgent(client)
+        results = await triage.process_batch(load_leads_csv(args.data)[:args.leads])
+    handles = [r['handoff'] for r in results if r.get('handoff')]
+
+    # What the old protocol shipped for the same handoffs: context + 10 history items, sent and echoed
+    history = await triage.short_term_memory.get_recent(n=10)
+    legacy = []
+    for handle in handles:
+        context = await triage.handoffs.fetch(handle)
+        payload = {'from_agent': handle['from_agent'], 'to_agent': handle['to_agent'], 'context': context,
+                   'timestamp': handle['timestamp'], 'conversation_history': history,
+                   'handoff_id': handle['handoff_id']}
+        legacy.append(2 * len(json.dumps(payload)))
+
+    start = time.perf_counter()
+    with contextlib.redirect_stdout(io.StringIO()):
+        for handle in handles:
+            await engagement.receive(handle)
+    resolve_us = (time.perf_counter() - start) / max(len(handles), 1) * 1e6
+
+    print(f"{len(handles)} handoffs from {args.leads} leads")
+    print(f"inline (old): median {statistics.median(legacy):.0f} bytes/handoff on the wire")
+    print(f"handle (new): median {statistics.median(client.handoff_bytes):.0f} bytes/handoff on the wire, "
+          f"receiver resolves {len(EngagementAgent.HANDOFF_FIELDS)} fields in {resolve_us:.1f}us")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -0,0 +1,74 @@
+# benchmarks/bench_lead_scoring.py
+"""Accuracy and latency benchmark for the lead-scoring model.
+
+Trains on the non-holdout part of data/leads.csv + data/conversions.csv and
+compares held-out AUC against the old hand-written threshold score, then
+times artifact loading and vectorized inference.
+
+    python benchmarks/bench_lead_scoring.py
+"""
+import argparse
+import statistics
+import time
+import numpy as np
+from analytics.lead_scoring import LeadScorer, auc, fit_from_csv, holdout_split, load_training_data, train
+
+
+def heuristic_score(lead):
+    """The thresholds _classify_lead used before the model (without its random noise)"""
+    score = 0.0
+    if (lead.get('engagement_score') or 0) > 70:
+        score += 0.4
+    if lead.get('company_size') in ('1000-5000', '5000+'):
+        score += 0.3
+    if lead.get('source') in ('webinar', 'demo_request'):
+        score += 0.1
+    return score
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--leads', default='data/leads.csv')
+    parser.add_argument('--conversions', default='data/conversions.csv')
+    parser.add_argument('--artifact', default='/tmp/bench_lead_scoring.npz')
+    parser.add_argument('--repeat', type=int, default=20)
+    args = parser.parse_args()
+
+    leads, labels = load_training_data(args.leads, args.conversions)
+    test = holdout_split(leads)
+    train_leads = [lead for lead, held in zip(leads, test) if not held]
+    test_leads = [lead for lead, held in zip(leads, test) if held]
+
+    start = time.perf_counter()
+    model = train(train_leads, labels[~test])
+    print(f"train: {len(train_leads)} leads in {(time.perf_counter() - start) * 1000:.0f}ms")
+
+    model_auc = auc(labels[test], model.probability(test_leads))
+    heuristic_auc = auc(labels[test], np.array([heuristic_score(lead) for lead in test_leads]))
+    print(f"holdout ({len(test_leads)} leads, base rate {labels[test].mean():.3f}): "
+          f"model AUC={model_auc:.3f}  heuristic AUC={heuristic_auc:.3f}")
+
+    fit_from_csv(args.leads, args.conversions).save(args.artifact)
+    start = time.perf_counter()
+    scorer = LeadScorer.load(args.artifact)
+    print(f"load: {(time.perf_counter() - start) * 1000:.2f}ms")
+
+    batch = []
+    for _ in range(args.repeat):
+        start = time.perf_counter()
+        scorer.score(leads)
+        batch.append((time.perf_counter() - start) / len(leads) * 1e6)
+    single = []
+    for lead in leads[:1000]:
+        start = time.perf_counter()
+        scorer.score([lead])
+        single.append((time.perf_counter() - start) * 1e6)
+    print(f"inference: batch of {len(leads)} = {statistics.median(batch):.2f}us/lead, "
+          f"single lead p50={statistics.median(single):.1f}us")
+
+    # Same inputs always give the same confidence (the old heuristic added random noise)
+    assert np.array_equal(scorer.score(leads)[1], scorer.score(leads)[1])
+
+
+if __name__ == '__main__':
+    main()
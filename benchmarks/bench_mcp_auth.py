@@ -0,0 +1,64 @@
+# benchmarks/bench_mcp_auth.py
+"""MCP auth: verifying every request's credentials vs verifying once and caching the principal.
+
+Issues --principals HS256 JWTs and sends --requests authenticated,
+authorized requests spread over them through the Authenticator. One run
+verifies every time (cache TTL 0) and one uses the credential cache.
+Both are compared with dispatching a trivial RPC (agent_handoff) through
+the JSON-RPC handler. Revocation lookups go to the in-process store, so
+with Redis the uncached path also pays a network round trip per request.
+
+    python benchmarks/bench_mcp_auth.py --requests 100000 --principals 50
+"""
+import argparse
+import asyncio
+import json
+import time
+from communication.jsonrpc_handler import JSONRPCHandler
+from mcp.auth import Authenticator, encode_jwt
+from memory.backends import InMemoryTTLStore
+
+SECRET = 'bench-secret'
+
+
+async def drive(auth, tokens, requests):
+    start = time.perf_counter()
+    for i in range(requests):
+        principal = await auth.authenticate(tokens[i % len(tokens)])
+        auth.authorize(principal, 'get_lead_data')
+    return (time.perf_counter() - start) / requests
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--requests', type=int, default=100000)
+    parser.add_argument('--principals', type=int, default=50)
+    args = parser.parse_args()
+    now = time.time()
+    tokens = [encode_jwt({'sub': f"svc-{i}", 'scope': 'leads:read campaigns:read', 'iat': now, 'exp': now + 3600},
+                         SECRET) for i in range(args.principals)]
+    quota = args.requests * 10  # measure verification, not throttling
+
+    store = InMemoryTTLStore()
+    every = await drive(Authenticator(store, {}, SECRET, cache_ttl=0, quota_rate=quota, quota_burst=quota),
+                        tokens, args.requests)
+    cached_auth = Authenticator(store, {}, SECRET, quota_rate=quota, quota_burst=quota)
+    cached = await drive(cached_auth, tokens, args.requests)
+
+    handler = JSONRPCHandler()
+    handler.register_method('agent_handoff', lambda params: asyncio.sleep(0, {'status': 'completed'}))
+    request = json.dumps({'jsonrpc': '2.0', 'method': 'agent_handoff', 'params': {'to_agent': 'x'}, 'id': '1'})
+    start = time.perf_counter()
+    for _ in range(args.requests):
+        await handler.handle_request(request)
+    dispatch = (time.perf_counter() - start) / args.requests
+
+    print(f"{args.requests:,} requests over {args.principals} principals")
+    print(f"trivial RPC dispatch: {dispatch * 1e6:.1f} us/request")
+    print(f"verify every request: {every * 1e6:.1f} us/request (+{every / dispatch:.0%} of dispatch)")
+    print(f"cached verification: {cached * 1e6:.1f} us/request (+{cached / dispatch:.0%}); "
+          f"{cached_auth.stats['verified']} verified, {cached_auth.stats['cached']:,} from cache")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,64 @@
+# benchmarks/bench_mcp_resources.py
+"""MCP resources: re-rendering on every read vs the rendered-resource cache vs conditional reads.
+
+Indexes --leads synthetic leads into the data/segments.csv segments and
+loads the campaign KPI engine from data/campaign_daily.csv. It then
+re-reads a segment's members, a campaign's KPIs and the agent_actions
+export --reads times each, in three ways:
+- re-rendered every time (what an uncached RPC method does)
+- served from the registry cache (first page of up to RESOURCE_PAGE_SIZE items)
+- conditional reads with the last ETag, answered not_modified
+
+    python benchmarks/bench_mcp_resources.py --leads 20000 --reads 200
+"""
+import argparse
+import asyncio
+import random
+import time
+from analytics.kpi import KPIEngine
+from analytics.segments import SegmentEngine, SegmentIndex
+from memory.backends import InMemoryTTLStore
+from mcp.resources import CampaignResources, DataResources, ResourceRegistry, SegmentResources
+
+INDUSTRIES = ['SaaS', 'FinTech', 'HealthTech', 'Retail', 'Media', 'EdTech', 'Manufacturing', 'E-commerce']
+REGIONS = ['US', 'EU', 'APAC', 'MEA', 'LATAM', 'India']
+CHANNELS = ['Email', 'SMS', 'Call', 'Web', 'Social', 'Ads']
+
+
+async def timed(reads, read):
+    start = time.perf_counter()
+    for _ in range(reads):
+        await read()
+    return (time.perf_counter() - start) / reads
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--leads', type=int, default=20000)
+    parser.add_argument('--reads', type=int, default=200)
+    args = parser.parse_args()
+    rng = random.Random(0)
+    store = InMemoryTTLStore()
+    index = SegmentIndex(SegmentEngine.from_csv('data/segments.csv'), store)
+    await index.update([{'email': f"lead{i}@example.com", 'lead_score': rng.randint(0, 100),
+                         'industry': rng.choice(INDUSTRIES), 'region': rng.choice(REGIONS),
+                         'preferred_channel': rng.choice(CHANNELS)} for i in range(args.leads)])
+    counts = {s: await index.count(s) for s in index.engine.ids}
+    segment_id = max(counts, key=counts.get)
+    segments = SegmentResources(index)
+    campaigns = CampaignResources(store, KPIEngine.from_csv('data/campaign_daily.csv'))
+    data = DataResources('data')
+    registry = ResourceRegistry([data, campaigns, segments])
+
+    for provider, uri in ((segments, f"analytics://segments/{segment_id}/members"),
+                          (campaigns, 'analytics://campaigns/CMP0001/kpis'), (data, 'data://agent_actions')):
+        rerender = await timed(args.reads, lambda: provider.render(uri))
+        first = await registry.read(uri)
+        cached = await timed(args.reads, lambda: registry.read(uri))
+        conditional = await timed(args.reads, lambda: registry.read(uri, if_none_match=first['etag']))
+        print(f"{uri} ({first['total']:,} items): re-render {rerender * 1000:.2f} ms, "
+              f"cached (first page) {cached * 1000:.3f} ms, not-modified {conditional * 1e6:.0f} us")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
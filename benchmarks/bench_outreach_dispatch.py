@@ -0,0 +1,65 @@
+# benchmarks/bench_outreach_dispatch.py
+"""Outreach throughput: one inline send per lead vs the per-channel dispatcher.
+
+Every provider call costs --latency seconds (a local stand-in for a real
+API round-trip). The inline baseline makes one call per message, one
+after another, as EngagementAgent did before. The dispatcher runs each
+channel's workers concurrently, batches bulk channels and stays within
+each channel's token-bucket rate limit.
+
+    python benchmarks/bench_outreach_dispatch.py --messages 2000 --latency 0.02
+"""
+import argparse
+import asyncio
+import random
+import time
+from collections import Counter
+from agents.engagement.dispatcher import OutreachDispatcher, SimulatedSender, normalize_channel
+from agents.lead_triage.sources import load_leads_csv
+from config import settings
+
+
+async def inline(channels, latency):
+    sender = SimulatedSender(latency=latency, rng=random.Random(0))
+    start = time.perf_counter()
+    for n, channel in enumerate(channels):
+        await sender.send(channel, [{'n': n}])
+    return time.perf_counter() - start, len(sender.calls)
+
+
+async def dispatched(channels, latency, limits):
+    sender = SimulatedSender(latency=latency, rng=random.Random(0))
+    dispatcher = OutreachDispatcher(sender, channels=limits)
+    start = time.perf_counter()
+    for n, channel in enumerate(channels):
+        await dispatcher.submit(channel, {'n': n})
+    await dispatcher.close()
+    return time.perf_counter() - start, len(sender.calls), dispatcher.stats()
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default='data/leads.csv')
+    parser.add_argument('--messages', type=int, default=2000)
+    parser.add_argument('--latency', type=float, default=0.02)
+    parser.add_argument('--unlimited', action='store_true', help='lift provider rate limits to show raw dispatch speed')
+    args = parser.parse_args()
+
+    channels = [normalize_channel(lead['preferred_channel']) for lead in load_leads_csv(args.data)[:args.messages]]
+    print(f"{len(channels)} messages by channel: {dict(Counter(channels))}")
+    limits = settings.OUTREACH_CHANNELS
+    if args.unlimited:
+        limits = {name: {**config, 'rate': 1e6, 'burst': max(config.get('burst', 1), config.get('batch_size', 1))}
+                  for name, config in limits.items()}
+
+    elapsed, calls = await inline(channels, args.latency)
+    print(f"inline:     {elapsed:.2f}s ({len(channels) / elapsed:.0f} msg/s, {calls} provider calls)")
+    elapsed, calls, stats = await dispatched(channels, args.latency, limits)
+    print(f"dispatcher: {elapsed:.2f}s ({len(channels) / elapsed:.0f} msg/s, {calls} provider calls)")
+    for name, channel in stats.items():
+        print(f"  {name}: {channel['sent'] + channel['failed']} sent in {channel['requests']} requests, "
+              f"throttled {channel['throttled_s']}s")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
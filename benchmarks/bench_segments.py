@@ -0,0 +1,97 @@
+# benchmarks/bench_segments.py
+"""Segment evaluation: compiled bitmask pass vs checking every rule of every segment per lead.
+
+Generates --segments random rule sets over the fields in data/segments.csv
+and --leads synthetic leads. It times the compiled engine against a
+per-lead, per-segment rule loop, then times a membership index update
+when 1% of leads change, and "leads in segment X" via the index vs a
+scan of every lead.
+
+    python benchmarks/bench_segments.py --leads 100000 --segments 200
+"""
+import argparse
+import asyncio
+import random
+import time
+from analytics.segments import SegmentEngine, SegmentIndex
+from memory.backends import InMemoryTTLStore
+
+INDUSTRIES = ['SaaS', 'FinTech', 'HealthTech', 'Retail', 'Media', 'EdTech', 'Manufacturing', 'E-commerce']
+REGIONS = ['US', 'EU', 'APAC', 'MEA', 'LATAM', 'India']
+CHANNELS = ['Email', 'SMS', 'Call', 'Web', 'Social', 'Ads']
+
+
+def random_segments(count, rng):
+    return [{'segment_id': f"SEG{i:04d}", 'rules': {
+        'industry': rng.choice([None, None] + INDUSTRIES),
+        'min_lead_score': rng.choice([None, 50, 60, 70, 80]),
+        'regions': rng.sample(REGIONS, rng.randint(1, 3)),
+        'preferred_channel': rng.choice([None] + CHANNELS)}} for i in range(count)]
+
+
+def random_lead(i, rng):
+    return {'email': f"lead{i}@example.com", 'lead_score': rng.randint(0, 100), 'industry': rng.choice(INDUSTRIES),
+            'region': rng.choice(REGIONS), 'preferred_channel': rng.choice(CHANNELS)}
+
+
+def rule_loop(leads, segments):
+    results = []
+    for lead in leads:
+        matched = []
+        for segment in segments:
+            rules = segment['rules']
+            if rules['industry'] and lead['industry'] != rules['industry']:
+                continue
+            if rules['min_lead_score'] is not None and lead['lead_score'] < rules['min_lead_score']:
+                continue
+            if rules['regions'] and lead['region'] not in rules['regions']:
+                continue
+            if rules['preferred_channel'] and lead['preferred_channel'] != rules['preferred_channel']:
+                continue
+            matched.append(segment['segment_id'])
+        results.append(matched)
+    return results
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--leads', type=int, default=100000)
+    parser.add_argument('--segments', type=int, default=200)
+    args = parser.parse_args()
+    rng = random.Random(0)
+    segments = random_segments(args.segments, rng)
+    leads = [random_lead(i, rng) for i in range(args.leads)]
+
+    start = time.perf_counter()
+    engine = SegmentEngine(segments)
+    compiled = engine.matches(leads)
+    print(f"compile + evaluate {args.segments} segments x {args.leads:,} leads: "
+          f"{(time.perf_counter() - start) * 1000:.0f} ms")
+    start = time.perf_counter()
+    expected = rule_loop(leads, segments)
+    print(f"per-lead rule loop: {(time.perf_counter() - start) * 1000:.0f} ms")
+    assert compiled == expected
+
+    index = SegmentIndex(engine, store=InMemoryTTLStore())
+    start = time.perf_counter()
+    await index.update(leads)
+    print(f"initial index build: {(time.perf_counter() - start) * 1000:.0f} ms")
+    changed = [{**lead, 'lead_score': rng.randint(0, 100), 'region': rng.choice(REGIONS)}
+               for lead in rng.sample(leads, args.leads // 100)]
+    start = time.perf_counter()
+    await index.update(changed)
+    print(f"update {len(changed):,} changed leads: {(time.perf_counter() - start) * 1000:.1f} ms")
+
+    segment_id = segments[0]['segment_id']
+    start = time.perf_counter()
+    members = await index.members(segment_id, 0, 100)
+    indexed = time.perf_counter() - start
+    start = time.perf_counter()
+    scanned = [lead['email'] for lead, ids in zip(leads, rule_loop(leads, segments[:1])) if ids]
+    print(f"first 100 leads of {segment_id} via index: {indexed * 1000:.2f} ms; "
+          f"scanning all leads: {(time.perf_counter() - start) * 1000:.0f} ms "
+          f"({len(members)} vs {len(scanned)} found)")
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
@@ -0,0 +1,60 @@
+# benchmarks/bench_semantic_snapshot.py
+"""Latency benchmark: in-process CSR snapshot vs Cypher for SemanticMemory.find_related.
+
+Builds the snapshot from data/semantic_kg_triples.csv. With --cypher the same
+triples are written to Neo4j through SemanticMemory and the Cypher path is
+timed on identical queries (requires a reachable Neo4j).
+
+    python benchmarks/bench_semantic_snapshot.py --depth 2 --cypher
+"""
+import argparse
+import csv
+import random
+import statistics
+import time
+from memory.graph_snapshot import GraphSnapshot
+from memory.semantic import SemanticMemory
+
+
+def timed(fn, queries):
+    samples = []
+    for entity, rel in queries:
+        start = time.perf_counter()
+        fn(entity, rel)
+        samples.append((time.perf_counter() - start) * 1e6)
+    return statistics.median(samples), sorted(samples)[int(len(samples) * 0.99) - 1]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default='data/semantic_kg_triples.csv')
+    parser.add_argument('--depth', type=int, default=2)
+    parser.add_argument('--queries', type=int, default=2000)
+    parser.add_argument('--cypher', action='store_true', help='also time the Neo4j path')
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    snapshot = GraphSnapshot.from_csv(args.data)
+    print(f"snapshot: {snapshot.num_nodes} nodes, {snapshot.num_edges} edges "
+          f"built in {(time.perf_counter() - start) * 1000:.1f}ms")
+
+    with open(args.data, newline='', encoding='utf-8') as f:
+        triples = list(csv.DictReader(f))
+    rng = random.Random(11)
+    queries = [(row['subject'], rng.choice([None, row['predicate']]))
+               for row in (rng.choice(triples) for _ in range(args.queries))]
+
+    p50, p99 = timed(lambda e, r: snapshot.neighbors(e, r, args.depth), queries)
+    print(f"snapshot depth={args.depth}: p50={p50:.1f}us p99={p99:.1f}us")
+
+    if args.cypher:
+        memory = SemanticMemory(snapshot=None)
+        for row in triples:
+            memory.add_knowledge(row['subject'], row['predicate'], row['object'], weight=float(row['weight']))
+        memory.flush()
+        p50, p99 = timed(lambda e, r: memory.find_related(e, r, args.depth), queries[:200])
+        print(f"cypher   depth={args.depth}: p50={p50:.1f}us p99={p99:.1f}us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# benchmarks/bench_triage_cache.py
+"""Latency of repeat lead arrivals with and without the triage result cache.
+
+Replays every lead --repeats times (as if several sources re-sent it)
+through LeadTriageAgent.process on the embedded backends, once with
+TRIAGE_CACHE_TTL=0 and once with the cache on.
+
+    python benchmarks/bench_triage_cache.py --leads 300 --repeats 3
+"""
+import os
+os.environ.setdefault('MEMORY_BACKEND', 'embedded')
+
+import argparse
+import asyncio
+import contextlib
+import io
+import time
+from collections import Counter
+from agents.lead_triage.agent import LeadTriageAgent
+from agents.lead_triage.sources import load_leads_csv
+from config import settings
+from memory.backends import reset_embedded_backends
+
+
+class RecordingClient:
+    """Stands in for MCPClient; counts RPCs by method"""
+
+    def __init__(self):
+        self.calls = Counter()
+
+    async def request(self, method, params):
+        self.calls[method] += 1
+        return {**params, 'status': 'completed'} if method == 'agent_handoff' else {'status': 'completed'}
+
+
+async def replay(leads, repeats, ttl):
+    settings.TRIAGE_CACHE_TTL = ttl
+    reset_embedded_backends()
+    client = RecordingClient()
+    with contextlib.redirect_stdout(io.StringIO()):
+        agent = LeadTriageAgent(client)
+        start = time.perf_counter()
+        results = [await agent.process(dict(lead)) for _ in range(repeats) for lead in leads]
+    elapsed = time.perf_counter() - start
+    hits = sum(1 for r in results if r.get('cached'))
+    return elapsed / len(results) * 1000, hits, len(results), sum(client.calls.values())
+
+
+async def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument('--data', default='data/leads.csv')
+    parser.add_argument('--leads', type=int, default=300)
+    parser.add_argument('--repeats', type=int, default=3)
+    args = parser.parse_args()
+    leads = load_leads_csv(args.data)[:args.leads]
+
+    for label, ttl in (('no cache', 0), ('cache', 600)):
+        ms, hits, total, rpcs = await replay(leads, args.repeats, ttl)
+        print(f"{label:>8}: {ms:.3f}ms/arrival over {total} arrivals, {hits} cache hits, {rpcs} RPCs")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -43,11 +43,45 @@ CREATE TABLE IF NOT EXISTS long_term_memory (
     memory_type VARCHAR(50),
     data JSONB,
     importance_score FLOAT,
+    effective_importance FLOAT,
+    access_count INTEGER DEFAULT 0,
     created_at TIMESTAMP DEFAULT NOW(),
     accessed_at TIMESTAMP DEFAULT NOW()
 );
 
+ALTER TABLE long_term_memory ADD COLUMN IF NOT EXISTS effective_importance FLOAT;
+ALTER TABLE long_term_memory ADD COLUMN IF NOT EXISTS access_count INTEGER DEFAULT 0;
+UPDATE long_term_memory SET effective_importance = importance_score WHERE effective_importance IS NULL;
+
+CREATE TABLE IF NOT EXISTS long_term_memory_archive (
+    id INTEGER PRIMARY KEY,
+    entity_id VARCHAR(255),
+    entity_type VARCHAR(50),
+    memory_type VARCHAR(50),
+    data JSONB,
+    importance_score FLOAT,
+    access_count INTEGER,
+    created_at TIMESTAMP,
+    accessed_at TIMESTAMP,
+    archived_at TIMESTAMP DEFAULT NOW()
+);
+
+CREATE TABLE IF NOT EXISTS entity_profiles (
+    entity_id VARCHAR(255) NOT NULL,
+    entity_type VARCHAR(50) NOT NULL,
+    channel VARCHAR(50),
+    time_preference VARCHAR(50),
+    content_type VARCHAR(50),
+    interests TEXT[] DEFAULT '{}',
+    interaction_count INTEGER DEFAULT 0,
+    updated_at TIMESTAMP DEFAULT NOW(),
+    PRIMARY KEY (entity_id, entity_type)
+);
+
 CREATE INDEX idx_leads_email ON leads(email);
 CREATE INDEX idx_leads_category ON leads(category);
 CREATE INDEX idx_interactions_lead_id ON interactions(lead_id);
-CREATE INDEX idx_memory_entity ON long_term_memory(entity_id, entity_type);
\ No newline at end of file
+CREATE INDEX idx_memory_entity ON long_term_memory(entity_id, entity_type);
+CREATE INDEX IF NOT EXISTS idx_memory_entity_rank
+    ON long_term_memory(entity_id, entity_type, effective_importance DESC, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_memory_created_at ON long_term_memory(created_at);
@@ -1,9 +1,16 @@
 # main.py
+import argparse
 import asyncio
 from mcp.client import MCPClient
 from agents.lead_triage.agent import LeadTriageAgent
 from agents.engagement.agent import EngagementAgent
 from agents.campaign_optimization.agent import CampaignOptimizationAgent
+from agents.campaign_optimization.monitor import CampaignMonitor
+from agents.campaign_optimization.sources import stream_campaign_daily_csv
+from analytics.kpi import KPIEngine
+from agents.lead_triage.sources import stream_leads_csv, stream_leads_rpc
+from pipeline.runner import AgentPipeline
+from pipeline.supervisor import ShardedSupervisor
 
 async def run_demo():
     client = MCPClient()
@@ -38,7 +45,71 @@ async def run_demo():
     })
     print("\n📊 Campaign Optimization Result:", optimized)
 
+    # The outreach was only queued; wait for it to be sent and recorded
+    await engagement_agent.close()
+    await lead_agent.close()
+    await campaign_agent.close()
     await client.close()
 
+async def run_pipeline(csv_path: str = None, limit: int = None):
+    """Stream leads from a CSV export (or the MCP server) through all three agents"""
+    client = MCPClient()
+    pipeline = AgentPipeline(
+        LeadTriageAgent(client), EngagementAgent(client), CampaignOptimizationAgent(client),
+        report_interval=5.0
+    )
+    source = stream_leads_csv(csv_path, limit=limit) if csv_path else stream_leads_rpc(client)
+    try:
+        await pipeline.run(source)
+    finally:
+        await client.close()
+
+async def run_sharded(csv_path: str, processes: int, limit: int = None):
+    """Stream a CSV export through agent pipelines in several worker processes"""
+    supervisor = ShardedSupervisor(num_workers=processes)
+    await supervisor.run(stream_leads_csv(csv_path, limit=limit))
+
+async def run_monitor(metrics_path: str, limit: int = None):
+    """Replay daily campaign metrics and optimize only the campaigns whose KPIs drop"""
+    client = MCPClient()
+    # The KPI engine starts empty and fills from the replay, so each analysis sees only the past
+    monitor = CampaignMonitor(CampaignOptimizationAgent(client, kpi_engine=KPIEngine()))
+    try:
+        stats = await monitor.run(stream_campaign_daily_csv(metrics_path, limit=limit))
+        print(f"\n📈 Campaign monitor: {stats}")
+    finally:
+        await monitor.close()
+        await client.close()
+
+async def run_follow_ups():
+    """Fire scheduled follow-ups as they fall due; run one or more of these alongside the pipeline"""
+    client = MCPClient()
+    agent = EngagementAgent(client)
+    print("⏰ Follow-up scheduler running")
+    try:
+        await agent.follow_ups.run()
+    finally:
+        await agent.close()
+        await client.close()
+
 if __name__ == "__main__":
-    asyncio.run(run_demo())
+    parser = argparse.ArgumentParser(description="Marketing multi-agent system")
+    parser.add_argument('--pipeline', action='store_true', help='run the streaming agent pipeline')
+    parser.add_argument('--csv', help='lead CSV to stream (default: poll the MCP server for new leads)')
+    parser.add_argument('--limit', type=int, help='stop after this many CSV rows')
+    parser.add_argument('--processes', type=int, help='shard the CSV across this many worker processes')
+    parser.add_argument('--follow-ups', action='store_true', help='run a follow-up scheduler worker')
+    parser.add_argument('--monitor', metavar='METRICS_CSV', nargs='?', const='data/campaign_daily.csv',
+                        help='replay daily campaign metrics, optimizing campaigns when a KPI drops')
+    args = parser.parse_args()
+
+    if args.follow_ups:
+        asyncio.run(run_follow_ups())
+    elif args.monitor:
+        asyncio.run(run_monitor(args.monitor, args.limit))
+    elif args.pipeline and args.processes and args.csv:
+        asyncio.run(run_sharded(args.csv, args.processes, args.limit))
+    elif args.pipeline:
+        asyncio.run(run_pipeline(args.csv, args.limit))
+    else:
+        asyncio.run(run_demo())
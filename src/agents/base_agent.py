@@ -1,16 +1,22 @@
 # agents/base_agent.py
 from abc import ABC, abstractmethod
-from typing import Dict, Any, Optional
-import uuid
+from typing import Dict, Any, List, Optional, Sequence
 from datetime import datetime
 from memory.short_term import ShortTermMemory
 from memory.long_term import LongTermMemory
 from memory.episodic import EpisodicMemory
 from memory.semantic import SemanticMemory
+from memory.facade import MemoryFacade
+from memory.conversation import ConversationStore
+from memory.handoff import HandoffStore
+from memory.triage_cache import invalidate_triage
 from mcp.client import MCPClient
 
 class BaseAgent(ABC):
     """Base class for all marketing agents"""
+
+    # Context fields this agent reads from an incoming handoff (None = all of them)
+    HANDOFF_FIELDS: Optional[Sequence[str]] = None
     
     def __init__(self, agent_id: str, mcp_client: MCPClient):
         self.agent_id = agent_id
@@ -21,6 +27,12 @@ class BaseAgent(ABC):
         self.long_term_memory = LongTermMemory(agent_id)
         self.episodic_memory = EpisodicMemory(agent_id)
         self.semantic_memory = SemanticMemory()
+        self.memory = MemoryFacade(
+            self.short_term_memory, self.long_term_memory,
+            self.episodic_memory, self.semantic_memory
+        )
+        self.conversations = ConversationStore(self.short_term_memory)
+        self.handoffs = HandoffStore(self.short_term_memory)
         
         print(f"✅ {agent_id} initialized")
     
@@ -28,30 +40,37 @@ class BaseAgent(ABC):
     async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """Process input and return output - must be implemented by child classes"""
         pass
+
+    async def close(self):
+        """Persist buffered memory state on shutdown"""
+        self.episodic_memory.close()
+        await self.long_term_memory.close()
     
     async def handoff(self, target_agent: str, context: Dict[str, Any]) -> Dict[str, Any]:
-        """Handoff to another agent with context preservation"""
-        handoff_context = {
-            "from_agent": self.agent_id,
-            "to_agent": target_agent,
-            "context": context,
-            "timestamp": datetime.now().isoformat(),
-            "conversation_history": await self.short_term_memory.get_recent(n=10),
-            "handoff_id": str(uuid.uuid4())
-        }
+        """Handoff to another agent, passing the context by reference"""
+        # The context is written once; the RPC and the receiver only see the handle
+        handle = await self.handoffs.put(self.agent_id, target_agent, context)
         
         # Store handoff in short-term memory
         await self.short_term_memory.add({
             'type': 'handoff',
             'target': target_agent,
-            'context': context,
+            'handoff': handle,
             'significant': True
         })
         
         # Call MCP server to register handoff
-        result = await self.mcp_client.request("agent_handoff", handoff_context)
+        result = await self.mcp_client.request("agent_handoff", handle)
         
         return result
+
+    async def receive(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
+        """Resolve an incoming handoff handle to the fields this agent reads; plain inputs pass through"""
+        if 'ref' not in input_data or 'handoff_id' not in input_data:
+            return input_data
+        context = await self.handoffs.fetch(input_data, self.HANDOFF_FIELDS)
+        context['handoff_id'] = input_data['handoff_id']
+        return context
     
     async def store_interaction(self, interaction: Dict[str, Any]):
         """Store interaction in appropriate memory systems"""
@@ -63,7 +82,7 @@ class BaseAgent(ABC):
         await self.short_term_memory.add(interaction)
         
         # Store significant interactions in episodic memory
-        if interaction.get('significant') or interaction.get('importance', 0) > 0.7:
+        if self._is_episode(interaction):
             # Assuming episodic_memory methods are not async yet. If they were, they'd need await.
             self.episodic_memory.add_episode(
                 problem=interaction.get('problem', 'N/A'),
@@ -75,17 +94,51 @@ class BaseAgent(ABC):
         # Consolidate if needed
         if await self.short_term_memory.should_consolidate():
             await self.consolidate_memory()
+
+    async def store_interactions(self, interactions: List[Dict[str, Any]]):
+        """Batch form of store_interaction: one write per memory tier for the whole list"""
+        timestamp = datetime.now().isoformat()
+        for interaction in interactions:
+            interaction['timestamp'] = timestamp
+            interaction['agent_id'] = self.agent_id
+
+        await self.short_term_memory.add_many(interactions)
+        self.episodic_memory.add_episodes([
+            {
+                'problem': interaction.get('problem', 'N/A'),
+                'solution': interaction.get('solution', 'N/A'),
+                'outcome': interaction.get('outcome', 'pending'),
+                'metadata': interaction
+            }
+            for interaction in interactions if self._is_episode(interaction)
+        ])
+
+        if await self.short_term_memory.should_consolidate():
+            await self.consolidate_memory()
+
+    @staticmethod
+    def _is_episode(interaction: Dict[str, Any]) -> bool:
+        return bool(interaction.get('significant') or interaction.get('importance', 0) > 0.7)
     
     async def consolidate_memory(self):
         """Move important short-term memories to long-term storage"""
         important_items = await self.short_term_memory.get_important()
         
-        for item in important_items:
-            await self.long_term_memory.add(
-                entity_id=item.get('entity_id', 'unknown'),
-                entity_type=item.get('entity_type', 'interaction'),
-                data=item,
-                importance=item.get('importance', 0.7)
-            )
+        await self.long_term_memory.bulk_add([
+            {
+                'entity_id': item.get('entity_id', 'unknown'),
+                'entity_type': item.get('entity_type', 'interaction'),
+                'data': item,
+                'importance': item.get('importance', 0.7)
+            }
+            for item in important_items
+        ])
+
+        # New history can change a lead's triage, so drop any cached decision for it.
+        # Triage's own categorization records describe that cached decision, so they don't count
+        await invalidate_triage(self.short_term_memory.store, [
+            item.get('entity_id') for item in important_items
+            if item.get('entity_type') == 'lead' and item.get('problem') != 'lead_categorization'
+        ])
         
         print(f"✅ Consolidated {len(important_items)} memories for {self.agent_id}")
\ No newline at end of file
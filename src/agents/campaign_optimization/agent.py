@@ -1,41 +1,69 @@
 # agents/campaign_optimization/agent.py
 from agents.base_agent import BaseAgent
-from typing import Dict, Any
+from analytics.attribution import campaign_attribution
+from analytics.bandit import VariantBandit, get_variant_bandit
+from analytics.kpi import KPIEngine, get_kpi_engine
+from memory.backends import get_short_term_backend
+from typing import Dict, Any, List, Optional, Sequence
 import random
 
 class CampaignOptimizationAgent(BaseAgent):
     """Monitors and optimizes campaign performance"""
+
+    HANDOFF_FIELDS = ('campaign_id', 'issue')
+    # A channel drawing this share of time-decay conversion credit, over at least
+    # ATTRIBUTION_MIN_CONVERSIONS attributed conversions, gets the budget shifted to it
+    DOMINANT_CHANNEL_SHARE = 0.6
+    ATTRIBUTION_MIN_CONVERSIONS = 5
     
-    def __init__(self, mcp_client):
+    def __init__(self, mcp_client, kpi_engine: KPIEngine = None, variants: VariantBandit = None):
         super().__init__("campaign_optimization_agent", mcp_client)
+        self.kpis = kpi_engine or get_kpi_engine()
+        self.variants = variants or get_variant_bandit()
         print("Campaign Optimization Agent ready")
     
     async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
         """Analyze and optimize campaigns"""
+        input_data = await self.receive(input_data)
         print(f"\n📊 Analyzing campaign performance...")
         
         campaign_id = input_data.get('campaign_id')
         issue = input_data.get('issue')
         
-        # Get campaign metrics
-        metrics = await self._get_campaign_metrics(campaign_id)
-        
-        # Analyze performance
-        analysis = self._analyze_performance(metrics)
-        
-        # Generate optimization recommendations
-        recommendations = self._generate_recommendations(analysis, issue)
+        # Rolling KPIs from daily data when we have it, else the campaign row's metrics
+        if campaign_id in self.kpis:
+            analysis = self.kpis.analysis(campaign_id)
+        else:
+            metrics = await self._get_campaign_metrics(campaign_id)
+            analysis = self._analyze_performance(metrics)
         
-        # Determine if human escalation needed
-        needs_escalation = analysis['performance_score'] < 0.5
+        result = self._review(campaign_id, analysis, issue)
+        recommendations = result['recommendations']
+        needs_escalation = result['needs_escalation']
+
+        # Report the A/B variants' standing; a clear winner gets the remaining budget
+        await self.variants.maybe_refresh()
+        variants = self.variants.summary(campaign_id) if campaign_id is not None else []
+        if variants:
+            result['variants'] = variants
+            winner = self.variants.winner(campaign_id)
+            if winner:
+                recommendations.insert(0, {
+                    'action': 'promote_variant',
+                    'priority': 'high',
+                    'description': f"Variant {winner['variant_id']} is best in {winner['win_probability']:.0%} "
+                                   f"of posterior draws; shift the remaining budget to it",
+                    'expected_impact': f"{winner['click_rate']:.1%} click rate"
+                })
         
-        result = {
-            'campaign_id': campaign_id,
-            'analysis': analysis,
-            'recommendations': recommendations,
-            'needs_escalation': needs_escalation,
-            'escalation_reason': 'Complex optimization required' if needs_escalation else None
-        }
+        # Where this campaign's conversions come from, by channel, variant and agent action
+        if campaign_id is not None:
+            attribution = await campaign_attribution(get_short_term_backend(), campaign_id)
+            if attribution['models']['linear']['conversions']:
+                result['attribution'] = attribution
+                recommendation = self._channel_recommendation(attribution)
+                if recommendation:
+                    recommendations.append(recommendation)
         
         # Store learning
         await self.store_interaction({
@@ -54,11 +82,48 @@ class CampaignOptimizationAgent(BaseAgent):
                 entity=issue or 'low_performance',
                 relationship='solved_by',
                 target=recommendations[0]['action'],
-                properties={'effectiveness': analysis['performance_score']}
+                properties={'effectiveness': analysis['performance_score']},
+                weight=analysis['performance_score']
             )
         
         return result
+
+    def review_campaigns(self, campaign_ids: Sequence = None, issue: str = None) -> List[Dict[str, Any]]:
+        """Analysis and recommendations for many campaigns (default: all with daily data) in one pass"""
+        analyses = self.kpis.analyze_many(campaign_ids)
+        return [self._review(campaign_id, analysis, issue) for campaign_id, analysis in analyses.items()]
+
+    def _review(self, campaign_id, analysis: Dict, issue: str = None) -> Dict[str, Any]:
+        recommendations = self._generate_recommendations(analysis, issue)
+        
+        # Determine if human escalation needed
+        needs_escalation = analysis['performance_score'] < 0.5
+        
+        return {
+            'campaign_id': campaign_id,
+            'analysis': analysis,
+            'recommendations': recommendations,
+            'needs_escalation': needs_escalation,
+            'escalation_reason': 'Complex optimization required' if needs_escalation else None
+        }
     
+    def _channel_recommendation(self, attribution: Dict) -> Optional[Dict]:
+        """Shift spend toward a channel that clearly drives this campaign's conversions"""
+        credited = {channel: models['time_decay']['conversions'] for channel, models in attribution['channels'].items()}
+        total = sum(credited.values())
+        if len(credited) < 2 or total < self.ATTRIBUTION_MIN_CONVERSIONS:
+            return None
+        channel = max(credited, key=credited.get)
+        share = credited[channel] / total
+        if share < self.DOMINANT_CHANNEL_SHARE:
+            return None
+        return {
+            'action': 'shift_channel_mix',
+            'priority': 'medium',
+            'description': f"{channel} earns {share:.0%} of time-decay conversion credit; move spend toward it",
+            'expected_impact': f"{credited[channel]:.1f} of {total:.1f} attributed conversions"
+        }
+
     async def _get_campaign_metrics(self, campaign_id: int = None) -> Dict:
         """Get campaign performance metrics"""
         if campaign_id:
@@ -153,5 +218,29 @@ class CampaignOptimizationAgent(BaseAgent):
                     'description': 'Decrease email frequency and improve segmentation',
                     'expected_impact': '-50% unsubscribe rate'
                 })
+            
+            elif detected_issue == 'high_cost_per_lead':
+                recommendations.append({
+                    'action': 'reallocate_budget',
+                    'priority': 'high',
+                    'description': 'Shift spend from the costliest placements to those producing leads',
+                    'expected_impact': '-20% cost per lead'
+                })
+            
+            elif detected_issue == 'low_roas':
+                recommendations.append({
+                    'action': 'focus_high_value_segments',
+                    'priority': 'medium',
+                    'description': 'Bid up on segments with the highest conversion value',
+                    'expected_impact': '+15% ROAS'
+                })
+            
+            elif detected_issue == 'no_recent_activity':
+                recommendations.append({
+                    'action': 'review_campaign_status',
+                    'priority': 'low',
+                    'description': 'No impressions or spend in the latest window; confirm the campaign is live',
+                    'expected_impact': 'Restore delivery'
+                })
         
         return recommendations
\ No newline at end of file
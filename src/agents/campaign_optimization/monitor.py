@@ -0,0 +1,96 @@
+# agents/campaign_optimization/monitor.py
+from typing import Any, AsyncIterator, Dict, List, Optional, Set
+import asyncio
+from analytics.anomaly import AnomalyDetector
+from config import settings
+
+
+class CampaignMonitor:
+    """Streams campaign metrics through the anomaly detector and optimizes only flagged campaigns.
+
+    Each daily (or running intraday) row also updates the agent's KPI
+    engine, so the triggered analysis sees the day that tripped the alert.
+    Optimizations run in the background, at most ``max_concurrent`` at
+    once. An alert for a campaign whose optimization is still running is
+    held, and the campaign is optimized again with it once that run
+    finishes; further alerts in the meantime replace the held one
+    (counted as ``coalesced``). close() stops whatever is still running.
+    """
+
+    def __init__(self, agent, detector: AnomalyDetector = None, max_concurrent: int = None):
+        self.agent = agent
+        self.detector = detector or AnomalyDetector()
+        self._slots = asyncio.Semaphore(max_concurrent or settings.PIPELINE_OPTIMIZATION_WORKERS)
+        self._in_flight: Set[str] = set()
+        self._pending: Dict[str, Dict[str, Any]] = {}
+        self._tasks: Set[asyncio.Task] = set()
+        self.results: List[Dict[str, Any]] = []
+        self.stats = {'invocations': 0, 'coalesced': 0, 'failed': 0}
+
+    def check(self, row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Record one metrics row; returns an alert when the campaign needs optimizing"""
+        if row.get('date'):
+            self.agent.kpis.ingest([row])
+        return self.detector.observe(row)
+
+    async def observe(self, row: Dict[str, Any]):
+        alert = self.check(row)
+        if alert is None:
+            return
+        campaign_id = str(alert['campaign_id'])
+        if campaign_id in self._in_flight:
+            # Re-run once the current optimization finishes, with the latest alert
+            if campaign_id in self._pending:
+                self.stats['coalesced'] += 1
+            self._pending[campaign_id] = alert
+            return
+        self._in_flight.add(campaign_id)
+        task = asyncio.create_task(self._optimize(campaign_id, alert))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def _optimize(self, campaign_id: str, alert: Dict[str, Any]):
+        try:
+            while alert is not None:
+                await self._run_once(alert)
+                alert = self._pending.pop(campaign_id, None)
+        finally:
+            self._in_flight.discard(campaign_id)
+            self._pending.pop(campaign_id, None)
+
+    async def _run_once(self, alert: Dict[str, Any]):
+        try:
+            async with self._slots:
+                self.stats['invocations'] += 1
+                print(f"🚨 {alert['campaign_id']}: {alert['issue']} detected on {alert['observed_at'][:10]}")
+                result = await self.agent.process({'campaign_id': alert['campaign_id'], 'issue': alert['issue']})
+                result['anomaly'] = alert
+                self.results.append(result)
+        except Exception as e:
+            self.stats['failed'] += 1
+            print(f"⚠️ Optimization for {alert['campaign_id']} failed: {e}")
+
+    async def drain(self):
+        """Wait for every optimization started so far, including held re-runs"""
+        while self._tasks:
+            await asyncio.gather(*list(self._tasks))
+
+    async def close(self):
+        """Cancel the optimizations still running, drop held alerts and close the agent"""
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*list(self._tasks), return_exceptions=True)
+        self._pending.clear()
+        close = getattr(self.agent, 'close', None)
+        if close:
+            await close()
+
+    async def run(self, source: AsyncIterator[Dict[str, Any]]) -> Dict[str, Any]:
+        """Consume a metrics stream to the end; returns detector and invocation counts"""
+        try:
+            async for row in source:
+                await self.observe(row)
+            await self.drain()
+        finally:
+            await self.close()
+        return {**self.detector.stats, **self.stats}
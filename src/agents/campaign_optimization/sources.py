@@ -0,0 +1,16 @@
+# agents/campaign_optimization/sources.py
+from typing import AsyncIterator, Dict, Optional
+import asyncio
+import csv
+
+
+async def stream_campaign_daily_csv(path: str = 'data/campaign_daily.csv', limit: Optional[int] = None,
+                                    interval: float = 0.0) -> AsyncIterator[Dict]:
+    """Replay a campaign_daily.csv-shaped export in date order, optionally spaced out like live data"""
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = sorted(csv.DictReader(f), key=lambda row: row['date'])
+    for i, row in enumerate(rows):
+        if limit is not None and i >= limit:
+            return
+        yield row
+        await asyncio.sleep(interval)
@@ -1,33 +1,73 @@
 # agents/engagement/agent.py
 from agents.base_agent import BaseAgent
-from typing import Dict, Any
+from agents.engagement.dispatcher import OutreachDispatcher, Sender, normalize_channel
+from analytics.attribution import record_touch
+from analytics.bandit import VariantBandit, get_variant_bandit
+from memory.backends import get_short_term_backend
+from scheduling.follow_ups import FollowUpScheduler
+from typing import Dict, Any, Awaitable, Callable, Optional
 from datetime import datetime
-import json
+import asyncio
+import time
 class EngagementAgent(BaseAgent):
     """Manages personalized outreach and lead nurturing"""
+
+    HANDOFF_FIELDS = ('lead', 'category', 'priority', 'conversation_id')
     
-    def __init__(self, mcp_client):
+    def __init__(self, mcp_client, sender: Sender = None, variants: VariantBandit = None):
         super().__init__("engagement_agent", mcp_client)
         self.email_templates = self._load_templates()
+        # A/B creative for each send, picked by Thompson sampling over the variants' results
+        self.variants = variants or get_variant_bandit()
+        self.dispatcher = OutreachDispatcher(sender)
+        # Template follow-ups are scheduled after a successful first send; run()
+        # a scheduler worker (main.py --follow-ups) to fire them
+        self.follow_ups = FollowUpScheduler(self._send_follow_up)
+        # Escalations are raised after a send completes; a pipeline hooks in here to route them
+        self.on_escalation: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None
         print("Engagement Agent ready")
     
     async def process(self, input_data: Dict[str, Any]) -> Dict[str, Any]:
-        """Process engagement request"""
-        # In the process() method...
+        """Plan outreach and queue it for dispatch; returns once the send is queued"""
+        input_data = await self.receive(input_data)
         print(f"\n📧 Processing engagement for lead: {input_data.get('email')}")
         
         lead = input_data.get('lead', {})
         category = input_data.get('category')
         priority = input_data.get('priority', 'normal')
         
+        # Pick up other workers' variant results every BANDIT_REFRESH_SECONDS
+        await self.variants.maybe_refresh()
+
         # Get lead preferences from memory
-        preferences = await self._get_preferences(lead.get('email'))
+        preferences = await self._get_preferences(lead.get('email'), lead.get('preferred_channel'))
         
         # Create personalized outreach
         outreach_plan = self._create_outreach_plan(lead, category, preferences)
         
-        # Execute outreach (simulation)
-        execution_result = await self._execute_outreach(outreach_plan)
+        # Queue the send; logging, memory and escalation follow when it completes
+        return await self._execute_outreach(lead, outreach_plan, priority, input_data.get('conversation_id'))
+
+    async def drain(self):
+        """Wait for every queued send and its follow-up work"""
+        await self.dispatcher.drain()
+
+    async def close(self):
+        """Stop firing follow-ups, then drain and stop the dispatcher's workers"""
+        await self.follow_ups.close()
+        await self.dispatcher.close()
+        await super().close()
+
+    async def _record_outreach(self, lead: Dict, outreach_plan: Dict, priority: str,
+                               conversation_id: Optional[str], execution_result: Dict):
+        """Log, remember and (if needed) escalate a completed send"""
+        # Only the slots this turn touched are written back
+        if conversation_id:
+            await self.conversations.update(
+                conversation_id,
+                slots={'channel': outreach_plan['channel'], 'last_outreach_status': execution_result['status']},
+                lead_id=lead.get('id')
+            )
         
         # Log interaction
         await self.mcp_client.request('log_interaction', {
@@ -50,37 +90,87 @@ class EngagementAgent(BaseAgent):
             'importance': 0.8 if priority == 'high' else 0.5
         })
         
+        if execution_result['status'] == 'sent':
+            await self._record_touch(lead, outreach_plan, 'outreach')
+        if execution_result['status'] == 'sent' and outreach_plan.get('variant_id'):
+            await self.variants.remember_send(lead.get('email'), outreach_plan['variant_id'])
+
+        # Follow-ups go out only after a successful first send, and only once
+        if execution_result['status'] == 'sent' and lead.get('email') and outreach_plan.get('follow_up_sequence'):
+            await self.follow_ups.schedule_sequence(lead['email'], outreach_plan['follow_up_sequence'], {
+                'lead': lead,
+                'plan': {**outreach_plan, 'follow_up_sequence': []}
+            })
+
         # Check if needs escalation to Campaign Optimization
         if execution_result.get('performance_concern'):
             print("⚠️ Performance concern detected! Handing off to Campaign Optimization...")
             handoff_result = await self.handoff('campaign_optimization_agent', {
+                'campaign_id': lead.get('campaign_id'),
                 'lead': lead,
                 'outreach_plan': outreach_plan,
                 'execution_result': execution_result,
                 'issue': 'low_engagement_rate'
             })
             execution_result['escalation'] = handoff_result
-        
-        return execution_result
+            if self.on_escalation:
+                await self.on_escalation(handoff_result)
     
-    async def _get_preferences(self, email: str) -> Dict:
+    async def _send_follow_up(self, job: Dict[str, Any]) -> Dict[str, Any]:
+        """Send one scheduled follow-up step through the dispatcher; returns the send's result"""
+        lead = job['payload']['lead']
+        plan = {**job['payload']['plan'], 'follow_up_step': job['step']}
+        delivered = asyncio.get_running_loop().create_future()
+
+        async def on_sent(result: Dict):
+            # The scheduler releases the job's lease on this result; the bookkeeping follows
+            if not delivered.done():
+                delivered.set_result(result)
+            await self.mcp_client.request('log_interaction', {
+                'lead_id': lead.get('id'),
+                'agent_id': self.agent_id,
+                'interaction_type': 'follow_up',
+                'content': plan['message_preview'],
+                'outcome': result['status'],
+                'metadata': plan
+            })
+            if result['status'] == 'sent':
+                await self._record_touch(lead, plan, 'follow_up')
+
+        await self.dispatcher.submit(plan['channel'], {'lead': lead, 'plan': plan}, on_sent)
+        return await delivered
+
+    async def _record_touch(self, lead: Dict, plan: Dict, action: str):
+        """Add a delivered send to the lead's attribution path"""
+        await record_touch(get_short_term_backend(), lead.get('email'), {
+            'at': time.time(),
+            'campaign_id': lead.get('campaign_id'),
+            'channel': plan['channel'],
+            'variant_id': plan.get('variant_id'),
+            'action': action
+        })
+    
+    async def _get_preferences(self, email: str, default_channel: str = None) -> Dict:
         """Get customer preferences from memory"""
-        if not email:
-            return {}
-        
-        memories = await self.long_term_memory.query(email, 'lead')
-        
         # Extract preferences
         preferences = {
-            'channel': 'email',  # default
+            'channel': normalize_channel(default_channel),  # lead's preferred channel, else email
             'time_preference': 'morning',
             'content_type': 'detailed'
         }
-        
-        for memory in memories:
-            if 'channel' in memory.get('data', {}):
-                preferences['channel'] = memory['data']['channel']
-        
+        if not email:
+            return preferences
+        
+        context = await self.memory.recall(email, need=('profile',))
+        profile = context['results'].get('profile')
+
+        if profile:
+            for key in ('channel', 'time_preference', 'content_type'):
+                if profile.get(key):
+                    preferences[key] = profile[key]
+            preferences['interests'] = list(profile.get('interests') or [])
+            preferences['interaction_count'] = profile.get('interaction_count', 0)
+
         return preferences
     
     def _create_outreach_plan(self, lead: Dict, category: str, preferences: Dict) -> Dict:
@@ -100,25 +190,22 @@ class EngagementAgent(BaseAgent):
             'scheduled_time': datetime.now().isoformat(),
             'follow_up_sequence': template['follow_ups']
         }
+
+        variant = self.variants.assign(lead.get('campaign_id'), channel)
+        if variant:
+            plan['variant_id'] = variant['variant_id']
+            plan['subject_line'] = variant.get('subject_line')
+            plan['call_to_action'] = variant.get('call_to_action')
         
         return plan
     
-    async def _execute_outreach(self, plan: Dict) -> Dict:
-        """Execute outreach plan (simulation)"""
-        # In production, this would actually send emails, create social posts, etc.
-        
-        import random
-        success = random.random() > 0.3  # 70% success rate
-        
-        result = {
-            'status': 'sent' if success else 'failed',
-            'channel': plan['channel'],
-            'timestamp': datetime.now().isoformat(),
-            'engagement_rate': random.uniform(0.1, 0.4),
-            'performance_concern': random.random() < 0.2  # 20% chance of concern
-        }
-        
-        return result
+    async def _execute_outreach(self, lead: Dict, plan: Dict, priority: str,
+                                conversation_id: Optional[str] = None) -> Dict:
+        """Hand the outreach to the channel's rate-limited dispatcher"""
+        async def on_sent(result: Dict):
+            await self._record_outreach(lead, plan, priority, conversation_id, result)
+
+        return await self.dispatcher.submit(plan['channel'], {'lead': lead, 'plan': plan}, on_sent)
     
     def _load_templates(self) -> Dict:
         """Load email templates"""
@@ -0,0 +1,197 @@
+# agents/engagement/dispatcher.py
+"""Rate-limited outreach dispatch with a send queue and worker pool per channel.
+
+Each channel (email, sms, social, call) has a bounded queue, a token
+bucket sized to its provider's rate limit and its own workers. Workers
+take up to ``batch_size`` queued messages at a time, so providers with a
+bulk endpoint get one request per batch. Senders are pluggable: the
+default ``SimulatedSender`` stands in for real providers locally.
+
+Completion handlers run on a separate queue and worker pool, so slow
+bookkeeping after a send never holds up the send workers. drain() waits
+for both; close() drains and then stops every worker.
+"""
+from abc import ABC, abstractmethod
+from typing import Any, Awaitable, Callable, Dict, List, Optional
+from datetime import datetime
+import asyncio
+import random
+import uuid
+from communication.rate_limit import TokenBucket
+from config import settings
+
+# preferred_channel values without a send provider of their own
+CHANNEL_FALLBACKS = {'ads': 'email', 'web': 'email'}
+
+
+def normalize_channel(channel: Optional[str]) -> str:
+    name = (channel or 'email').strip().lower()
+    return CHANNEL_FALLBACKS.get(name, name)
+
+
+class Sender(ABC):
+    """Provider integration: one call sends a batch of messages on one channel"""
+
+    @abstractmethod
+    async def send(self, channel: str, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Send messages and return one result per message, in order"""
+        pass
+
+
+class SimulatedSender(Sender):
+    """Local stand-in for real providers, with the old inline simulation's outcome rates"""
+
+    def __init__(self, latency: float = 0.0, rng: random.Random = None):
+        self.latency = latency
+        self.rng = rng or random
+        self.calls: List[tuple] = []
+
+    async def send(self, channel: str, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        self.calls.append((channel, len(messages)))
+        if self.latency:
+            await asyncio.sleep(self.latency)
+        results = []
+        for _ in messages:
+            success = self.rng.random() > 0.3  # 70% success rate
+            results.append({
+                'status': 'sent' if success else 'failed',
+                'channel': channel,
+                'timestamp': datetime.now().isoformat(),
+                'engagement_rate': self.rng.uniform(0.1, 0.4),
+                'performance_concern': self.rng.random() < 0.2  # 20% chance of concern
+            })
+        return results
+
+
+class _Channel:
+    def __init__(self, name: str, rate: float, burst: float, workers: int, batch_size: int, queue_size: int):
+        if batch_size > burst:
+            raise ValueError(f"Channel {name}: batch_size {batch_size} exceeds burst {burst}")
+        self.name = name
+        self.bucket = TokenBucket(rate, burst)
+        self.workers = int(workers)
+        self.batch_size = int(batch_size)
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.sent = 0
+        self.failed = 0
+        self.errors = 0
+        self.requests = 0
+        self.completion_errors = 0
+
+
+class OutreachDispatcher:
+    """Queues outreach per channel and sends it under each provider's rate limit"""
+
+    def __init__(self, sender: Sender = None, channels: Dict[str, Dict[str, float]] = None,
+                 queue_size: int = None, completion_workers: int = None):
+        self.sender = sender or SimulatedSender()
+        config = channels or settings.OUTREACH_CHANNELS
+        size = queue_size or settings.OUTREACH_QUEUE_SIZE
+        self.channels = {
+            name: _Channel(name, limits['rate'], limits.get('burst', limits['rate']),
+                           limits.get('workers', 1), limits.get('batch_size', 1), size)
+            for name, limits in config.items()
+        }
+        if 'email' not in self.channels:
+            raise ValueError("Outreach channels must include 'email' (the fallback channel)")
+        self.completion_workers = completion_workers or settings.OUTREACH_COMPLETION_WORKERS
+        self._completions: asyncio.Queue = asyncio.Queue(maxsize=size)
+        self._submitted = 0
+        self._tasks: List[asyncio.Task] = []
+
+    def _start(self):
+        # Workers are created on first use so they bind to the running event loop
+        if not self._tasks:
+            self._tasks = [
+                asyncio.create_task(self._worker(channel))
+                for channel in self.channels.values() for _ in range(channel.workers)
+            ] + [asyncio.create_task(self._completion_worker()) for _ in range(self.completion_workers)]
+
+    async def submit(self, channel: str, message: Dict[str, Any],
+                     on_complete: Optional[Callable[[Dict[str, Any]], Awaitable[None]]] = None) -> Dict[str, Any]:
+        """Enqueue a send and return a ticket; waits only while the channel's queue is full"""
+        self._start()
+        name = normalize_channel(channel)
+        target = self.channels.get(name) or self.channels['email']
+        dispatch_id = str(uuid.uuid4())
+        self._submitted += 1
+        await target.queue.put((dispatch_id, message, on_complete))
+        return {
+            'status': 'queued',
+            'dispatch_id': dispatch_id,
+            'channel': target.name,
+            'timestamp': datetime.now().isoformat(),
+            'queue_depth': target.queue.qsize()
+        }
+
+    async def _worker(self, channel: _Channel):
+        while True:
+            batch = [await channel.queue.get()]
+            while len(batch) < channel.batch_size and not channel.queue.empty():
+                batch.append(channel.queue.get_nowait())
+            try:
+                await channel.bucket.acquire(len(batch))
+                channel.requests += 1
+                try:
+                    results = await self.sender.send(channel.name, [message for _, message, _ in batch])
+                except Exception as e:
+                    channel.errors += len(batch)
+                    print(f"⚠️ {channel.name} send of {len(batch)} message(s) failed: {e}")
+                    results = [{'status': 'failed', 'channel': channel.name, 'error': str(e),
+                                'timestamp': datetime.now().isoformat()} for _ in batch]
+
+                for (dispatch_id, _, on_complete), result in zip(batch, results):
+                    result['dispatch_id'] = dispatch_id
+                    if result.get('status') == 'sent':
+                        channel.sent += 1
+                    else:
+                        channel.failed += 1
+                    if on_complete:
+                        # Waits only while the completion queue is full
+                        await self._completions.put((channel, on_complete, result))
+            finally:
+                for _ in batch:
+                    channel.queue.task_done()
+
+    async def _completion_worker(self):
+        while True:
+            channel, on_complete, result = await self._completions.get()
+            try:
+                await on_complete(result)
+            except Exception as e:
+                channel.completion_errors += 1
+                print(f"⚠️ Outreach completion handler failed: {e}")
+            finally:
+                self._completions.task_done()
+
+    async def drain(self):
+        """Wait until everything queued so far has been sent and its completion handled"""
+        while True:
+            submitted = self._submitted
+            await asyncio.gather(*(channel.queue.join() for channel in self.channels.values()))
+            await self._completions.join()
+            # A completion handler may have queued another send
+            if self._submitted == submitted:
+                return
+
+    async def close(self):
+        """Drain, then stop the workers"""
+        await self.drain()
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    def stats(self) -> Dict[str, Dict[str, Any]]:
+        return {
+            name: {
+                'sent': channel.sent,
+                'failed': channel.failed,
+                'errors': channel.errors,
+                'requests': channel.requests,
+                'completion_errors': channel.completion_errors,
+                'queue_depth': channel.queue.qsize(),
+                'throttled_s': round(channel.bucket.waited_seconds, 3)
+            }
+            for name, channel in self.channels.items()
+        }
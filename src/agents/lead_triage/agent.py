@@ -1,7 +1,13 @@
 # agents/lead_triage/agent.py
 from agents.base_agent import BaseAgent
-from typing import Dict, Any
-import random  # Replace with actual ML model
+from typing import Dict, Any, List, Sequence, Tuple
+import asyncio
+import hashlib
+import numpy as np
+from analytics.lead_scoring import get_lead_scorer
+from analytics.segments import get_segment_index
+from memory.triage_cache import TriageCache, fingerprint
+from config import settings
 
 class LeadTriageAgent(BaseAgent):
     """Categorizes and routes incoming leads"""
@@ -13,9 +19,20 @@ class LeadTriageAgent(BaseAgent):
         'general_inquiry': 'General Inquiry',
         'existing_customer': 'Existing Customer'
     }
+
+    # Rule-based score, used until a trained model beats chance
+    HIGH_VALUE_SIZES = ('1000-5000', '5000+')
+    HIGH_INTENT_SOURCES = ('webinar', 'demo_request')
+    # Match the row caps of the per-lead history and episode lookups
+    HISTORY_LIMIT = 50
+    EPISODE_LIMIT = 10
     
     def __init__(self, mcp_client):
         super().__init__("lead_triage_agent", mcp_client)
+        # None until a trained model beats chance; leads get the rule-based score meanwhile
+        self.scorer = get_lead_scorer()
+        self.cache = TriageCache(self.short_term_memory)
+        self.segments = get_segment_index()
         print("Lead Triage Agent ready")
     
     async def process(self, lead_data: Dict[str, Any]) -> Dict[str, Any]:
@@ -24,12 +41,21 @@ class LeadTriageAgent(BaseAgent):
         
         # Extract features
         features = self._extract_features(lead_data)
+
+        # A repeat arrival of an unchanged lead reuses its decision with no side effects
+        cached = await self.cache.get(lead_data.get('email'), features)
+        if cached is not None:
+            print("♻️ Duplicate lead: reusing cached triage")
+            return {**cached, 'lead_id': lead_data.get('id'), 'cached': True}
         
         # Get historical context
-        historical = await self._get_historical_context(lead_data.get('email'))
+        historical, prior_episodes, complete = await self._get_historical_context(lead_data.get('email'))
         
         # Classify lead
         category, confidence = self._classify_lead(features, historical)
+
+        # Segment memberships follow the lead's current attributes
+        segments = (await self.segments.update([lead_data]))[0]
         
         # Update lead in database
         if lead_data.get('id'):
@@ -47,9 +73,18 @@ class LeadTriageAgent(BaseAgent):
             'category': category,
             'confidence': confidence,
             'historical_interactions': len(historical),
+            'prior_episodes': len(prior_episodes),
+            'segments': segments,
             'recommended_action': self._get_recommendation(category, confidence)
         }
-        
+        if not complete:
+            result['provisional'] = True
+
+        # Cached before storing the interaction, so a consolidation it triggers can invalidate it.
+        # A decision made without the lead's full history is not reused
+        if complete:
+            await self.cache.put(lead_data.get('email'), features, result)
+
         # Store interaction
         await self.store_interaction({
             'entity_id': lead_data.get('email'),
@@ -65,16 +100,168 @@ class LeadTriageAgent(BaseAgent):
         # Handoff to Engagement Agent if high priority
         if category == self.CATEGORIES['campaign_qualified'] and confidence > 0.8:
             print("🎯 High-value lead detected! Handing off to Engagement Agent...")
-            handoff_result = await self.handoff('engagement_agent', {
-                'lead': lead_data,
-                'category': category,
-                'confidence': confidence,
-                'priority': 'high'
-            })
+            try:
+                handoff_result = await self.handoff('engagement_agent', {
+                    'lead': lead_data,
+                    'category': category,
+                    'confidence': confidence,
+                    'priority': 'high'
+                })
+            except Exception:
+                # A retry must hand off again, not hit the cache
+                await self.cache.invalidate(lead_data.get('email'))
+                raise
             result['handoff'] = handoff_result
         
         return result
-    
+
+    async def process_batch(self, leads: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Triage many leads with one history lookup, one status write and batched memory writes.
+
+        Gives the same results as calling process() per lead, except that every
+        lead in the batch sees memory as it was before the batch started, and a
+        failed handoff is reported on its lead as 'handoff_error' (that lead is
+        not cached) instead of raising.
+        """
+        if not leads:
+            return []
+        print(f"\n🔍 Triaging batch of {len(leads)} leads")
+
+        features = [self._extract_features(lead) for lead in leads]
+        emails = [lead.get('email') for lead in leads]
+        cached = await self.cache.get_many(emails, features)
+
+        # Only first arrivals get a full triage; repeats within the batch reuse
+        # that decision, as sequential process() calls would through the cache
+        fresh, repeat_of, first_seen = [], {}, {}
+        for i, (email, hit) in enumerate(zip(emails, cached)):
+            if hit is not None:
+                continue
+            key = (email.strip().lower(), fingerprint(features[i])) if email and self.cache.enabled else None
+            if key in first_seen:
+                repeat_of[i] = first_seen[key]
+                continue
+            if key:
+                first_seen[key] = i
+            fresh.append(i)
+
+        triaged = dict(zip(fresh, await self._triage_batch(
+            [leads[i] for i in fresh], [features[i] for i in fresh]
+        ))) if fresh else {}
+
+        results = []
+        for i, lead in enumerate(leads):
+            if i in triaged:
+                results.append(triaged[i])
+                continue
+            decision = cached[i] if cached[i] is not None else \
+                {k: v for k, v in triaged[repeat_of[i]].items() if k != 'handoff'}
+            results.append({**decision, 'lead_id': lead.get('id'), 'cached': True})
+
+        if len(fresh) < len(leads):
+            print(f"♻️ {len(leads) - len(fresh)} duplicate leads reused a cached triage")
+        return results
+
+    async def _triage_batch(self, leads: List[Dict[str, Any]], features: List[Dict]) -> List[Dict[str, Any]]:
+        """Full triage of leads that missed the cache"""
+        emails = [lead.get('email') for lead in leads]
+        known = [email for email in emails if email]
+
+        # History and prior episodes for the whole batch, concurrently and under the same
+        # deadline as a single lead's recall
+        try:
+            history, episodes = await asyncio.wait_for(asyncio.gather(
+                self.long_term_memory.count_many(known, 'lead', limit=self.HISTORY_LIMIT),
+                asyncio.to_thread(self.episodic_memory.count_by_entity, known, self.EPISODE_LIMIT)
+            ), timeout=settings.MEMORY_RECALL_DEADLINE)
+            complete = True
+        except Exception as e:
+            print(f"⚠️ Lead history unavailable for this batch ({e!r}); decisions are provisional")
+            history, episodes, complete = {}, {}, False
+        history_counts = [history.get(email, 0) if email else 0 for email in emails]
+        for email, count in zip(emails, history_counts):
+            if count:
+                self.semantic_memory.add_knowledge(
+                    entity=email,
+                    relationship='has_history',
+                    target='interactions',
+                    properties={'count': count}
+                )
+
+        categories, confidences = self._classify_batch(features, history_counts)
+        memberships = await self.segments.update(leads)
+
+        updates = [
+            {'lead_id': lead.get('id'), 'email': lead.get('email'), 'status': 'triaged', 'category': category}
+            for lead, category in zip(leads, categories) if lead.get('id') or lead.get('email')
+        ]
+        if updates:
+            await self.mcp_client.request('bulk_update_lead_status', {'updates': updates})
+
+        results, interactions, handoffs = [], [], []
+        for lead, email, category, confidence, count, segments in zip(leads, emails, categories, confidences,
+                                                                      history_counts, memberships):
+            results.append({
+                'lead_id': lead.get('id'),
+                'email': email,
+                'category': category,
+                'confidence': confidence,
+                'historical_interactions': count,
+                'prior_episodes': episodes.get(email, 0) if email else 0,
+                'segments': segments,
+                'recommended_action': self._get_recommendation(category, confidence)
+            })
+            if not complete:
+                results[-1]['provisional'] = True
+            interactions.append({
+                'entity_id': email,
+                'entity_type': 'lead',
+                'problem': 'lead_categorization',
+                'solution': category,
+                'outcome': 'success',
+                'confidence': confidence,
+                'significant': confidence > 0.8,
+                'importance': confidence
+            })
+            if category == self.CATEGORIES['campaign_qualified'] and confidence > 0.8:
+                handoffs.append((results[-1], {
+                    'lead': lead,
+                    'category': category,
+                    'confidence': confidence,
+                    'priority': 'high'
+                }))
+
+        # Handoffs settle before anything is cached: a lead whose handoff failed stays uncached so
+        # a retry hands it off again, and the others' handoffs don't depend on its outcome
+        failed = set()
+        if handoffs:
+            print(f"🎯 {len(handoffs)} high-value leads detected! Handing off to Engagement Agent...")
+            handoff_results = await asyncio.gather(
+                *(self.handoff('engagement_agent', context) for _, context in handoffs),
+                return_exceptions=True
+            )
+            for (result, _), outcome in zip(handoffs, handoff_results):
+                if isinstance(outcome, Exception):
+                    failed.add(id(result))
+                    print(f"⚠️ Handoff failed for {result['email']}: {outcome}")
+
+        # Cached before storing the interactions, so a consolidation they trigger can invalidate them
+        if complete:
+            await self.cache.put_many([
+                (email, feature, result) for email, feature, result in zip(emails, features, results)
+                if id(result) not in failed
+            ])
+        await self.store_interactions(interactions)
+
+        if handoffs:
+            for (result, _), outcome in zip(handoffs, handoff_results):
+                if id(result) in failed:
+                    result['handoff_error'] = str(outcome)
+                else:
+                    result['handoff'] = outcome
+
+        return results
+
     def _extract_features(self, lead_data: Dict) -> Dict:
         """Extract classification features"""
         return {
@@ -82,16 +269,31 @@ class LeadTriageAgent(BaseAgent):
             'engagement_score': lead_data.get('engagement_score', 0),
             'company_size': lead_data.get('company_size', 'unknown'),
             'industry': lead_data.get('industry', 'unknown'),
-            'has_company': bool(lead_data.get('company'))
+            'persona': lead_data.get('persona'),
+            'region': lead_data.get('region'),
+            'preferred_channel': lead_data.get('preferred_channel'),
+            'campaign_id': lead_data.get('campaign_id'),
+            'gdpr_consent': lead_data.get('gdpr_consent'),
+            'has_company': bool(lead_data.get('company')),
+            'key': lead_data.get('email') or lead_data.get('id')
         }
     
-    async def _get_historical_context(self, email: str) -> list:
-        """Get historical interactions"""
+    async def _get_historical_context(self, email: str) -> tuple:
+        """Historical interactions, past episodes, and whether both were fetched in time"""
         if not email:
-            return []
+            return [], [], True
         
-        # Check long-term memory
-        historical = await self.long_term_memory.query(email, 'lead')
+        # Long-term history and episodes are fetched concurrently under one deadline.
+        # Only the row count feeds classification, so skip decoding the JSONB payloads
+        context = await self.memory.recall(
+            email, need=('history', 'episodes'),
+            history_columns=('id', 'importance_score', 'created_at')
+        )
+        historical = context['results'].get('history', [])
+        prior_episodes = context['results'].get('episodes', [])
+        if not context['complete']:
+            print(f"⚠️ Incomplete history for {email} (timed out: {context['timed_out']}, "
+                  f"errors: {context['errors']}); decision is provisional")
         
         # Add to semantic memory
         if historical:
@@ -102,38 +304,47 @@ class LeadTriageAgent(BaseAgent):
                 properties={'count': len(historical)}
             )
         
-        return historical
+        return historical, prior_episodes, context['complete']
     
     def _classify_lead(self, features: Dict, historical: list) -> tuple:
-        """Classify lead (simplified - replace with ML model)"""
-        score = 0
-        
-        # Scoring logic
-        if features['engagement_score'] > 70:
-            score += 0.4
-        if features['company_size'] in ['1000-5000', '5000+']:
-            score += 0.3
-        if len(historical) > 0:
-            score += 0.2
-        if features['source'] in ['webinar', 'demo_request']:
-            score += 0.1
-        
-        # Determine category
-        if score > 0.8:
-            category = self.CATEGORIES['campaign_qualified']
-        elif score > 0.6:
-            category = self.CATEGORIES['sales_qualified']
-        elif len(historical) > 0:
-            category = self.CATEGORIES['existing_customer']
-        elif score > 0.3:
-            category = self.CATEGORIES['general_inquiry']
+        """Classify lead with the scoring model (or rules)"""
+        categories, confidences = self._classify_batch([features], [len(historical)])
+        return categories[0], confidences[0]
+
+    def _classify_batch(self, features: List[Dict], history_counts: Sequence[int]) -> Tuple[List[str], List[float]]:
+        """Score a batch of feature dicts with the lead-scoring model, or the rules while there is none"""
+        has_history = np.asarray(history_counts, dtype=int) > 0
+        if self.scorer is not None:
+            _, confidence = self.scorer.score(features)
+            score = confidence
         else:
-            category = self.CATEGORIES['cold_lead']
-        
-        confidence = min(score + random.uniform(0.1, 0.2), 1.0)
-        
-        return category, round(confidence, 2)
+            score, confidence = self._rule_score(features, has_history)
+
+        labels = np.array([
+            self.CATEGORIES['campaign_qualified'], self.CATEGORIES['sales_qualified'],
+            self.CATEGORIES['existing_customer'], self.CATEGORIES['general_inquiry'],
+            self.CATEGORIES['cold_lead']
+        ], dtype=object)
+        choice = np.select([score > 0.8, score > 0.6, has_history, score > 0.3], [0, 1, 2, 3], default=4)
+        return list(labels[choice]), [round(float(c), 2) for c in confidence]
     
+    def _rule_score(self, features: List[Dict], has_history: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """Hand-written (score, confidence): the category comes from the score, the jitter is only reported"""
+        n = len(features)
+        engaged = np.fromiter(((f['engagement_score'] or 0) > 70 for f in features), bool, n)
+        high_value = np.fromiter((f['company_size'] in self.HIGH_VALUE_SIZES for f in features), bool, n)
+        high_intent = np.fromiter((f['source'] in self.HIGH_INTENT_SOURCES for f in features), bool, n)
+        score = 0.4 * engaged + 0.3 * high_value + 0.2 * has_history + 0.1 * high_intent
+        return score, np.minimum(score + self._confidence_noise([f.get('key') for f in features]), 1.0)
+
+    @staticmethod
+    def _confidence_noise(keys: Sequence) -> np.ndarray:
+        """Per-lead jitter in [0.1, 0.2), derived from the lead so re-triage is reproducible"""
+        return np.array([
+            0.1 + 0.1 * int.from_bytes(hashlib.blake2b(str(key).encode(), digest_size=8).digest(), 'big') / 2 ** 64
+            for key in keys
+        ])
+
     def _get_recommendation(self, category: str, confidence: float) -> str:
         """Get next step recommendation"""
         recommendations = {
@@ -0,0 +1,55 @@
+# agents/lead_triage/sources.py
+from typing import AsyncIterator, Dict, List, Optional
+import asyncio
+import csv
+from config import settings
+
+
+def load_leads_csv(path: str = 'data/leads.csv') -> List[Dict]:
+    """Read a leads.csv-shaped export into the lead dicts LeadTriageAgent expects.
+
+    The file's lead_id (e.g. L0000001) is not a database id, so it is kept
+    as external_id and leads are matched by email when statuses are written.
+    """
+    leads = []
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            leads.append({
+                'external_id': row['lead_id'],
+                'email': row['email'],
+                'source': row['source'].strip().lower().replace(' ', '_'),
+                'engagement_score': int(float(row['lead_score'] or 0)),
+                'company_size': row['company_size'],
+                'industry': row['industry'],
+                'campaign_id': row['campaign_id'],
+                'persona': row['persona'],
+                'region': row['region'],
+                'preferred_channel': row['preferred_channel'],
+                'gdpr_consent': row['gdpr_consent'] == 'True',
+                'status': row['lead_status']
+            })
+    return leads
+
+
+async def stream_leads_csv(path: str = 'data/leads.csv', limit: Optional[int] = None,
+                           interval: float = 0.0) -> AsyncIterator[Dict]:
+    """Yield leads from a CSV export, optionally spaced out to mimic live arrivals"""
+    for i, lead in enumerate(load_leads_csv(path)):
+        if limit is not None and i >= limit:
+            return
+        yield lead
+        await asyncio.sleep(interval)
+
+
+async def stream_leads_rpc(mcp_client, after_id: int = 0, batch_size: int = 100,
+                           poll_interval: float = None) -> AsyncIterator[Dict]:
+    """Yield new leads from the MCP server as they arrive, polling list_new_leads forever"""
+    poll_interval = settings.PIPELINE_POLL_INTERVAL if poll_interval is None else poll_interval
+    while True:
+        result = await mcp_client.request('list_new_leads', {'after_id': after_id, 'limit': batch_size})
+        leads = result.get('leads', [])
+        for lead in leads:
+            after_id = max(after_id, lead['id'])
+            yield lead
+        if len(leads) < batch_size:
+            await asyncio.sleep(poll_interval)
@@ -0,0 +1,144 @@
+# analytics/anomaly.py
+"""Streaming detection of campaign KPI drops (EWMA baseline + one-sided CUSUM).
+
+For every campaign and KPI the detector keeps an exponentially weighted
+mean and variance and a CUSUM of standardized deviations in the harmful
+direction (CTR and ROAS falling, CPL and unsubscribe rate rising). That
+is a fixed handful of floats per campaign and KPI. Each new observation
+is scored against the baseline from before it arrived. An alert fires
+when the CUSUM crosses ``h`` standard deviations, after ``warmup``
+observations. A (campaign, KPI) pair that alerted stays quiet for the
+cooldown, measured on the observations' own timestamps so replays
+behave like live data.
+"""
+from typing import Any, Dict, Optional, Tuple
+from datetime import datetime, timedelta
+import math
+from config import settings
+
+# KPI -> (numerator, denominator, minimum denominator for a usable reading, higher is better,
+# tracked on a log scale). Money ratios swing multiplicatively day to day, so their
+# baselines are kept in log space.
+KPI_INPUTS = {
+    'ctr': ('clicks', 'impressions', 100, True, False),
+    'cpl': ('cost_usd', 'leads_created', 5, False, True),
+    'roas': ('revenue_usd', 'cost_usd', 1.0, True, True),
+    'unsubscribe_rate': ('unsubscribes', 'sends', 100, False, False),
+}
+LOG_OFFSET = 0.01
+# Named like the KPI engine's issues so the optimization agent recommends the matching fix
+ISSUES = {'ctr': 'low_click_rate', 'cpl': 'high_cost_per_lead', 'roas': 'low_roas',
+          'unsubscribe_rate': 'high_unsubscribe_rate'}
+# Relative noise floor: a deviation smaller than this share of the mean is never significant
+RELATIVE_FLOOR = 0.05
+
+
+def _timestamp(row: Dict) -> datetime:
+    value = row.get('timestamp') or row.get('date')
+    if isinstance(value, datetime):
+        return value
+    return datetime.fromisoformat(str(value)) if value else datetime.now()
+
+
+def kpi_readings(row: Dict) -> Dict[str, float]:
+    """KPIs computable from one observation; a precomputed KPI is used only without its inputs"""
+    readings = {}
+    for name, (numerator, denominator, minimum, _, _) in KPI_INPUTS.items():
+        try:
+            if numerator not in row or denominator not in row:
+                if row.get(name) not in (None, ''):
+                    readings[name] = float(row[name])
+                continue
+            base = float(row[denominator] or 0)
+            # Too little volume for the ratio to mean anything
+            if base >= minimum:
+                readings[name] = float(row[numerator] or 0) / base
+        except (TypeError, ValueError):
+            continue
+    return readings
+
+
+class _Series:
+    """EWMA mean/variance and CUSUM for one campaign KPI"""
+
+    __slots__ = ('count', 'mean', 'variance', 'cusum', 'quiet_until')
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.variance = 0.0
+        self.cusum = 0.0
+        self.quiet_until: Optional[datetime] = None
+
+
+class AnomalyDetector:
+    """Per-campaign EWMA/CUSUM drop detector over a stream of metric observations"""
+
+    def __init__(self, alpha: float = None, k: float = None, h: float = None, warmup: int = None,
+                 cooldown: timedelta = None):
+        self.alpha = alpha or settings.ANOMALY_EWMA_ALPHA
+        self.k = settings.ANOMALY_CUSUM_K if k is None else k
+        self.h = h or settings.ANOMALY_CUSUM_H
+        self.warmup = settings.ANOMALY_WARMUP if warmup is None else warmup
+        self.cooldown = cooldown if cooldown is not None else timedelta(hours=settings.ANOMALY_COOLDOWN_HOURS)
+        self._series: Dict[Tuple[str, str], _Series] = {}
+        self.stats = {'observations': 0, 'alerts': 0, 'suppressed': 0}
+
+    def __len__(self) -> int:
+        return len(self._series)
+
+    def observe(self, row: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """Score one observation; returns an alert covering every KPI that tripped, or None"""
+        campaign_id = str(row['campaign_id'])
+        at = _timestamp(row)
+        self.stats['observations'] += 1
+        tripped = []
+
+        for name, reading in kpi_readings(row).items():
+            higher_is_better, log_scale = KPI_INPUTS[name][3:]
+            value = math.log(max(reading, 0.0) + LOG_OFFSET) if log_scale else reading
+            series = self._series.get((campaign_id, name))
+            if series is None:
+                series = self._series[(campaign_id, name)] = _Series()
+
+            # Scored only once the baseline has settled, against the baseline from before this reading
+            if series.count >= max(self.warmup, 1):
+                spread = math.sqrt(max(series.variance, (RELATIVE_FLOOR * series.mean) ** 2, 1e-12))
+                z = (value - series.mean) / spread
+                harm = -z if higher_is_better else z
+                series.cusum = max(0.0, series.cusum + harm - self.k)
+                if series.cusum > self.h:
+                    if series.quiet_until and at < series.quiet_until:
+                        self.stats['suppressed'] += 1
+                    else:
+                        baseline = math.exp(series.mean) - LOG_OFFSET if log_scale else series.mean
+                        tripped.append({'metric': name, 'issue': ISSUES[name], 'value': reading,
+                                        'baseline': baseline, 'z': z, 'cusum': series.cusum})
+                        series.quiet_until = at + self.cooldown
+                    series.cusum = 0.0
+
+            # Plain running averages until the EWMA weight takes over, so early estimates aren't
+            # dominated by the first reading
+            weight = max(self.alpha, 1.0 / (series.count + 1))
+            deviation = value - series.mean
+            series.mean += weight * deviation
+            series.variance = (1 - weight) * (series.variance + weight * deviation ** 2)
+            series.count += 1
+
+        if not tripped:
+            return None
+        self.stats['alerts'] += 1
+        # The most severe drop names the issue; the rest ride along in the same alert
+        tripped.sort(key=lambda drop: drop['cusum'], reverse=True)
+        return {
+            'campaign_id': row['campaign_id'],
+            'issue': tripped[0]['issue'],
+            'observed_at': at.isoformat(),
+            'drops': tripped
+        }
+
+    def state(self, campaign_id) -> Dict[str, Dict[str, float]]:
+        """Current baseline per KPI for one campaign (log-scale KPIs in log units)"""
+        return {name: {'mean': series.mean, 'std': math.sqrt(series.variance), 'cusum': series.cusum,
+                       'count': series.count}
+                for (cid, name), series in self._series.items() if cid == str(campaign_id)}
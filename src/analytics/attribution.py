@@ -0,0 +1,300 @@
+# analytics/attribution.py
+"""Multi-touch conversion attribution per campaign, channel, A/B variant and agent action.
+
+A lead's touchpoints (outreach sends, follow-ups, interactions, agent
+actions) form a path. Each conversion credits the path's touches within
+ATTRIBUTION_LOOKBACK_DAYS under four models: first touch, last touch,
+linear, and time decay (weight halving every ATTRIBUTION_HALF_LIFE_DAYS
+before the conversion). Only the last ATTRIBUTION_MAX_TOUCHES touches
+count. A conversion consumes its path, so the next one starts fresh. A
+conversion with no touches is credited directly to its own campaign, as
+is any touch that doesn't name a campaign. Channel, variant and action
+credit is split among the touches that carry that field.
+
+History is attributed in one pass over events sorted by lead and time
+(attribute_stream). Memory holds one lead's path, plus the running
+totals. Live traffic is attributed as it happens. record_touch() appends
+to the lead's path in the short-term store, where it expires after the
+lookback. attribute_conversions() credits the path and adds the result to
+one credit hash per campaign. Nothing is ever recomputed from scratch.
+"""
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence
+from collections import deque
+from datetime import datetime
+import asyncio
+import csv
+import heapq
+import json
+import sys
+import numpy as np
+from memory.backends import ShortTermBackend, get_short_term_backend
+from config import settings
+
+MODELS = ('first_touch', 'last_touch', 'linear', 'time_decay')
+# Touch field -> breakdown within a campaign
+DIMENSIONS = {'channel': 'channels', 'variant_id': 'variants', 'action': 'actions'}
+METRICS = ('conversions', 'value')
+PATH_KEY_PREFIX = 'attribution:path'
+CREDIT_KEY_PREFIX = 'attribution:campaign'
+# Campaign -> count of writes to its credits, so readers can tell whether a cached report is current
+VERSIONS_KEY = 'attribution:versions'
+# Credits are fractional; the shared hash stores them as integer millionths
+SCALE = 1_000_000
+# agent_actions.csv action types that reach the lead (triage, memory upkeep etc. don't)
+TOUCH_ACTIONS = ('outreach', 'follow_up', 'handoff', 'escalate')
+_TOUCH, _CONVERSION = 0, 1
+
+
+def _epoch(value) -> float:
+    if isinstance(value, (int, float)):
+        return float(value)
+    if isinstance(value, datetime):
+        return value.timestamp()
+    return datetime.fromisoformat(str(value)).timestamp()
+
+
+def _lead(lead) -> str:
+    return str(lead).strip().lower()
+
+
+def _path_key(lead) -> str:
+    return f"{PATH_KEY_PREFIX}:{_lead(lead)}"
+
+
+def _credit_key(campaign_id) -> str:
+    return f"{CREDIT_KEY_PREFIX}:{campaign_id}"
+
+
+def model_weights(times: Sequence[float], converted_at: float, half_life: float) -> Dict[str, np.ndarray]:
+    """Each model's share of one conversion per touch (touches in time order; each model sums to 1)"""
+    n = len(times)
+    first, last = np.zeros(n), np.zeros(n)
+    first[0] = last[-1] = 1.0
+    decay = np.exp2(-(converted_at - np.asarray(times, dtype=float)) / half_life)
+    return {'first_touch': first, 'last_touch': last, 'linear': np.full(n, 1.0 / n),
+            'time_decay': decay / decay.sum()}
+
+
+class Attribution:
+    """Credited conversions and value per campaign, model and touch dimension"""
+
+    def __init__(self, half_life_days: float = None, lookback_days: float = None, max_touches: int = None):
+        self.half_life = (half_life_days or settings.ATTRIBUTION_HALF_LIFE_DAYS) * 86400
+        self.lookback = (lookback_days or settings.ATTRIBUTION_LOOKBACK_DAYS) * 86400
+        self.max_touches = max_touches or settings.ATTRIBUTION_MAX_TOUCHES
+        # campaign -> "model:metric" or "model:dimension=key:metric" -> credit
+        self.credits: Dict[str, Dict[str, float]] = {}
+        self.conversions = 0
+
+    def credit(self, path: Sequence[Dict[str, Any]], conversion: Dict[str, Any]) -> Dict[str, Dict[str, float]]:
+        """Credits for one conversion given its lead's touches (time order); also added to the totals"""
+        at = conversion['at']
+        touches = [t for t in path if at - self.lookback <= t['at'] <= at][-self.max_touches:]
+        fallback = conversion.get('campaign_id')
+        if not touches:
+            touches = [{'at': at, 'campaign_id': fallback}]
+        # (campaign, credit field) -> share of this conversion
+        shares: Dict[tuple, float] = {}
+        campaigns = [t.get('campaign_id') or fallback for t in touches]
+        for model, weights in model_weights([t['at'] for t in touches], at, self.half_life).items():
+            for campaign_id, weight in zip(campaigns, weights):
+                if campaign_id and weight:
+                    shares[campaign_id, model] = shares.get((campaign_id, model), 0.0) + weight
+        for field in DIMENSIONS:
+            carrying = [(t, c) for t, c in zip(touches, campaigns) if t.get(field) and c]
+            if not carrying:
+                continue
+            for model, weights in model_weights([t['at'] for t, _ in carrying], at, self.half_life).items():
+                for (touch, campaign_id), weight in zip(carrying, weights):
+                    if weight:
+                        key = (campaign_id, f"{model}:{field}={touch[field]}")
+                        shares[key] = shares.get(key, 0.0) + weight
+
+        value = float(conversion.get('value') or 0.0)
+        credits: Dict[str, Dict[str, float]] = {}
+        for (campaign_id, field), share in shares.items():
+            fields = credits.setdefault(str(campaign_id), {})
+            fields[f"{field}:conversions"] = share
+            fields[f"{field}:value"] = share * value
+        self.add(credits)
+        self.conversions += 1
+        return credits
+
+    def add(self, credits: Dict[str, Dict[str, float]]):
+        for campaign_id, fields in credits.items():
+            totals = self.credits.setdefault(campaign_id, {})
+            for field, amount in fields.items():
+                totals[field] = totals.get(field, 0.0) + amount
+
+    def campaign(self, campaign_id) -> Dict[str, Any]:
+        return campaign_report(campaign_id, self.credits.get(str(campaign_id), {}))
+
+    def campaigns(self) -> List[str]:
+        return sorted(self.credits)
+
+
+def campaign_report(campaign_id, fields: Dict[str, float]) -> Dict[str, Any]:
+    """Per-model totals and channel/variant/action breakdowns from one campaign's credit fields"""
+    report = {'campaign_id': campaign_id,
+              'models': {model: dict.fromkeys(METRICS, 0.0) for model in MODELS},
+              **{name: {} for name in DIMENSIONS.values()}}
+    for field, amount in fields.items():
+        parts = field.split(':')
+        model, metric = parts[0], parts[-1]
+        if model not in MODELS or metric not in METRICS:
+            continue
+        if len(parts) == 2:
+            report['models'][model][metric] += amount
+            continue
+        dimension, _, key = parts[1].partition('=')
+        if dimension in DIMENSIONS:
+            entry = report[DIMENSIONS[dimension]].setdefault(key, {m: dict.fromkeys(METRICS, 0.0) for m in MODELS})
+            entry[model][metric] += amount
+    return report
+
+
+def attribute_stream(events: Iterable[Dict[str, Any]], attribution: Attribution = None) -> Attribution:
+    """One pass over touch and conversion events sorted by lead, then time; memory holds one lead's path"""
+    attribution = attribution or Attribution()
+    path: deque = deque(maxlen=attribution.max_touches)
+    lead, last_at = None, None
+    for event in events:
+        if event['lead'] != lead:
+            lead, last_at = event['lead'], None
+            path.clear()
+        if last_at is not None and event['at'] < last_at:
+            raise ValueError(f"Events for lead {lead} are not in time order")
+        last_at = event['at']
+        if event['kind'] == 'conversion':
+            attribution.credit(path, event)
+            path.clear()
+        else:
+            path.append(event)
+    return attribution
+
+
+def _order(event: Dict[str, Any]):
+    # Touches sort ahead of a conversion at the same instant
+    return event['lead'], event['at'], _TOUCH if event['kind'] == 'touch' else _CONVERSION
+
+
+def merge_events(*sources: Iterable[Dict[str, Any]]) -> Iterator[Dict[str, Any]]:
+    """Merge event streams that are each sorted by lead and time"""
+    return heapq.merge(*sources, key=_order)
+
+
+def interaction_touches(rows: Iterable[Dict]) -> Iterator[Dict[str, Any]]:
+    """interactions.csv-shaped rows as touches"""
+    for row in rows:
+        yield {'kind': 'touch', 'lead': _lead(row['lead_id']), 'at': _epoch(row['timestamp']),
+               'campaign_id': row.get('campaign_id') or None, 'channel': row.get('channel') or None,
+               'variant_id': row.get('variant_id') or None, 'action': row.get('event_type') or None}
+
+
+def action_touches(rows: Iterable[Dict]) -> Iterator[Dict[str, Any]]:
+    """agent_actions.csv-shaped rows that reach the lead, as touches"""
+    for row in rows:
+        if row.get('action_type') in TOUCH_ACTIONS:
+            yield {'kind': 'touch', 'lead': _lead(row['lead_id']), 'at': _epoch(row['timestamp']),
+                   'campaign_id': row.get('campaign_id') or None, 'channel': row.get('channel') or None,
+                   'variant_id': None, 'action': row['action_type']}
+
+
+def conversion_events(rows: Iterable[Dict]) -> Iterator[Dict[str, Any]]:
+    """conversions.csv-shaped rows as conversions"""
+    for row in rows:
+        yield {'kind': 'conversion', 'lead': _lead(row['lead_id']), 'at': _epoch(row['converted_at']),
+               'campaign_id': row.get('campaign_id') or None,
+               'value': float(row.get('conversion_value_usd') or 0.0), 'type': row.get('conversion_type')}
+
+
+def csv_events(path: str, parse: Callable[[Iterable[Dict]], Iterator[Dict]],
+               presorted: bool = False) -> Iterator[Dict[str, Any]]:
+    """Events from a CSV export; exports already ordered by lead and time stream in constant memory"""
+    with open(path, newline='', encoding='utf-8') as f:
+        events = parse(csv.DictReader(f))
+        if not presorted:
+            events = iter(sorted(events, key=_order))
+        yield from events
+
+
+async def record_touch(store: ShortTermBackend, lead, touch: Dict[str, Any]):
+    """Append a live touch ({'at', 'campaign_id', 'channel', 'variant_id', 'action'}) to the lead's path"""
+    if not lead:
+        return
+    touch = {k: v for k, v in touch.items() if v is not None and k not in ('kind', 'lead')}
+    key = _path_key(lead)
+    await store.zadd(key, {json.dumps(touch, sort_keys=True): touch['at']})
+    await store.expire(key, int(settings.ATTRIBUTION_LOOKBACK_DAYS * 86400))
+
+
+async def attribute_conversions(store: ShortTermBackend, conversions: Sequence[Dict[str, Any]],
+                                attribution: Attribution = None) -> int:
+    """Credit live conversions ({'lead', 'at', 'campaign_id', 'value'}) to their paths; returns how many"""
+    attribution = attribution or Attribution()
+    conversions = sorted((c for c in conversions if c.get('lead')), key=lambda c: c['at'])
+    paths = await asyncio.gather(*(
+        store.zrangebyscore(_path_key(c['lead']), c['at'] - attribution.lookback, c['at']) for c in conversions
+    ))
+    increments: Dict[str, Dict[str, int]] = {}
+    converted_at: Dict[str, float] = {}
+    for conversion, path in zip(conversions, paths):
+        # A lead converting twice in one batch: the second conversion gets only the touches after the first
+        since = converted_at.get(_lead(conversion['lead']), float('-inf'))
+        touches = [json.loads(member) for member, at in path if at > since]
+        converted_at[_lead(conversion['lead'])] = conversion['at']
+        for campaign_id, fields in attribution.credit(touches, conversion).items():
+            totals = increments.setdefault(campaign_id, {})
+            for field, amount in fields.items():
+                totals[field] = totals.get(field, 0) + round(amount * SCALE)
+    await asyncio.gather(*(store.hincrby(_credit_key(campaign_id), fields)
+                           for campaign_id, fields in increments.items()),
+                         store.hincrby(VERSIONS_KEY, {str(campaign_id): 1 for campaign_id in increments}))
+    # A conversion ends its path
+    keys = list(dict.fromkeys(_path_key(c['lead']) for c in conversions))
+    if keys:
+        await store.delete(*keys)
+    return len(conversions)
+
+
+async def campaign_attribution(store: ShortTermBackend, campaign_id) -> Dict[str, Any]:
+    """A campaign's attributed conversions and value from the shared credit hash"""
+    stored = await store.hgetall(_credit_key(campaign_id))
+    return campaign_report(campaign_id, {field: int(amount) / SCALE for field, amount in stored.items()})
+
+
+async def store_attribution(store: ShortTermBackend, attribution: Attribution):
+    """Replace the shared credit hashes of the attribution's campaigns with its totals (backfill)"""
+    for campaign_id, fields in attribution.credits.items():
+        key = _credit_key(campaign_id)
+        await store.delete(key)
+        await store.hincrby(key, {field: round(amount * SCALE) for field, amount in fields.items()})
+    await store.hincrby(VERSIONS_KEY, {str(campaign_id): 1 for campaign_id in attribution.credits})
+
+
+async def campaign_versions(store: ShortTermBackend, campaign_ids: Sequence) -> Dict[str, int]:
+    """How many times each campaign's credits were written (0 if never)"""
+    stored = await store.hmget(VERSIONS_KEY, [str(campaign_id) for campaign_id in campaign_ids])
+    return {str(campaign_id): int(version or 0) for campaign_id, version in zip(campaign_ids, stored)}
+
+
+def attribute_csvs(conversions_path: str = 'data/conversions.csv', actions_path: str = 'data/agent_actions.csv',
+                   interactions_path: Optional[str] = None, presorted: bool = False) -> Attribution:
+    sources = [csv_events(conversions_path, conversion_events, presorted),
+               csv_events(actions_path, action_touches, presorted)]
+    if interactions_path:
+        sources.append(csv_events(interactions_path, interaction_touches, presorted))
+    return attribute_stream(merge_events(*sources))
+
+
+def main():
+    """Backfill the shared credit hashes from data/ exports (conversions, agent actions[, interactions])"""
+    attribution = attribute_csvs(*sys.argv[1:4])
+    asyncio.run(store_attribution(get_short_term_backend(), attribution))
+    value = sum(fields.get('linear:value', 0.0) for fields in attribution.credits.values())
+    print(f"✅ Attributed {attribution.conversions} conversions (${value:,.0f}) "
+          f"across {len(attribution.credits)} campaigns")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,255 @@
+# analytics/bandit.py
+"""Thompson-sampling traffic allocation between A/B creative variants.
+
+Each variant has a Beta posterior on its click rate and a Gamma posterior
+on its conversions per send. The variants competing for one send slot,
+keyed (campaign, channel), form a group. For each group a batch of joint
+posterior draws is taken at once and the winner of each draw is queued,
+so assigning a variant to a send is a pop from that queue. The queue is
+rebuilt when it runs out or when new counts are loaded.
+
+Counts are kept locally and flushed as increments to a shared hash in
+the short-term store (Redis), then re-read. That way every worker process
+learns from everyone's sends and the state survives restarts. Outcomes
+that arrive elsewhere (click tracking, conversions) are added to the same
+hash with record_outcomes().
+"""
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+import csv
+import os
+import threading
+import time
+import numpy as np
+from memory.backends import ShortTermBackend, get_short_term_backend
+from config import settings
+
+COUNTS_KEY = 'bandit:counts'
+LEAD_KEY_PREFIX = 'bandit:lead'
+METRICS = ('sends', 'clicks', 'conversions')
+SENDS, CLICKS, CONVERSIONS = range(len(METRICS))
+
+# Beta(1, 1) on click rate; Gamma(shape 0.5, rate 10) on conversions per send (mean 0.05)
+CLICK_PRIOR = (1.0, 1.0)
+CONVERSION_PRIOR = (0.5, 10.0)
+# A variant is reported as the winner once it's best in this share of posterior draws
+PROMOTE_PROBABILITY = 0.95
+MIN_SENDS_TO_PROMOTE = 100
+WIN_PROBABILITY_DRAWS = 4000
+
+
+def _lead_key(email: str) -> str:
+    return f"{LEAD_KEY_PREFIX}:{email.strip().lower()}"
+
+
+def _group(campaign_id, channel: Optional[str] = None) -> Tuple[str, Optional[str]]:
+    return str(campaign_id), channel.strip().lower() if channel else None
+
+
+async def record_outcomes(store: ShortTermBackend, events: Iterable[Tuple[str, str]]):
+    """Add (variant_id, 'clicks' | 'conversions') outcome events to the shared counts"""
+    increments: Dict[str, int] = {}
+    for variant_id, metric in events:
+        if metric not in METRICS:
+            raise ValueError(f"Unknown variant metric '{metric}' (expected one of {METRICS})")
+        field = f"{variant_id}:{metric}"
+        increments[field] = increments.get(field, 0) + 1
+    await store.hincrby(COUNTS_KEY, increments)
+
+
+async def attributed_variants(store: ShortTermBackend, emails: Sequence[str]) -> Dict[str, str]:
+    """The variant each lead was last sent, for leads sent one within BANDIT_ATTRIBUTION_TTL"""
+    emails = [email for email in dict.fromkeys(emails) if email]
+    entries = await store.hgetall_many([_lead_key(email) for email in emails])
+    return {email: entry['variant_id'] for email, entry in zip(emails, entries) if entry.get('variant_id')}
+
+
+async def record_conversions(store: ShortTermBackend, emails: Sequence[str]) -> int:
+    """Credit converted leads' conversions to the variant they were sent; returns how many matched"""
+    variants = await attributed_variants(store, emails)
+    await record_outcomes(store, [(variant_id, 'conversions') for variant_id in variants.values()])
+    return len(variants)
+
+
+class VariantBandit:
+    """Per-variant posteriors and O(1) Thompson-sampled assignment"""
+
+    def __init__(self, variants: Sequence[Dict], store: ShortTermBackend = None,
+                 conversion_weight: float = None, sample_batch: int = None,
+                 refresh_seconds: float = None, seed: int = None):
+        self.store = store
+        self.conversion_weight = settings.BANDIT_CONVERSION_WEIGHT if conversion_weight is None else conversion_weight
+        self.sample_batch = sample_batch or settings.BANDIT_SAMPLE_BATCH
+        self.refresh_seconds = settings.BANDIT_REFRESH_SECONDS if refresh_seconds is None else refresh_seconds
+        self.rng = np.random.default_rng(seed)
+        self.variants: List[Dict] = []
+        self._index: Dict[str, int] = {}
+        self._groups: Dict[Tuple[str, Optional[str]], np.ndarray] = {}
+        self._counts = np.zeros((0, len(METRICS)), dtype=np.int64)
+        self._pending = np.zeros((0, len(METRICS)), dtype=np.int64)
+        self._queues: Dict[Tuple[str, Optional[str]], List[int]] = {}
+        self._lock = threading.Lock()
+        self._refreshed_at: Optional[float] = None
+        self.register(variants)
+
+    def __contains__(self, variant_id) -> bool:
+        return variant_id in self._index
+
+    def register(self, variants: Iterable[Dict]):
+        """Add variants; each is grouped under its campaign+channel and under its campaign alone"""
+        with self._lock:
+            added = 0
+            for variant in variants:
+                if variant['variant_id'] in self._index:
+                    continue
+                self._index[variant['variant_id']] = len(self.variants)
+                self.variants.append(dict(variant))
+                added += 1
+            if not added:
+                return
+            extra = np.zeros((added, len(METRICS)), dtype=np.int64)
+            self._counts = np.concatenate([self._counts, extra])
+            self._pending = np.concatenate([self._pending, extra])
+            members: Dict[Tuple[str, Optional[str]], List[int]] = {}
+            for i, variant in enumerate(self.variants):
+                members.setdefault(_group(variant['campaign_id'], variant.get('channel')), []).append(i)
+                members.setdefault(_group(variant['campaign_id']), []).append(i)
+            self._groups = {key: np.array(ids) for key, ids in members.items()}
+            self._queues = {}
+
+    def _members(self, campaign_id, channel: Optional[str]) -> Tuple[Optional[tuple], Optional[np.ndarray]]:
+        for key in (_group(campaign_id, channel), _group(campaign_id)):
+            if key in self._groups:
+                return key, self._groups[key]
+        return None, None
+
+    def _totals(self, members: np.ndarray) -> np.ndarray:
+        return self._counts[members] + self._pending[members]
+
+    def _draw(self, members: np.ndarray, draws: int) -> np.ndarray:
+        """(draws, len(members)) sampled expected reward per send"""
+        totals = self._totals(members).astype(np.float64)
+        sends, clicks, conversions = totals[:, SENDS], totals[:, CLICKS], totals[:, CONVERSIONS]
+        shape = (draws, len(members))
+        click_rate = self.rng.beta(CLICK_PRIOR[0] + clicks, CLICK_PRIOR[1] + np.maximum(sends - clicks, 0), shape)
+        conversion_rate = self.rng.gamma(CONVERSION_PRIOR[0] + conversions, 1.0 / (CONVERSION_PRIOR[1] + sends), shape)
+        return click_rate + self.conversion_weight * conversion_rate
+
+    def assign(self, campaign_id, channel: Optional[str] = None) -> Optional[Dict]:
+        """Pick a variant for one send (None if the campaign has no variants)"""
+        if campaign_id is None:
+            return None
+        with self._lock:
+            key, members = self._members(campaign_id, channel)
+            if key is None:
+                return None
+            queue = self._queues.get(key)
+            if not queue:
+                winners = members[np.argmax(self._draw(members, self.sample_batch), axis=1)]
+                queue = self._queues[key] = winners[::-1].tolist()
+            return self.variants[queue.pop()]
+
+    def record(self, variant_id: str, sends: int = 0, clicks: int = 0, conversions: int = 0):
+        """Count outcomes observed by this process; they're shared on the next flush"""
+        i = self._index.get(variant_id)
+        if i is None:
+            return
+        with self._lock:
+            self._pending[i] += (sends, clicks, conversions)
+
+    def _store(self) -> ShortTermBackend:
+        # Resolved per call: the process-wide bandit outlives any one backend choice
+        return self.store or get_short_term_backend()
+
+    async def flush(self):
+        """Push local counts to the shared hash and load everyone's totals"""
+        with self._lock:
+            pending, self._pending = self._pending, np.zeros_like(self._pending)
+        rows, columns = np.nonzero(pending)
+        store = self._store()
+        try:
+            await store.hincrby(COUNTS_KEY, {
+                f"{self.variants[i]['variant_id']}:{METRICS[j]}": int(pending[i, j]) for i, j in zip(rows, columns)
+            })
+        except Exception:
+            with self._lock:
+                self._pending += pending
+            raise
+        stored = await store.hgetall(COUNTS_KEY)
+
+        counts = np.zeros_like(self._counts)
+        for field, value in stored.items():
+            variant_id, _, metric = field.rpartition(':')
+            i = self._index.get(variant_id)
+            if i is not None and metric in METRICS:
+                counts[i, METRICS.index(metric)] = int(value)
+        with self._lock:
+            self._counts = counts
+            self._queues = {}
+            self._refreshed_at = time.monotonic()
+
+    async def maybe_refresh(self):
+        """flush() if BANDIT_REFRESH_SECONDS have passed since the last one (or there hasn't been one)"""
+        if self._refreshed_at is None or time.monotonic() - self._refreshed_at >= self.refresh_seconds:
+            await self.flush()
+
+    async def remember_send(self, email: Optional[str], variant_id: str):
+        """Count a send and remember the lead's variant so a later conversion is credited to it"""
+        self.record(variant_id, sends=1)
+        if email:
+            await self._store().hset(_lead_key(email), {'variant_id': variant_id},
+                                     ttl=settings.BANDIT_ATTRIBUTION_TTL)
+
+    def summary(self, campaign_id, channel: Optional[str] = None) -> List[Dict]:
+        """Counts, posterior means and probability of being best for a campaign's variants, best first"""
+        with self._lock:
+            key, members = self._members(campaign_id, channel)
+            if key is None:
+                return []
+            totals = self._totals(members)
+            best = np.argmax(self._draw(members, WIN_PROBABILITY_DRAWS), axis=1)
+        win_probability = np.bincount(best, minlength=len(members)) / WIN_PROBABILITY_DRAWS
+        rows = []
+        for k, i in enumerate(members):
+            sends, clicks, conversions = (int(x) for x in totals[k])
+            rows.append({
+                'variant_id': self.variants[i]['variant_id'],
+                'channel': self.variants[i].get('channel'),
+                'subject_line': self.variants[i].get('subject_line'),
+                'sends': sends,
+                'clicks': clicks,
+                'conversions': conversions,
+                'click_rate': (CLICK_PRIOR[0] + clicks) / (sum(CLICK_PRIOR) + max(sends, clicks)),
+                'conversion_rate': (CONVERSION_PRIOR[0] + conversions) / (CONVERSION_PRIOR[1] + sends),
+                'win_probability': float(win_probability[k])
+            })
+        return sorted(rows, key=lambda row: row['win_probability'], reverse=True)
+
+    def winner(self, campaign_id, channel: Optional[str] = None) -> Optional[Dict]:
+        """The leading variant once it's clearly best and has enough sends, else None"""
+        rows = self.summary(campaign_id, channel)
+        if len(rows) > 1 and rows[0]['win_probability'] >= PROMOTE_PROBABILITY \
+                and rows[0]['sends'] >= MIN_SENDS_TO_PROMOTE:
+            return rows[0]
+        return None
+
+
+def load_variants_csv(path: str = 'data/ab_variants.csv') -> List[Dict]:
+    with open(path, newline='', encoding='utf-8') as f:
+        return [dict(row) for row in csv.DictReader(f)]
+
+
+_bandit: Optional[VariantBandit] = None
+_bandit_lock = threading.Lock()
+
+
+def get_variant_bandit() -> VariantBandit:
+    """Process-wide bandit over the variants in AB_VARIANTS_PATH"""
+    global _bandit
+    with _bandit_lock:
+        if _bandit is None:
+            path = settings.AB_VARIANTS_PATH
+            variants = load_variants_csv(path) if os.path.exists(path) else []
+            if not variants:
+                print(f"⚠️ No A/B variants at {path}; outreach uses template copy only")
+            _bandit = VariantBandit(variants)
+        return _bandit
@@ -0,0 +1,287 @@
+# analytics/columnar.py
+"""Typed, memory-mapped columnar cache of the data/ CSV exports.
+
+The first load of a CSV parses it once into one .npy file per column
+under COLUMNAR_CACHE_DIR/<file stem>/, plus a manifest.json. Column types
+are inferred:
+
+- int64, float64 (NaN for blanks), bool, datetime64[s] or [D]; digit
+  strings that wouldn't survive the round trip (leading zeros, signs)
+  stay text
+- categoricals: text with few distinct values, stored as small integer
+  codes plus a categories array
+- fixed-width strings
+
+JSON columns are parsed at build time. Each key of their objects becomes
+a typed sub-column named ``column.key``. The raw JSON is kept, and
+json() decodes each distinct value once.
+
+Later loads only read the manifest. Columns are opened with
+np.load(mmap_mode='r') on first access, so a process pays only for the
+columns it touches, and processes reading the same table share its page
+cache pages. The cache is rebuilt when the source file's size or mtime
+changes. Builds write to a temporary directory that is renamed into
+place, so readers never see a half-written table.
+"""
+from typing import Any, Dict, Iterator, List, Optional, Sequence, Tuple
+import csv
+import glob
+import json
+import os
+import shutil
+import sys
+import tempfile
+import numpy as np
+from config import settings
+
+CACHE_VERSION = 2
+MANIFEST = 'manifest.json'
+# Text columns with at most this share of distinct values are dictionary-encoded
+MAX_CATEGORY_SHARE = 0.5
+_BOOLS = {'true': True, 'false': False}
+
+
+def _int_round_trips(value: str) -> bool:
+    """False for integer text that int() would change ('007', '+44', '1_000'); True for anything else"""
+    try:
+        return str(int(value)) == value
+    except ValueError:
+        return True
+
+
+def _infer(values: List[str]) -> Tuple[str, np.ndarray, Optional[np.ndarray]]:
+    """(kind, data, categories) for one column of CSV text; '' is a missing value"""
+    present = [v for v in values if v != '']
+    # Ids, zip codes and phone numbers with leading zeros stay text rather than losing them
+    numeric = all(_int_round_trips(v) for v in set(present))
+    if present:
+        if numeric and len(present) == len(values):
+            try:
+                return 'int', np.array([int(v) for v in values], dtype=np.int64), None
+            except (ValueError, OverflowError):
+                pass
+        try:
+            if numeric:
+                return 'float', np.array([float(v) if v != '' else np.nan for v in values]), None
+        except ValueError:
+            pass
+        if len(present) == len(values) and all(v.lower() in _BOOLS for v in present):
+            return 'bool', np.array([_BOOLS[v.lower()] for v in values]), None
+        if all(len(v) >= 10 and v[4] == '-' and v[7] == '-' for v in present):
+            unit = 's' if any(len(v) > 10 for v in present) else 'D'
+            try:
+                return 'datetime', np.array([v or 'NaT' for v in values], dtype=f'datetime64[{unit}]'), None
+            except ValueError:
+                pass
+        if all(v[0] in '[{' for v in present):
+            try:
+                for v in set(present):
+                    json.loads(v)
+                return ('json',) + _text(values)
+            except ValueError:
+                pass
+    data, categories = _text(values)
+    return 'category' if categories is not None else 'string', data, categories
+
+
+def _text(values: List[str]) -> Tuple[np.ndarray, Optional[np.ndarray]]:
+    """Codes and categories when few values repeat a lot, else a fixed-width string array"""
+    distinct = set(values)
+    if len(distinct) > max(1, MAX_CATEGORY_SHARE * len(values)):
+        return np.array(values, dtype=str), None
+    categories = sorted(distinct)
+    index = {value: code for code, value in enumerate(categories)}
+    dtype = np.uint8 if len(categories) <= 2 ** 8 else np.uint16 if len(categories) <= 2 ** 16 else np.uint32
+    return np.fromiter((index[v] for v in values), dtype=dtype, count=len(values)), np.array(categories, dtype=str)
+
+
+def _as_text(value: Any) -> str:
+    if value is None:
+        return ''
+    if isinstance(value, (dict, list)):
+        return json.dumps(value, sort_keys=True)
+    return str(value)
+
+
+def _columns(header: Sequence[str], rows: List[List[str]]) -> Iterator[tuple]:
+    """(name, kind, data, categories) for every column, with JSON objects flattened into sub-columns"""
+    for i, name in enumerate(header):
+        values = [row[i] if i < len(row) else '' for row in rows]
+        yield from _typed(name, values)
+
+
+def _typed(name: str, values: List[str]):
+    kind, data, categories = _infer(values)
+    yield name, kind, data, categories
+    if kind != 'json':
+        return
+    parsed = {v: json.loads(v) for v in set(values) if v}
+    objects = [parsed.get(v) for v in values]
+    if not all(isinstance(o, dict) for o in objects if o is not None):
+        return
+    keys = list(dict.fromkeys(key for o in objects if o for key in o))
+    for key in keys:
+        yield from _typed(f"{name}.{key}", [_as_text(o.get(key)) if o else '' for o in objects])
+
+
+def _source_stamp(path: str) -> Dict[str, Any]:
+    stat = os.stat(path)
+    return {'path': os.path.abspath(path), 'size': stat.st_size, 'mtime_ns': stat.st_mtime_ns}
+
+
+class ColumnarTable:
+    """A cached CSV's columns, opened lazily as read-only memory maps"""
+
+    def __init__(self, manifest: Dict[str, Any], directory: Optional[str] = None,
+                 arrays: Optional[Dict[str, np.ndarray]] = None):
+        self.manifest = manifest
+        self.directory = directory
+        self._arrays: Dict[str, np.ndarray] = dict(arrays or {})
+        self._json: Dict[str, List[Any]] = {}
+
+    def __len__(self) -> int:
+        return self.manifest['rows']
+
+    def __contains__(self, name) -> bool:
+        return name in self.manifest['columns']
+
+    @property
+    def columns(self) -> List[str]:
+        return list(self.manifest['columns'])
+
+    def kind(self, name: str) -> str:
+        return self._spec(name)['kind']
+
+    def _spec(self, name: str) -> Dict[str, Any]:
+        try:
+            return self.manifest['columns'][name]
+        except KeyError:
+            raise KeyError(f"No column '{name}' in {self.manifest['source']['path']}") from None
+
+    def _array(self, file: str) -> np.ndarray:
+        if file not in self._arrays:
+            self._arrays[file] = np.load(os.path.join(self.directory, file), mmap_mode='r')
+        return self._arrays[file]
+
+    def raw(self, name: str) -> np.ndarray:
+        """Stored values: codes for categoricals, the data itself otherwise (memory-mapped)"""
+        return self._array(self._spec(name)['file'])
+
+    def categories(self, name: str) -> Optional[np.ndarray]:
+        spec = self._spec(name)
+        return self._array(spec['categories']) if spec.get('categories') else None
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        """Column values; categoricals are decoded to strings"""
+        data = self.raw(name)
+        categories = self.categories(name)
+        return categories[data] if categories is not None else data
+
+    def json(self, name: str) -> List[Any]:
+        """Parsed values of a JSON column (each distinct value is parsed once and shared)"""
+        if self.kind(name) != 'json':
+            raise ValueError(f"Column '{name}' is {self.kind(name)}, not json")
+        if name not in self._json:
+            categories = self.categories(name)
+            if categories is not None:
+                decoded = [json.loads(v) if v else None for v in categories.tolist()]
+                self._json[name] = [decoded[code] for code in self.raw(name).tolist()]
+            else:
+                seen: Dict[str, Any] = {}
+                self._json[name] = [(seen[v] if v in seen else seen.setdefault(v, json.loads(v))) if v else None
+                                    for v in self.raw(name).tolist()]
+        return self._json[name]
+
+    def values(self, name: str) -> List[Any]:
+        """Column as Python values: None for blanks/NaN/NaT, ISO strings for datetimes, parsed JSON"""
+        kind = self.kind(name)
+        if kind == 'json':
+            return self.json(name)
+        data = self[name]
+        if kind == 'datetime':
+            return [None if v == 'NaT' else v for v in np.datetime_as_string(data).tolist()]
+        if kind == 'float':
+            return [None if v != v else v for v in data.tolist()]
+        return data.tolist()
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """The table as row dicts of the source's columns (JSON sub-columns are left inside their JSON)"""
+        parents = [name.rsplit('.', 1)[0] for name in self.columns]
+        names = [name for name, parent in zip(self.columns, parents)
+                 if parent == name or parent not in self or self.kind(parent) != 'json']
+        columns = [self.values(name) for name in names]
+        return [dict(zip(names, row)) for row in zip(*columns)] if columns else []
+
+
+def _cache_directory(path: str, cache_dir: Optional[str]) -> str:
+    return os.path.join(cache_dir or settings.COLUMNAR_CACHE_DIR, os.path.splitext(os.path.basename(path))[0])
+
+
+def _fresh_manifest(directory: str, stamp: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+    try:
+        with open(os.path.join(directory, MANIFEST), encoding='utf-8') as f:
+            manifest = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if manifest.get('version') != CACHE_VERSION or manifest.get('source') != stamp:
+        return None
+    return manifest
+
+
+def build_table(path: str, cache_dir: Optional[str] = None) -> ColumnarTable:
+    """Parse a CSV into typed columns and write them to its cache directory"""
+    stamp = _source_stamp(path)
+    with open(path, newline='', encoding='utf-8') as f:
+        reader = csv.reader(f)
+        header = next(reader, [])
+        rows = list(reader)
+
+    manifest = {'version': CACHE_VERSION, 'source': stamp, 'rows': len(rows), 'columns': {}}
+    arrays: Dict[str, np.ndarray] = {}
+    for i, (name, kind, data, categories) in enumerate(_columns(header, rows)):
+        spec = {'kind': kind, 'file': f"c{i}.npy"}
+        arrays[spec['file']] = data
+        if categories is not None:
+            spec['categories'] = f"c{i}.categories.npy"
+            arrays[spec['categories']] = categories
+        manifest['columns'][name] = spec
+
+    directory = _cache_directory(path, cache_dir)
+    try:
+        os.makedirs(os.path.dirname(directory), exist_ok=True)
+        staging = tempfile.mkdtemp(prefix=f".{os.path.basename(directory)}-", dir=os.path.dirname(directory))
+        for file, data in arrays.items():
+            np.save(os.path.join(staging, file), data)
+        with open(os.path.join(staging, MANIFEST), 'w', encoding='utf-8') as f:
+            json.dump(manifest, f)
+        # Swap the new table in; open memory maps of the old files stay valid until closed
+        retired = f"{staging}.old"
+        if os.path.exists(directory):
+            os.rename(directory, retired)
+        os.rename(staging, directory)
+        shutil.rmtree(retired, ignore_errors=True)
+    except OSError as e:
+        print(f"⚠️ Could not write the columnar cache for {path} ({e}); using it uncached")
+        return ColumnarTable(manifest, arrays=arrays)
+    return ColumnarTable(manifest, directory)
+
+
+def load_table(path: str, cache_dir: Optional[str] = None) -> ColumnarTable:
+    """A CSV's columnar table, rebuilt first if the CSV changed since it was cached"""
+    directory = _cache_directory(path, cache_dir)
+    manifest = _fresh_manifest(directory, _source_stamp(path))
+    if manifest is None:
+        return build_table(path, cache_dir)
+    return ColumnarTable(manifest, directory)
+
+
+def main():
+    paths = sys.argv[1:] or sorted(glob.glob('data/*.csv'))
+    for path in paths:
+        table = load_table(path)
+        print(f"📦 {path}: {len(table):,} rows, {len(table.columns)} columns")
+    print(f"✅ Columnar cache ready in {settings.COLUMNAR_CACHE_DIR}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,265 @@
+# analytics/kpi.py
+"""Rolling campaign KPIs over daily data held in NumPy arrays.
+
+Daily rows (``campaign_daily.csv``-shaped) are stored as a dense
+campaigns x days x counters array with a running cumulative sum along
+the day axis, so any window total is one subtraction. Every campaign's
+window ends at its own latest reported day. CTR, CPL, ROAS and
+conversion rate for the current and previous window, their relative
+change, and each campaign's percentile against all campaigns are
+computed for every campaign at once.
+"""
+from typing import Dict, Iterable, List, Optional, Sequence
+from datetime import date
+import os
+import threading
+import numpy as np
+from analytics.columnar import load_table
+from config import settings
+
+COUNTERS = ('impressions', 'clicks', 'leads_created', 'conversions', 'cost_usd', 'revenue_usd')
+IMPRESSIONS, CLICKS, LEADS, CONVERSIONS, COST, REVENUE = range(len(COUNTERS))
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+
+# KPI name -> True if higher is better
+KPIS = {'ctr': True, 'conversion_rate': True, 'cpl': False, 'roas': True}
+# Issue raised when a campaign's KPI ranks in the worst KPI_ISSUE_PERCENTILE of campaigns
+ISSUES = {'ctr': 'low_click_rate', 'conversion_rate': 'low_conversion_rate',
+          'cpl': 'high_cost_per_lead', 'roas': 'low_roas'}
+
+
+def _day(value) -> int:
+    if isinstance(value, date):
+        return value.toordinal()
+    return date.fromisoformat(str(value)[:10]).toordinal()
+
+
+def _ratio(numerator: np.ndarray, denominator: np.ndarray, empty: float) -> np.ndarray:
+    """numerator / denominator, with `empty` where both are 0 and inf where only the denominator is"""
+    with np.errstate(divide='ignore', invalid='ignore'):
+        out = numerator / denominator
+    out[(denominator == 0) & (numerator == 0)] = empty
+    return out
+
+
+def _kpis(totals: np.ndarray) -> Dict[str, np.ndarray]:
+    """KPI arrays from (campaigns, counters) window totals"""
+    return {
+        'ctr': _ratio(totals[:, CLICKS], totals[:, IMPRESSIONS], 0.0),
+        'conversion_rate': _ratio(totals[:, CONVERSIONS], totals[:, LEADS], 0.0),
+        'cpl': _ratio(totals[:, COST], totals[:, LEADS], np.nan),
+        'roas': _ratio(totals[:, REVENUE], totals[:, COST], np.nan)
+    }
+
+
+def _percentile_rank(values: np.ndarray, active: np.ndarray, higher_is_better: bool) -> np.ndarray:
+    """Share of active campaigns each value beats (ties count half), oriented so 1.0 is best"""
+    population = np.sort(values[active & ~np.isnan(values)])
+    if not len(population):
+        return np.full(len(values), np.nan)
+    below = np.searchsorted(population, values, side='left')
+    at_or_below = np.searchsorted(population, values, side='right')
+    rank = (below + at_or_below) / (2.0 * len(population))
+    rank = rank if higher_is_better else 1.0 - rank
+    rank[np.isnan(values)] = np.nan
+    return rank
+
+
+class KPISnapshot:
+    """Vectorized KPIs for every campaign at one point in time"""
+
+    def __init__(self, campaign_ids: List[str], as_of: np.ndarray, window: int,
+                 current: np.ndarray, previous: np.ndarray, issue_percentile: float):
+        self.campaign_ids = campaign_ids
+        self.index = {campaign_id: i for i, campaign_id in enumerate(campaign_ids)}
+        self.as_of = as_of
+        self.window = window
+        self.totals = current
+        self.active = (current[:, IMPRESSIONS] > 0) | (current[:, COST] > 0)
+        self.current = _kpis(current)
+        self.previous = _kpis(previous)
+        with np.errstate(divide='ignore', invalid='ignore'):
+            self.deltas = {name: (self.current[name] - self.previous[name]) / np.abs(self.previous[name])
+                           for name in KPIS}
+        for delta in self.deltas.values():
+            delta[~np.isfinite(delta)] = np.nan
+        self.percentiles = {name: _percentile_rank(self.current[name], self.active, higher)
+                            for name, higher in KPIS.items()}
+
+        self.issue_percentile = issue_percentile
+        # KPI value at the edge of the issue band across active campaigns, for reporting
+        self.benchmarks = {}
+        for name, higher in KPIS.items():
+            values = self.current[name][self.active & np.isfinite(self.current[name])]
+            if len(values):
+                quantile = issue_percentile if higher else 1.0 - issue_percentile
+                self.benchmarks[name] = float(np.quantile(values, quantile))
+        # A KPI without a value (no leads, no spend) counts as flagged
+        self.flagged = {name: ~(self.percentiles[name] >= issue_percentile) for name in KPIS}
+        self.scores = sum((~self.flagged[name]).astype(float) for name in KPIS) / len(KPIS)
+        self.scores[~self.active] = 0.0
+
+    def analysis(self, campaign_id) -> Dict:
+        """The analysis dict CampaignOptimizationAgent consumes, for one campaign"""
+        i = self.index[str(campaign_id)]
+        if self.active[i]:
+            issues = [ISSUES[name] for name in KPIS if self.flagged[name][i]]
+        else:
+            issues = ['no_recent_activity']
+        return {
+            'performance_score': float(self.scores[i]),
+            'issues': issues,
+            'metrics': {name: _value(self.current[name][i]) for name in KPIS},
+            'benchmarks': dict(self.benchmarks),
+            'trends': {name: _value(self.deltas[name][i]) for name in KPIS},
+            'percentiles': {name: _value(self.percentiles[name][i]) for name in KPIS},
+            'totals': {name: float(self.totals[i, j]) for j, name in enumerate(COUNTERS)},
+            'window_days': self.window,
+            'as_of': date.fromordinal(int(self.as_of[i])).isoformat()
+        }
+
+
+def _value(x: float) -> Optional[float]:
+    return float(x) if np.isfinite(x) else None
+
+
+class KPIEngine:
+    """Daily campaign counters in NumPy arrays, ingested incrementally and analyzed in bulk"""
+
+    def __init__(self, window: int = None, issue_percentile: float = None):
+        self.window = window or settings.KPI_WINDOW_DAYS
+        self.issue_percentile = settings.KPI_ISSUE_PERCENTILE if issue_percentile is None else issue_percentile
+        self._ids: List[str] = []
+        self._index: Dict[str, int] = {}
+        self._first_day: Optional[int] = None
+        self._days = 0
+        self._daily = np.zeros((0, 0, len(COUNTERS)))
+        # _cumulative[:, d + 1] is the running total through day d
+        self._cumulative = np.zeros((0, 1, len(COUNTERS)))
+        self._last = np.zeros(0, dtype=np.int64)
+        self._lock = threading.Lock()
+        self._snapshot: Optional[KPISnapshot] = None
+        # Bumped by every ingest, so cached renderings of the KPIs can tell they're stale
+        self.version = 0
+
+    def __len__(self) -> int:
+        return len(self._ids)
+
+    def __contains__(self, campaign_id) -> bool:
+        return campaign_id is not None and str(campaign_id) in self._index
+
+    @property
+    def campaign_ids(self) -> List[str]:
+        return list(self._ids)
+
+    def _grow(self, campaigns: int, first_day: int, last_day: int) -> bool:
+        """Cover these campaigns and days; True if the arrays were reallocated (amortized doubling)"""
+        shift = 0
+        if self._first_day is None:
+            self._first_day = first_day
+        elif first_day < self._first_day:
+            shift = self._first_day - first_day
+            self._first_day = first_day
+        days = max(self._days + shift, last_day - self._first_day + 1)
+        capacity_c, capacity_d = self._daily.shape[:2]
+        if campaigns <= capacity_c and days <= capacity_d and not shift:
+            self._days = days
+            return False
+
+        new_c = max(campaigns, 2 * capacity_c if campaigns > capacity_c else capacity_c, 16)
+        new_d = max(days, 2 * capacity_d if days > capacity_d else capacity_d, 32)
+        daily = np.zeros((new_c, new_d, len(COUNTERS)))
+        daily[:capacity_c, shift:shift + self._days] = self._daily[:, :self._days]
+        self._daily = daily
+        self._cumulative = np.zeros((new_c, new_d + 1, len(COUNTERS)))
+        self._last = np.concatenate([self._last + shift, np.zeros(new_c - capacity_c, dtype=np.int64)])
+        self._days = days
+        return True
+
+    def ingest(self, rows: Iterable[Dict]) -> int:
+        """Add or replace daily rows; only days from the earliest changed one are re-accumulated"""
+        parsed = [(str(row['campaign_id']), _day(row['date']), [float(row.get(name) or 0) for name in COUNTERS])
+                  for row in rows]
+        if not parsed:
+            return 0
+        campaign_ids, days, values = zip(*parsed)
+        return self.ingest_columns(campaign_ids, np.array(days), np.array(values))
+
+    def ingest_columns(self, campaign_ids: Sequence[str], days: np.ndarray, values: np.ndarray) -> int:
+        """ingest() for column arrays: day ordinals and a (rows, COUNTERS) array of counts"""
+        if not len(campaign_ids):
+            return 0
+        with self._lock:
+            for campaign_id in dict.fromkeys(campaign_ids):
+                if campaign_id not in self._index:
+                    self._index[campaign_id] = len(self._ids)
+                    self._ids.append(campaign_id)
+            reallocated = self._grow(len(self._ids), int(days.min()), int(days.max()))
+
+            rows_ix = np.array([self._index[campaign_id] for campaign_id in campaign_ids])
+            days_ix = days - self._first_day
+            self._daily[rows_ix, days_ix] = values
+            np.maximum.at(self._last, rows_ix, days_ix)
+
+            start = 0 if reallocated else int(days_ix.min())
+            n, end = len(self._ids), self._days
+            self._cumulative[:n, start + 1:end + 1] = (
+                self._cumulative[:n, start:start + 1] + np.cumsum(self._daily[:n, start:end], axis=1))
+            self._snapshot = None
+            self.version += 1
+        return len(campaign_ids)
+
+    def snapshot(self) -> KPISnapshot:
+        """KPIs for every campaign over its latest window (cached until the next ingest)"""
+        with self._lock:
+            if self._snapshot is None:
+                n = len(self._ids)
+                rows = np.arange(n)
+                end = self._last[:n] + 1
+                mid = np.maximum(end - self.window, 0)
+                start = np.maximum(end - 2 * self.window, 0)
+                cumulative = self._cumulative
+                current = cumulative[rows, end] - cumulative[rows, mid]
+                previous = cumulative[rows, mid] - cumulative[rows, start]
+                as_of = self._last[:n] + (self._first_day or 0)
+                self._snapshot = KPISnapshot(list(self._ids), as_of, self.window, current, previous,
+                                             self.issue_percentile)
+            return self._snapshot
+
+    def analysis(self, campaign_id) -> Dict:
+        return self.snapshot().analysis(campaign_id)
+
+    def analyze_many(self, campaign_ids: Sequence = None) -> Dict[str, Dict]:
+        """Analysis dicts for these campaigns (default: all) from one vectorized snapshot"""
+        snapshot = self.snapshot()
+        ids = snapshot.campaign_ids if campaign_ids is None else [str(c) for c in campaign_ids if c in self]
+        return {campaign_id: snapshot.analysis(campaign_id) for campaign_id in ids}
+
+    @classmethod
+    def from_csv(cls, path: str, **options) -> 'KPIEngine':
+        """Engine over a campaign_daily.csv-shaped file, read through the columnar cache"""
+        engine = cls(**options)
+        table = load_table(path)
+        if len(table):
+            days = table['date'].astype('datetime64[D]').astype(np.int64) + EPOCH_ORDINAL
+            values = np.nan_to_num(np.column_stack([table[name] for name in COUNTERS]).astype(float))
+            engine.ingest_columns(table['campaign_id'].astype(str).tolist(), days, values)
+        return engine
+
+
+_engine: Optional[KPIEngine] = None
+_engine_lock = threading.Lock()
+
+
+def get_kpi_engine() -> KPIEngine:
+    """Process-wide engine, loaded once from CAMPAIGN_DAILY_PATH (empty if the file is missing)"""
+    global _engine
+    with _engine_lock:
+        if _engine is None:
+            path = settings.CAMPAIGN_DAILY_PATH
+            if os.path.exists(path):
+                _engine = KPIEngine.from_csv(path)
+            else:
+                print(f"⚠️ No campaign daily data at {path}; KPIs will come from get_campaign_metrics")
+                _engine = KPIEngine()
+        return _engine
@@ -0,0 +1,240 @@
+# analytics/lead_scoring.py
+"""Offline-trained lead-scoring model (logistic regression on hashed one-hot features).
+
+Train from the CSV exports and write the artifact:
+
+    python -m analytics.lead_scoring --leads data/leads.csv --conversions data/conversions.csv
+
+A lead's confidence is the model's conversion probability. Triage only
+uses a model whose held-out AUC reaches LEAD_SCORING_MIN_AUC; until one
+does (or when there is no artifact), it keeps its rule-based score.
+"""
+from typing import Dict, List, Optional, Sequence, Tuple
+from functools import lru_cache
+import argparse
+import csv
+import hashlib
+import os
+import threading
+import numpy as np
+from config import settings
+
+# Categorical lead fields, each one-hot encoded into the hashed feature space
+CATEGORICAL_FEATURES = ('source', 'company_size', 'industry', 'persona', 'region',
+                        'preferred_channel', 'campaign_id')
+HASH_DIM = 1024
+
+
+@lru_cache(maxsize=65536)
+def _bucket(feature: str, value: str) -> int:
+    digest = hashlib.blake2b(f"{feature}={value}".encode(), digest_size=8).digest()
+    return int.from_bytes(digest, 'little') % HASH_DIM
+
+
+def _normalize(value) -> str:
+    if value is None or value == '':
+        return 'unknown'
+    return str(value).strip().lower().replace(' ', '_')
+
+
+def encode(leads: Sequence[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+    """Hashed feature indices (n, k) and numeric features (n, 2) for a batch of leads"""
+    n, k = len(leads), len(CATEGORICAL_FEATURES) + 1
+    indices = np.empty((n, k), dtype=np.int64)
+    numeric = np.empty((n, 2), dtype=np.float64)
+    for i, lead in enumerate(leads):
+        for j, feature in enumerate(CATEGORICAL_FEATURES):
+            indices[i, j] = _bucket(feature, _normalize(lead.get(feature)))
+        engagement = float(lead.get('engagement_score') or 0)
+        # A coarse bucket lets the model bend the otherwise linear engagement term
+        indices[i, -1] = _bucket('engagement_decile', str(min(int(engagement // 10), 10)))
+        numeric[i] = (engagement / 100.0, 1.0 if lead.get('gdpr_consent') else 0.0)
+    return indices, numeric
+
+
+def _design_matrix(indices: np.ndarray, numeric: np.ndarray) -> np.ndarray:
+    X = np.zeros((len(indices), HASH_DIM + numeric.shape[1] + 1))
+    np.add.at(X, (np.arange(len(indices))[:, None], indices), 1.0)
+    X[:, HASH_DIM:-1] = numeric
+    X[:, -1] = 1.0
+    return X
+
+
+def _sigmoid(z: np.ndarray) -> np.ndarray:
+    return 1.0 / (1.0 + np.exp(-np.clip(z, -30, 30)))
+
+
+class LeadScorer:
+    """Vectorized inference over a trained logistic-regression artifact"""
+
+    def __init__(self, weights: np.ndarray, numeric_weights: np.ndarray, bias: float,
+                 metrics: Optional[Dict] = None):
+        self.weights = weights.astype(np.float32)
+        self.numeric_weights = numeric_weights.astype(np.float32)
+        self.bias = float(bias)
+        self.metrics = metrics or {}
+
+    def beats_chance(self, min_auc: float = None) -> bool:
+        """Whether the held-out AUC recorded at training time reaches min_auc (LEAD_SCORING_MIN_AUC)"""
+        min_auc = settings.LEAD_SCORING_MIN_AUC if min_auc is None else min_auc
+        return self.metrics.get('holdout_auc', 0.0) >= min_auc
+
+    def probability(self, leads: Sequence[Dict]) -> np.ndarray:
+        """Conversion probability per lead"""
+        indices, numeric = encode(leads)
+        logits = self.weights[indices].sum(axis=1) + numeric @ self.numeric_weights + self.bias
+        return _sigmoid(logits)
+
+    def score(self, leads: Sequence[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+        """(probability, confidence) arrays for a batch of leads.
+
+        Confidence is the probability itself, so a threshold of 0.8 means an
+        80% chance of converting, whatever the mix of leads being scored.
+        """
+        probabilities = self.probability(leads)
+        return probabilities, probabilities.astype(np.float64)
+
+    def save(self, path: str):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez_compressed(
+            tmp_path, weights=self.weights, numeric_weights=self.numeric_weights,
+            bias=np.array(self.bias),
+            features=np.array(CATEGORICAL_FEATURES), hash_dim=np.array(HASH_DIM),
+            metric_names=np.array(list(self.metrics), dtype=str),
+            metric_values=np.array(list(self.metrics.values()), dtype=np.float64)
+        )
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'LeadScorer':
+        with np.load(path) as stored:
+            if tuple(stored['features']) != CATEGORICAL_FEATURES or int(stored['hash_dim']) != HASH_DIM:
+                raise ValueError(f"Lead-scoring artifact {path} was trained with a different feature layout")
+            metrics = dict(zip(stored['metric_names'].tolist(), stored['metric_values'].tolist()))
+            return cls(stored['weights'], stored['numeric_weights'], float(stored['bias']), metrics)
+
+
+def train(leads: Sequence[Dict], labels: np.ndarray, l2: float = 10.0, iterations: int = 25,
+          tol: float = 1e-6) -> LeadScorer:
+    """Fit L2-regularized logistic regression with Newton (IRLS) steps"""
+    X = _design_matrix(*encode(leads))
+    y = labels.astype(np.float64)
+    w = np.zeros(X.shape[1])
+    penalty = np.full(X.shape[1], l2)
+    penalty[-1] = 0.0  # don't shrink the bias
+
+    for _ in range(iterations):
+        p = _sigmoid(X @ w)
+        gradient = X.T @ (p - y) + penalty * w
+        hessian = (X * (p * (1 - p))[:, None]).T @ X + np.diag(penalty)
+        step = np.linalg.solve(hessian, gradient)
+        w -= step
+        if np.abs(step).max() < tol:
+            break
+
+    return LeadScorer(w[:HASH_DIM], w[HASH_DIM:-1], w[-1])
+
+
+def auc(labels: np.ndarray, scores: np.ndarray) -> float:
+    """Area under the ROC curve via the rank-sum statistic (ties get average rank)"""
+    labels = np.asarray(labels, dtype=bool)
+    order = np.argsort(scores, kind='mergesort')
+    ranks = np.empty(len(scores))
+    sorted_scores = np.asarray(scores)[order]
+    # Average ranks over runs of equal scores
+    _, starts, counts = np.unique(sorted_scores, return_index=True, return_counts=True)
+    for start, count in zip(starts, counts):
+        ranks[order[start:start + count]] = start + (count + 1) / 2.0
+    positives = labels.sum()
+    negatives = len(labels) - positives
+    if not positives or not negatives:
+        return float('nan')
+    return float((ranks[labels].sum() - positives * (positives + 1) / 2) / (positives * negatives))
+
+
+def load_training_data(leads_path: str = 'data/leads.csv',
+                       conversions_path: str = 'data/conversions.csv') -> Tuple[List[Dict], np.ndarray]:
+    """leads.csv rows as lead dicts, labelled 1 if the lead appears in conversions.csv"""
+    from agents.lead_triage.sources import load_leads_csv
+    with open(conversions_path, newline='', encoding='utf-8') as f:
+        converted = {row['lead_id'] for row in csv.DictReader(f)}
+    leads = load_leads_csv(leads_path)
+    labels = np.array([lead['external_id'] in converted for lead in leads], dtype=bool)
+    return leads, labels
+
+
+def holdout_split(leads: Sequence[Dict], fraction: float = 0.2) -> np.ndarray:
+    """Deterministic test-set mask keyed on the lead id"""
+    return np.array([_bucket('holdout', lead.get('external_id') or lead.get('email')) < fraction * HASH_DIM
+                     for lead in leads])
+
+
+def fit_from_csv(leads_path: str = 'data/leads.csv', conversions_path: str = 'data/conversions.csv',
+                 l2: float = 10.0) -> LeadScorer:
+    """Train on the non-holdout leads, record held-out metrics, then refit on everything"""
+    leads, labels = load_training_data(leads_path, conversions_path)
+    test = holdout_split(leads)
+    train_leads = [lead for lead, held in zip(leads, test) if not held]
+    test_leads = [lead for lead, held in zip(leads, test) if held]
+
+    probe = train(train_leads, labels[~test], l2=l2)
+    test_p = probe.probability(test_leads)
+    eps = 1e-12
+    metrics = {
+        'holdout_auc': auc(labels[test], test_p),
+        'holdout_log_loss': float(-np.mean(labels[test] * np.log(test_p + eps) +
+                                           (~labels[test]) * np.log(1 - test_p + eps))),
+        'base_rate': float(labels.mean()),
+        'train_size': float(len(leads))
+    }
+
+    scorer = train(leads, labels, l2=l2)
+    scorer.metrics = metrics
+    return scorer
+
+
+_scorer: Optional[LeadScorer] = None
+_scorer_loaded = False
+_scorer_lock = threading.Lock()
+
+
+def get_lead_scorer() -> Optional[LeadScorer]:
+    """Process-wide scorer from LEAD_SCORING_MODEL_PATH; None if it's missing or no better than chance"""
+    global _scorer, _scorer_loaded
+    with _scorer_lock:
+        if not _scorer_loaded:
+            path = settings.LEAD_SCORING_MODEL_PATH
+            if not os.path.exists(path):
+                print(f"⚠️ No lead-scoring model at {path}; triaging with the rule-based score")
+            else:
+                scorer = LeadScorer.load(path)
+                if scorer.beats_chance():
+                    _scorer = scorer
+                else:
+                    print(f"⚠️ Lead-scoring model at {path} has holdout AUC "
+                          f"{scorer.metrics.get('holdout_auc', float('nan')):.3f} (< {settings.LEAD_SCORING_MIN_AUC}); "
+                          f"triaging with the rule-based score")
+            _scorer_loaded = True
+        return _scorer
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Train the lead-scoring model")
+    parser.add_argument('--leads', default='data/leads.csv')
+    parser.add_argument('--conversions', default='data/conversions.csv')
+    parser.add_argument('--l2', type=float, default=10.0)
+    parser.add_argument('--out', default=None, help='artifact path (default: LEAD_SCORING_MODEL_PATH)')
+    args = parser.parse_args()
+
+    scorer = fit_from_csv(args.leads, args.conversions, l2=args.l2)
+    out = args.out or settings.LEAD_SCORING_MODEL_PATH
+    scorer.save(out)
+    print(f"✅ Lead-scoring model saved to {out} ({os.path.getsize(out)} bytes): {scorer.metrics}")
+    if not scorer.beats_chance():
+        print(f"⚠️ Holdout AUC is below LEAD_SCORING_MIN_AUC ({settings.LEAD_SCORING_MIN_AUC}); "
+              f"triage will keep using the rule-based score")
+
+
+if __name__ == '__main__':
+    main()
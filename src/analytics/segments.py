@@ -0,0 +1,294 @@
+# analytics/segments.py
+"""Lead segments: rule sets compiled to bitmask lookups, plus a membership index.
+
+A segment's rules (data/segments.csv ``rules_json``) constrain industry,
+region, preferred channel and a minimum lead score, where null means
+"any". Compiling turns every categorical rule field into a table with
+one row per value named in any rule (row 0 for every other value). Each
+row holds a packed bitmask of the segments that accept that value.
+Thresholds work the same way: row t holds the segments whose minimum is
+met by a score at or above the t-th smallest threshold. A batch of
+leads is evaluated in one pass: each column is mapped to table rows and
+the gathered rows are ANDed, so the cost does not grow with the number
+of rules.
+
+SegmentIndex keeps the result in the short-term store (Redis): one
+sorted set of member emails per segment, scored by lead score, and one
+hash per lead with its segments. Updating a lead writes only the
+memberships that changed. "Leads in segment X" is then a range read
+instead of a scan.
+"""
+from typing import Any, Dict, List, Optional, Sequence
+import asyncio
+import csv
+import json
+import os
+import sys
+import threading
+import numpy as np
+from memory.backends import ShortTermBackend, get_short_term_backend
+from config import settings
+
+MEMBERS_KEY_PREFIX = 'segment:members'
+LEAD_KEY_PREFIX = 'segment:lead'
+# Segment -> count of membership changes, so readers can tell whether a cached member list is current
+VERSIONS_KEY = 'segment:versions'
+# Rule key -> lead field
+CATEGORICAL_RULES = {'industry': 'industry', 'regions': 'region', 'preferred_channel': 'preferred_channel'}
+SCORE_RULE = 'min_lead_score'
+# Lead fields holding the lead score, in order of preference (CSV exports vs the leads table)
+SCORE_FIELDS = ('lead_score', 'engagement_score')
+
+
+def _norm(value) -> str:
+    return str(value).strip().casefold() if value is not None else ''
+
+
+def _email(email: str) -> str:
+    return email.strip().lower()
+
+
+def _members_key(segment_id: str) -> str:
+    return f"{MEMBERS_KEY_PREFIX}:{segment_id}"
+
+
+def _lead_key(email: str) -> str:
+    return f"{LEAD_KEY_PREFIX}:{_email(email)}"
+
+
+def lead_score(lead: Dict[str, Any]) -> Optional[float]:
+    for field in SCORE_FIELDS:
+        try:
+            if lead.get(field) not in (None, ''):
+                return float(lead[field])
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+class SegmentEngine:
+    """Segment rule sets compiled to per-field lookup tables of packed segment bitmasks"""
+
+    def __init__(self, segments: Sequence[Dict[str, Any]]):
+        self.segments: List[Dict[str, Any]] = []
+        for segment in segments:
+            rules = segment.get('rules')
+            if rules is None:
+                rules = json.loads(segment.get('rules_json') or '{}')
+            unknown = set(rules) - set(CATEGORICAL_RULES) - {SCORE_RULE}
+            if unknown:
+                raise ValueError(f"Segment {segment['segment_id']} has unknown rules: {sorted(unknown)}")
+            self.segments.append({**{k: v for k, v in segment.items() if k != 'rules_json'}, 'rules': rules})
+        self.ids = [segment['segment_id'] for segment in self.segments]
+        self._position = {segment_id: i for i, segment_id in enumerate(self.ids)}
+        if len(self._position) != len(self.ids):
+            raise ValueError("Duplicate segment_id in segment definitions")
+        self._words = max(1, -(-len(self.ids) // 64))
+        self._compile()
+
+    def __len__(self) -> int:
+        return len(self.ids)
+
+    def __contains__(self, segment_id) -> bool:
+        return segment_id in self._position
+
+    def get(self, segment_id) -> Optional[Dict[str, Any]]:
+        i = self._position.get(segment_id)
+        return self.segments[i] if i is not None else None
+
+    def _bit(self, table: np.ndarray, rows, s: int):
+        word, bit = divmod(s, 64)
+        table[rows, word] |= np.uint64(1 << bit)
+
+    def _compile(self):
+        self._vocab: Dict[str, Dict[str, int]] = {}
+        self._tables: Dict[str, np.ndarray] = {}
+        for rule in CATEGORICAL_RULES:
+            vocab: Dict[str, int] = {}
+            accepted = []
+            for segment in self.segments:
+                value = segment['rules'].get(rule)
+                values = value if isinstance(value, (list, tuple)) else [] if value is None else [value]
+                # An empty list constrains nothing, like null
+                accepted.append({vocab.setdefault(_norm(v), len(vocab) + 1) for v in values if _norm(v)} or None)
+            table = np.zeros((len(vocab) + 1, self._words), dtype=np.uint64)
+            for s, codes in enumerate(accepted):
+                self._bit(table, slice(None) if codes is None else sorted(codes), s)
+            self._vocab[rule], self._tables[rule] = vocab, table
+
+        minimums = [segment['rules'].get(SCORE_RULE) for segment in self.segments]
+        self._thresholds = np.array(sorted({float(m) for m in minimums if m is not None}))
+        table = np.zeros((len(self._thresholds) + 1, self._words), dtype=np.uint64)
+        for s, minimum in enumerate(minimums):
+            first = 0 if minimum is None else int(np.searchsorted(self._thresholds, float(minimum))) + 1
+            self._bit(table, slice(first, None), s)
+        self._score_table = table
+
+    def _codes(self, rule: str, column: Sequence) -> np.ndarray:
+        vocab = self._vocab[rule]
+        # Each distinct raw value is normalized once
+        seen: Dict[Any, int] = {}
+        return np.fromiter((seen[v] if v in seen else seen.setdefault(v, vocab.get(_norm(v), 0)) for v in column),
+                           dtype=np.intp, count=len(column))
+
+    def evaluate(self, leads: Sequence[Dict[str, Any]]) -> np.ndarray:
+        """(len(leads), words) uint64 membership bitmasks, bit s set when the lead is in segment s"""
+        if not leads:
+            return np.zeros((0, self._words), dtype=np.uint64)
+        scores = np.array([lead_score(lead) for lead in leads], dtype=float)
+        rows = np.searchsorted(self._thresholds, scores, side='right')
+        rows[np.isnan(scores)] = 0  # no score meets no minimum
+        masks = self._score_table[rows]
+        for rule, field in CATEGORICAL_RULES.items():
+            masks &= self._tables[rule][self._codes(rule, [lead.get(field) for lead in leads])]
+        return masks
+
+    def decode(self, masks: np.ndarray) -> List[List[str]]:
+        """Segment ids per bitmask row, in definition order"""
+        if not len(masks):
+            return []
+        # Leads share few distinct combinations, so each is decoded once
+        distinct, inverse = np.unique(masks, axis=0, return_inverse=True)
+        bits = np.unpackbits(distinct.astype('<u8').view(np.uint8), axis=1, bitorder='little')[:, :len(self.ids)]
+        ids = np.array(self.ids, dtype=object)
+        decoded = [ids[np.flatnonzero(row)].tolist() for row in bits]
+        return [list(decoded[i]) for i in inverse.reshape(-1)]
+
+    def matches(self, leads: Sequence[Dict[str, Any]]) -> List[List[str]]:
+        """Segment ids each lead belongs to"""
+        return self.decode(self.evaluate(leads))
+
+    @classmethod
+    def from_csv(cls, path: str = 'data/segments.csv') -> 'SegmentEngine':
+        with open(path, newline='', encoding='utf-8') as f:
+            return cls([dict(row) for row in csv.DictReader(f)])
+
+
+class SegmentIndex:
+    """Lead -> segments memberships and per-segment member sets, kept in the short-term store"""
+
+    def __init__(self, engine: SegmentEngine, store: ShortTermBackend = None):
+        self.engine = engine
+        self.store = store
+        self.stats = {'evaluated': 0, 'changed': 0}
+
+    def _store(self) -> ShortTermBackend:
+        # Resolved per call: the process-wide index outlives any one backend choice
+        return self.store or get_short_term_backend()
+
+    async def update(self, leads: Sequence[Dict[str, Any]]) -> List[List[str]]:
+        """Re-evaluate leads (new, triaged or edited) and store changed memberships; returns each lead's segments"""
+        if not leads or not len(self.engine):
+            return [[] for _ in leads]
+        memberships = self.engine.matches(leads)
+        # The last copy of a lead in the batch wins
+        latest: Dict[str, tuple] = {}
+        for lead, segments in zip(leads, memberships):
+            if lead.get('email'):
+                latest[_email(lead['email'])] = (segments, lead_score(lead) or 0.0)
+        self.stats['evaluated'] += len(leads)
+
+        store = self._store()
+        emails = list(latest)
+        previous = await store.hgetall_many([_lead_key(email) for email in emails])
+        added: Dict[str, Dict[str, float]] = {}
+        removed: Dict[str, List[str]] = {}
+        writes = []
+        for email, stored in zip(emails, previous):
+            segments, score = latest[email]
+            before = set(filter(None, stored.get('segments', '').split(',')))
+            entry = {'segments': ','.join(segments), 'score': f"{score:g}"}
+            if (not stored and not segments) or stored == entry:
+                continue
+            # Re-scored members are re-added so each segment stays ordered by lead score
+            for segment_id in segments:
+                added.setdefault(segment_id, {})[email] = score
+            for segment_id in before - set(segments):
+                removed.setdefault(segment_id, []).append(email)
+            writes.append(store.hset(_lead_key(email), entry))
+        await asyncio.gather(
+            *(store.zadd(_members_key(segment_id), members) for segment_id, members in added.items()),
+            *(store.zrem(_members_key(segment_id), *members) for segment_id, members in removed.items()),
+            store.hincrby(VERSIONS_KEY, {segment_id: 1 for segment_id in {**added, **removed}}),
+            *writes
+        )
+        self.stats['changed'] += len(writes)
+        return memberships
+
+    async def remove(self, emails: Sequence[str]):
+        """Drop leads from every segment (deleted or opted out)"""
+        emails = list(dict.fromkeys(_email(email) for email in emails if email))
+        if not emails:
+            return
+        store = self._store()
+        previous = await store.hgetall_many([_lead_key(email) for email in emails])
+        removed: Dict[str, List[str]] = {}
+        for email, stored in zip(emails, previous):
+            for segment_id in filter(None, stored.get('segments', '').split(',')):
+                removed.setdefault(segment_id, []).append(email)
+        await asyncio.gather(*(store.zrem(_members_key(segment_id), *members)
+                               for segment_id, members in removed.items()),
+                             store.hincrby(VERSIONS_KEY, {segment_id: 1 for segment_id in removed}))
+        await store.delete(*[_lead_key(email) for email in emails])
+
+    async def members(self, segment_id: str, offset: int = 0, limit: int = 100) -> List[str]:
+        """Member emails, highest lead score first"""
+        if limit <= 0:
+            return []
+        return await self._store().zrange(_members_key(segment_id), offset, offset + limit - 1, desc=True)
+
+    async def count(self, segment_id: str) -> int:
+        return await self._store().zcard(_members_key(segment_id))
+
+    async def versions(self, segment_ids: Sequence[str]) -> Dict[str, int]:
+        """How many times each segment's membership changed (0 if never)"""
+        stored = await self._store().hmget(VERSIONS_KEY, list(segment_ids))
+        return {segment_id: int(version or 0) for segment_id, version in zip(segment_ids, stored)}
+
+    async def segments_of(self, emails: Sequence[str]) -> Dict[str, List[str]]:
+        """Stored segments per lead email ([] for leads never indexed)"""
+        emails = [email for email in dict.fromkeys(emails) if email]
+        stored = await self._store().hgetall_many([_lead_key(email) for email in emails])
+        return {email: list(filter(None, entry.get('segments', '').split(','))) for email, entry in zip(emails, stored)}
+
+
+_index: Optional[SegmentIndex] = None
+_index_lock = threading.Lock()
+
+
+def get_segment_index() -> SegmentIndex:
+    """Process-wide index over the segments in SEGMENTS_PATH"""
+    global _index
+    with _index_lock:
+        if _index is None:
+            path = settings.SEGMENTS_PATH
+            if os.path.exists(path):
+                engine = SegmentEngine.from_csv(path)
+            else:
+                print(f"⚠️ No segment definitions at {path}; leads are not segmented")
+                engine = SegmentEngine([])
+            _index = SegmentIndex(engine)
+        return _index
+
+
+async def index_leads_csv(path: str, batch_size: int = 10000) -> Dict[str, int]:
+    """Evaluate every lead in a leads.csv export and store the memberships; returns counts per segment"""
+    index = get_segment_index()
+    with open(path, newline='', encoding='utf-8') as f:
+        rows = [dict(row) for row in csv.DictReader(f)]
+    for start in range(0, len(rows), batch_size):
+        await index.update(rows[start:start + batch_size])
+    counts = await asyncio.gather(*(index.count(segment_id) for segment_id in index.engine.ids))
+    return dict(zip(index.engine.ids, counts))
+
+
+def main():
+    path = sys.argv[1] if len(sys.argv) > 1 else 'data/leads.csv'
+    counts = asyncio.run(index_leads_csv(path))
+    for segment_id, count in counts.items():
+        print(f"{segment_id} {get_segment_index().engine.get(segment_id)['name']}: {count} leads")
+    print(f"✅ Indexed {path} into {len(counts)} segments")
+
+
+if __name__ == '__main__':
+    main()
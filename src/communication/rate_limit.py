@@ -0,0 +1,54 @@
+# communication/rate_limit.py
+from typing import Callable
+import asyncio
+import time
+
+
+class TokenBucket:
+    """Async token bucket: refills at `rate` tokens/s up to `capacity`.
+
+    Waiters are served in arrival order, so a large request can't be
+    starved by a stream of small ones.
+    """
+
+    def __init__(self, rate: float, capacity: float = None, clock: Callable[[], float] = time.monotonic):
+        if rate <= 0:
+            raise ValueError(f"Token bucket rate must be positive, got {rate}")
+        self.rate = float(rate)
+        self.capacity = float(capacity if capacity is not None else rate)
+        self._clock = clock
+        self._tokens = self.capacity
+        self._updated = clock()
+        self._lock = asyncio.Lock()
+        self.waited_seconds = 0.0
+
+    def _refill(self):
+        now = self._clock()
+        self._tokens = min(self.capacity, self._tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def try_acquire(self, tokens: float = 1) -> bool:
+        """Take tokens if they're available right now"""
+        self._refill()
+        if self._tokens >= tokens and not self._lock.locked():
+            self._tokens -= tokens
+            return True
+        return False
+
+    def full(self) -> bool:
+        """Refilled to capacity with no waiters, i.e. no different from a new bucket"""
+        self._refill()
+        return self._tokens >= self.capacity and not self._lock.locked()
+
+    async def acquire(self, tokens: float = 1):
+        """Wait until tokens are available, then take them"""
+        if tokens > self.capacity:
+            raise ValueError(f"Can't acquire {tokens} tokens from a bucket of capacity {self.capacity}")
+        async with self._lock:
+            self._refill()
+            while self._tokens < tokens:
+                wait = (tokens - self._tokens) / self.rate
+                self.waited_seconds += wait
+                await asyncio.sleep(wait)
+                self._refill()
+            self._tokens -= tokens
@@ -1,6 +1,6 @@
 # config.py
 from pydantic_settings import BaseSettings, SettingsConfigDict
-from typing import Optional
+from typing import Dict, List, Optional
 
 class Settings(BaseSettings):
     # This tells Pydantic to load settings from a file named .env
@@ -14,6 +14,22 @@ class Settings(BaseSettings):
     # MCP Server
     MCP_HOST: str
     MCP_PORT: int
+    # Extra API keys: key -> {"principal": ..., "scopes": [...]}; API_KEY itself is an admin ("*") key
+    MCP_API_KEYS: Dict[str, Dict] = {}
+    # HS256 secret for bearer JWTs (sub = principal, scope/scp = scopes); None accepts API keys only
+    MCP_JWT_SECRET: Optional[str] = None
+    MCP_JWT_ISSUER: Optional[str] = None
+    MCP_JWT_AUDIENCE: Optional[str] = None
+    MCP_JWT_LEEWAY: float = 30.0
+    # Seconds a verified credential is reused without re-verification (also bounds how long
+    # another server process keeps accepting a revoked one), and how many are kept
+    MCP_AUTH_CACHE_TTL: float = 60.0
+    MCP_AUTH_CACHE_SIZE: int = 10000
+    # Seconds a revocation is kept when the credential has no expiry of its own (API keys)
+    MCP_AUTH_REVOCATION_TTL: int = 2592000
+    # Per-principal request quota: token bucket refill rate (requests/s) and burst
+    MCP_QUOTA_RATE: float = 50.0
+    MCP_QUOTA_BURST: float = 100.0
     
     # Databases
     POSTGRES_URL: str
@@ -29,5 +45,112 @@ class Settings(BaseSettings):
     SHORT_TERM_MEMORY_SIZE: int
     SHORT_TERM_MEMORY_TTL: int
 
+    # Long-term memory maintenance
+    LTM_ACCESS_FLUSH_SIZE: int = 100
+    LTM_ACCESS_FLUSH_INTERVAL: float = 5.0
+    LTM_DECAY_HALF_LIFE_DAYS: float = 30.0
+    LTM_COMPACTION_MIN_AGE_DAYS: int = 30
+    LTM_COMPACTION_THRESHOLD: float = 0.2
+
+    # Episodic memory retrieval
+    EPISODE_EMBEDDING_DIM: int = 256
+    EPISODE_INDEX_DIR: Optional[str] = None
+    EPISODE_INDEX_SAVE_EVERY: int = 50
+
+    # Semantic memory write batching
+    SEMANTIC_BATCH_SIZE: int = 200
+    SEMANTIC_FLUSH_INTERVAL: float = 1.0
+    SEMANTIC_SNAPSHOT_ENABLED: bool = False
+    SEMANTIC_SNAPSHOT_SOURCE: Optional[str] = None
+
+    # Multi-tier recall
+    MEMORY_RECALL_DEADLINE: float = 0.5
+
+    # Memory backends: "embedded" switches every tier to its in-process store,
+    # otherwise each tier picks its own (redis|memory, postgres|sqlite, neo4j|memory)
+    MEMORY_BACKEND: Optional[str] = None
+    STM_BACKEND: str = "redis"
+    LTM_BACKEND: str = "postgres"
+    GRAPH_BACKEND: str = "neo4j"
+    SQLITE_PATH: str = ":memory:"
+
+    # Typed, memory-mapped column files built from the data/ CSV exports (rebuilt when a CSV changes)
+    COLUMNAR_CACHE_DIR: str = "data/.columnar"
+
+    # MCP resources: directory served as data://{name} and the exports in it that may be served
+    # (auth, transport and memory dumps stay private), rendered resources cached per process,
+    # and the most items one resources/read returns
+    RESOURCE_DATA_DIR: str = "data"
+    RESOURCE_DATA_EXPORTS: List[str] = ["leads", "campaigns", "campaign_daily", "ab_variants",
+                                        "conversions", "segments"]
+    RESOURCE_CACHE_SIZE: int = 256
+    RESOURCE_PAGE_SIZE: int = 1000
+
+    # Lead scoring: trained model artifact, used only once its holdout AUC reaches the
+    # minimum (triage falls back to the rule-based score until then)
+    LEAD_SCORING_MODEL_PATH: str = "models/lead_scoring.npz"
+    LEAD_SCORING_MIN_AUC: float = 0.6
+    # Campaign KPI engine: daily data, rolling window length, and the cross-campaign
+    # percentile below which a KPI is reported as an issue
+    CAMPAIGN_DAILY_PATH: str = "data/campaign_daily.csv"
+    KPI_WINDOW_DAYS: int = 7
+    KPI_ISSUE_PERCENTILE: float = 0.25
+    # Campaign anomaly detection: EWMA smoothing, CUSUM slack/threshold (in standard
+    # deviations), readings before a KPI is scored, and quiet period after an alert
+    ANOMALY_EWMA_ALPHA: float = 0.2
+    ANOMALY_CUSUM_K: float = 0.5
+    ANOMALY_CUSUM_H: float = 5.0
+    ANOMALY_WARMUP: int = 5
+    ANOMALY_COOLDOWN_HOURS: float = 72.0
+    # Lead segment definitions (rules_json over industry, regions, channel and min score)
+    SEGMENTS_PATH: str = "data/segments.csv"
+    # Multi-touch attribution: touches older than the lookback don't share a conversion's credit,
+    # time-decay weight halves every half-life, and only the last MAX_TOUCHES of a path count
+    ATTRIBUTION_LOOKBACK_DAYS: float = 30.0
+    ATTRIBUTION_HALF_LIFE_DAYS: float = 7.0
+    ATTRIBUTION_MAX_TOUCHES: int = 50
+    # A/B variant allocation: a conversion counts as this many clicks in the sampled reward;
+    # assignments are drawn in batches and counts shared every BANDIT_REFRESH_SECONDS
+    AB_VARIANTS_PATH: str = "data/ab_variants.csv"
+    BANDIT_CONVERSION_WEIGHT: float = 10.0
+    BANDIT_SAMPLE_BATCH: int = 256
+    BANDIT_REFRESH_SECONDS: float = 60.0
+    # Seconds a lead's conversion is still credited to the variant it was sent
+    BANDIT_ATTRIBUTION_TTL: int = 2592000
+    # Seconds a triage decision is reused for a repeat arrival of the same lead (0 disables)
+    TRIAGE_CACHE_TTL: int = 600
+
+    # Outreach dispatch: per-channel provider rate limit (messages/s), burst, workers and
+    # bulk batch size (1 = no bulk endpoint)
+    OUTREACH_CHANNELS: Dict[str, Dict[str, float]] = {
+        'email': {'rate': 100, 'burst': 200, 'workers': 4, 'batch_size': 100},
+        'sms': {'rate': 20, 'burst': 20, 'workers': 2, 'batch_size': 1},
+        'social': {'rate': 5, 'burst': 10, 'workers': 2, 'batch_size': 1},
+        'call': {'rate': 5, 'burst': 10, 'workers': 2, 'batch_size': 1}
+    }
+    OUTREACH_QUEUE_SIZE: int = 1000
+    # Workers running send completion handlers (logging, memory, escalation) off the send workers
+    OUTREACH_COMPLETION_WORKERS: int = 8
+
+    # Follow-up scheduler: jobs due within the horizon (seconds) are held in an in-memory
+    # timer wheel with the given tick; claimed jobs are leased until their send finishes
+    FOLLOW_UP_HORIZON: float = 300.0
+    FOLLOW_UP_POLL_INTERVAL: float = 30.0
+    FOLLOW_UP_LEASE_SECONDS: float = 300.0
+    FOLLOW_UP_BATCH_SIZE: int = 500
+    FOLLOW_UP_PREFETCH: int = 50000
+    FOLLOW_UP_TICK: float = 1.0
+
+    # Streaming agent pipeline
+    PIPELINE_QUEUE_SIZE: int = 100
+    PIPELINE_TRIAGE_WORKERS: int = 4
+    PIPELINE_ENGAGEMENT_WORKERS: int = 4
+    PIPELINE_OPTIMIZATION_WORKERS: int = 1
+    PIPELINE_TRIAGE_BATCH_SIZE: int = 1
+    PIPELINE_POLL_INTERVAL: float = 2.0
+    # Worker processes for the sharded supervisor (None = one per CPU core)
+    PIPELINE_PROCESSES: Optional[int] = None
+    PIPELINE_INBOX_SIZE: int = 1000
+
 # This single instance is imported by other parts of the app
 settings = Settings()
\ No newline at end of file
@@ -20,10 +20,40 @@ def init_neo4j():
             FOR (e:Entity) REQUIRE e.id IS UNIQUE
         """)
         
+        session.run("""
+            CREATE CONSTRAINT entity_name IF NOT EXISTS
+            FOR (e:Entity) REQUIRE e.name IS UNIQUE
+        """)
+        
         session.run("""
             CREATE CONSTRAINT episode_id IF NOT EXISTS
             FOR (ep:Episode) REQUIRE ep.id IS UNIQUE
         """)
+
+        session.run("""
+            CREATE INDEX episode_agent IF NOT EXISTS
+            FOR (ep:Episode) ON (ep.agent_id)
+        """)
+
+        session.run("""
+            CREATE INDEX episode_entity IF NOT EXISTS
+            FOR (ep:Episode) ON (ep.entity_id)
+        """)
+
+        session.run("""
+            CREATE INDEX episode_outcome IF NOT EXISTS
+            FOR (ep:Episode) ON (ep.outcome)
+        """)
+
+        session.run("""
+            CREATE INDEX episode_importance IF NOT EXISTS
+            FOR (ep:Episode) ON (ep.importance)
+        """)
+
+        session.run("""
+            CREATE INDEX episode_timestamp IF NOT EXISTS
+            FOR (ep:Episode) ON (ep.timestamp)
+        """)
     print("✅ Neo4j initialized")
 
 def init_redis():
@@ -0,0 +1,308 @@
+# mcp/auth.py
+"""Authentication, scope checks and per-principal quotas for the MCP server.
+
+A caller presents either an API key (``X-API-KEY``, or a bearer token
+that isn't a JWT) or an HS256 JWT (``Authorization: Bearer``). WebSocket
+clients present it at the handshake (browser clients may pass
+``?token=``) and it is re-checked against the cache on every message. Checking a credential means parsing it, computing an HMAC
+and looking it up in the revocation keys in the short-term store. The
+result is therefore cached in-process under the credential's SHA-256
+fingerprint, for MCP_AUTH_CACHE_TTL or until the token expires if that
+comes first, so a request with a known credential costs one dict lookup.
+
+revoke() marks a token, or every credential a principal holds, as
+revoked in the shared store and drops it from this process's cache.
+Other server processes stop accepting it once their cached entry
+expires. A principal's JWTs are revoked by a cutoff against their
+``iat``; API keys have no issue time, so the principal's configured
+keys are revoked one by one and keys added later still work.
+
+Every RPC method requires one scope (METHOD_SCOPES). A ``resource:write``
+grant also allows ``resource:read``, ``*`` allows everything, and any
+method not listed is admin-only. Each principal's requests also go
+through a token bucket of MCP_QUOTA_RATE requests/s and MCP_QUOTA_BURST
+burst. A bucket idle long enough to refill is the same as a new one,
+so it is dropped.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, Iterable, Mapping, Optional, Tuple
+import base64
+import hashlib
+import hmac
+import json
+import threading
+import time
+from communication.rate_limit import TokenBucket
+from memory.backends import ShortTermBackend, get_short_term_backend
+from config import settings
+
+ADMIN_SCOPE = '*'
+METHOD_SCOPES = {
+    'get_lead_data': 'leads:read',
+    'list_new_leads': 'leads:read',
+    'list_segment_leads': 'leads:read',
+    'get_lead_segments': 'leads:read',
+    'update_lead_status': 'leads:write',
+    'bulk_update_lead_status': 'leads:write',
+    'get_campaign_metrics': 'campaigns:read',
+    'record_variant_outcome': 'campaigns:write',
+    'log_interaction': 'memory:rw',
+    'agent_handoff': 'memory:rw',
+    'resources/list': 'resources:read',
+    'resources/read': 'resources:read',
+}
+REVOKED_KEY_PREFIX = 'auth:revoked'
+REVOKED_PRINCIPAL_KEY_PREFIX = 'auth:revoked-principal'
+# JSON-RPC server error codes for rejected requests
+UNAUTHENTICATED = -32001
+FORBIDDEN = -32003
+RATE_LIMITED = -32029
+
+
+class AuthError(Exception):
+    """A rejected request, with the HTTP status and JSON-RPC error code to answer it with"""
+
+    def __init__(self, status: int, code: int, message: str):
+        super().__init__(message)
+        self.status = status
+        self.code = code
+
+
+def _unauthenticated(message: str) -> AuthError:
+    return AuthError(401, UNAUTHENTICATED, message)
+
+
+class Principal:
+    """An authenticated caller: name, granted scopes, and the credential's mechanism and lifetime"""
+
+    def __init__(self, name: str, scopes: Iterable[str], mechanism: str,
+                 expires_at: Optional[float] = None, issued_at: Optional[float] = None):
+        self.name = name
+        self.scopes = frozenset(scopes)
+        self.mechanism = mechanism
+        self.expires_at = expires_at
+        self.issued_at = issued_at
+
+    def allows(self, scope: str) -> bool:
+        if ADMIN_SCOPE in self.scopes or scope in self.scopes:
+            return True
+        resource, _, access = scope.partition(':')
+        return access == 'read' and f"{resource}:write" in self.scopes
+
+
+def fingerprint(credential: str) -> str:
+    """Key for a credential in caches and the store; the credential itself is never stored"""
+    return hashlib.sha256(credential.encode()).hexdigest()
+
+
+def _b64encode(data: bytes) -> str:
+    return base64.urlsafe_b64encode(data).rstrip(b'=').decode()
+
+
+def _b64decode(part: str) -> bytes:
+    return base64.urlsafe_b64decode(part + '=' * (-len(part) % 4))
+
+
+def _claims(token: str) -> Tuple[Dict[str, Any], Dict[str, Any]]:
+    """Header and claims of a JWT, unverified"""
+    try:
+        header_b64, payload_b64, _ = token.split('.')
+        header, claims = json.loads(_b64decode(header_b64)), json.loads(_b64decode(payload_b64))
+    except ValueError:
+        raise _unauthenticated("Malformed token") from None
+    if not isinstance(header, dict) or not isinstance(claims, dict):
+        raise _unauthenticated("Malformed token")
+    return header, claims
+
+
+def encode_jwt(claims: Dict[str, Any], secret: str) -> str:
+    """Sign claims as an HS256 JWT (service tokens, tests)"""
+    signing_input = '.'.join(_b64encode(json.dumps(part, separators=(',', ':')).encode())
+                             for part in ({'alg': 'HS256', 'typ': 'JWT'}, claims))
+    signature = hmac.new(secret.encode(), signing_input.encode(), hashlib.sha256).digest()
+    return f"{signing_input}.{_b64encode(signature)}"
+
+
+def decode_jwt(token: str, secret: str, issuer: Optional[str] = None, audience: Optional[str] = None,
+               leeway: float = 0.0, now: Optional[float] = None) -> Dict[str, Any]:
+    """Claims of an HS256 JWT after checking its signature, exp/nbf, issuer and audience"""
+    header, claims = _claims(token)
+    if header.get('alg') != 'HS256':
+        raise _unauthenticated(f"Unsupported token algorithm: {header.get('alg')}")
+    signing_input, _, signature = token.rpartition('.')
+    expected = hmac.new(secret.encode(), signing_input.encode(), hashlib.sha256).digest()
+    try:
+        valid = hmac.compare_digest(_b64decode(signature), expected)
+    except ValueError:
+        valid = False
+    if not valid:
+        raise _unauthenticated("Invalid token signature")
+    now = time.time() if now is None else now
+    if 'exp' in claims and now > float(claims['exp']) + leeway:
+        raise _unauthenticated("Token expired")
+    if 'nbf' in claims and now < float(claims['nbf']) - leeway:
+        raise _unauthenticated("Token not yet valid")
+    if issuer and claims.get('iss') != issuer:
+        raise _unauthenticated("Unexpected token issuer")
+    if audience:
+        aud = claims.get('aud')
+        if audience not in (aud if isinstance(aud, list) else [aud]):
+            raise _unauthenticated("Unexpected token audience")
+    return claims
+
+
+def credential_from(headers: Mapping[str, str], query: Optional[Mapping[str, str]] = None) -> Optional[str]:
+    """Bearer token, X-API-KEY header, or ?token= query parameter (WebSocket clients in browsers)"""
+    scheme, _, value = (headers.get('authorization') or '').partition(' ')
+    if scheme.lower() == 'bearer' and value.strip():
+        return value.strip()
+    return headers.get('x-api-key') or (query or {}).get('token') or None
+
+
+class Authenticator:
+    """Verifies credentials once and caches the result; authorizes and meters each request"""
+
+    def __init__(self, store: ShortTermBackend = None, api_keys: Optional[Dict[str, Dict]] = None,
+                 jwt_secret: Optional[str] = None, cache_ttl: Optional[float] = None,
+                 quota_rate: Optional[float] = None, quota_burst: Optional[float] = None,
+                 clock=time.time):
+        self.store = store
+        keys = {settings.API_KEY: {'principal': 'admin', 'scopes': [ADMIN_SCOPE]}} if settings.API_KEY else {}
+        keys.update(settings.MCP_API_KEYS if api_keys is None else api_keys)
+        self.api_keys = keys
+        self.jwt_secret = jwt_secret if jwt_secret is not None else settings.MCP_JWT_SECRET
+        self.cache_ttl = cache_ttl if cache_ttl is not None else settings.MCP_AUTH_CACHE_TTL
+        self.quota_rate = quota_rate or settings.MCP_QUOTA_RATE
+        self.quota_burst = quota_burst or settings.MCP_QUOTA_BURST
+        self._clock = clock
+        self._cache: 'OrderedDict[str, Tuple[Principal, float]]' = OrderedDict()
+        self._buckets: 'OrderedDict[str, TokenBucket]' = OrderedDict()
+        self.stats = {'cached': 0, 'verified': 0, 'rejected': 0}
+
+    def _store(self) -> ShortTermBackend:
+        # Resolved per call: the process-wide authenticator outlives any one backend choice
+        return self.store or get_short_term_backend()
+
+    async def authenticate(self, credential: Optional[str]) -> Principal:
+        """The principal behind a credential, verified on first sight and then served from the cache"""
+        if not credential:
+            self.stats['rejected'] += 1
+            raise _unauthenticated("Missing credentials")
+        key = fingerprint(credential)
+        now = self._clock()
+        cached = self._cache.get(key)
+        if cached is not None and cached[1] > now:
+            self._cache.move_to_end(key)
+            self.stats['cached'] += 1
+            return cached[0]
+        try:
+            principal = await self._verify(credential, key, now)
+        except AuthError:
+            self._cache.pop(key, None)
+            self.stats['rejected'] += 1
+            raise
+        self.stats['verified'] += 1
+        until = now + self.cache_ttl
+        if principal.expires_at is not None:
+            until = min(until, principal.expires_at)
+        self._cache[key] = (principal, until)
+        self._cache.move_to_end(key)
+        while len(self._cache) > settings.MCP_AUTH_CACHE_SIZE:
+            self._cache.popitem(last=False)
+        return principal
+
+    async def _verify(self, credential: str, key: str, now: float) -> Principal:
+        if credential.count('.') == 2:
+            if not self.jwt_secret:
+                raise _unauthenticated("Bearer tokens are not accepted by this server")
+            claims = decode_jwt(credential, self.jwt_secret, settings.MCP_JWT_ISSUER, settings.MCP_JWT_AUDIENCE,
+                                settings.MCP_JWT_LEEWAY, now)
+            if not claims.get('sub'):
+                raise _unauthenticated("Token has no subject")
+            scopes = claims.get('scp') or claims.get('scope') or []
+            if isinstance(scopes, str):
+                scopes = scopes.split()
+            principal = Principal(str(claims['sub']), scopes, 'jwt', claims.get('exp'), claims.get('iat'))
+        else:
+            # compare_digest against every key so timing doesn't reveal a matching prefix
+            matches = [grant for api_key, grant in self.api_keys.items()
+                       if hmac.compare_digest(api_key.encode(), credential.encode())]
+            if not matches:
+                raise _unauthenticated("Invalid API key")
+            principal = Principal(matches[0]['principal'], matches[0].get('scopes', []), 'api_key')
+
+        revoked, principal_revoked_at = await self._store().mget([
+            f"{REVOKED_KEY_PREFIX}:{key}", f"{REVOKED_PRINCIPAL_KEY_PREFIX}:{principal.name}"])
+        # API keys are revoked per key by revoke(principal=...); the cutoff is for issued tokens
+        if revoked or (principal_revoked_at is not None and principal.mechanism != 'api_key' and
+                       (principal.issued_at is None or float(principal.issued_at) <= float(principal_revoked_at))):
+            raise _unauthenticated("Credentials revoked")
+        return principal
+
+    def authorize(self, principal: Principal, method: Optional[str]):
+        """Check a request's scope, the credential's expiry (long-lived connections) and the principal's quota"""
+        if principal.expires_at is not None and self._clock() > principal.expires_at + settings.MCP_JWT_LEEWAY:
+            raise _unauthenticated("Token expired")
+        required = METHOD_SCOPES.get(method, ADMIN_SCOPE)
+        if not principal.allows(required):
+            raise AuthError(403, FORBIDDEN, f"'{principal.name}' lacks scope '{required}' for {method}")
+        bucket = self._buckets.get(principal.name)
+        if bucket is None:
+            bucket = self._buckets[principal.name] = TokenBucket(self.quota_rate, self.quota_burst, self._clock)
+        else:
+            self._buckets.move_to_end(principal.name)
+        self._evict_idle_buckets()
+        if not bucket.try_acquire():
+            raise AuthError(429, RATE_LIMITED, f"Request quota exceeded for '{principal.name}'")
+
+    def _evict_idle_buckets(self):
+        # Least recently used first; stop at the first one that hasn't refilled yet
+        while len(self._buckets) > 1:
+            name, bucket = next(iter(self._buckets.items()))
+            if not bucket.full():
+                break
+            del self._buckets[name]
+
+    async def revoke(self, credential: Optional[str] = None, principal: Optional[str] = None) -> int:
+        """Revoke one credential, or everything a principal holds now, in every server process"""
+        if not credential and not principal:
+            raise ValueError("revoke() needs a credential or a principal")
+        now = self._clock()
+        dropped = 0
+        if credential:
+            ttl = settings.MCP_AUTH_REVOCATION_TTL
+            if credential.count('.') == 2:
+                try:
+                    expires_at = _claims(credential)[1].get('exp')
+                except AuthError:
+                    expires_at = None
+                if expires_at is not None:
+                    ttl = max(int(float(expires_at) + settings.MCP_JWT_LEEWAY - now) + 1, 1)
+            key = fingerprint(credential)
+            await self._store().set(f"{REVOKED_KEY_PREFIX}:{key}", '1', ttl)
+            dropped += self._cache.pop(key, None) is not None
+        if principal:
+            await self._store().set(f"{REVOKED_PRINCIPAL_KEY_PREFIX}:{principal}", str(now),
+                                    settings.MCP_AUTH_REVOCATION_TTL)
+            keys = [api_key for api_key, grant in self.api_keys.items() if grant['principal'] == principal]
+            if keys:
+                await self._store().set_many({f"{REVOKED_KEY_PREFIX}:{fingerprint(api_key)}": '1' for api_key in keys},
+                                             settings.MCP_AUTH_REVOCATION_TTL)
+            held = [key for key, (cached, _) in self._cache.items() if cached.name == principal]
+            for key in held:
+                del self._cache[key]
+            dropped += len(held)
+        return dropped
+
+
+_authenticator: Optional[Authenticator] = None
+_authenticator_lock = threading.Lock()
+
+
+def get_authenticator() -> Authenticator:
+    """Process-wide authenticator, so every request shares its credential cache and quotas"""
+    global _authenticator
+    with _authenticator_lock:
+        if _authenticator is None:
+            _authenticator = Authenticator()
+        return _authenticator
@@ -13,12 +13,13 @@ class MCPClient:
         self.http_url = f"http://{settings.MCP_HOST}:{settings.MCP_PORT}/rpc"
         self.ws_url = f"ws://{settings.MCP_HOST}:{settings.MCP_PORT}/ws"
         self.use_websocket = use_websocket
+        self.headers = {'X-API-KEY': settings.API_KEY}
         self.ws_connection: Optional[websockets.WebSocketClientProtocol] = None
     
     async def connect_ws(self):
         """Establish WebSocket connection"""
         if not self.ws_connection:
-            self.ws_connection = await websockets.connect(self.ws_url)
+            self.ws_connection = await websockets.connect(self.ws_url, extra_headers=self.headers)
     
     async def request(self, method: str, params: Dict) -> Dict[str, Any]:
         """Make JSON-RPC request"""
@@ -32,7 +33,7 @@ class MCPClient:
     async def _request_http(self, request_data: str) -> Dict:
         """Make HTTP request"""
         async with aiohttp.ClientSession() as session:
-            async with session.post(self.http_url, json=json.loads(request_data)) as response:
+            async with session.post(self.http_url, json=json.loads(request_data), headers=self.headers) as response:
                 result = await response.json()
                 if 'error' in result:
                     raise Exception(f"RPC Error: {result['error']}")
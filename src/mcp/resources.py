@@ -0,0 +1,214 @@
+# mcp/resources.py
+"""MCP resources: read-only views addressed by URI, served with ETags and range reads.
+
+    data://{name}                                rows of data/{name}.csv (the columnar cache), for
+                                                 the exports in RESOURCE_DATA_EXPORTS
+    analytics://campaigns/{campaign_id}/kpis     rolling KPI analysis of a campaign
+    analytics://campaigns/{campaign_id}/attribution  multi-touch attribution report
+    analytics://segments/{segment_id}/members    member emails, highest lead score first
+
+Every resource renders to a list of JSON items. Each provider can report
+a resource's version without rendering it:
+- the export's size and mtime for data://
+- the KPI engine's ingest counter
+- change counters the attribution and segment writers keep in the
+  short-term store
+
+The ETag is a hash of the URI and that version. A read that presents the
+current ETag (``if_none_match``) gets a not-modified answer with no
+items. Anything else is served from the rendered copy kept in an
+in-process LRU, and is only re-rendered once the version moves.
+``offset``/``limit`` slice the cached items.
+"""
+from collections import OrderedDict
+from typing import Any, Dict, List, Optional, Tuple
+import asyncio
+import hashlib
+import os
+import re
+import threading
+import uuid
+from analytics.attribution import campaign_attribution, campaign_versions
+from analytics.columnar import load_table
+from analytics.kpi import get_kpi_engine
+from analytics.segments import get_segment_index
+from memory.backends import ShortTermBackend, get_short_term_backend
+from config import settings
+
+MIME_TYPE = 'application/json'
+_DATA_NAME = re.compile(r'^[\w-]+$')
+_CAMPAIGN_URI = re.compile(r'^analytics://campaigns/([^/]+)/(kpis|attribution)$')
+_SEGMENT_URI = re.compile(r'^analytics://segments/([^/]+)/members$')
+
+
+def etag(uri: str, version: str) -> str:
+    return hashlib.sha256(f"{uri}\n{version}".encode()).hexdigest()[:32]
+
+
+class DataResources:
+    """data://{name}: the allowed CSV exports in RESOURCE_DATA_DIR, one item per row"""
+    prefix = 'data://'
+
+    def __init__(self, directory: Optional[str] = None, exports: Optional[List[str]] = None):
+        self.directory = directory or settings.RESOURCE_DATA_DIR
+        self.exports = set(exports if exports is not None else settings.RESOURCE_DATA_EXPORTS)
+
+    def _path(self, uri: str) -> Optional[str]:
+        name = uri[len(self.prefix):]
+        if name not in self.exports or not _DATA_NAME.match(name):
+            return None
+        path = os.path.join(self.directory, f"{name}.csv")
+        return path if os.path.isfile(path) else None
+
+    async def list(self) -> List[Dict[str, str]]:
+        names = [name for name in sorted(self.exports) if self._path(f"{self.prefix}{name}")]
+        return [{'uri': f"{self.prefix}{name}", 'name': name, 'description': f"Rows of {name}.csv"}
+                for name in names]
+
+    async def version(self, uri: str) -> Optional[str]:
+        path = self._path(uri)
+        if path is None:
+            return None
+        stat = os.stat(path)
+        return f"{stat.st_size}:{stat.st_mtime_ns}"
+
+    async def render(self, uri: str) -> List[Any]:
+        path = self._path(uri)
+        if path is None:
+            raise ValueError(f"Unknown resource: {uri}")
+        # Building rows touches every column; keep it off the event loop
+        return await asyncio.to_thread(lambda: load_table(path).rows())
+
+
+class CampaignResources:
+    """analytics://campaigns/{id}/kpis and /attribution, one item each"""
+    prefix = 'analytics://campaigns/'
+
+    def __init__(self, store: ShortTermBackend = None, kpi_engine=None):
+        self.store = store
+        self.kpi_engine = kpi_engine
+        # KPI versions count ingests into this process's engine, so they only compare within it
+        self._engine_token = uuid.uuid4().hex[:8]
+
+    def _store(self) -> ShortTermBackend:
+        return self.store or get_short_term_backend()
+
+    def _engine(self):
+        return self.kpi_engine or get_kpi_engine()
+
+    async def list(self) -> List[Dict[str, str]]:
+        return [{'uri': f"{self.prefix}{campaign_id}/{view}", 'name': f"{campaign_id} {view}",
+                 'description': description}
+                for campaign_id in self._engine().campaign_ids
+                for view, description in (('kpis', 'Rolling KPI window, trends and percentiles'),
+                                          ('attribution', 'Multi-touch attribution by model and channel'))]
+
+    async def version(self, uri: str) -> Optional[str]:
+        match = _CAMPAIGN_URI.match(uri)
+        if match is None:
+            return None
+        campaign_id, view = match.groups()
+        engine = self._engine()
+        if view == 'kpis':
+            return f"{self._engine_token}:{engine.version}" if campaign_id in engine else None
+        version = (await campaign_versions(self._store(), [campaign_id]))[campaign_id]
+        return str(version) if version or campaign_id in engine else None
+
+    async def render(self, uri: str) -> List[Any]:
+        campaign_id, view = _CAMPAIGN_URI.match(uri).groups()
+        if view == 'kpis':
+            return [{'campaign_id': campaign_id, **self._engine().analysis(campaign_id)}]
+        return [await campaign_attribution(self._store(), campaign_id)]
+
+
+class SegmentResources:
+    """analytics://segments/{id}/members: one item (email) per member"""
+    prefix = 'analytics://segments/'
+
+    def __init__(self, index=None):
+        self.index = index
+
+    def _index(self):
+        return self.index or get_segment_index()
+
+    async def list(self) -> List[Dict[str, str]]:
+        return [{'uri': f"{self.prefix}{segment['segment_id']}/members", 'name': segment.get('name') or '',
+                 'description': 'Member emails, highest lead score first'}
+                for segment in self._index().engine.segments]
+
+    async def version(self, uri: str) -> Optional[str]:
+        match = _SEGMENT_URI.match(uri)
+        index = self._index()
+        if match is None or index.engine.get(match.group(1)) is None:
+            return None
+        return str((await index.versions([match.group(1)]))[match.group(1)])
+
+    async def render(self, uri: str) -> List[Any]:
+        index = self._index()
+        segment_id = _SEGMENT_URI.match(uri).group(1)
+        return await index.members(segment_id, 0, await index.count(segment_id))
+
+
+class ResourceRegistry:
+    """Routes resources/list and resources/read to providers, caching rendered resources by ETag"""
+
+    def __init__(self, providers: Optional[List[Any]] = None, cache_size: Optional[int] = None):
+        self.providers = providers if providers is not None else [
+            DataResources(), CampaignResources(), SegmentResources()]
+        self.cache_size = cache_size or settings.RESOURCE_CACHE_SIZE
+        self._cache: 'OrderedDict[str, Tuple[str, List[Any]]]' = OrderedDict()
+        self.stats = {'not_modified': 0, 'cached': 0, 'rendered': 0}
+
+    def _provider(self, uri: str):
+        for provider in self.providers:
+            if uri.startswith(provider.prefix):
+                return provider
+        raise ValueError(f"Unknown resource: {uri}")
+
+    async def list(self) -> List[Dict[str, str]]:
+        listed = await asyncio.gather(*(provider.list() for provider in self.providers))
+        return [{**entry, 'mimeType': MIME_TYPE} for entries in listed for entry in entries]
+
+    async def read(self, uri: str, if_none_match: Optional[str] = None, offset: int = 0,
+                   limit: Optional[int] = None) -> Dict[str, Any]:
+        """Items [offset, offset + limit) of a resource, or not_modified if if_none_match is current"""
+        provider = self._provider(uri)
+        version = await provider.version(uri)
+        if version is None:
+            raise ValueError(f"Unknown resource: {uri}")
+        tag = etag(uri, version)
+        if if_none_match == tag:
+            self.stats['not_modified'] += 1
+            return {'uri': uri, 'etag': tag, 'not_modified': True}
+
+        cached = self._cache.get(uri)
+        if cached is not None and cached[0] == tag:
+            self._cache.move_to_end(uri)
+            self.stats['cached'] += 1
+        else:
+            # Versioned before rendering: if the resource changes meanwhile, the copy is newer than
+            # its ETag, which only costs a client one extra read, never a stale one
+            cached = (tag, await provider.render(uri))
+            self._cache[uri] = cached
+            self._cache.move_to_end(uri)
+            while len(self._cache) > self.cache_size:
+                self._cache.popitem(last=False)
+            self.stats['rendered'] += 1
+        items = cached[1]
+        offset = max(int(offset), 0)
+        limit = min(int(limit), settings.RESOURCE_PAGE_SIZE) if limit is not None else settings.RESOURCE_PAGE_SIZE
+        return {'uri': uri, 'etag': tag, 'mimeType': MIME_TYPE, 'total': len(items), 'offset': offset,
+                'items': items[offset:offset + max(limit, 0)]}
+
+
+_registry: Optional[ResourceRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_resource_registry() -> ResourceRegistry:
+    """Process-wide registry, so every connection shares the rendered-resource cache"""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ResourceRegistry()
+        return _registry
@@ -1,12 +1,21 @@
 # mcp/server.py
-from fastapi import FastAPI, WebSocket, WebSocketDisconnect
+from fastapi import FastAPI, Request, WebSocket, WebSocketDisconnect
 from fastapi.responses import JSONResponse
 from typing import Dict, List
 import asyncio
 from communication.jsonrpc_handler import JSONRPCHandler
+from mcp.auth import AuthError, credential_from, get_authenticator
+from mcp.resources import get_resource_registry
 from database.connection import db_manager
+from memory.backends import get_short_term_backend
+from memory.triage_cache import invalidate_triage
+from scheduling.follow_ups import cancel_follow_ups
+from analytics.attribution import attribute_conversions
+from analytics.bandit import attributed_variants, record_conversions, record_outcomes
+from analytics.segments import get_segment_index
 from sqlalchemy import text
 from src.config import settings
+import time
 import uuid,json
 
 app = FastAPI(title="MCP Server - Model Context Protocol")
@@ -54,6 +63,24 @@ async def get_lead_data(params: Dict) -> Dict:
         return {"error": "Lead not found"}
    
 # After
+async def list_new_leads(params: Dict) -> Dict:
+    """Leads with an id above after_id, oldest first, for streaming consumers"""
+    async with db_manager.get_db_session() as session:
+        query = text("SELECT * FROM leads WHERE id > :after_id ORDER BY id LIMIT :limit")
+        result = await session.execute(query, {
+            'after_id': int(params.get('after_id', 0)),
+            'limit': min(int(params.get('limit', 100)), 1000)
+        })
+        return {"leads": [dict(row._mapping) for row in result]}
+
+def _converted(status) -> bool:
+    return (status or '').strip().lower() == 'converted'
+
+def _conversion(email: str, update: Dict) -> Dict:
+    """A conversion for attribution; the leads table has no campaign or value, so updates may carry them"""
+    return {'lead': email, 'at': time.time(), 'campaign_id': update.get('campaign_id'),
+            'value': update.get('conversion_value')}
+
 async def update_lead_status(params: Dict) -> Dict:
     """Update lead status"""
     lead_id = params.get('lead_id')
@@ -74,9 +101,128 @@ async def update_lead_status(params: Dict) -> Dict:
         })
         row = result.fetchone()
         if row:
-            return dict(row._mapping)
+            lead = dict(row._mapping)
+            await invalidate_triage(get_short_term_backend(), [lead['email']])
+            if _converted(lead['status']):
+                await cancel_follow_ups(get_short_term_backend(), [lead['email']])
+                await record_conversions(get_short_term_backend(), [lead['email']])
+                await attribute_conversions(get_short_term_backend(), [_conversion(lead['email'], params)])
+            return lead
         return {"error": "Lead not found"}
-    
+
+async def bulk_update_lead_status(params: Dict) -> Dict:
+    """Update many leads' status/category in one statement per key type"""
+    updates = params.get('updates', [])
+    by_id = [u for u in updates if u.get('lead_id') is not None]
+    # Leads from external files (e.g. leads.csv) are only known by email
+    by_email = [u for u in updates if u.get('lead_id') is None and u.get('email')]
+    updated = []
+
+    async with db_manager.get_db_session() as session:
+        if by_id:
+            result = await session.execute(text("""
+                UPDATE leads AS l
+                SET status = u.status, category = u.category, updated_at = NOW()
+                FROM unnest(CAST(:ids AS INTEGER[]), CAST(:statuses AS TEXT[]), CAST(:categories AS TEXT[]))
+                    AS u(id, status, category)
+                WHERE l.id = u.id
+                RETURNING l.id, l.email, l.status
+            """), {
+                'ids': [int(u['lead_id']) for u in by_id],
+                'statuses': [u.get('status') for u in by_id],
+                'categories': [u.get('category') for u in by_id]
+            })
+            updated.extend(result.fetchall())
+        if by_email:
+            result = await session.execute(text("""
+                UPDATE leads AS l
+                SET status = u.status, category = u.category, updated_at = NOW()
+                FROM unnest(CAST(:emails AS TEXT[]), CAST(:statuses AS TEXT[]), CAST(:categories AS TEXT[]))
+                    AS u(email, status, category)
+                WHERE l.email = u.email
+                RETURNING l.id, l.email, l.status
+            """), {
+                'emails': [u['email'] for u in by_email],
+                'statuses': [u.get('status') for u in by_email],
+                'categories': [u.get('category') for u in by_email]
+            })
+            updated.extend(result.fetchall())
+
+    # Cached triage decisions for these leads are stale now
+    await invalidate_triage(get_short_term_backend(), [row.email for row in updated])
+    # Converted leads get no more follow-ups, and their conversion is credited to the variant they were sent
+    converted = [row for row in updated if _converted(row.status)]
+    await cancel_follow_ups(get_short_term_backend(), [row.email for row in converted])
+    await record_conversions(get_short_term_backend(), [row.email for row in converted])
+    requested = {**{('id', int(u['lead_id'])): u for u in by_id}, **{('email', u['email']): u for u in by_email}}
+    await attribute_conversions(get_short_term_backend(), [
+        _conversion(row.email, requested.get(('id', row.id)) or requested.get(('email', row.email)) or {})
+        for row in converted
+    ])
+    return {"requested": len(updates), "updated": len(updated), "lead_ids": [row.id for row in updated]}
+
+
+async def record_variant_outcome(params: Dict) -> Dict:
+    """Count a click or conversion for an A/B variant, given directly or via the lead it was sent to"""
+    event = params.get('event')
+    metric = {'click': 'clicks', 'conversion': 'conversions'}.get(event)
+    if metric is None:
+        return {"error": f"Unknown event '{event}' (expected 'click' or 'conversion')"}
+    store = get_short_term_backend()
+    variant_id = params.get('variant_id')
+    if not variant_id and params.get('email'):
+        variant_id = (await attributed_variants(store, [params['email']])).get(params['email'])
+    if not variant_id:
+        return {"error": "No variant to credit"}
+    await record_outcomes(store, [(variant_id, metric)])
+    return {"variant_id": variant_id, "event": event, "status": "recorded"}
+
+
+async def list_segment_leads(params: Dict) -> Dict:
+    """Emails of the leads in a segment, highest lead score first, from the membership index"""
+    index = get_segment_index()
+    segment_id = params.get('segment_id')
+    segment = index.engine.get(segment_id)
+    if segment is None:
+        return {"error": f"Unknown segment '{segment_id}'"}
+    offset = max(int(params.get('offset', 0)), 0)
+    limit = min(int(params.get('limit', 100)), 1000)
+    members, total = await asyncio.gather(index.members(segment_id, offset, limit), index.count(segment_id))
+    return {"segment_id": segment_id, "name": segment.get('name'), "total": total, "offset": offset,
+            "leads": members}
+
+
+async def get_lead_segments(params: Dict) -> Dict:
+    """Segments the given leads belong to (params: email or emails)"""
+    emails = params.get('emails') or ([params['email']] if params.get('email') else [])
+    if not emails:
+        return {"error": "email or emails required"}
+    return {"segments": await get_segment_index().segments_of(emails)}
+
+
+async def revoke_credentials(params: Dict) -> Dict:
+    """Revoke an API key or token (params: credential), or everything a principal holds (params: principal)"""
+    if not params.get('credential') and not params.get('principal'):
+        return {"error": "credential or principal required"}
+    dropped = await get_authenticator().revoke(params.get('credential'), params.get('principal'))
+    return {"status": "revoked", "cached_entries_dropped": dropped}
+
+
+async def list_resources(params: Dict) -> Dict:
+    """URIs of the readable resources (data exports, campaign KPIs/attribution, segment members)"""
+    return {"resources": await get_resource_registry().list()}
+
+
+async def read_resource(params: Dict) -> Dict:
+    """A resource's items (params: uri, offset, limit), or not_modified when if_none_match is its current etag"""
+    if not params.get('uri'):
+        return {"error": "uri required"}
+    try:
+        return await get_resource_registry().read(params['uri'], params.get('if_none_match'),
+                                                  params.get('offset', 0), params.get('limit'))
+    except ValueError as e:
+        return {"error": str(e)}
+
 
 async def get_campaign_metrics(params: Dict) -> Dict:
     """Get campaign performance metrics"""
@@ -112,39 +258,90 @@ async def log_interaction(params: Dict) -> Dict:
         return {"interaction_id": row[0], "status": "logged"}
 
 async def agent_handoff(params: Dict) -> Dict:
-    """Handle agent handoff with context preservation"""
+    """Register an agent handoff; the context stays in the shared store and only the handle travels"""
     return {
-        "handoff_id": str(uuid.uuid4()),
+        "handoff_id": params.get('handoff_id') or str(uuid.uuid4()),
+        "ref": params.get('ref'),
         "from_agent": params.get('from_agent'),
         "to_agent": params.get('to_agent'),
-        "context": params.get('context'),
+        "fields": params.get('fields', []),
+        "summary": params.get('summary'),
+        "confidence": params.get('confidence'),
+        "timestamp": params.get('timestamp'),
         "status": "completed"
     }
 
 # Register all methods
 rpc_handler.register_method('get_lead_data', get_lead_data)
+rpc_handler.register_method('list_new_leads', list_new_leads)
 rpc_handler.register_method('update_lead_status', update_lead_status)
+rpc_handler.register_method('bulk_update_lead_status', bulk_update_lead_status)
+rpc_handler.register_method('record_variant_outcome', record_variant_outcome)
+rpc_handler.register_method('list_segment_leads', list_segment_leads)
+rpc_handler.register_method('get_lead_segments', get_lead_segments)
 rpc_handler.register_method('get_campaign_metrics', get_campaign_metrics)
 rpc_handler.register_method('log_interaction', log_interaction)
 rpc_handler.register_method('agent_handoff', agent_handoff)
+rpc_handler.register_method('resources/list', list_resources)
+rpc_handler.register_method('resources/read', read_resource)
+# Not in METHOD_SCOPES, so admin-only
+rpc_handler.register_method('revoke_credentials', revoke_credentials)
+
+
+def _rejected(error: AuthError, request_id) -> str:
+    return rpc_handler._create_error(error.code, str(error), request_id)
+
+def _request_fields(data: str):
+    """(method, id) of a raw request; (None, None) if it doesn't parse, which the handler reports"""
+    try:
+        request = json.loads(data)
+    except ValueError:
+        return None, None
+    return (request.get('method'), request.get('id')) if isinstance(request, dict) else (None, None)
 
 
 # HTTP Endpoint for JSON-RPC
 @app.post("/rpc")
-async def rpc_endpoint(request: dict):
-    """HTTP transport for JSON-RPC"""
-    import json
+async def rpc_endpoint(request: dict, http_request: Request):
+    """HTTP transport for JSON-RPC; every request carries its credentials (verified once, then cached)"""
+    auth = get_authenticator()
+    try:
+        principal = await auth.authenticate(credential_from(http_request.headers))
+        if request.get('method') is not None:
+            auth.authorize(principal, request.get('method'))
+    except AuthError as e:
+        return JSONResponse(status_code=e.status, content=json.loads(_rejected(e, request.get('id'))))
     response = await rpc_handler.handle_request(json.dumps(request))
     return JSONResponse(content=json.loads(response))
 
 # WebSocket Endpoint
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket transport for real-time communication"""
+    """WebSocket transport for real-time communication; credentials are checked at the handshake and on every message"""
+    auth = get_authenticator()
+    credential = credential_from(websocket.headers, websocket.query_params)
+    try:
+        await auth.authenticate(credential)
+    except AuthError as e:
+        await websocket.close(code=1008, reason=str(e))
+        return
     await manager.connect(websocket)
     try:
         while True:
             data = await websocket.receive_text()
+            method, request_id = _request_fields(data)
+            try:
+                # A cache hit unless the credential was revoked here, or its cache entry expired
+                principal = await auth.authenticate(credential)
+                if method is not None:
+                    auth.authorize(principal, method)
+            except AuthError as e:
+                await websocket.send_text(_rejected(e, request_id))
+                if e.status == 401:
+                    await websocket.close(code=1008, reason=str(e))
+                    manager.disconnect(websocket)
+                    return
+                continue
             response = await rpc_handler.handle_request(data)
             await websocket.send_text(response)
     except WebSocketDisconnect:
@@ -0,0 +1,62 @@
+# memory/backends/__init__.py
+from typing import Dict
+import threading
+from config import settings
+from memory.backends.base import GraphBackend, LongTermBackend, ShortTermBackend
+from memory.backends.graph import InMemoryGraphBackend, Neo4jGraphBackend
+from memory.backends.kv import InMemoryTTLStore, RedisShortTermBackend
+from memory.backends.sql import PostgresLongTermBackend, SQLiteLongTermBackend
+
+# Embedded stores live in this process, so every agent must share one
+# instance per tier to see the same data (as they would on a server)
+_embedded: Dict[str, object] = {}
+_embedded_lock = threading.Lock()
+
+
+def _choice(tier_setting: str, embedded_name: str) -> str:
+    if (settings.MEMORY_BACKEND or '').lower() == 'embedded':
+        return embedded_name
+    return tier_setting.lower()
+
+
+def _shared(name: str, factory):
+    with _embedded_lock:
+        if name not in _embedded:
+            _embedded[name] = factory()
+        return _embedded[name]
+
+
+def get_short_term_backend() -> ShortTermBackend:
+    """Configured STM backend: Redis, or the shared in-memory TTL store"""
+    choice = _choice(settings.STM_BACKEND, 'memory')
+    if choice == 'redis':
+        return RedisShortTermBackend()
+    if choice == 'memory':
+        return _shared('stm', InMemoryTTLStore)
+    raise ValueError(f"Unknown STM_BACKEND: {choice} (expected 'redis' or 'memory')")
+
+
+def get_long_term_backend() -> LongTermBackend:
+    """Configured LTM backend: PostgreSQL, or the shared SQLite database"""
+    choice = _choice(settings.LTM_BACKEND, 'sqlite')
+    if choice == 'postgres':
+        return PostgresLongTermBackend()
+    if choice == 'sqlite':
+        return _shared('ltm', lambda: SQLiteLongTermBackend(settings.SQLITE_PATH))
+    raise ValueError(f"Unknown LTM_BACKEND: {choice} (expected 'postgres' or 'sqlite')")
+
+
+def get_graph_backend() -> GraphBackend:
+    """Configured episodic/semantic backend: Neo4j, or the shared in-memory graph"""
+    choice = _choice(settings.GRAPH_BACKEND, 'memory')
+    if choice == 'neo4j':
+        return Neo4jGraphBackend()
+    if choice == 'memory':
+        return _shared('graph', InMemoryGraphBackend)
+    raise ValueError(f"Unknown GRAPH_BACKEND: {choice} (expected 'neo4j' or 'memory')")
+
+
+def reset_embedded_backends():
+    """Drop the shared embedded stores (fresh state for tests and benchmarks)"""
+    with _embedded_lock:
+        _embedded.clear()
@@ -0,0 +1,175 @@
+# memory/backends/base.py
+from abc import ABC, abstractmethod
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+from datetime import datetime
+
+
+def server_connections():
+    """The shared DatabaseManager, imported lazily so embedded backends never open server clients"""
+    from database import connection
+    return connection.db_manager
+
+class ShortTermBackend(ABC):
+    """Key/value + sorted-set store with per-key TTL (the subset of Redis STM uses)"""
+
+    @abstractmethod
+    async def set(self, key: str, value: str, ttl: int):
+        """Store a string value that expires after ``ttl`` seconds"""
+
+    @abstractmethod
+    async def mget(self, keys: Sequence[str]) -> List[Optional[str]]:
+        """Fetch several values at once; missing or expired keys come back as None"""
+
+    @abstractmethod
+    async def delete(self, *keys: str):
+        """Remove keys of any type"""
+
+    async def set_many(self, mapping: Dict[str, str], ttl: int):
+        """Store several expiring values at once"""
+        for key, value in mapping.items():
+            await self.set(key, value, ttl)
+
+    @abstractmethod
+    async def zadd(self, key: str, mapping: Dict[str, float]):
+        """Add or re-score sorted-set members"""
+
+    @abstractmethod
+    async def zrange(self, key: str, start: int, stop: int, desc: bool = False) -> List[str]:
+        """Members by rank, inclusive of ``stop`` (Redis semantics, negative indexes allowed)"""
+
+    @abstractmethod
+    async def zcard(self, key: str) -> int:
+        """Number of members in a sorted set"""
+
+    @abstractmethod
+    async def zrem(self, key: str, *members: str):
+        """Remove sorted-set members"""
+
+    @abstractmethod
+    async def zrangebyscore(self, key: str, min_score: float, max_score: float,
+                            limit: int = None) -> List[Tuple[str, float]]:
+        """(member, score) pairs with min_score <= score <= max_score, lowest score first"""
+
+    @abstractmethod
+    async def zclaim(self, key: str, members: Sequence[str]) -> List[str]:
+        """Remove members, returning only those this call removed.
+
+        Each removal is atomic, so when several workers race for the same
+        members every member is claimed by exactly one of them.
+        """
+
+    @abstractmethod
+    async def zmove(self, source: str, destination: str, members: Sequence[str], score: float) -> List[str]:
+        """Claim members from ``source`` and add them to ``destination`` at ``score`` in one atomic step.
+
+        Returns the members this call moved; a member is never out of both
+        sets, so a worker dying between the two can't lose it.
+        """
+
+    @abstractmethod
+    async def hset(self, key: str, mapping: Dict[str, str], ttl: int = None):
+        """Set hash fields, leaving the others untouched; ``ttl`` (re)starts the key's expiry"""
+
+    @abstractmethod
+    async def hmget(self, key: str, fields: Sequence[str], ttl: int = None) -> List[Optional[str]]:
+        """Read selected hash fields; ``ttl`` slides the key's expiry in the same round-trip"""
+
+    @abstractmethod
+    async def hgetall(self, key: str, ttl: int = None) -> Dict[str, str]:
+        """Read a whole hash ({} if missing or expired)"""
+
+    @abstractmethod
+    async def hgetall_many(self, keys: Sequence[str]) -> List[Dict[str, str]]:
+        """Read many hashes in one round-trip, without touching their expiry"""
+
+    @abstractmethod
+    async def hincrby(self, key: str, increments: Dict[str, int]):
+        """Atomically add integer amounts to hash fields (missing fields start at 0)"""
+
+    @abstractmethod
+    async def hdel(self, key: str, *fields: str):
+        """Remove hash fields"""
+
+    @abstractmethod
+    async def expire(self, key: str, ttl: int):
+        """Restart a key's expiry"""
+
+
+class LongTermBackend(ABC):
+    """Durable per-entity memory rows plus their materialized profiles"""
+
+    @abstractmethod
+    async def insert(self, rows: List[Dict]):
+        """Insert memory rows and upsert each row's profile fields.
+
+        Each row has entity_id, entity_type, memory_type, data (dict),
+        importance and profile (output of extract_profile_fields).
+        """
+
+    @abstractmethod
+    async def query(self, entity_id: str, entity_type: Optional[str], columns: Optional[Sequence[str]],
+                    limit: int = 50) -> List[Dict]:
+        """Rows for an entity ranked by effective importance, then recency"""
+
+    @abstractmethod
+    async def count_many(self, entity_ids: Sequence[str], entity_type: Optional[str]) -> Dict[str, int]:
+        """Number of rows per entity for a whole batch in one query (entities with none are omitted)"""
+
+    @abstractmethod
+    async def get_profile(self, entity_id: str, entity_type: str) -> Optional[Dict]:
+        """Materialized profile for one entity"""
+
+    @abstractmethod
+    async def record_access(self, hits: Dict[int, int]):
+        """Bump accessed_at and add ``hits[id]`` to each row's access_count"""
+
+    @abstractmethod
+    async def fetch_compaction_batch(self, cutoff: datetime, after_id: int, limit: int) -> List[Dict]:
+        """Rows created before ``cutoff`` with id > ``after_id``, in id order"""
+
+    @abstractmethod
+    async def apply_compaction(self, rescored: List[Dict], archived_ids: List[int], summaries: List[Dict]):
+        """Update effective importance, archive and delete merged rows, insert summaries"""
+
+
+class GraphBackend(ABC):
+    """Episode store and semantic knowledge graph"""
+
+    @abstractmethod
+    def create_episode(self, episode: Dict, promoted: Dict):
+        """Store an episode; ``promoted`` holds typed, filterable metadata properties"""
+
+    def create_episodes(self, rows: List[Dict]):
+        """Store many episodes; each row holds ``episode`` and ``promoted`` dicts"""
+        for row in rows:
+            self.create_episode(row['episode'], row['promoted'])
+
+    @abstractmethod
+    def count_episodes(self, agent_id: str, entity_ids: Sequence[str]) -> Dict[str, int]:
+        """Number of an agent's episodes per entity (entities with none are omitted)"""
+
+    @abstractmethod
+    def get_episodes(self, ids: Sequence[str]) -> List[Dict]:
+        """Fetch episodes by id (order not guaranteed)"""
+
+    @abstractmethod
+    def query_episodes(self, agent_id: str, entity_id: str = None, outcome: str = None,
+                       since_days: int = None, min_importance: float = None, limit: int = 50) -> List[Dict]:
+        """Filtered episodes for an agent, newest first"""
+
+    @abstractmethod
+    def episode_embeddings(self, agent_id: str) -> Iterable[Dict]:
+        """id/problem/solution/embedding for every episode of an agent"""
+
+    @abstractmethod
+    def merge_triples(self, rows: List[Dict]):
+        """Upsert (entity)-[relationship]->(target) edges from SemanticMemory write rows"""
+
+    @abstractmethod
+    def find_related(self, entity: str, relationship_type: str = None, depth: int = 2,
+                     limit: int = 20) -> List[Dict]:
+        """Paths of up to ``depth`` hops from ``entity``"""
+
+    @abstractmethod
+    def all_triples(self) -> Iterable[Tuple[str, str, str, float, int]]:
+        """(subject, relationship, object, weight, count) for every edge"""
@@ -0,0 +1,243 @@
+# memory/backends/graph.py
+from typing import Dict, Iterable, List, Sequence, Tuple
+from collections import defaultdict
+from datetime import datetime, timedelta
+from memory.backends.base import GraphBackend, server_connections
+import threading
+
+# Edges are identified by (subject, type, object) only; everything else is
+# updated in place so repeated writes never fan out into duplicate edges.
+# Caller properties land as typed prop_* fields so they can be filtered on.
+MERGE_TRIPLES = """
+UNWIND $rows AS row
+MERGE (a:Entity {name: row.entity})
+MERGE (b:Entity {name: row.target})
+MERGE (a)-[r:RELATES {type: row.relationship}]->(b)
+ON CREATE SET r.created_at = datetime()
+WITH r, row, coalesce(r.count, 0) AS seen
+SET r.weight = (coalesce(r.weight, 0.0) * seen + row.weight_sum) / (seen + row.count),
+    r.count = seen + row.count,
+    r.updated_at = datetime()
+SET r += row.properties
+"""
+
+
+class Neo4jGraphBackend(GraphBackend):
+    """Episode nodes and RELATES edges in Neo4j"""
+
+    def create_episode(self, episode: Dict, promoted: Dict):
+        with server_connections().get_neo4j_session() as session:
+            session.run("""
+            CREATE (e:Episode {
+                id: $id,
+                agent_id: $agent_id,
+                problem: $problem,
+                solution: $solution,
+                outcome: $outcome,
+                metadata: $metadata,
+                embedding: $embedding,
+                timestamp: datetime()
+            })
+            SET e += $promoted
+            RETURN e
+            """, promoted=promoted, **episode)
+
+    def create_episodes(self, rows: List[Dict]):
+        with server_connections().get_neo4j_session() as session:
+            session.run("""
+            UNWIND $rows AS row
+            CREATE (e:Episode)
+            SET e = row.episode, e.timestamp = datetime()
+            SET e += row.promoted
+            """, rows=rows)
+
+    def count_episodes(self, agent_id: str, entity_ids: Sequence[str]) -> Dict[str, int]:
+        with server_connections().get_neo4j_session() as session:
+            result = session.run("""
+            MATCH (e:Episode {agent_id: $agent_id})
+            WHERE e.entity_id IN $entity_ids
+            RETURN e.entity_id AS entity_id, count(e) AS n
+            """, agent_id=agent_id, entity_ids=list(entity_ids))
+            return {record['entity_id']: record['n'] for record in result}
+
+    def get_episodes(self, ids: Sequence[str]) -> List[Dict]:
+        with server_connections().get_neo4j_session() as session:
+            result = session.run("""
+            MATCH (e:Episode)
+            WHERE e.id IN $ids
+            RETURN e
+            """, ids=list(ids))
+            return [dict(record['e']) for record in result]
+
+    def query_episodes(self, agent_id: str, entity_id: str = None, outcome: str = None,
+                       since_days: int = None, min_importance: float = None, limit: int = 50) -> List[Dict]:
+        conditions = ["e.agent_id = $agent_id"]
+        params = {'agent_id': agent_id, 'limit': limit}
+        if entity_id is not None:
+            conditions.append("e.entity_id = $entity_id")
+            params['entity_id'] = entity_id
+        if outcome is not None:
+            conditions.append("e.outcome = $outcome")
+            params['outcome'] = outcome
+        if since_days is not None:
+            conditions.append("e.timestamp >= datetime() - duration({days: $since_days})")
+            params['since_days'] = since_days
+        if min_importance is not None:
+            conditions.append("e.importance >= $min_importance")
+            params['min_importance'] = min_importance
+
+        with server_connections().get_neo4j_session() as session:
+            result = session.run(f"""
+            MATCH (e:Episode)
+            WHERE {' AND '.join(conditions)}
+            RETURN e
+            ORDER BY e.timestamp DESC
+            LIMIT $limit
+            """, **params)
+            return [dict(record['e']) for record in result]
+
+    def episode_embeddings(self, agent_id: str) -> Iterable[Dict]:
+        with server_connections().get_neo4j_session() as session:
+            result = session.run("""
+                MATCH (e:Episode {agent_id: $agent_id})
+                RETURN e.id AS id, e.problem AS problem, e.solution AS solution, e.embedding AS embedding
+            """, agent_id=agent_id)
+            return [dict(record) for record in result]
+
+    def merge_triples(self, rows: List[Dict]):
+        with server_connections().get_neo4j_session() as session:
+            session.run(MERGE_TRIPLES, rows=rows)
+
+    def find_related(self, entity: str, relationship_type: str = None, depth: int = 2,
+                     limit: int = 20) -> List[Dict]:
+        with server_connections().get_neo4j_session() as session:
+            if relationship_type:
+                query = f"""
+                    MATCH path = (e:Entity {{name: $entity}})-[r*1..{depth}]->(related)
+                    WHERE ALL(rel in r WHERE rel.type = $rel_type)
+                    RETURN related, r
+                    LIMIT $limit
+                    """
+                result = session.run(query, entity=entity, rel_type=relationship_type, limit=limit)
+            else:
+                query = f"""
+                MATCH path = (e:Entity {{name: $entity}})-[r:RELATES*1..{depth}]->(related)
+                RETURN related, r
+                LIMIT $limit
+                """
+                result = session.run(query, entity=entity, limit=limit)
+
+            return [dict(record) for record in result]
+
+    def all_triples(self) -> Iterable[Tuple[str, str, str, float, int]]:
+        with server_connections().get_neo4j_session() as session:
+            result = session.run("""
+                MATCH (a:Entity)-[r:RELATES]->(b:Entity)
+                RETURN a.name AS subject, r.type AS type, b.name AS object,
+                       coalesce(r.weight, 1.0) AS weight, coalesce(r.count, 1) AS count
+            """)
+            return [(record['subject'], record['type'], record['object'], record['weight'], record['count'])
+                    for record in result]
+
+
+class InMemoryGraphBackend(GraphBackend):
+    """Embedded graph: episodes and edges held in dicts, traversed in-process"""
+
+    def __init__(self):
+        self._episodes: Dict[str, Dict] = {}
+        self._by_agent: Dict[str, List[str]] = defaultdict(list)
+        # subject -> (type, object) -> edge properties
+        self._edges: Dict[str, Dict[Tuple[str, str], Dict]] = defaultdict(dict)
+        self._lock = threading.Lock()
+
+    def create_episode(self, episode: Dict, promoted: Dict):
+        node = {**episode, 'timestamp': datetime.now(), **promoted}
+        with self._lock:
+            self._episodes[node['id']] = node
+            self._by_agent[node['agent_id']].append(node['id'])
+
+    def count_episodes(self, agent_id: str, entity_ids: Sequence[str]) -> Dict[str, int]:
+        wanted = set(entity_ids)
+        counts: Dict[str, int] = defaultdict(int)
+        with self._lock:
+            for episode_id in self._by_agent.get(agent_id, []):
+                entity_id = self._episodes[episode_id].get('entity_id')
+                if entity_id in wanted:
+                    counts[entity_id] += 1
+        return dict(counts)
+
+    def get_episodes(self, ids: Sequence[str]) -> List[Dict]:
+        with self._lock:
+            return [dict(self._episodes[i]) for i in ids if i in self._episodes]
+
+    def query_episodes(self, agent_id: str, entity_id: str = None, outcome: str = None,
+                       since_days: int = None, min_importance: float = None, limit: int = 50) -> List[Dict]:
+        since = datetime.now() - timedelta(days=since_days) if since_days is not None else None
+        with self._lock:
+            # Episodes are appended in creation order, so walk backwards for newest first
+            matches = []
+            for episode_id in reversed(self._by_agent.get(agent_id, [])):
+                node = self._episodes[episode_id]
+                if since is not None and node['timestamp'] < since:
+                    break
+                if entity_id is not None and node.get('entity_id') != entity_id:
+                    continue
+                if outcome is not None and node.get('outcome') != outcome:
+                    continue
+                if min_importance is not None and (node.get('importance') is None or
+                                                   node['importance'] < min_importance):
+                    continue
+                matches.append(dict(node))
+                if len(matches) >= limit:
+                    break
+            return matches
+
+    def episode_embeddings(self, agent_id: str) -> Iterable[Dict]:
+        with self._lock:
+            return [{key: self._episodes[i].get(key) for key in ('id', 'problem', 'solution', 'embedding')}
+                    for i in self._by_agent.get(agent_id, [])]
+
+    def merge_triples(self, rows: List[Dict]):
+        now = datetime.now()
+        with self._lock:
+            for row in rows:
+                edges = self._edges[row['entity']]
+                self._edges.setdefault(row['target'], {})
+                key = (row['relationship'], row['target'])
+                edge = edges.get(key)
+                if edge is None:
+                    edge = edges[key] = {'type': row['relationship'], 'weight': 0.0, 'count': 0, 'created_at': now}
+                seen = edge['count']
+                edge['weight'] = (edge['weight'] * seen + row['weight_sum']) / (seen + row['count'])
+                edge['count'] = seen + row['count']
+                edge['updated_at'] = now
+                edge.update(row['properties'])
+
+    def find_related(self, entity: str, relationship_type: str = None, depth: int = 2,
+                     limit: int = 20) -> List[Dict]:
+        """Paths of 1..depth hops, shortest first, never reusing an edge within a path"""
+        results = []
+        with self._lock:
+            if entity not in self._edges:
+                return results
+            frontier = [(entity, [], frozenset())]
+            for _ in range(depth):
+                next_frontier = []
+                for node, path, used in frontier:
+                    for (rel_type, target), edge in self._edges.get(node, {}).items():
+                        key = (node, rel_type, target)
+                        if key in used or (relationship_type and rel_type != relationship_type):
+                            continue
+                        hop = path + [dict(edge)]
+                        results.append({'related': {'name': target}, 'r': hop})
+                        if len(results) >= limit:
+                            return results
+                        next_frontier.append((target, hop, used | {key}))
+                frontier = next_frontier
+        return results
+
+    def all_triples(self) -> Iterable[Tuple[str, str, str, float, int]]:
+        with self._lock:
+            return [(subject, rel_type, target, edge['weight'], edge['count'])
+                    for subject, edges in self._edges.items()
+                    for (rel_type, target), edge in edges.items()]
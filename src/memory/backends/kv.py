@@ -0,0 +1,282 @@
+# memory/backends/kv.py
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+from memory.backends.base import ShortTermBackend, server_connections
+import heapq
+import threading
+import time
+
+# Expired keys are dropped on read; a full sweep runs every N writes so
+# keys nobody reads again don't accumulate
+SWEEP_EVERY = 1000
+
+# KEYS = source, destination; ARGV = score, members...
+ZMOVE_SCRIPT = """
+local moved = {}
+for i = 2, #ARGV do
+    if redis.call('ZREM', KEYS[1], ARGV[i]) == 1 then
+        redis.call('ZADD', KEYS[2], ARGV[1], ARGV[i])
+        moved[#moved + 1] = ARGV[i]
+    end
+end
+return moved
+"""
+
+
+class RedisShortTermBackend(ShortTermBackend):
+    """Short-term store on the shared Redis client"""
+
+    async def _redis(self):
+        return await server_connections().get_redis()
+
+    async def set(self, key: str, value: str, ttl: int):
+        await (await self._redis()).setex(key, ttl, value)
+
+    async def mget(self, keys: Sequence[str]) -> List[Optional[str]]:
+        return await (await self._redis()).mget(keys)
+
+    async def set_many(self, mapping: Dict[str, str], ttl: int):
+        async with (await self._redis()).pipeline(transaction=False) as pipe:
+            for key, value in mapping.items():
+                pipe.setex(key, ttl, value)
+            await pipe.execute()
+
+    async def delete(self, *keys: str):
+        await (await self._redis()).delete(*keys)
+
+    async def zadd(self, key: str, mapping: Dict[str, float]):
+        await (await self._redis()).zadd(key, mapping)
+
+    async def zrange(self, key: str, start: int, stop: int, desc: bool = False) -> List[str]:
+        redis = await self._redis()
+        return await (redis.zrevrange if desc else redis.zrange)(key, start, stop)
+
+    async def zcard(self, key: str) -> int:
+        return await (await self._redis()).zcard(key)
+
+    async def zrem(self, key: str, *members: str):
+        await (await self._redis()).zrem(key, *members)
+
+    async def zrangebyscore(self, key: str, min_score: float, max_score: float,
+                            limit: int = None) -> List[Tuple[str, float]]:
+        bounds = ['-inf' if score == float('-inf') else '+inf' if score == float('inf') else score
+                  for score in (min_score, max_score)]
+        page = {'start': 0, 'num': limit} if limit else {}
+        return await (await self._redis()).zrangebyscore(key, *bounds, withscores=True, **page)
+
+    async def zclaim(self, key: str, members: Sequence[str]) -> List[str]:
+        if not members:
+            return []
+        async with (await self._redis()).pipeline(transaction=False) as pipe:
+            for member in members:
+                pipe.zrem(key, member)
+            removed = await pipe.execute()
+        return [member for member, count in zip(members, removed) if count]
+
+    async def zmove(self, source: str, destination: str, members: Sequence[str], score: float) -> List[str]:
+        if not members:
+            return []
+        # One Lua script, so the move is atomic on the server
+        return await (await self._redis()).eval(ZMOVE_SCRIPT, 2, source, destination, repr(float(score)), *members)
+
+    async def hset(self, key: str, mapping: Dict[str, str], ttl: int = None):
+        if not mapping:
+            return
+        async with (await self._redis()).pipeline(transaction=True) as pipe:
+            pipe.hset(key, mapping=mapping)
+            if ttl:
+                pipe.expire(key, ttl)
+            await pipe.execute()
+
+    async def hmget(self, key: str, fields: Sequence[str], ttl: int = None) -> List[Optional[str]]:
+        async with (await self._redis()).pipeline(transaction=False) as pipe:
+            pipe.hmget(key, list(fields))
+            if ttl:
+                pipe.expire(key, ttl)
+            return (await pipe.execute())[0]
+
+    async def hgetall(self, key: str, ttl: int = None) -> Dict[str, str]:
+        async with (await self._redis()).pipeline(transaction=False) as pipe:
+            pipe.hgetall(key)
+            if ttl:
+                pipe.expire(key, ttl)
+            return (await pipe.execute())[0]
+
+    async def hgetall_many(self, keys: Sequence[str]) -> List[Dict[str, str]]:
+        async with (await self._redis()).pipeline(transaction=False) as pipe:
+            for key in keys:
+                pipe.hgetall(key)
+            return await pipe.execute()
+
+    async def hincrby(self, key: str, increments: Dict[str, int]):
+        if not increments:
+            return
+        async with (await self._redis()).pipeline(transaction=True) as pipe:
+            for field, amount in increments.items():
+                pipe.hincrby(key, field, int(amount))
+            await pipe.execute()
+
+    async def hdel(self, key: str, *fields: str):
+        await (await self._redis()).hdel(key, *fields)
+
+    async def expire(self, key: str, ttl: int):
+        await (await self._redis()).expire(key, ttl)
+
+
+class InMemoryTTLStore(ShortTermBackend):
+    """Embedded short-term store: dicts with per-key expiry, Redis-compatible ordering"""
+
+    def __init__(self, clock: Callable[[], float] = time.monotonic):
+        self._clock = clock
+        self._values: Dict[str, Tuple[Any, Optional[float]]] = {}
+        self._zsets: Dict[str, Dict[str, float]] = {}
+        self._lock = threading.Lock()
+        self._writes = 0
+
+    def _get(self, key: str):
+        entry = self._values.get(key)
+        if entry is None:
+            return None
+        value, expires_at = entry
+        if expires_at is not None and expires_at <= self._clock():
+            del self._values[key]
+            return None
+        return value
+
+    def _sweep(self):
+        now = self._clock()
+        expired = [key for key, (_, expires_at) in self._values.items()
+                   if expires_at is not None and expires_at <= now]
+        for key in expired:
+            del self._values[key]
+
+    def _wrote(self):
+        self._writes += 1
+        if self._writes % SWEEP_EVERY == 0:
+            self._sweep()
+
+    async def set(self, key: str, value: str, ttl: int):
+        with self._lock:
+            self._values[key] = (value, self._clock() + ttl if ttl else None)
+            self._wrote()
+
+    async def mget(self, keys: Sequence[str]) -> List[Optional[str]]:
+        with self._lock:
+            return [self._get(key) for key in keys]
+
+    async def delete(self, *keys: str):
+        with self._lock:
+            for key in keys:
+                self._values.pop(key, None)
+                self._zsets.pop(key, None)
+
+    async def zadd(self, key: str, mapping: Dict[str, float]):
+        with self._lock:
+            self._zsets.setdefault(key, {}).update(mapping)
+            self._wrote()
+
+    async def zrange(self, key: str, start: int, stop: int, desc: bool = False) -> List[str]:
+        with self._lock:
+            members = sorted(self._zsets.get(key, {}).items(), key=lambda m: (m[1], m[0]), reverse=desc)
+        size = len(members)
+        start = max(start + size if start < 0 else start, 0)
+        stop = stop + size if stop < 0 else stop
+        return [member for member, _ in members[start:stop + 1]]
+
+    async def zcard(self, key: str) -> int:
+        with self._lock:
+            return len(self._zsets.get(key, {}))
+
+    async def zrem(self, key: str, *members: str):
+        with self._lock:
+            zset = self._zsets.get(key)
+            if zset is None:
+                return
+            for member in members:
+                zset.pop(member, None)
+            if not zset:
+                del self._zsets[key]
+
+    async def zrangebyscore(self, key: str, min_score: float, max_score: float,
+                            limit: int = None) -> List[Tuple[str, float]]:
+        # Linear scan: fine for the embedded store, Redis keeps the set ordered
+        with self._lock:
+            matches = [(member, score) for member, score in self._zsets.get(key, {}).items()
+                       if min_score <= score <= max_score]
+        order = lambda m: (m[1], m[0])
+        return heapq.nsmallest(limit, matches, key=order) if limit else sorted(matches, key=order)
+
+    async def zclaim(self, key: str, members: Sequence[str]) -> List[str]:
+        with self._lock:
+            zset = self._zsets.get(key, {})
+            claimed = [member for member in members if zset.pop(member, None) is not None]
+            if key in self._zsets and not zset:
+                del self._zsets[key]
+            return claimed
+
+    async def zmove(self, source: str, destination: str, members: Sequence[str], score: float) -> List[str]:
+        with self._lock:
+            zset = self._zsets.get(source, {})
+            moved = [member for member in members if zset.pop(member, None) is not None]
+            if source in self._zsets and not zset:
+                del self._zsets[source]
+            if moved:
+                self._zsets.setdefault(destination, {}).update(dict.fromkeys(moved, score))
+                self._wrote()
+            return moved
+
+    def _hash(self, key: str, ttl: int = None, create: bool = False) -> Optional[Dict[str, str]]:
+        """The live hash at ``key``, optionally created and/or with its expiry slid forward"""
+        fields = self._get(key)
+        if fields is None:
+            if not create:
+                return None
+            fields = {}
+            self._values[key] = (fields, None)
+        if ttl:
+            self._values[key] = (fields, self._clock() + ttl)
+        return fields
+
+    async def hset(self, key: str, mapping: Dict[str, str], ttl: int = None):
+        if not mapping:
+            return
+        with self._lock:
+            self._hash(key, ttl, create=True).update(mapping)
+            self._wrote()
+
+    async def hmget(self, key: str, fields: Sequence[str], ttl: int = None) -> List[Optional[str]]:
+        with self._lock:
+            values = self._hash(key, ttl) or {}
+            return [values.get(field) for field in fields]
+
+    async def hgetall(self, key: str, ttl: int = None) -> Dict[str, str]:
+        with self._lock:
+            return dict(self._hash(key, ttl) or {})
+
+    async def hgetall_many(self, keys: Sequence[str]) -> List[Dict[str, str]]:
+        with self._lock:
+            return [dict(self._hash(key) or {}) for key in keys]
+
+    async def hincrby(self, key: str, increments: Dict[str, int]):
+        if not increments:
+            return
+        with self._lock:
+            values = self._hash(key, create=True)
+            for field, amount in increments.items():
+                values[field] = str(int(values.get(field, 0)) + int(amount))
+            self._wrote()
+
+    async def hdel(self, key: str, *fields: str):
+        with self._lock:
+            values = self._hash(key)
+            if values is None:
+                return
+            for field in fields:
+                values.pop(field, None)
+            if not values:
+                del self._values[key]
+
+    async def expire(self, key: str, ttl: int):
+        with self._lock:
+            value = self._get(key)
+            if value is not None:
+                self._values[key] = (value, self._clock() + ttl)
@@ -0,0 +1,318 @@
+# memory/backends/sql.py
+from typing import Dict, List, Optional, Sequence
+from datetime import datetime
+from sqlalchemy import text
+from memory.backends.base import LongTermBackend, server_connections
+import json
+import sqlite3
+import threading
+
+PROFILE_UPSERT = text("""
+    INSERT INTO entity_profiles
+    (entity_id, entity_type, channel, time_preference, content_type, interests, interaction_count, updated_at)
+    VALUES (:entity_id, :entity_type, :channel, :time_preference, :content_type, :interests, 1, NOW())
+    ON CONFLICT (entity_id, entity_type) DO UPDATE SET
+        channel = COALESCE(EXCLUDED.channel, entity_profiles.channel),
+        time_preference = COALESCE(EXCLUDED.time_preference, entity_profiles.time_preference),
+        content_type = COALESCE(EXCLUDED.content_type, entity_profiles.content_type),
+        interests = ARRAY(
+            SELECT DISTINCT unnest(entity_profiles.interests || EXCLUDED.interests)
+        ),
+        interaction_count = entity_profiles.interaction_count + 1,
+        updated_at = NOW()
+""")
+
+INSERT_MEMORY = text("""
+    INSERT INTO long_term_memory
+    (entity_id, entity_type, memory_type, data, importance_score, effective_importance, created_at, accessed_at)
+    VALUES (:entity_id, :entity_type, :memory_type, :data, :importance, :importance, NOW(), NOW())
+""")
+
+PROFILE_COLUMNS = ('channel', 'time_preference', 'content_type', 'interests', 'interaction_count', 'updated_at')
+
+
+def _memory_params(row: Dict) -> Dict:
+    params = {key: row[key] for key in ('entity_id', 'entity_type', 'memory_type', 'importance')}
+    params['data'] = json.dumps(row['data'])
+    return params
+
+
+def _profile_params(row: Dict) -> Dict:
+    return {'entity_id': row['entity_id'], 'entity_type': row['entity_type'], **row['profile']}
+
+
+class PostgresLongTermBackend(LongTermBackend):
+    """long_term_memory / entity_profiles tables in PostgreSQL"""
+
+    async def insert(self, rows: List[Dict]):
+        if not rows:
+            return
+        async with server_connections().get_db_session() as session:
+            await session.execute(INSERT_MEMORY, [_memory_params(row) for row in rows])
+            # Keep the materialized profile in step with the raw history
+            await session.execute(PROFILE_UPSERT, [_profile_params(row) for row in rows])
+
+    async def query(self, entity_id: str, entity_type: Optional[str], columns: Optional[Sequence[str]],
+                    limit: int = 50) -> List[Dict]:
+        projection = ", ".join(columns) if columns else "*"
+        where = "entity_id = :entity_id" + (" AND entity_type = :entity_type" if entity_type else "")
+        async with server_connections().get_db_session() as session:
+            result = await session.execute(text(f"""
+                SELECT {projection} FROM long_term_memory
+                WHERE {where}
+                ORDER BY effective_importance DESC, created_at DESC
+                LIMIT :limit
+            """), {'entity_id': entity_id, 'entity_type': entity_type, 'limit': limit})
+            return [dict(row._mapping) for row in result]
+
+    async def count_many(self, entity_ids: Sequence[str], entity_type: Optional[str]) -> Dict[str, int]:
+        if not entity_ids:
+            return {}
+        where = "entity_id = ANY(:entity_ids)" + (" AND entity_type = :entity_type" if entity_type else "")
+        async with server_connections().get_db_session() as session:
+            result = await session.execute(text(f"""
+                SELECT entity_id, COUNT(*) AS n FROM long_term_memory
+                WHERE {where}
+                GROUP BY entity_id
+            """), {'entity_ids': list(entity_ids), 'entity_type': entity_type})
+            return {row.entity_id: row.n for row in result}
+
+    async def get_profile(self, entity_id: str, entity_type: str) -> Optional[Dict]:
+        async with server_connections().get_db_session() as session:
+            result = await session.execute(text(f"""
+                SELECT {', '.join(PROFILE_COLUMNS)}
+                FROM entity_profiles
+                WHERE entity_id = :entity_id AND entity_type = :entity_type
+            """), {'entity_id': entity_id, 'entity_type': entity_type})
+            row = result.fetchone()
+            return dict(row._mapping) if row else None
+
+    async def record_access(self, hits: Dict[int, int]):
+        async with server_connections().get_db_session() as session:
+            await session.execute(text("""
+                UPDATE long_term_memory AS m
+                SET accessed_at = NOW(), access_count = m.access_count + a.hits
+                FROM unnest(CAST(:ids AS INTEGER[]), CAST(:hits AS INTEGER[])) AS a(id, hits)
+                WHERE m.id = a.id
+            """), {'ids': list(hits.keys()), 'hits': list(hits.values())})
+
+    async def fetch_compaction_batch(self, cutoff: datetime, after_id: int, limit: int) -> List[Dict]:
+        async with server_connections().get_db_session() as session:
+            result = await session.execute(text("""
+                SELECT id, entity_id, entity_type, memory_type, data, importance_score,
+                       access_count, created_at, accessed_at
+                FROM long_term_memory
+                WHERE created_at < :cutoff AND id > :last_id
+                ORDER BY id
+                LIMIT :batch
+            """), {'cutoff': cutoff, 'last_id': after_id, 'batch': limit})
+            return [dict(row._mapping) for row in result]
+
+    async def apply_compaction(self, rescored: List[Dict], archived_ids: List[int], summaries: List[Dict]):
+        async with server_connections().get_db_session() as session:
+            if rescored:
+                await session.execute(text("""
+                    UPDATE long_term_memory SET effective_importance = :score WHERE id = :id
+                """), rescored)
+            if archived_ids:
+                await session.execute(text("""
+                    INSERT INTO long_term_memory_archive
+                    (id, entity_id, entity_type, memory_type, data, importance_score, access_count,
+                     created_at, accessed_at, archived_at)
+                    SELECT id, entity_id, entity_type, memory_type, data, importance_score, access_count,
+                           created_at, accessed_at, NOW()
+                    FROM long_term_memory WHERE id = ANY(:ids)
+                """), {'ids': archived_ids})
+                await session.execute(text("DELETE FROM long_term_memory WHERE id = ANY(:ids)"),
+                                      {'ids': archived_ids})
+            if summaries:
+                await session.execute(text("""
+                    INSERT INTO long_term_memory
+                    (entity_id, entity_type, memory_type, data, importance_score, effective_importance,
+                     created_at, accessed_at)
+                    VALUES (:entity_id, :entity_type, 'summary', :data, :importance, :score, NOW(), NOW())
+                """), [{**summary, 'data': json.dumps(summary['data'])} for summary in summaries])
+
+
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS long_term_memory (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    entity_id TEXT,
+    entity_type TEXT,
+    memory_type TEXT,
+    data TEXT,
+    importance_score REAL,
+    effective_importance REAL,
+    access_count INTEGER DEFAULT 0,
+    created_at TEXT,
+    accessed_at TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_memory_entity_rank
+    ON long_term_memory(entity_id, entity_type, effective_importance DESC, created_at DESC);
+CREATE INDEX IF NOT EXISTS idx_memory_created_at ON long_term_memory(created_at);
+
+CREATE TABLE IF NOT EXISTS long_term_memory_archive (
+    id INTEGER PRIMARY KEY,
+    entity_id TEXT,
+    entity_type TEXT,
+    memory_type TEXT,
+    data TEXT,
+    importance_score REAL,
+    access_count INTEGER,
+    created_at TEXT,
+    accessed_at TEXT,
+    archived_at TEXT
+);
+
+CREATE TABLE IF NOT EXISTS entity_profiles (
+    entity_id TEXT NOT NULL,
+    entity_type TEXT NOT NULL,
+    channel TEXT,
+    time_preference TEXT,
+    content_type TEXT,
+    interests TEXT DEFAULT '[]',
+    interaction_count INTEGER DEFAULT 0,
+    updated_at TEXT,
+    PRIMARY KEY (entity_id, entity_type)
+);
+"""
+
+SQLITE_PROFILE_UPSERT = """
+    INSERT INTO entity_profiles
+    (entity_id, entity_type, channel, time_preference, content_type, interests, interaction_count, updated_at)
+    VALUES (:entity_id, :entity_type, :channel, :time_preference, :content_type, :interests, 1, :now)
+    ON CONFLICT (entity_id, entity_type) DO UPDATE SET
+        channel = COALESCE(excluded.channel, entity_profiles.channel),
+        time_preference = COALESCE(excluded.time_preference, entity_profiles.time_preference),
+        content_type = COALESCE(excluded.content_type, entity_profiles.content_type),
+        interests = (
+            SELECT json_group_array(value) FROM (
+                SELECT value FROM json_each(entity_profiles.interests)
+                UNION SELECT value FROM json_each(excluded.interests)
+            )
+        ),
+        interaction_count = entity_profiles.interaction_count + 1,
+        updated_at = excluded.updated_at
+"""
+
+# Stored as fixed-width text so string order matches time order
+TIMESTAMP_FORMAT = '%Y-%m-%d %H:%M:%S.%f'
+TIMESTAMP_COLUMNS = ('created_at', 'accessed_at', 'updated_at', 'archived_at')
+
+
+def _now() -> str:
+    return datetime.now().strftime(TIMESTAMP_FORMAT)
+
+
+class SQLiteLongTermBackend(LongTermBackend):
+    """Embedded long-term store: the same tables in a local SQLite file (or ``:memory:``).
+
+    Statements run inline on the caller's thread; SQLite calls are
+    microseconds with no network hop, so there is nothing to overlap.
+    """
+
+    def __init__(self, path: str = ':memory:'):
+        self.path = path
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._lock = threading.Lock()
+        with self._lock, self._conn:
+            self._conn.executescript(SQLITE_SCHEMA)
+
+    def _rows(self, sql: str, params=()) -> List[Dict]:
+        with self._lock:
+            rows = [dict(row) for row in self._conn.execute(sql, params)]
+        for row in rows:
+            for column in TIMESTAMP_COLUMNS:
+                if row.get(column):
+                    row[column] = datetime.strptime(row[column], TIMESTAMP_FORMAT)
+            if isinstance(row.get('interests'), str):
+                row['interests'] = sorted(json.loads(row['interests']))
+        return rows
+
+    async def insert(self, rows: List[Dict]):
+        if not rows:
+            return
+        now = _now()
+        with self._lock, self._conn:
+            self._conn.executemany("""
+                INSERT INTO long_term_memory
+                (entity_id, entity_type, memory_type, data, importance_score, effective_importance,
+                 created_at, accessed_at)
+                VALUES (:entity_id, :entity_type, :memory_type, :data, :importance, :importance, :now, :now)
+            """, [{**_memory_params(row), 'now': now} for row in rows])
+            self._conn.executemany(SQLITE_PROFILE_UPSERT, [
+                {**_profile_params(row), 'interests': json.dumps(row['profile']['interests']), 'now': now}
+                for row in rows
+            ])
+
+    async def query(self, entity_id: str, entity_type: Optional[str], columns: Optional[Sequence[str]],
+                    limit: int = 50) -> List[Dict]:
+        projection = ", ".join(columns) if columns else "*"
+        where = "entity_id = :entity_id" + (" AND entity_type = :entity_type" if entity_type else "")
+        return self._rows(f"""
+            SELECT {projection} FROM long_term_memory
+            WHERE {where}
+            ORDER BY effective_importance DESC, created_at DESC
+            LIMIT :limit
+        """, {'entity_id': entity_id, 'entity_type': entity_type, 'limit': limit})
+
+    async def count_many(self, entity_ids: Sequence[str], entity_type: Optional[str]) -> Dict[str, int]:
+        if not entity_ids:
+            return {}
+        # json_each keeps this one statement regardless of batch size
+        where = "entity_id IN (SELECT value FROM json_each(:entity_ids))"
+        where += " AND entity_type = :entity_type" if entity_type else ""
+        rows = self._rows(f"""
+            SELECT entity_id, COUNT(*) AS n FROM long_term_memory
+            WHERE {where}
+            GROUP BY entity_id
+        """, {'entity_ids': json.dumps(list(entity_ids)), 'entity_type': entity_type})
+        return {row['entity_id']: row['n'] for row in rows}
+
+    async def get_profile(self, entity_id: str, entity_type: str) -> Optional[Dict]:
+        rows = self._rows(f"""
+            SELECT {', '.join(PROFILE_COLUMNS)} FROM entity_profiles
+            WHERE entity_id = :entity_id AND entity_type = :entity_type
+        """, {'entity_id': entity_id, 'entity_type': entity_type})
+        return rows[0] if rows else None
+
+    async def record_access(self, hits: Dict[int, int]):
+        now = _now()
+        with self._lock, self._conn:
+            self._conn.executemany("""
+                UPDATE long_term_memory SET accessed_at = ?, access_count = access_count + ? WHERE id = ?
+            """, [(now, count, memory_id) for memory_id, count in hits.items()])
+
+    async def fetch_compaction_batch(self, cutoff: datetime, after_id: int, limit: int) -> List[Dict]:
+        return self._rows("""
+            SELECT id, entity_id, entity_type, memory_type, data, importance_score,
+                   access_count, created_at, accessed_at
+            FROM long_term_memory
+            WHERE created_at < ? AND id > ?
+            ORDER BY id
+            LIMIT ?
+        """, (cutoff.strftime(TIMESTAMP_FORMAT), after_id, limit))
+
+    async def apply_compaction(self, rescored: List[Dict], archived_ids: List[int], summaries: List[Dict]):
+        now = _now()
+        with self._lock, self._conn:
+            self._conn.executemany("UPDATE long_term_memory SET effective_importance = :score WHERE id = :id",
+                                   rescored)
+            if archived_ids:
+                marks = ", ".join("?" * len(archived_ids))
+                self._conn.execute(f"""
+                    INSERT INTO long_term_memory_archive
+                    (id, entity_id, entity_type, memory_type, data, importance_score, access_count,
+                     created_at, accessed_at, archived_at)
+                    SELECT id, entity_id, entity_type, memory_type, data, importance_score, access_count,
+                           created_at, accessed_at, ?
+                    FROM long_term_memory WHERE id IN ({marks})
+                """, (now, *archived_ids))
+                self._conn.execute(f"DELETE FROM long_term_memory WHERE id IN ({marks})", archived_ids)
+            self._conn.executemany("""
+                INSERT INTO long_term_memory
+                (entity_id, entity_type, memory_type, data, importance_score, effective_importance,
+                 created_at, accessed_at)
+                VALUES (:entity_id, :entity_type, 'summary', :data, :importance, :score, :now, :now)
+            """, [{**summary, 'data': json.dumps(summary['data']), 'now': now} for summary in summaries])
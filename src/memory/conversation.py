@@ -0,0 +1,110 @@
+# memory/conversation.py
+from typing import Dict, Iterable, List, Optional, Sequence
+from datetime import datetime
+import csv
+import json
+from memory.short_term import ShortTermMemory
+
+# Slots live as individual hash fields so a turn rewrites only what changed
+SLOT_PREFIX = 'slot:'
+# Plain-string conversation fields stored alongside the slots
+STATE_FIELDS = ('lead_id', 'active_intent', 'last_utterance_summary', 'updated_at')
+
+
+def _decode_state(conversation_id: str, fields: Dict[str, str]) -> Optional[Dict]:
+    if not fields:
+        return None
+    state = {'conversation_id': conversation_id, 'slots': {}}
+    for name, value in fields.items():
+        if name.startswith(SLOT_PREFIX):
+            state['slots'][name[len(SLOT_PREFIX):]] = json.loads(value)
+        else:
+            state[name] = value
+    return state
+
+
+class ConversationStore:
+    """Per-conversation state (intent, summary, slots) with field-level updates.
+
+    Each conversation is one hash in the short-term store. Every write and
+    single-conversation read slides its TTL, so active conversations stay
+    alive and idle ones expire on their own.
+    """
+
+    def __init__(self, short_term: ShortTermMemory, ttl_seconds: int = None, key_prefix: str = 'conv'):
+        self.short_term = short_term
+        self.ttl = ttl_seconds or int(short_term.ttl.total_seconds())
+        self.key_prefix = key_prefix
+
+    def _key(self, conversation_id: str) -> str:
+        return f"{self.key_prefix}:{conversation_id}"
+
+    async def _store(self):
+        await self.short_term.initialize()
+        return self.short_term.store
+
+    async def update(self, conversation_id: str, slots: Dict = None, **state):
+        """Merge slots and state fields into a conversation, leaving other fields untouched"""
+        unknown = set(state) - set(STATE_FIELDS)
+        if unknown:
+            raise ValueError(f"Unknown conversation fields: {sorted(unknown)}")
+
+        mapping = {name: str(value) for name, value in state.items() if value is not None}
+        mapping.update({f"{SLOT_PREFIX}{name}": json.dumps(value) for name, value in (slots or {}).items()})
+        mapping['updated_at'] = datetime.now().isoformat()
+        store = await self._store()
+        await store.hset(self._key(conversation_id), mapping, ttl=self.ttl)
+
+    async def get_slots(self, conversation_id: str, names: Sequence[str] = None) -> Dict:
+        """Read some or all slots; missing slots are left out"""
+        store = await self._store()
+        key = self._key(conversation_id)
+        if names is None:
+            state = _decode_state(conversation_id, await store.hgetall(key, ttl=self.ttl))
+            return state['slots'] if state else {}
+
+        values = await store.hmget(key, [f"{SLOT_PREFIX}{name}" for name in names], ttl=self.ttl)
+        return {name: json.loads(value) for name, value in zip(names, values) if value is not None}
+
+    async def get(self, conversation_id: str) -> Optional[Dict]:
+        """Full conversation state, or None once it has expired"""
+        store = await self._store()
+        return _decode_state(conversation_id, await store.hgetall(self._key(conversation_id), ttl=self.ttl))
+
+    async def get_many(self, conversation_ids: Iterable[str]) -> Dict[str, Dict]:
+        """Bulk read in one round-trip; doesn't count as activity, so TTLs are left alone"""
+        conversation_ids = list(conversation_ids)
+        store = await self._store()
+        hashes = await store.hgetall_many([self._key(cid) for cid in conversation_ids])
+        states = {}
+        for conversation_id, fields in zip(conversation_ids, hashes):
+            state = _decode_state(conversation_id, fields)
+            if state:
+                states[conversation_id] = state
+        return states
+
+    async def clear_slots(self, conversation_id: str, *names: str):
+        """Drop individual slots"""
+        if names:
+            store = await self._store()
+            await store.hdel(self._key(conversation_id), *(f"{SLOT_PREFIX}{name}" for name in names))
+
+    async def end(self, conversation_id: str):
+        """Forget a conversation immediately"""
+        store = await self._store()
+        await store.delete(self._key(conversation_id))
+
+    async def seed_from_csv(self, path: str = 'data/memory_short_term.csv') -> List[str]:
+        """Load memory_short_term.csv conversations; each gets a fresh TTL"""
+        seeded = []
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                await self.update(
+                    row['conversation_id'],
+                    slots=json.loads(row['slots_json'] or '{}'),
+                    lead_id=row['lead_id'],
+                    active_intent=row['active_intent'],
+                    last_utterance_summary=row['last_utterance_summary']
+                )
+                seeded.append(row['conversation_id'])
+        return seeded
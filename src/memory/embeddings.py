@@ -0,0 +1,114 @@
+# memory/embeddings.py
+from typing import Dict, Iterable, List, Optional, Tuple
+from functools import lru_cache
+import hashlib
+import math
+import os
+import re
+import numpy as np
+
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+")
+
+
+@lru_cache(maxsize=65536)
+def _hash_token(token: str) -> int:
+    return int.from_bytes(hashlib.blake2b(token.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class HashingEmbedder:
+    """Offline text embedder using signed feature hashing of unigrams and bigrams"""
+
+    def __init__(self, dim: int = 256):
+        self.dim = dim
+
+    def tokenize(self, text: str) -> List[str]:
+        words = TOKEN_PATTERN.findall((text or '').lower())
+        return words + [f"{a}_{b}" for a, b in zip(words, words[1:])]
+
+    def embed(self, text: str) -> np.ndarray:
+        """Embed text into a unit-length float32 vector"""
+        counts: Dict[str, int] = {}
+        for token in self.tokenize(text):
+            counts[token] = counts.get(token, 0) + 1
+
+        vector = np.zeros(self.dim, dtype=np.float32)
+        for token, tf in counts.items():
+            h = _hash_token(token)
+            sign = 1.0 if h >> 63 else -1.0
+            vector[h % self.dim] += sign * (1.0 + math.log(tf))
+
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    def embed_many(self, texts: Iterable[str]) -> np.ndarray:
+        vectors = [self.embed(t) for t in texts]
+        return np.vstack(vectors) if vectors else np.zeros((0, self.dim), dtype=np.float32)
+
+
+class VectorIndex:
+    """In-process cosine top-k index over unit vectors, persisted as .npz"""
+
+    def __init__(self, dim: int, path: Optional[str] = None):
+        self.dim = dim
+        self.path = path
+        self._vectors = np.zeros((64, dim), dtype=np.float32)
+        self._keys: List[str] = []
+        self._positions: Dict[str, int] = {}
+        self.unsaved = 0
+
+    def __len__(self):
+        return len(self._keys)
+
+    def __contains__(self, key: str):
+        return key in self._positions
+
+    def add(self, key: str, vector: np.ndarray):
+        """Insert or replace a vector, growing storage geometrically"""
+        position = self._positions.get(key)
+        if position is None:
+            position = len(self._keys)
+            if position == len(self._vectors):
+                grown = np.zeros((len(self._vectors) * 2, self.dim), dtype=np.float32)
+                grown[:position] = self._vectors
+                self._vectors = grown
+            self._keys.append(key)
+            self._positions[key] = position
+        self._vectors[position] = vector
+        self.unsaved += 1
+
+    def search(self, vector: np.ndarray, k: int = 5) -> List[Tuple[str, float]]:
+        """Return the k most similar keys with their cosine similarity"""
+        n = len(self._keys)
+        if n == 0 or k <= 0:
+            return []
+        scores = self._vectors[:n] @ vector
+        k = min(k, n)
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top], kind='stable')]
+        return [(self._keys[i], float(scores[i])) for i in top]
+
+    def save(self, path: Optional[str] = None):
+        """Atomically write the index to disk"""
+        path = path or self.path
+        if not path:
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, vectors=self._vectors[:len(self._keys)], keys=np.array(self._keys, dtype=str))
+        os.replace(tmp_path, path)
+        self.unsaved = 0
+
+    @classmethod
+    def load(cls, path: str, dim: int) -> 'VectorIndex':
+        """Index saved at path (empty if there is none); ValueError if it was built for another dimension"""
+        index = cls(dim, path)
+        if not os.path.exists(path):
+            return index
+        with np.load(path) as stored:
+            vectors, keys = stored['vectors'], [str(k) for k in stored['keys']]
+        if vectors.shape[1:] != (dim,):
+            raise ValueError(f"Index at {path} has dimension {vectors.shape[1:]}, expected {dim}")
+        for key, vector in zip(keys, vectors):
+            index.add(key, vector)
+        index.unsaved = 0
+        return index
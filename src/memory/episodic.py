@@ -1,56 +1,193 @@
 # memory/episodic.py
-from typing import Dict, List
+from typing import Dict, List, Optional
 from datetime import datetime
+import csv
+import json
+import os
 import uuid
-from database.connection import db_manager
+import zipfile
+import numpy as np
+from memory.backends import GraphBackend, get_graph_backend
+from memory.embeddings import HashingEmbedder, VectorIndex
+from memory.serialization import flatten_properties, parse_metadata, to_json
+from config import settings
+
+# Solution text still helps retrieval, but the problem statement dominates
+SOLUTION_WEIGHT = 0.5
+
+# Metadata keys copied onto the node as typed, indexed properties
+PROMOTED_KEYS = ('entity_id', 'entity_type', 'importance', 'confidence')
+
+
+def decode_episode(node: Dict) -> Dict:
+    """Turn a stored Episode node into a plain dict with parsed metadata"""
+    episode = dict(node)
+    episode.pop('embedding', None)
+    episode['metadata'] = parse_metadata(episode.get('metadata'))
+    return episode
+
+
+def load_episode_corpus(path: str = 'data/memory_episodic.csv') -> List[Dict]:
+    """Read memory_episodic.csv-shaped playbooks as episode dicts"""
+    episodes = []
+    with open(path, newline='', encoding='utf-8') as f:
+        for row in csv.DictReader(f):
+            actions = json.loads(row['action_sequence_json'] or '[]')
+            episodes.append({
+                'id': row['episode_id'],
+                'problem': f"{row['scenario'].replace('_', ' ')}: {row['notes']}",
+                'solution': ' -> '.join(actions),
+                'outcome': 'success' if float(row['outcome_score']) >= 0.5 else 'partial',
+                'metadata': {'scenario': row['scenario'], 'outcome_score': float(row['outcome_score'])}
+            })
+    return episodes
 
 class EpisodicMemory:
     """Stores problem-resolution episodes"""
     
-    def __init__(self, agent_id: str):
+    def __init__(self, agent_id: str, embedder: HashingEmbedder = None, index_path: Optional[str] = None,
+                 backend: GraphBackend = None):
         self.agent_id = agent_id
+        self.backend = backend or get_graph_backend()
+        self.embedder = embedder or HashingEmbedder(settings.EPISODE_EMBEDDING_DIM)
+        if index_path is None and settings.EPISODE_INDEX_DIR:
+            index_path = os.path.join(settings.EPISODE_INDEX_DIR, f"{agent_id}.npz")
+        self.index_path = index_path
+        self._index: Optional[VectorIndex] = None
+
+    def embed_episode(self, problem: str, solution: str = '') -> np.ndarray:
+        """Embed an episode, weighting the problem statement over the solution"""
+        vector = self.embedder.embed(problem) + SOLUTION_WEIGHT * self.embedder.embed(solution)
+        norm = np.linalg.norm(vector)
+        return vector / norm if norm else vector
+
+    @property
+    def index(self) -> VectorIndex:
+        """Vector index, loaded from disk and topped up from stored embeddings on first use"""
+        if self._index is None:
+            dim = self.embedder.dim
+            if self.index_path and os.path.exists(self.index_path):
+                try:
+                    self._index = VectorIndex.load(self.index_path, dim)
+                except (OSError, ValueError, KeyError, zipfile.BadZipFile) as e:
+                    # Stale or unreadable file: the stored embeddings are the source of truth
+                    print(f"⚠️ Rebuilding episode index {self.index_path}: {e}")
+            if self._index is None:
+                self._index = VectorIndex(dim, self.index_path)
+            # The file may predate episodes added since the last save (here or by another process)
+            self._sync_index()
+        return self._index
+
+    def _sync_index(self):
+        """Add stored episodes the index is missing"""
+        for record in self.backend.episode_embeddings(self.agent_id):
+            if record['id'] in self._index:
+                continue
+            embedding = record['embedding']
+            if embedding is None or len(embedding) != self.embedder.dim:
+                vector = self.embed_episode(record['problem'], record['solution'])
+            else:
+                vector = np.asarray(embedding, dtype=np.float32)
+            self._index.add(record['id'], vector)
+        self.save_index()
+
+    def save_index(self):
+        """Persist unsaved index updates"""
+        if self._index is not None and self._index.unsaved:
+            self._index.save()
+
+    def close(self):
+        """Save the index so episodes added since the last save survive a restart"""
+        self.save_index()
     
     def add_episode(self, problem: str, solution: str, outcome: str, metadata: Dict = None):
         """Store a problem-solution episode"""
-        with db_manager.get_neo4j_session() as session:
-            episode_id = str(uuid.uuid4())
-            query = """
-            CREATE (e:Episode {
-                id: $id,
-                agent_id: $agent_id,
-                problem: $problem,
-                solution: $solution,
-                outcome: $outcome,
-                metadata: $metadata,
-                timestamp: datetime()
-            })
-            RETURN e
-            """
-            session.run(query, 
-                id=episode_id,
-                agent_id=self.agent_id,
-                problem=problem,
-                solution=solution,
-                outcome=outcome,
-                metadata=str(metadata or {})
-            )
-            return episode_id
+        embedding = self.embed_episode(problem, solution)
+        episode_id = str(uuid.uuid4())
+        self.backend.create_episode({
+            'id': episode_id,
+            'agent_id': self.agent_id,
+            'problem': problem,
+            'solution': solution,
+            'outcome': outcome,
+            'metadata': to_json(metadata or {}),
+            'embedding': embedding.tolist()
+        }, promoted=flatten_properties({key: (metadata or {}).get(key) for key in PROMOTED_KEYS}))
+
+        index = self.index
+        index.add(episode_id, embedding)
+        if index.unsaved >= settings.EPISODE_INDEX_SAVE_EVERY:
+            self.save_index()
+        return episode_id
     
-    def find_similar_episodes(self, problem_description: str, limit: int = 5) -> List[Dict]:
-        """Find similar past episodes"""
-        with db_manager.get_neo4j_session() as session:
-            # Simple keyword matching (can be enhanced with embeddings)
-            query = """
-            MATCH (e:Episode)
-            WHERE e.agent_id = $agent_id 
-            AND e.problem CONTAINS $keyword
-            RETURN e
-            ORDER BY e.timestamp DESC
-            LIMIT $limit
-            """
-            result = session.run(query,
-                agent_id=self.agent_id,
-                keyword=problem_description.split()[0],  # Simple matching
-                limit=limit
-            )
-            return [dict(record['e']) for record in result]
\ No newline at end of file
+    def add_episodes(self, episodes: List[Dict]) -> List[str]:
+        """Store many problem/solution/outcome/metadata dicts in one backend write"""
+        rows, vectors = [], []
+        for episode in episodes:
+            metadata = episode.get('metadata') or {}
+            embedding = self.embed_episode(episode['problem'], episode['solution'])
+            vectors.append(embedding)
+            rows.append({
+                'episode': {
+                    'id': str(uuid.uuid4()),
+                    'agent_id': self.agent_id,
+                    'problem': episode['problem'],
+                    'solution': episode['solution'],
+                    'outcome': episode['outcome'],
+                    'metadata': to_json(metadata),
+                    'embedding': embedding.tolist()
+                },
+                'promoted': flatten_properties({key: metadata.get(key) for key in PROMOTED_KEYS})
+            })
+        if not rows:
+            return []
+
+        self.backend.create_episodes(rows)
+        index = self.index
+        for row, vector in zip(rows, vectors):
+            index.add(row['episode']['id'], vector)
+        if index.unsaved >= settings.EPISODE_INDEX_SAVE_EVERY:
+            self.save_index()
+        return [row['episode']['id'] for row in rows]
+
+    def count_by_entity(self, entity_ids: List[str], limit: int = None) -> Dict[str, int]:
+        """Episode count per entity for a batch of entities, optionally capped"""
+        counts = self.backend.count_episodes(self.agent_id, list(dict.fromkeys(entity_ids)))
+        return {entity_id: counts.get(entity_id, 0) if limit is None else min(counts.get(entity_id, 0), limit)
+                for entity_id in entity_ids}
+
+    def find_similar_episodes(self, problem_description: str, limit: int = 5,
+                              min_similarity: float = 0.0) -> List[Dict]:
+        """Find past episodes closest to the description by embedding similarity"""
+        hits = [(episode_id, score) for episode_id, score
+                in self.index.search(self.embed_episode(problem_description), limit)
+                if score > min_similarity]
+        if not hits:
+            return []
+
+        nodes = {node['id']: decode_episode(node)
+                 for node in self.backend.get_episodes([episode_id for episode_id, _ in hits])}
+
+        episodes = []
+        for episode_id, score in hits:
+            if episode_id in nodes:
+                episode = nodes[episode_id]
+                episode['similarity'] = round(score, 4)
+                episodes.append(episode)
+        return episodes
+
+    def query_episodes(self, entity_id: str = None, outcome: str = None, since_days: int = None,
+                       min_importance: float = None, limit: int = 50) -> List[Dict]:
+        """Filter this agent's episodes in the graph store, newest first"""
+        episodes = self.backend.query_episodes(self.agent_id, entity_id=entity_id, outcome=outcome,
+                                               since_days=since_days, min_importance=min_importance,
+                                               limit=limit)
+        return [decode_episode(node) for node in episodes]
+
+    def seed_from_csv(self, path: str = 'data/memory_episodic.csv') -> int:
+        """Load memory_episodic.csv playbooks as episodes for this agent"""
+        corpus = load_episode_corpus(path)
+        for episode in corpus:
+            self.add_episode(episode['problem'], episode['solution'], episode['outcome'], episode['metadata'])
+        self.save_index()
+        return len(corpus)
@@ -0,0 +1,87 @@
+# memory/facade.py
+from typing import Any, Awaitable, Callable, Dict, Iterable
+import asyncio
+import time
+from config import settings
+
+
+class MemoryFacade:
+    """Single recall() entry point over all memory tiers.
+
+    Each requested tier is queried concurrently (synchronous Neo4j calls run
+    in worker threads) under one deadline. Tiers that miss the deadline are
+    reported in ``timed_out`` and left out of ``results``, so callers always
+    get whatever arrived in time plus per-tier latency.
+    """
+
+    TIERS = ('recent', 'history', 'profile', 'episodes', 'related')
+
+    def __init__(self, short_term, long_term, episodic, semantic):
+        self.short_term = short_term
+        self.long_term = long_term
+        self.episodic = episodic
+        self.semantic = semantic
+
+    def _fetcher(self, tier: str, entity_id: str, entity_type: str, options: Dict) -> Callable[[], Awaitable]:
+        if tier == 'recent':
+            async def fetch():
+                items = await self.short_term.get_recent(n=options.get('recent_n', 10))
+                return [item for item in items if item.get('entity_id') == entity_id]
+            return fetch
+        if tier == 'history':
+            return lambda: self.long_term.query(entity_id, entity_type, columns=options.get('history_columns'))
+        if tier == 'profile':
+            return lambda: self.long_term.get_profile(entity_id, entity_type)
+        if tier == 'episodes':
+            return lambda: asyncio.to_thread(
+                self.episodic.query_episodes, entity_id=entity_id, limit=options.get('episode_limit', 10)
+            )
+        if tier == 'related':
+            return lambda: asyncio.to_thread(
+                self.semantic.find_related, entity_id, options.get('relationship_type'),
+                options.get('related_depth', 2)
+            )
+        raise ValueError(f"Unknown memory tier: {tier} (expected one of {self.TIERS})")
+
+    async def recall(self, entity_id: str, need: Iterable[str] = ('history', 'profile'),
+                     entity_type: str = 'lead', deadline: float = None, **options) -> Dict[str, Any]:
+        """Fetch the requested tiers concurrently, returning partial results at the deadline"""
+        deadline = settings.MEMORY_RECALL_DEADLINE if deadline is None else deadline
+        fetchers = {tier: self._fetcher(tier, entity_id, entity_type, options) for tier in dict.fromkeys(need)}
+        started = time.perf_counter()
+        latency_ms: Dict[str, float] = {}
+
+        async def timed(tier: str, fetch: Callable[[], Awaitable]):
+            try:
+                return await fetch()
+            finally:
+                latency_ms[tier] = round((time.perf_counter() - started) * 1000, 2)
+
+        tasks = {asyncio.create_task(timed(tier, fetch)): tier for tier, fetch in fetchers.items()}
+        done, pending = await asyncio.wait(tasks, timeout=deadline) if tasks else (set(), set())
+
+        for task in pending:
+            task.cancel()
+
+        results, errors = {}, {}
+        for task in done:
+            tier = tasks[task]
+            if task.exception() is not None:
+                errors[tier] = str(task.exception())
+            else:
+                results[tier] = task.result()
+
+        timed_out = [tasks[task] for task in pending]
+        elapsed_ms = round((time.perf_counter() - started) * 1000, 2)
+        for tier in timed_out:
+            latency_ms[tier] = elapsed_ms
+
+        return {
+            'entity_id': entity_id,
+            'results': results,
+            'errors': errors,
+            'timed_out': timed_out,
+            'complete': not errors and not timed_out,
+            'latency_ms': dict(latency_ms),
+            'elapsed_ms': elapsed_ms
+        }
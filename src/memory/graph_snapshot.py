@@ -0,0 +1,233 @@
+# memory/graph_snapshot.py
+from typing import Dict, Iterable, List, Optional, Tuple
+import csv
+import threading
+import numpy as np
+
+
+class GraphSnapshot:
+    """Array-backed (CSR) copy of the semantic graph for in-process k-hop queries.
+
+    Edges live in CSR arrays sorted by source node. Writes that introduce new
+    edges go to a small delta map and are folded into the arrays once the delta
+    grows past ``compact_threshold``; weight updates to existing edges are
+    applied in place.
+    """
+
+    def __init__(self, compact_threshold: int = 1024):
+        self.compact_threshold = compact_threshold
+        self._node_ids: Dict[str, int] = {}
+        self._names: List[str] = []
+        self._rel_ids: Dict[str, int] = {}
+        self._rel_names: List[str] = []
+
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int32)
+        self.rel_types = np.zeros(0, dtype=np.int32)
+        self.weights = np.zeros(0, dtype=np.float32)
+        self.counts = np.zeros(0, dtype=np.int32)
+
+        # src -> {(dst, rel): [weight, count]} for edges not yet in the arrays
+        self._delta: Dict[int, Dict[Tuple[int, int], List[float]]] = {}
+        self._delta_size = 0
+        self._lock = threading.Lock()
+        self._best = np.zeros(0)
+        self._hops = np.zeros(0, dtype=np.int32)
+
+    @property
+    def num_nodes(self) -> int:
+        return len(self._names)
+
+    @property
+    def num_edges(self) -> int:
+        return len(self.indices) + self._delta_size
+
+    def _node(self, name: str) -> int:
+        node = self._node_ids.get(name)
+        if node is None:
+            node = self._node_ids[name] = len(self._names)
+            self._names.append(name)
+        return node
+
+    def _rel(self, name: str) -> int:
+        rel = self._rel_ids.get(name)
+        if rel is None:
+            rel = self._rel_ids[name] = len(self._rel_names)
+            self._rel_names.append(name)
+        return rel
+
+    def add_edge(self, subject: str, relationship: str, target: str, weight: float = 1.0, count: int = 1):
+        """Record ``count`` observations of an edge averaging ``weight``"""
+        with self._lock:
+            src, dst, rel = self._node(subject), self._node(target), self._rel(relationship)
+
+            if src < len(self.indptr) - 1:
+                lo, hi = self.indptr[src], self.indptr[src + 1]
+                match = np.flatnonzero((self.indices[lo:hi] == dst) & (self.rel_types[lo:hi] == rel))
+                if match.size:
+                    i = lo + match[0]
+                    seen = self.counts[i]
+                    self.weights[i] = (self.weights[i] * seen + weight * count) / (seen + count)
+                    self.counts[i] = seen + count
+                    return
+
+            edges = self._delta.setdefault(src, {})
+            edge = edges.get((dst, rel))
+            if edge is None:
+                edges[(dst, rel)] = [float(weight), count]
+                self._delta_size += 1
+            else:
+                edge[0] = (edge[0] * edge[1] + weight * count) / (edge[1] + count)
+                edge[1] += count
+
+            if self._delta_size >= self.compact_threshold:
+                self._compact()
+
+    def add_rows(self, rows: Iterable[Dict]):
+        """Apply SemanticMemory write rows (entity/relationship/target/count/weight_sum)"""
+        for row in rows:
+            self.add_edge(row['entity'], row['relationship'], row['target'],
+                          row['weight_sum'] / row['count'], row['count'])
+
+    def compact(self):
+        with self._lock:
+            self._compact()
+
+    def _compact(self):
+        if not self._delta_size and len(self.indptr) - 1 == self.num_nodes:
+            return
+        n = self.num_nodes
+        old_src = np.repeat(np.arange(len(self.indptr) - 1, dtype=np.int32), np.diff(self.indptr))
+
+        delta = [(src, dst, rel, w, c) for src, edges in self._delta.items()
+                 for (dst, rel), (w, c) in edges.items()]
+        if delta:
+            d_src, d_dst, d_rel, d_w, d_c = (np.array(col) for col in zip(*delta))
+        else:
+            d_src = d_dst = d_rel = d_c = np.zeros(0, dtype=np.int32)
+            d_w = np.zeros(0, dtype=np.float32)
+
+        src = np.concatenate([old_src, d_src]).astype(np.int32)
+        order = np.argsort(src, kind='stable')
+        self.indices = np.concatenate([self.indices, d_dst]).astype(np.int32)[order]
+        self.rel_types = np.concatenate([self.rel_types, d_rel]).astype(np.int32)[order]
+        self.weights = np.concatenate([self.weights, d_w]).astype(np.float32)[order]
+        self.counts = np.concatenate([self.counts, d_c]).astype(np.int32)[order]
+        self.indptr = np.concatenate([[0], np.cumsum(np.bincount(src, minlength=n))]).astype(np.int64)
+
+        self._delta = {}
+        self._delta_size = 0
+
+    def neighbors(self, entity: str, relationship_type: str = None, depth: int = 2,
+                  limit: int = 20) -> List[Dict]:
+        """Entities reachable within ``depth`` hops, ranked by best path weight.
+
+        A path's score is the product of its edge weights. With
+        ``relationship_type`` set, every hop on the path must have that type.
+        """
+        with self._lock:
+            start = self._node_ids.get(entity)
+            rel_filter = self._rel_ids.get(relationship_type) if relationship_type else None
+            if start is None or (relationship_type and rel_filter is None):
+                return []
+
+            best, hops = self._scratch()
+            best[start] = 1.0
+            touched = [np.array([start])]
+            frontier_nodes = np.array([start], dtype=np.int64)
+            frontier_scores = np.array([1.0])
+            csr_nodes = len(self.indptr) - 1
+
+            for hop in range(1, depth + 1):
+                dst, scores = self._expand(frontier_nodes, frontier_scores, csr_nodes, rel_filter)
+                if not dst.size:
+                    break
+                # Keep the best score per destination from this hop
+                order = np.lexsort((-scores, dst))
+                dst, scores = dst[order], scores[order]
+                first = np.concatenate([[True], dst[1:] != dst[:-1]])
+                dst, scores = dst[first], scores[first]
+
+                improved = scores > best[dst]
+                frontier_nodes, frontier_scores = dst[improved], scores[improved]
+                best[frontier_nodes] = frontier_scores
+                hops[frontier_nodes[hops[frontier_nodes] == 0]] = hop
+                touched.append(frontier_nodes)
+
+            reached = np.unique(np.concatenate(touched))
+            reached = reached[reached != start]
+            ranked = reached[np.lexsort((reached, -best[reached]))][:limit]
+            results = [{'related': {'name': self._names[node]}, 'score': round(float(score), 6),
+                        'depth': int(hop)}
+                       for node, score, hop in zip(ranked.tolist(), best[ranked], hops[ranked])]
+
+            # Reset only what this query touched so the buffers stay reusable
+            best[reached] = 0.0
+            best[start] = 0.0
+            hops[reached] = 0
+            return results
+
+    def _scratch(self) -> Tuple[np.ndarray, np.ndarray]:
+        """Per-node score/hop buffers, grown with the graph and kept zeroed between queries"""
+        if len(self._best) < self.num_nodes:
+            size = max(self.num_nodes, 2 * len(self._best))
+            self._best = np.zeros(size)
+            self._hops = np.zeros(size, dtype=np.int32)
+        return self._best, self._hops
+
+    def _expand(self, nodes: np.ndarray, scores: np.ndarray, csr_nodes: int,
+                rel_filter: Optional[int]) -> Tuple[np.ndarray, np.ndarray]:
+        """Gather all out-edges of the frontier in one vectorized pass"""
+        in_csr = nodes < csr_nodes
+        csr_frontier, csr_scores = nodes[in_csr], scores[in_csr]
+        starts = self.indptr[csr_frontier]
+        lengths = self.indptr[csr_frontier + 1] - starts
+        total = int(lengths.sum())
+
+        if total:
+            offsets = np.repeat(starts - np.concatenate([[0], np.cumsum(lengths)[:-1]]), lengths)
+            edge_ids = offsets + np.arange(total)
+            dst = self.indices[edge_ids].astype(np.int64)
+            out = np.repeat(csr_scores, lengths) * self.weights[edge_ids]
+            if rel_filter is not None:
+                keep = self.rel_types[edge_ids] == rel_filter
+                dst, out = dst[keep], out[keep]
+        else:
+            dst, out = np.zeros(0, dtype=np.int64), np.zeros(0)
+
+        if self._delta:
+            extra_dst, extra_scores = [], []
+            for node, score in zip(nodes.tolist(), scores.tolist()):
+                for (target, rel), (weight, _) in self._delta.get(node, {}).items():
+                    if rel_filter is None or rel == rel_filter:
+                        extra_dst.append(target)
+                        extra_scores.append(score * weight)
+            if extra_dst:
+                dst = np.concatenate([dst, extra_dst])
+                out = np.concatenate([out, extra_scores])
+        return dst, out
+
+    @classmethod
+    def from_triples(cls, triples: Iterable[Tuple], compact_threshold: int = 1024) -> 'GraphSnapshot':
+        """Build from (subject, relationship, object[, weight[, count]]) tuples"""
+        snapshot = cls(compact_threshold=compact_threshold)
+        snapshot.compact_threshold = float('inf')  # bulk load into the delta, compact once
+        for triple in triples:
+            snapshot.add_edge(*triple)
+        snapshot.compact_threshold = compact_threshold
+        snapshot.compact()
+        return snapshot
+
+    @classmethod
+    def from_csv(cls, path: str = 'data/semantic_kg_triples.csv') -> 'GraphSnapshot':
+        """Build from a semantic_kg_triples.csv-shaped file"""
+        with open(path, newline='', encoding='utf-8') as f:
+            return cls.from_triples(
+                (row['subject'], row['predicate'], row['object'], float(row['weight'] or 1.0))
+                for row in csv.DictReader(f)
+            )
+
+    @classmethod
+    def from_backend(cls, backend) -> 'GraphSnapshot':
+        """Build from the edges currently held by a GraphBackend (Neo4j or in-memory)"""
+        return cls.from_triples(backend.all_triples())
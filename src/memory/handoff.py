@@ -0,0 +1,79 @@
+# memory/handoff.py
+from typing import Any, Dict, List, Optional, Sequence
+from datetime import datetime
+import json
+import uuid
+from memory.short_term import ShortTermMemory
+
+# Resolved lazily from the sender's short-term memory instead of being copied
+HISTORY_FIELD = 'conversation_history'
+HISTORY_SIZE = 10
+
+
+def _summary(from_agent: str, to_agent: str, context: Dict) -> str:
+    reason = context.get('summary') or context.get('issue') or context.get('category') or 'handoff'
+    return f"{from_agent} → {to_agent}: {reason}"
+
+
+class HandoffStore:
+    """Handoff contexts written once to the short-term store and passed around as handles.
+
+    Each top-level context key is its own JSON hash field, so a receiver
+    fetches only the fields it reads. The handle itself stays small: the
+    key, the field names, and the summary/confidence pair the action log
+    keeps for every handoff.
+    """
+
+    def __init__(self, short_term: ShortTermMemory, ttl_seconds: int = None, key_prefix: str = 'handoff'):
+        self.short_term = short_term
+        self.ttl = ttl_seconds or int(short_term.ttl.total_seconds())
+        self.key_prefix = key_prefix
+
+    async def _store(self):
+        await self.short_term.initialize()
+        return self.short_term.store
+
+    async def put(self, from_agent: str, to_agent: str, context: Dict[str, Any]) -> Dict[str, Any]:
+        """Write a context in one hash write and return its handle"""
+        if HISTORY_FIELD in context:
+            raise ValueError(f"'{HISTORY_FIELD}' is resolved from the sender's memory and can't be set")
+        handoff_id = str(uuid.uuid4())
+        key = f"{self.key_prefix}:{handoff_id}"
+        store = await self._store()
+        await store.hset(key, {name: json.dumps(value) for name, value in context.items()}, ttl=self.ttl)
+
+        confidence = context.get('confidence')
+        return {
+            'handoff_id': handoff_id,
+            'ref': key,
+            'from_agent': from_agent,
+            'to_agent': to_agent,
+            'fields': sorted(context),
+            'summary': _summary(from_agent, to_agent, context),
+            'confidence': float(confidence) if confidence is not None else None,
+            'timestamp': datetime.now().isoformat()
+        }
+
+    async def fetch(self, handle: Dict[str, Any], fields: Optional[Sequence[str]] = None) -> Dict[str, Any]:
+        """Resolve some or all of a handle's fields; raises ValueError once the context has expired"""
+        wanted: List[str] = list(handle.get('fields', [])) if fields is None else list(fields)
+        stored = [name for name in wanted if name != HISTORY_FIELD]
+        context: Dict[str, Any] = {}
+
+        if stored:
+            store = await self._store()
+            values = await store.hmget(handle['ref'], stored)
+            if all(value is None for value in values) and set(stored) & set(handle.get('fields', [])):
+                raise ValueError(f"Handoff context {handle['handoff_id']} has expired")
+            context = {name: json.loads(value) for name, value in zip(stored, values) if value is not None}
+
+        if HISTORY_FIELD in wanted:
+            context[HISTORY_FIELD] = await self.history(handle)
+        return context
+
+    async def history(self, handle: Dict[str, Any], n: int = HISTORY_SIZE) -> List[Dict]:
+        """The sender's recent short-term items up to the moment of the handoff"""
+        store = await self._store()
+        sender = ShortTermMemory(handle['from_agent'], backend=store)
+        items = await sender.get_recent(n=n)
+        return [item for item in items if item.get('timestamp', '') <= handle['timestamp']]
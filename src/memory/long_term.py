@@ -1,79 +1,281 @@
 # memory/long_term.py
-from typing import Dict, List, Optional
-from datetime import datetime
-from sqlalchemy import text
-from database.connection import db_manager
+from typing import Dict, List, Optional, Sequence, Tuple
+from datetime import datetime, timedelta
+from collections import Counter, defaultdict
+from memory.backends import LongTermBackend, get_long_term_backend
+from config import settings
+import asyncio
 import json
+import math
+import time
+
+# Columns callers may project in query(); anything else is rejected so the
+# column list can be interpolated into the SELECT safely.
+QUERYABLE_COLUMNS = (
+    'id', 'entity_id', 'entity_type', 'memory_type', 'data',
+    'importance_score', 'effective_importance', 'access_count', 'created_at', 'accessed_at'
+)
+
+# Each logged read adds a small, saturating bonus on top of the decayed score
+ACCESS_BOOST = 0.05
+
+def extract_profile_fields(data: Dict) -> Dict:
+    """Pull the preference fields tracked in entity_profiles out of a memory payload"""
+    data = data or {}
+    prefs = data.get('preferences') if isinstance(data.get('preferences'), dict) else {}
+
+    channel = data.get('channel') or data.get('preferred_channel') or prefs.get('channel')
+    if not channel:
+        channels = data.get('preferred_channels') or prefs.get('preferred_channels') or []
+        channel = channels[0] if channels else None
+
+    interests = data.get('interests') or prefs.get('interests') or []
+    if isinstance(interests, str):
+        interests = [interests]
+
+    return {
+        'channel': channel,
+        'time_preference': (data.get('time_preference') or data.get('best_contact_time')
+                            or prefs.get('best_contact_time')),
+        'content_type': data.get('content_type') or prefs.get('content_type'),
+        'interests': sorted({str(i) for i in interests})
+    }
+
+
+def decayed_importance(importance: float, last_used: datetime, access_count: int = 0,
+                       now: datetime = None, half_life_days: float = None) -> float:
+    """Exponentially decay importance by idle time, boosted by how often it was read"""
+    now = now or datetime.now()
+    half_life = half_life_days or settings.LTM_DECAY_HALF_LIFE_DAYS
+    idle_days = max((now - last_used).total_seconds(), 0) / 86400
+
+    score = (importance or 0.0) * 0.5 ** (idle_days / half_life)
+    score += ACCESS_BOOST * math.log1p(access_count or 0)
+    return round(min(max(score, 0.0), 1.0), 4)
+
+
+def _decode(data) -> Dict:
+    if isinstance(data, str):
+        try:
+            return json.loads(data)
+        except json.JSONDecodeError:
+            return {'raw': data}
+    return data or {}
+
+
+def summarize_memories(rows: List[Dict]) -> Dict:
+    """Fold a group of stale memories (and earlier summaries) into one summary payload"""
+    outcomes, solutions, problems = Counter(), Counter(), Counter()
+    interests = set()
+    merged = 0
+    channel = None
+    first_seen, last_seen = None, None
+
+    for row in sorted(rows, key=lambda r: r['created_at']):
+        data = _decode(row.get('data'))
+        if data.get('summary'):
+            merged += data.get('merged_count', 0)
+            outcomes.update(data.get('outcomes', {}))
+            solutions.update(data.get('solutions', {}))
+            problems.update(data.get('problems', {}))
+            interests.update(data.get('interests', []))
+            channel = data.get('channel') or channel
+            seen_from, seen_to = data.get('first_seen'), data.get('last_seen')
+        else:
+            merged += 1
+            for counter, key in ((outcomes, 'outcome'), (solutions, 'solution'), (problems, 'problem')):
+                if data.get(key) is not None:
+                    counter[str(data[key])] += 1
+            fields = extract_profile_fields(data)
+            interests.update(fields['interests'])
+            channel = fields['channel'] or channel
+            seen_from = seen_to = row['created_at'].isoformat()
+
+        first_seen = min(filter(None, (first_seen, seen_from)), default=None)
+        last_seen = max(filter(None, (last_seen, seen_to)), default=None)
+
+    return {
+        'summary': True,
+        'merged_count': merged,
+        'first_seen': first_seen,
+        'last_seen': last_seen,
+        'outcomes': dict(outcomes),
+        'solutions': dict(solutions.most_common(5)),
+        'problems': dict(problems.most_common(5)),
+        'channel': channel,
+        'interests': sorted(interests)
+    }
+
+
+async def compact_long_term_memory(min_age_days: int = None, threshold: float = None,
+                                   half_life_days: float = None, batch_size: int = 5000,
+                                   backend: LongTermBackend = None) -> Dict:
+    """Re-score old memories, merge low-importance ones per entity and archive the originals"""
+    backend = backend or get_long_term_backend()
+    min_age_days = min_age_days if min_age_days is not None else settings.LTM_COMPACTION_MIN_AGE_DAYS
+    threshold = threshold if threshold is not None else settings.LTM_COMPACTION_THRESHOLD
+    now = datetime.now()
+    stats = {'scanned': 0, 'rescored': 0, 'archived': 0, 'summaries': 0}
+    last_id = 0
+
+    while True:
+        rows = await backend.fetch_compaction_batch(now - timedelta(days=min_age_days), last_id, batch_size)
+        if not rows:
+            break
+        last_id = rows[-1]['id']
+        stats['scanned'] += len(rows)
+
+        rescored = []
+        stale: Dict[Tuple[str, str], List[Dict]] = defaultdict(list)
+        for row in rows:
+            score = decayed_importance(
+                row['importance_score'], max(row['created_at'], row['accessed_at'] or row['created_at']),
+                row['access_count'], now=now, half_life_days=half_life_days
+            )
+            if score < threshold:
+                stale[(row['entity_id'], row['entity_type'])].append(row)
+            else:
+                rescored.append({'id': row['id'], 'score': score})
+
+        summaries, archived_ids = [], []
+        for (entity_id, entity_type), group in stale.items():
+            # A lone summary row has nothing left to merge with
+            if len(group) == 1 and group[0]['memory_type'] == 'summary':
+                continue
+            summaries.append({
+                'entity_id': entity_id,
+                'entity_type': entity_type,
+                'data': summarize_memories(group),
+                'importance': max(r['importance_score'] or 0.0 for r in group),
+                'score': threshold
+            })
+            archived_ids.extend(r['id'] for r in group)
+
+        await backend.apply_compaction(rescored, archived_ids, summaries)
+        stats['rescored'] += len(rescored)
+        stats['archived'] += len(archived_ids)
+        stats['summaries'] += len(summaries)
+
+        if len(rows) < batch_size:
+            break
+
+    print(f"✅ Long-term memory compaction: {stats}")
+    return stats
+
 
 class LongTermMemory:
     """Persistent storage for customer history"""
     
-    def __init__(self, agent_id: str):
+    def __init__(self, agent_id: str, backend: LongTermBackend = None):
         self.agent_id = agent_id
+        self.backend = backend or get_long_term_backend()
+        # Reads are recorded here and written back in batches, never per query
+        self._pending_access: Counter = Counter()
+        self._last_access_flush = time.monotonic()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._flush_timer: Optional[asyncio.TimerHandle] = None
+
+    def _row(self, entity_id: str, entity_type: str, data: Dict, importance: float) -> Dict:
+        return {
+            'entity_id': entity_id,
+            'entity_type': entity_type,
+            'memory_type': self.agent_id,
+            'data': data,
+            'importance': importance,
+            # Keep the materialized profile in step with the raw history
+            'profile': extract_profile_fields(data)
+        }
     
     async def add(self, entity_id: str, entity_type: str, data: Dict, importance: float = 0.5):
         """Store item in long-term memory"""
-        async with db_manager.get_db_session() as session:
-            query = text("""
-                INSERT INTO long_term_memory 
-                (entity_id, entity_type, memory_type, data, importance_score, created_at, accessed_at)
-                VALUES (:entity_id, :entity_type, :memory_type, :data, :importance, NOW(), NOW())
-            """)
-            await session.execute(query, {
-                'entity_id': entity_id,
-                'entity_type': entity_type,
-                'memory_type': self.agent_id,
-                'data': json.dumps(data),
-                'importance': importance
-            })
+        await self.backend.insert([self._row(entity_id, entity_type, data, importance)])
     
-    async def query(self, entity_id: str, entity_type: str = None) -> List[Dict]:
-        """Query long-term memory"""
-        async with db_manager.get_db_session() as session:
-            if entity_type:
-                query = text("""
-                    SELECT * FROM long_term_memory 
-                    WHERE entity_id = :entity_id AND entity_type = :entity_type
-                    ORDER BY importance_score DESC, created_at DESC
-                    LIMIT 50
-                """)
-                result = await session.execute(query, {
-                    'entity_id': entity_id,
-                    'entity_type': entity_type
-                })
-            else:
-                query = text("""
-                    SELECT * FROM long_term_memory 
-                    WHERE entity_id = :entity_id
-                    ORDER BY importance_score DESC, created_at DESC
-                    LIMIT 50
-                """)
-                result = await session.execute(query, {'entity_id': entity_id})
-            
-            return [dict(row._mapping) for row in result]
+    async def query(self, entity_id: str, entity_type: str = None,
+                    columns: Optional[Sequence[str]] = None) -> List[Dict]:
+        """Query long-term memory, optionally fetching only the given columns"""
+        if columns:
+            unknown = set(columns) - set(QUERYABLE_COLUMNS)
+            if unknown:
+                raise ValueError(f"Unknown long_term_memory columns: {sorted(unknown)}")
+
+        rows = await self.backend.query(entity_id, entity_type, columns)
+        for row in rows:
+            if 'data' in row:
+                row['data'] = _decode(row['data'])
+
+        self._record_access(row['id'] for row in rows if 'id' in row)
+        return rows
+
+    async def count_many(self, entity_ids: Sequence[str], entity_type: str = None,
+                         limit: int = 50) -> Dict[str, int]:
+        """History size per entity for a whole batch, capped at query()'s row limit"""
+        counts = await self.backend.count_many(list(dict.fromkeys(entity_ids)), entity_type)
+        return {entity_id: min(counts.get(entity_id, 0), limit) for entity_id in entity_ids}
+
+    def _record_access(self, ids):
+        """Buffer read ids and schedule a background flush once the batch is due"""
+        self._pending_access.update(ids)
+        if not self._pending_access:
+            return
+
+        if not (self._flush_task and not self._flush_task.done()):
+            due = (len(self._pending_access) >= settings.LTM_ACCESS_FLUSH_SIZE or
+                   time.monotonic() - self._last_access_flush >= settings.LTM_ACCESS_FLUSH_INTERVAL)
+            if due:
+                self._flush_task = asyncio.create_task(self.flush_access())
+                return
+        # A partial batch is still written once the interval passes, even if reads stop
+        if self._flush_timer is None:
+            delay = settings.LTM_ACCESS_FLUSH_INTERVAL - (time.monotonic() - self._last_access_flush)
+            self._flush_timer = asyncio.get_running_loop().call_later(max(delay, 0), self._flush_timer_fired)
+
+    def _flush_timer_fired(self):
+        self._flush_timer = None
+        self._record_access(())
+
+    async def flush_access(self):
+        """Write buffered accessed_at/access_count updates in a single statement"""
+        pending, self._pending_access = self._pending_access, Counter()
+        self._last_access_flush = time.monotonic()
+        if not pending:
+            return
+
+        try:
+            await self.backend.record_access(dict(pending))
+        except Exception as e:
+            print(f"⚠️ Failed to flush long-term memory access stats: {e}")
+
+    async def close(self):
+        """Stop the flush timer and write the last partial batch of access updates"""
+        if self._flush_timer is not None:
+            self._flush_timer.cancel()
+            self._flush_timer = None
+        if self._flush_task is not None:
+            await self._flush_task
+        await self.flush_access()
+
+    async def get_profile(self, entity_id: str, entity_type: str = 'lead') -> Optional[Dict]:
+        """Fetch the materialized preference profile with a single primary-key lookup"""
+        return await self.backend.get_profile(entity_id, entity_type)
     
     # In src/memory/long_term.py
     async def bulk_add(self, items: List[Dict]):
-        """Bulk insert items efficiently within a single session."""
+        """Bulk insert items efficiently in one round-trip."""
         if not items:
             return
 
-        async with db_manager.get_db_session() as session:
-            # Prepare the data for a bulk insert
-            insert_data = []
-            for item in items:
-                insert_data.append({
-                    'entity_id': item.get('entity_id', 'unknown'),
-                    'entity_type': item.get('entity_type', 'interaction'),
-                    'memory_type': self.agent_id,
-                    'data': json.dumps(item.get('data', item)), # Use item itself if 'data' key is missing
-                    'importance': item.get('importance', 0.5)
-                })
-
-            query = text("""
-                INSERT INTO long_term_memory 
-                (entity_id, entity_type, memory_type, data, importance_score, created_at, accessed_at)
-                VALUES (:entity_id, :entity_type, :memory_type, :data, :importance, NOW(), NOW())
-            """)
-            
-            await session.execute(query, insert_data)
\ No newline at end of file
+        rows = []
+        for item in items:
+            data = item.get('data', item) # Use item itself if 'data' key is missing
+            rows.append(self._row(
+                item.get('entity_id', 'unknown'),
+                item.get('entity_type', 'interaction'),
+                data,
+                item.get('importance', 0.5)
+            ))
+
+        await self.backend.insert(rows)
+
+
+if __name__ == "__main__":
+    asyncio.run(compact_long_term_memory())
@@ -1,50 +1,116 @@
 # memory/semantic.py
-from typing import Dict, List
-from database.connection import db_manager
+from typing import Dict, List, Optional, Tuple
+import threading
+from memory.backends import GraphBackend, get_graph_backend
+from memory.graph_snapshot import GraphSnapshot
+from memory.serialization import flatten_properties
+from config import settings
+
+_shared_snapshot: Optional[GraphSnapshot] = None
+_snapshot_lock = threading.Lock()
+
+
+def get_shared_snapshot() -> GraphSnapshot:
+    """Process-wide graph snapshot, built once from SEMANTIC_SNAPSHOT_SOURCE or the graph backend"""
+    global _shared_snapshot
+    with _snapshot_lock:
+        if _shared_snapshot is None:
+            if settings.SEMANTIC_SNAPSHOT_SOURCE:
+                _shared_snapshot = GraphSnapshot.from_csv(settings.SEMANTIC_SNAPSHOT_SOURCE)
+            else:
+                _shared_snapshot = GraphSnapshot.from_backend(get_graph_backend())
+        return _shared_snapshot
 
 class SemanticMemory:
     """Domain knowledge graph"""
     
-    def __init__(self):
-        pass
+    def __init__(self, batch_size: int = None, flush_interval: float = None,
+                 snapshot: GraphSnapshot = None, backend: GraphBackend = None):
+        self.backend = backend or get_graph_backend()
+        self.batch_size = batch_size or settings.SEMANTIC_BATCH_SIZE
+        self.flush_interval = settings.SEMANTIC_FLUSH_INTERVAL if flush_interval is None else flush_interval
+        self._pending: Dict[Tuple[str, str, str], Dict] = {}
+        self._lock = threading.Lock()
+        self._timer: Optional[threading.Timer] = None
+        self._snapshot = snapshot
+
+    @property
+    def snapshot(self) -> Optional[GraphSnapshot]:
+        """In-memory read path, if one was given or SEMANTIC_SNAPSHOT_ENABLED is set"""
+        if self._snapshot is None and settings.SEMANTIC_SNAPSHOT_ENABLED:
+            self._snapshot = get_shared_snapshot()
+        return self._snapshot
     
-    def add_knowledge(self, entity: str, relationship: str, target: str, properties: Dict = None):
-        """Add knowledge to semantic network"""
-        with db_manager.get_neo4j_session() as session:
-            query = """
-            MERGE (a:Entity {name: $entity})
-            MERGE (b:Entity {name: $target})
-            MERGE (a)-[r:RELATES {
-                type: $relationship,
-                properties: $properties,
-                created_at: datetime()
-            }]->(b)
-            RETURN a, r, b
-            """
-            session.run(query,
-                entity=entity,
-                target=target,
-                relationship=relationship,
-                properties=str(properties or {})
-            )
+    def add_knowledge(self, entity: str, relationship: str, target: str, properties: Dict = None,
+                      weight: float = 1.0):
+        """Buffer a triple for the next batched write to the semantic network"""
+        row = {
+            'entity': entity,
+            'relationship': relationship,
+            'target': target,
+            'count': 1,
+            'weight_sum': float(weight),
+            'properties': flatten_properties(properties, prefix='prop_')
+        }
+        with self._lock:
+            self._merge_pending(row)
+            full = len(self._pending) >= self.batch_size
+            if not full and self._timer is None and self.flush_interval > 0:
+                self._timer = threading.Timer(self.flush_interval, self._timed_flush)
+                self._timer.start()
+
+        # The snapshot sees writes immediately; the graph store catches up on flush
+        if self.snapshot is not None:
+            self.snapshot.add_edge(entity, relationship, target, float(weight))
+
+        # Agents call this from the event loop; never block it on a graph round-trip
+        if full:
+            threading.Thread(target=self._timed_flush, daemon=True).start()
+
+    def _merge_pending(self, row: Dict):
+        """Collapse a row into the buffer, summing counts and weights per edge"""
+        key = (row['entity'], row['relationship'], row['target'])
+        pending = self._pending.get(key)
+        if pending is None:
+            self._pending[key] = row
+            return
+        pending['count'] += row['count']
+        pending['weight_sum'] += row['weight_sum']
+        pending['properties'].update(row['properties'])
+
+    def _timed_flush(self):
+        try:
+            self.flush()
+        except Exception as e:
+            print(f"⚠️ Semantic memory flush failed, will retry with the next batch: {e}")
+
+    def flush(self) -> int:
+        """Write all buffered triples in one batched backend call (a single UNWIND on Neo4j)"""
+        with self._lock:
+            rows = list(self._pending.values())
+            self._pending = {}
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+        if not rows:
+            return 0
+
+        try:
+            self.backend.merge_triples(rows)
+        except Exception:
+            # Put the batch back so a transient outage doesn't drop knowledge
+            with self._lock:
+                for row in rows:
+                    self._merge_pending(row)
+            raise
+        return len(rows)
     
-    def find_related(self, entity: str, relationship_type: str = None, depth: int = 2) -> List[Dict]:
+    def find_related(self, entity: str, relationship_type: str = None, depth: int = 2,
+                     limit: int = 20) -> List[Dict]:
         """Find related entities"""
-        with db_manager.get_neo4j_session() as session:
-            if relationship_type:
-                query = f"""
-                    MATCH path = (e:Entity {{name: $entity}})-[r*1..{depth}]->(related)
-                    WHERE ALL(rel in r WHERE rel.type = $rel_type)
-                    RETURN related, r
-                    LIMIT 20
-                    """
-                result = session.run(query, entity=entity, rel_type=relationship_type)
-            else:
-                query = f"""
-                MATCH path = (e:Entity {{name: $entity}})-[r:RELATES*1..{depth}]->(related)
-                RETURN related, r
-                LIMIT 20
-                """
-                result = session.run(query, entity=entity)
-            
-            return [dict(record) for record in result]
\ No newline at end of file
+        if self.snapshot is not None:
+            return self.snapshot.neighbors(entity, relationship_type, depth, limit)
+
+        self.flush()
+        return self.backend.find_related(entity, relationship_type, depth, limit)
@@ -0,0 +1,62 @@
+# memory/serialization.py
+from typing import Any, Dict
+from datetime import date, datetime
+import ast
+import json
+
+PRIMITIVES = (bool, int, float, str)
+
+
+def _property_value(value: Any):
+    """Coerce a value into something Neo4j can store as a property, or None to drop it"""
+    if value is None or isinstance(value, PRIMITIVES):
+        return value
+    if isinstance(value, (datetime, date)):
+        return value.isoformat()
+    if isinstance(value, (list, tuple, set)):
+        items = list(value)
+        # Neo4j only stores homogeneous lists of primitives
+        if items and all(isinstance(i, PRIMITIVES) for i in items) and len({type(i) for i in items}) == 1:
+            return items
+        return to_json(items)
+    return to_json(value)
+
+
+def flatten_properties(data: Dict, prefix: str = '', sep: str = '_') -> Dict:
+    """Flatten a nested dict into typed, queryable graph properties.
+
+    ``{'a': {'b': 1}}`` becomes ``{'<prefix>a_b': 1}``. Values Neo4j can't
+    hold natively (mixed lists, lists of maps) are stored as JSON strings.
+    """
+    flat = {}
+    for key, value in (data or {}).items():
+        name = f"{prefix}{key}"
+        if isinstance(value, dict):
+            flat.update(flatten_properties(value, f"{name}{sep}", sep))
+            continue
+        value = _property_value(value)
+        if value is not None:
+            flat[name] = value
+    return flat
+
+
+def to_json(data: Any) -> str:
+    """JSON-encode, stringifying anything the encoder doesn't know"""
+    return json.dumps(data, default=lambda o: o.isoformat() if isinstance(o, (datetime, date)) else str(o))
+
+
+def parse_metadata(value) -> Dict:
+    """Decode stored metadata: JSON, or a legacy ``str(dict)`` repr"""
+    if value is None:
+        return {}
+    if isinstance(value, dict):
+        return value
+    try:
+        return json.loads(value)
+    except (TypeError, ValueError):
+        pass
+    try:
+        parsed = ast.literal_eval(value)
+        return parsed if isinstance(parsed, dict) else {'value': parsed}
+    except (ValueError, SyntaxError):
+        return {'raw': value}
@@ -3,22 +3,23 @@ from typing import Dict, List, Optional
 from datetime import datetime, timedelta
 from collections import deque
 import json
-from database.connection import db_manager
+from memory.backends import ShortTermBackend, get_short_term_backend
 
 class ShortTermMemory:
     """Working memory for current conversations"""
     
-    def __init__(self, agent_id: str, max_size: int = 100, ttl_minutes: int = 60):
+    def __init__(self, agent_id: str, max_size: int = 100, ttl_minutes: int = 60,
+                 backend: ShortTermBackend = None):
         self.agent_id = agent_id
         self.max_size = max_size
         self.ttl = timedelta(minutes=ttl_minutes)
-        self.redis = None
+        self.store = backend
         self.key_prefix = f"stm:{agent_id}"
     
     async def initialize(self):
-        """Asynchronously initialize the Redis connection."""
-        if self.redis is None:
-            self.redis = await db_manager.get_redis()
+        """Resolve the configured store (Redis or in-process) on first use."""
+        if self.store is None:
+            self.store = get_short_term_backend()
     
     async def add(self, item: Dict):
         """Add item to short-term memory"""
@@ -26,16 +27,16 @@ class ShortTermMemory:
         item['timestamp'] = datetime.now().isoformat()
         item['agent_id'] = self.agent_id
         
-        # Store in Redis with TTL
+        # Store with TTL
         key = f"{self.key_prefix}:{item.get('id', datetime.now().timestamp())}"
-        await self.redis.setex(
+        await self.store.set(
             key,
-            int(self.ttl.total_seconds()),
-            json.dumps(item)
+            json.dumps(item),
+            int(self.ttl.total_seconds())
         )
         
         # Add to sorted set for ordering
-        await self.redis.zadd(
+        await self.store.zadd(
             f"{self.key_prefix}:index",
             {key: datetime.now().timestamp()}
         )
@@ -43,17 +44,36 @@ class ShortTermMemory:
         # Trim to max size
         await self._trim_to_size()
     
+    async def add_many(self, items: List[Dict]):
+        """Add a batch of items with one multi-set, one index update and one trim"""
+        if not items:
+            return
+        await self.initialize()
+        now = datetime.now()
+        values, scores = {}, {}
+        for i, item in enumerate(items):
+            item['timestamp'] = now.isoformat()
+            item['agent_id'] = self.agent_id
+            # Offset by position so same-instant items keep distinct keys and their order
+            key = f"{self.key_prefix}:{item.get('id', f'{now.timestamp()}-{i}')}"
+            values[key] = json.dumps(item)
+            scores[key] = now.timestamp() + i * 1e-6
+
+        await self.store.set_many(values, int(self.ttl.total_seconds()))
+        await self.store.zadd(f"{self.key_prefix}:index", scores)
+        await self._trim_to_size()
+    
     # In memory/short_term.py
 
     async def get_recent(self, n: int = 10) -> List[Dict]:
         """Get n most recent items asynchronously and efficiently."""
         await self.initialize()
-        keys = await self.redis.zrevrange(f"{self.key_prefix}:index", 0, n-1)
+        keys = await self.store.zrange(f"{self.key_prefix}:index", 0, n-1, desc=True)
         if not keys:
             return []
         
-        # Use mget to fetch all values in one network call
-        items_json = await self.redis.mget(keys)
+        # Use mget to fetch all values in one round-trip
+        items_json = await self.store.mget(keys)
         
         # Filter out potential None values if a key expired between zrevrange and mget
         return [json.loads(item) for item in items_json if item]
@@ -62,22 +82,22 @@ class ShortTermMemory:
     async def _trim_to_size(self):
         """Keep only max_size items asynchronously."""
         await self.initialize()
-        count = await self.redis.zcard(f"{self.key_prefix}:index")
+        count = await self.store.zcard(f"{self.key_prefix}:index")
         if count > self.max_size:
             # Get the keys of the oldest items
-            to_remove_keys = await self.redis.zrange(
+            to_remove_keys = await self.store.zrange(
                 f"{self.key_prefix}:index", 0, count - self.max_size - 1
             )
             if to_remove_keys:
                 # Use pipeline or transactions for atomicity in production
                 # but for now, just await them.
-                await self.redis.delete(*to_remove_keys)
-                await self.redis.zrem(f"{self.key_prefix}:index", *to_remove_keys)
+                await self.store.delete(*to_remove_keys)
+                await self.store.zrem(f"{self.key_prefix}:index", *to_remove_keys)
     
     async def should_consolidate(self) -> bool:
         """Check if consolidation is needed"""
         await self.initialize()
-        count = await self.redis.zcard(f"{self.key_prefix}:index")
+        count = await self.store.zcard(f"{self.key_prefix}:index")
         return count > self.max_size * 0.8
     
     async def get_important(self) -> List[Dict]:
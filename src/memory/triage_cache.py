@@ -0,0 +1,86 @@
+# memory/triage_cache.py
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+import asyncio
+import hashlib
+import json
+from memory.backends import ShortTermBackend
+from memory.short_term import ShortTermMemory
+from config import settings
+
+KEY_PREFIX = 'triage'
+
+
+def fingerprint(features: Dict[str, Any]) -> str:
+    """Stable digest of a lead's scoring features"""
+    payload = json.dumps(features, sort_keys=True, default=str)
+    return hashlib.blake2b(payload.encode(), digest_size=16).hexdigest()
+
+
+def _key(email: str) -> str:
+    return f"{KEY_PREFIX}:{email.strip().lower()}"
+
+
+async def invalidate_triage(store: ShortTermBackend, emails: Iterable[str]):
+    """Drop cached triage decisions for these leads (status change, new history)"""
+    keys = [_key(email) for email in dict.fromkeys(emails) if email]
+    if keys:
+        await store.delete(*keys)
+
+
+class TriageCache:
+    """Recent triage decisions per lead, reused while the lead is unchanged.
+
+    One hash per lead email holds the fingerprint of the features it was
+    scored on and the result. A repeat arrival with the same features is a
+    hit until the TTL runs out or the entry is invalidated, which happens
+    whenever the lead's status or stored history changes.
+    """
+
+    def __init__(self, short_term: ShortTermMemory, ttl_seconds: int = None):
+        self.short_term = short_term
+        self.ttl = settings.TRIAGE_CACHE_TTL if ttl_seconds is None else ttl_seconds
+
+    @property
+    def enabled(self) -> bool:
+        return self.ttl > 0
+
+    async def _store(self) -> ShortTermBackend:
+        await self.short_term.initialize()
+        return self.short_term.store
+
+    async def get(self, email: Optional[str], features: Dict[str, Any]) -> Optional[Dict]:
+        """Cached result for this lead, if it was triaged on identical features"""
+        return (await self.get_many([email], [features]))[0]
+
+    async def get_many(self, emails: Sequence[Optional[str]],
+                       features: Sequence[Dict[str, Any]]) -> List[Optional[Dict]]:
+        """Batch lookup in one round-trip; None for misses and leads without an email"""
+        if not self.enabled:
+            return [None] * len(emails)
+        known = [i for i, email in enumerate(emails) if email]
+        results: List[Optional[Dict]] = [None] * len(emails)
+        if not known:
+            return results
+
+        store = await self._store()
+        entries = await store.hgetall_many([_key(emails[i]) for i in known])
+        for i, entry in zip(known, entries):
+            if entry and entry.get('fingerprint') == fingerprint(features[i]):
+                results[i] = json.loads(entry['result'])
+        return results
+
+    async def put(self, email: Optional[str], features: Dict[str, Any], result: Dict[str, Any]):
+        if not self.enabled or not email:
+            return
+        store = await self._store()
+        await store.hset(_key(email), {
+            'fingerprint': fingerprint(features),
+            'result': json.dumps(result, default=str)
+        }, ttl=self.ttl)
+
+    async def put_many(self, entries: Sequence[Tuple[Optional[str], Dict[str, Any], Dict[str, Any]]]):
+        """Cache (email, features, result) triples; writes run concurrently"""
+        await asyncio.gather(*(self.put(email, features, result) for email, features, result in entries))
+
+    async def invalidate(self, *emails: str):
+        await invalidate_triage(await self._store(), emails)
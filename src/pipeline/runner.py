@@ -0,0 +1,190 @@
+# pipeline/runner.py
+"""Streaming triage → engagement → optimization pipeline.
+
+Each stage owns a bounded asyncio queue and a pool of workers. When a
+downstream queue is full, the upstream workers block on ``put`` and the
+feeder stops pulling from the lead source, so a slow stage throttles
+everything in front of it rather than buffering without limit.
+"""
+from typing import Any, AsyncIterable, Awaitable, Callable, Dict, List, Optional
+import asyncio
+import time
+from config import settings
+
+STAGES = ('triage', 'engagement', 'optimization')
+
+
+class StageStats:
+    """Counters for one pipeline stage"""
+
+    def __init__(self, name: str, queue: asyncio.Queue):
+        self.name = name
+        self.queue = queue
+        self.processed = 0
+        self.errors = 0
+        self.routed = 0
+        self.busy_seconds = 0.0
+        self.max_depth = 0
+
+    def observe_depth(self):
+        self.max_depth = max(self.max_depth, self.queue.qsize())
+
+    def snapshot(self, elapsed: float) -> Dict[str, Any]:
+        return {
+            'processed': self.processed,
+            'errors': self.errors,
+            'routed': self.routed,
+            'queue_depth': self.queue.qsize(),
+            'max_queue_depth': self.max_depth,
+            'throughput_per_s': round(self.processed / elapsed, 2) if elapsed > 0 else 0.0,
+            'avg_latency_ms': round(self.busy_seconds / self.processed * 1000, 2) if self.processed else 0.0
+        }
+
+
+class AgentPipeline:
+    """Runs leads through the three agents, routing on their handoff/escalation results"""
+
+    def __init__(self, triage_agent, engagement_agent, optimization_agent,
+                 workers: Optional[Dict[str, int]] = None, queue_size: int = None,
+                 triage_batch_size: int = None, report_interval: float = 0.0,
+                 on_result: Optional[Callable[[str, Dict], Awaitable[None]]] = None):
+        self.agents = {
+            'triage': triage_agent,
+            'engagement': engagement_agent,
+            'optimization': optimization_agent
+        }
+        self.workers = {
+            'triage': settings.PIPELINE_TRIAGE_WORKERS,
+            'engagement': settings.PIPELINE_ENGAGEMENT_WORKERS,
+            'optimization': settings.PIPELINE_OPTIMIZATION_WORKERS,
+            **(workers or {})
+        }
+        if any(count < 1 for count in self.workers.values()):
+            raise ValueError(f"Every stage needs at least one worker: {self.workers}")
+        self.queue_size = queue_size or settings.PIPELINE_QUEUE_SIZE
+        self.triage_batch_size = triage_batch_size or settings.PIPELINE_TRIAGE_BATCH_SIZE
+        self.report_interval = report_interval
+        self.on_result = on_result
+
+        self.queues = {stage: asyncio.Queue(maxsize=self.queue_size) for stage in STAGES}
+        self.stats = {stage: StageStats(stage, self.queues[stage]) for stage in STAGES}
+        self.fed = 0
+        self._started: Optional[float] = None
+
+        # Engagement escalates after its queued sends complete, outside process()
+        if hasattr(engagement_agent, 'on_escalation'):
+            engagement_agent.on_escalation = self._escalate
+
+    def snapshot(self) -> Dict[str, Any]:
+        """Per-stage throughput, latency and queue depth so far"""
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+        return {
+            'elapsed_s': round(elapsed, 3),
+            'fed': self.fed,
+            'stages': {stage: stats.snapshot(elapsed) for stage, stats in self.stats.items()}
+        }
+
+    async def run(self, source: AsyncIterable[Dict]) -> Dict[str, Any]:
+        """Feed every lead from source through the pipeline, returning the final stats"""
+        self._started = time.perf_counter()
+        tasks = [
+            asyncio.create_task(self._worker(stage))
+            for stage in STAGES for _ in range(self.workers[stage])
+        ]
+        reporter = asyncio.create_task(self._report()) if self.report_interval > 0 else None
+        try:
+            async for lead in source:
+                await self._put('triage', lead)
+                self.fed += 1
+            # Upstream workers enqueue before marking their item done, so joining
+            # the stages in order (and any work an agent deferred) drains everything
+            for stage in STAGES:
+                await self.queues[stage].join()
+                drain = getattr(self.agents[stage], 'drain', None)
+                if drain:
+                    await drain()
+        finally:
+            for task in tasks + ([reporter] if reporter else []):
+                task.cancel()
+            await asyncio.gather(*tasks, *([reporter] if reporter else []), return_exceptions=True)
+            # Agents with background workers of their own stop them too
+            for stage in STAGES:
+                close = getattr(self.agents[stage], 'close', None)
+                if close:
+                    await close()
+
+        stats = self.snapshot()
+        self._print(stats, final=True)
+        return stats
+
+    async def _put(self, stage: str, item: Dict):
+        await self.queues[stage].put(item)
+        self.stats[stage].observe_depth()
+
+    async def _worker(self, stage: str):
+        queue = self.queues[stage]
+        while True:
+            items = [await queue.get()]
+            if stage == 'triage':
+                while len(items) < self.triage_batch_size and not queue.empty():
+                    items.append(queue.get_nowait())
+            try:
+                await self._handle(stage, items)
+            except Exception as e:
+                # A bad lead must not take the worker down with it
+                self.stats[stage].errors += len(items)
+                print(f"⚠️ Pipeline {stage} stage failed on {len(items)} item(s): {e}")
+            finally:
+                for _ in items:
+                    queue.task_done()
+
+    async def _handle(self, stage: str, items: List[Dict]):
+        stats = self.stats[stage]
+        agent = self.agents[stage]
+        started = time.perf_counter()
+        try:
+            if stage == 'triage' and len(items) > 1:
+                results = await agent.process_batch(items)
+            else:
+                results = [await agent.process(item) for item in items]
+        finally:
+            stats.busy_seconds += time.perf_counter() - started
+        stats.processed += len(results)
+        # A batch reports a failed handoff on its lead rather than failing the whole batch
+        stats.errors += sum(1 for result in results if result.get('handoff_error'))
+
+        for result in results:
+            if self.on_result:
+                await self.on_result(stage, result)
+            routed = self._route(stage, result)
+            if routed is not None:
+                stats.routed += 1
+                await self._put(*routed)
+
+    @staticmethod
+    def _route(stage: str, result: Dict):
+        """Next (stage, input) for a result; the handoff handle is resolved by the receiving agent"""
+        if stage == 'triage' and result.get('handoff'):
+            return 'engagement', result['handoff']
+        if stage == 'engagement' and result.get('escalation'):
+            return 'optimization', result['escalation']
+        return None
+
+    async def _escalate(self, handoff: Dict):
+        self.stats['engagement'].routed += 1
+        await self._put('optimization', handoff)
+
+    async def _report(self):
+        while True:
+            await asyncio.sleep(self.report_interval)
+            self._print(self.snapshot())
+
+    @staticmethod
+    def _print(stats: Dict[str, Any], final: bool = False):
+        stages = '  '.join(
+            f"{stage}: {s['processed']} done, {s['throughput_per_s']}/s, queue {s['queue_depth']} "
+            f"(max {s['max_queue_depth']}), {s['errors']} errors"
+            for stage, s in stats['stages'].items()
+        )
+        prefix = "✅ Pipeline finished" if final else "📈 Pipeline"
+        print(f"{prefix} [{stats['elapsed_s']}s, {stats['fed']} fed] {stages}")
@@ -0,0 +1,293 @@
+# pipeline/supervisor.py
+"""Multi-process agent workers behind a consistent-hash shard router.
+
+Each worker process runs its own event loop, MCP client, memory
+connections and AgentPipeline, fed from a bounded multiprocessing queue.
+Leads are routed by a consistent hash of their email (or id), so one
+lead always lands on the same process and its short-term memory stays
+local to it. Each process triages with a single worker, so a lead's
+events are also handled strictly in arrival order; triage throughput
+scales with the number of processes.
+"""
+from typing import Any, AsyncIterable, Callable, Dict, List, Optional, Tuple
+import asyncio
+import bisect
+import hashlib
+import multiprocessing as mp
+import os
+import queue
+import threading
+import time
+from config import settings
+from pipeline.runner import STAGES, AgentPipeline
+
+
+class HashRing:
+    """Consistent hash ring; adding a shard only moves ~1/N of the keys"""
+
+    def __init__(self, shards: int, replicas: int = 64):
+        points = sorted(
+            (self._hash(f"shard-{shard}#{replica}"), shard)
+            for shard in range(shards) for replica in range(replicas)
+        )
+        self._keys = [point for point, _ in points]
+        self._shards = [shard for _, shard in points]
+
+    @staticmethod
+    def _hash(key: str) -> int:
+        return int.from_bytes(hashlib.blake2b(key.encode(), digest_size=8).digest(), 'big')
+
+    def shard_for(self, key: str) -> int:
+        index = bisect.bisect(self._keys, self._hash(key)) % len(self._keys)
+        return self._shards[index]
+
+
+def lead_key(lead: Dict) -> str:
+    """Routing key: email when known (CSV leads have no database id), else id"""
+    return str(lead.get('email') or lead.get('id') or lead.get('external_id') or '')
+
+
+def default_agents() -> Tuple[Any, List]:
+    """MCP client and the three pipeline agents, built inside the worker process"""
+    from mcp.client import MCPClient
+    from agents.lead_triage.agent import LeadTriageAgent
+    from agents.engagement.agent import EngagementAgent
+    from agents.campaign_optimization.agent import CampaignOptimizationAgent
+
+    client = MCPClient()
+    return client, [LeadTriageAgent(client), EngagementAgent(client), CampaignOptimizationAgent(client)]
+
+
+async def _inbox_source(inbox, poll_interval: float = 0.005) -> AsyncIterable[Dict]:
+    # Poll rather than block in an executor thread: a worker that crashes while a thread
+    # waits in get() never releases the queue's shared read lock, and its replacement
+    # could then never read the inbox again
+    while True:
+        try:
+            lead = inbox.get_nowait()
+        except queue.Empty:
+            await asyncio.sleep(poll_interval)
+            continue
+        if lead is None:
+            return
+        yield lead
+
+
+async def _serve(shard: int, generation: int, inbox, outbox, agent_factory: Callable,
+                 pipeline_options: Dict, stats_interval: float):
+    client, agents = agent_factory()
+    pipeline = AgentPipeline(*agents, **pipeline_options)
+
+    async def report():
+        while True:
+            await asyncio.sleep(stats_interval)
+            outbox.put(('stats', shard, generation, pipeline.snapshot()))
+
+    reporter = asyncio.create_task(report())
+    try:
+        stats = await pipeline.run(_inbox_source(inbox))
+    finally:
+        reporter.cancel()
+        if hasattr(client, 'close'):
+            await client.close()
+    outbox.put(('done', shard, generation, stats))
+
+
+def _worker_main(shard: int, generation: int, inbox, outbox, agent_factory: Callable,
+                 pipeline_options: Dict, stats_interval: float):
+    asyncio.run(_serve(shard, generation, inbox, outbox, agent_factory, pipeline_options, stats_interval))
+
+
+class ShardedSupervisor:
+    """Runs N agent worker processes, restarts crashed ones and aggregates their stats"""
+
+    def __init__(self, num_workers: int = None, agent_factory: Callable = default_agents,
+                 pipeline_options: Optional[Dict] = None, inbox_size: int = None,
+                 stats_interval: float = 1.0, max_restarts: int = 5):
+        self.num_workers = num_workers or settings.PIPELINE_PROCESSES or os.cpu_count() or 1
+        self.agent_factory = agent_factory
+        options = pipeline_options or {}
+        # Several triage workers in one process could reorder a lead's events
+        self.pipeline_options = {**options, 'workers': {**options.get('workers', {}), 'triage': 1}}
+        self.stats_interval = stats_interval
+        self.max_restarts = max_restarts
+        self.ring = HashRing(self.num_workers)
+
+        # spawn: workers must not inherit the parent's event loop, driver threads or sockets
+        self._ctx = mp.get_context('spawn')
+        size = inbox_size or settings.PIPELINE_INBOX_SIZE
+        self.inboxes = [self._ctx.Queue(maxsize=size) for _ in range(self.num_workers)]
+        self.outbox = self._ctx.Queue()
+        self.processes: List[Optional[mp.Process]] = [None] * self.num_workers
+        self.generations = [0] * self.num_workers
+        self.restarts = 0
+        self.failed = set()
+        self.submitted = [0] * self.num_workers
+        # Leads routed to a shard after it hit the restart limit; nothing would ever read them
+        self.dropped = [0] * self.num_workers
+
+        self._snapshots: Dict[Tuple[int, int], Dict] = {}
+        self._lock = threading.Lock()
+        self._closing = threading.Event()
+        self._stopping = threading.Event()
+        self._monitor: Optional[threading.Thread] = None
+        self._started: Optional[float] = None
+
+    def start(self):
+        self._started = time.perf_counter()
+        for shard in range(self.num_workers):
+            self._spawn(shard)
+        self._monitor = threading.Thread(target=self._watch, daemon=True)
+        self._monitor.start()
+        print(f"✅ Supervisor started {self.num_workers} agent worker processes")
+
+    def _spawn(self, shard: int):
+        process = self._ctx.Process(
+            target=_worker_main, name=f"agent-worker-{shard}",
+            args=(shard, self.generations[shard], self.inboxes[shard], self.outbox,
+                  self.agent_factory, self.pipeline_options, self.stats_interval),
+            daemon=True
+        )
+        process.start()
+        self.processes[shard] = process
+
+    def shard_for(self, lead: Dict) -> int:
+        return self.ring.shard_for(lead_key(lead))
+
+    def _put(self, shard: int, item: Optional[Dict], deadline: Optional[float] = None) -> bool:
+        """Block until item is queued for shard; False once the shard has failed or deadline passes"""
+        while shard not in self.failed:
+            try:
+                self.inboxes[shard].put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                if deadline is not None and time.monotonic() >= deadline:
+                    return False
+        return False
+
+    def _count(self, shard: int, queued: bool):
+        if queued:
+            self.submitted[shard] += 1
+        else:
+            self.dropped[shard] += 1
+
+    def submit(self, lead: Dict):
+        """Route a lead to its shard, blocking while that shard's inbox is full (dropped if it failed)"""
+        shard = self.shard_for(lead)
+        self._count(shard, self._put(shard, lead))
+
+    async def run(self, source: AsyncIterable[Dict]) -> Dict[str, Any]:
+        """Start the workers, feed every lead from source, then drain and stop"""
+        self.start()
+        try:
+            async for lead in source:
+                shard = self.shard_for(lead)
+                if shard in self.failed:
+                    queued = False
+                else:
+                    try:
+                        self.inboxes[shard].put_nowait(lead)
+                        queued = True
+                    except queue.Full:
+                        # Backpressure from a busy shard, without blocking the event loop
+                        queued = await asyncio.to_thread(self._put, shard, lead)
+                self._count(shard, queued)
+        finally:
+            await asyncio.to_thread(self.stop)
+        stats = self.stats()
+        print(f"✅ Supervisor finished: {stats['processed']} leads triaged by {self.num_workers} "
+              f"workers in {stats['elapsed_s']}s ({stats['throughput_per_s']}/s, {self.restarts} restarts)")
+        if stats['dropped']:
+            print(f"⚠️ {stats['dropped']} leads dropped for failed workers {sorted(self.failed)}")
+        return stats
+
+    def stop(self, timeout: float = 60.0):
+        """Ask every worker to finish its queue, then wait for them"""
+        deadline = time.monotonic() + timeout
+        self._closing.set()
+        # A failed shard has no reader, and a stuck one is terminated below once the deadline passes
+        for shard in range(self.num_workers):
+            self._put(shard, None, deadline)
+        for shard in range(self.num_workers):
+            # A worker may be restarted while we wait, so re-read the slot each time
+            while time.monotonic() < deadline:
+                process = self.processes[shard]
+                process.join(timeout=0.1)
+                # A crashed worker is about to be replaced; only a clean exit means drained
+                if process is self.processes[shard] and (process.exitcode == 0 or shard in self.failed):
+                    break
+        self._stopping.set()
+        if self._monitor:
+            self._monitor.join()
+        for shard, process in enumerate(self.processes):
+            if process.is_alive():
+                print(f"⚠️ Worker {shard} did not stop in time; terminating")
+                process.terminate()
+        self._drain_outbox()
+
+    def _watch(self):
+        while not self._stopping.is_set():
+            self._drain_outbox(timeout=0.2)
+            for shard, process in enumerate(self.processes):
+                if shard not in self.failed and process.exitcode not in (None, 0):
+                    self._restart(shard, process.exitcode)
+
+    def _restart(self, shard: int, exitcode: int):
+        if self.restarts >= self.max_restarts:
+            print(f"❌ Worker {shard} exited with {exitcode}; restart limit reached, dropping its leads")
+            self.failed.add(shard)
+            # Don't let interpreter exit wait to flush leads into a pipe nobody reads
+            self.inboxes[shard].cancel_join_thread()
+            return
+        self.restarts += 1
+        self.generations[shard] += 1
+        print(f"⚠️ Worker {shard} exited with {exitcode}; restarting (generation {self.generations[shard]})")
+        # The new process picks up the same inbox; only the lead(s) in flight are lost
+        self._spawn(shard)
+        if self._closing.is_set():
+            # The crashed process may have taken the stop sentinel with it. If the inbox is
+            # full it still holds leads, and the sentinel queued behind them
+            try:
+                self.inboxes[shard].put_nowait(None)
+            except queue.Full:
+                pass
+
+    def _drain_outbox(self, timeout: float = 0.0):
+        while True:
+            try:
+                kind, shard, generation, snapshot = self.outbox.get(timeout=timeout) if timeout \
+                    else self.outbox.get_nowait()
+            except queue.Empty:
+                return
+            with self._lock:
+                self._snapshots[(shard, generation)] = snapshot
+            timeout = 0.0
+
+    def stats(self) -> Dict[str, Any]:
+        """Totals across shards (including crashed generations' last report)"""
+        with self._lock:
+            snapshots = dict(self._snapshots)
+        elapsed = time.perf_counter() - self._started if self._started else 0.0
+        stages = {}
+        for stage in STAGES:
+            per_shard = [s['stages'][stage] for s in snapshots.values()]
+            stages[stage] = {
+                key: sum(s[key] for s in per_shard)
+                for key in ('processed', 'errors', 'routed', 'queue_depth')
+            }
+        processed = stages['triage']['processed']
+        return {
+            'elapsed_s': round(elapsed, 3),
+            'workers': self.num_workers,
+            'restarts': self.restarts,
+            'submitted': sum(self.submitted),
+            'dropped': sum(self.dropped),
+            'processed': processed,
+            'throughput_per_s': round(processed / elapsed, 2) if elapsed > 0 else 0.0,
+            'per_shard': {
+                shard: sum(s['stages']['triage']['processed'] for (sh, _), s in snapshots.items() if sh == shard)
+                for shard in range(self.num_workers)
+            },
+            'stages': stages
+        }
+
@@ -0,0 +1,235 @@
+# scheduling/follow_ups.py
+"""Durable delayed jobs for follow-up sequences.
+
+Jobs live in the short-term store (Redis in production): a sorted set of
+job ids by due time, a hash of job payloads and a per-lead index used to
+cancel a lead's pending follow-ups. Scheduling is a constant number of
+writes however many jobs are pending. Each worker loads jobs due within
+``horizon`` seconds into an in-memory timer wheel and, as they expire,
+claims them in batches by removing them from the due set; a job removed
+by one worker can't be claimed by another, so nothing fires twice.
+A claim moves the job from the due set to the lease set in one atomic
+step, and the lease is only released once the handler reports the
+follow-up as sent. A failed send, a handler that outlives its lease or a
+worker that dies mid-job leaves the lease to expire and the job is
+re-queued (at least once delivery).
+"""
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence
+from datetime import datetime
+import asyncio
+import json
+import re
+import time
+import uuid
+from memory.backends import ShortTermBackend, get_short_term_backend
+from scheduling.timer_wheel import TimerWheel
+from config import settings
+
+DUE_KEY = 'followup:due'
+LEASE_KEY = 'followup:leased'
+JOBS_KEY = 'followup:jobs'
+LEAD_KEY_PREFIX = 'followup:lead'
+
+OFFSET_UNITS = {'minute': 60, 'hour': 3600, 'day': 86400, 'week': 604800}
+_OFFSET = re.compile(r'^(minute|hour|day|week)s?_(\d+)$')
+
+
+def parse_offset(step: str) -> int:
+    """Seconds after the first send for a template step such as 'day_3'"""
+    match = _OFFSET.match(step.strip().lower())
+    if not match:
+        raise ValueError(f"Unknown follow-up step '{step}' (expected e.g. 'day_3' or 'hour_12')")
+    return OFFSET_UNITS[match.group(1)] * int(match.group(2))
+
+
+def _lead_key(email: str) -> str:
+    return f"{LEAD_KEY_PREFIX}:{email.strip().lower()}"
+
+
+async def cancel_follow_ups(store: ShortTermBackend, emails: Iterable[str]) -> int:
+    """Drop every pending follow-up for these leads (e.g. once they convert); returns the count"""
+    cancelled = 0
+    for email in dict.fromkeys(email for email in emails if email):
+        key = _lead_key(email)
+        job_ids = list(await store.hgetall(key))
+        if not job_ids:
+            continue
+        cancelled += len(await store.zclaim(DUE_KEY, job_ids))
+        await store.hdel(JOBS_KEY, *job_ids)
+        await store.delete(key)
+    return cancelled
+
+
+class FollowUpScheduler:
+    """Schedules follow-up jobs and fires them through `handler` when they fall due.
+
+    The handler returns the send's result: a job is done once its status is
+    'sent' (or the handler returns None), and stays leased for a retry otherwise.
+    """
+
+    def __init__(self, handler: Callable[[Dict[str, Any]], Awaitable[None]], store: ShortTermBackend = None,
+                 horizon: float = None, poll_interval: float = None, lease_seconds: float = None,
+                 batch_size: int = None, prefetch: int = None, tick: float = None,
+                 clock: Callable[[], float] = time.time):
+        self.handler = handler
+        self.store = store
+        self.horizon = horizon or settings.FOLLOW_UP_HORIZON
+        self.poll_interval = poll_interval or settings.FOLLOW_UP_POLL_INTERVAL
+        self.lease_seconds = lease_seconds or settings.FOLLOW_UP_LEASE_SECONDS
+        self.batch_size = batch_size or settings.FOLLOW_UP_BATCH_SIZE
+        self.prefetch = prefetch or settings.FOLLOW_UP_PREFETCH
+        self.clock = clock
+        self.wheel = TimerWheel(tick=tick or settings.FOLLOW_UP_TICK, start=clock())
+        self._running = False
+        self._stopped: Optional[asyncio.Event] = None
+        self.stats = {'scheduled': 0, 'fired': 0, 'failed': 0, 'recovered': 0, 'lost_claims': 0}
+
+    def _store(self) -> ShortTermBackend:
+        if self.store is None:
+            self.store = get_short_term_backend()
+        return self.store
+
+    async def schedule(self, email: str, due: float, payload: Dict[str, Any], step: str = None) -> str:
+        """Schedule one job at `due` (epoch seconds); returns its id"""
+        return (await self._enqueue(email, [(step, due)], payload))[0]
+
+    async def schedule_sequence(self, email: str, steps: Sequence[str], payload: Dict[str, Any],
+                                start: float = None) -> List[str]:
+        """Schedule a template's follow-up steps ('day_3', ...) relative to `start` (default now)"""
+        start = self.clock() if start is None else start
+        return await self._enqueue(email, [(step, start + parse_offset(step)) for step in steps], payload)
+
+    async def _enqueue(self, email: str, steps: Sequence[tuple], payload: Dict[str, Any]) -> List[str]:
+        if not email:
+            raise ValueError("Follow-ups need a lead email to be cancellable")
+        jobs = {}
+        for step, due in steps:
+            job_id = uuid.uuid4().hex
+            jobs[job_id] = {
+                'job_id': job_id,
+                'email': email,
+                'step': step,
+                'due': due,
+                'scheduled_at': datetime.now().isoformat(),
+                'payload': payload
+            }
+        if not jobs:
+            return []
+
+        # Three writes per sequence regardless of how many jobs are already pending
+        store = self._store()
+        await store.hset(JOBS_KEY, {job_id: json.dumps(job, default=str) for job_id, job in jobs.items()})
+        await store.hset(_lead_key(email), {job_id: str(job['due']) for job_id, job in jobs.items()})
+        await store.zadd(DUE_KEY, {job_id: job['due'] for job_id, job in jobs.items()})
+        self.stats['scheduled'] += len(jobs)
+        return list(jobs)
+
+    async def cancel_lead(self, email: str) -> int:
+        return await cancel_follow_ups(self._store(), [email])
+
+    async def poll(self):
+        """Re-queue jobs whose lease ran out, then load jobs due within the horizon into the wheel"""
+        store = self._store()
+        now = self.clock()
+
+        expired = await store.zrangebyscore(LEASE_KEY, float('-inf'), now, limit=self.batch_size)
+        recovered = await store.zmove(LEASE_KEY, DUE_KEY, [job_id for job_id, _ in expired], now)
+        if recovered:
+            self.stats['recovered'] += len(recovered)
+            print(f"♻️ Re-queued {len(recovered)} follow-up(s) whose worker didn't finish them")
+
+        room = self.prefetch - len(self.wheel)
+        if room <= 0:
+            return
+        upcoming = await store.zrangebyscore(DUE_KEY, float('-inf'), now + self.horizon, limit=self.prefetch)
+        for job_id, due in upcoming:
+            if room <= 0:
+                break
+            if job_id not in self.wheel:
+                self.wheel.add(job_id, due)
+                room -= 1
+
+    async def fire_due(self) -> int:
+        """Claim and run the jobs the wheel says are due; returns how many ran"""
+        due = [job_id for job_id, _ in self.wheel.advance(self.clock())]
+        fired = 0
+        for start in range(0, len(due), self.batch_size):
+            fired += await self._fire_batch(due[start:start + self.batch_size])
+        return fired
+
+    async def _fire_batch(self, job_ids: List[str]) -> int:
+        store = self._store()
+        claimed = await store.zmove(DUE_KEY, LEASE_KEY, job_ids, self.clock() + self.lease_seconds)
+        # Jobs another worker claimed first, or that were cancelled since loading
+        self.stats['lost_claims'] += len(job_ids) - len(claimed)
+        if not claimed:
+            return 0
+        payloads = await store.hmget(JOBS_KEY, claimed)
+
+        jobs = [json.loads(raw) for raw in payloads if raw is not None]
+        results = await asyncio.gather(*(self._run_handler(job) for job in jobs), return_exceptions=True)
+
+        done = [job_id for job_id, raw in zip(claimed, payloads) if raw is None]
+        finished = []
+        for job, result in zip(jobs, results):
+            if isinstance(result, dict) and result.get('status') != 'sent':
+                result = RuntimeError(f"send {result.get('status')}: {result.get('error', 'not delivered')}")
+            if isinstance(result, Exception):
+                # The lease stays, so the job is retried once it expires
+                self.stats['failed'] += 1
+                print(f"⚠️ Follow-up {job['step']} for {job['email']} failed: {result}")
+            else:
+                finished.append(job)
+        await self._complete(done + [job['job_id'] for job in finished], finished)
+        self.stats['fired'] += len(finished)
+        return len(finished)
+
+    async def _run_handler(self, job: Dict[str, Any]) -> Optional[Dict[str, Any]]:
+        """The handler's send result; a handler still running when the lease ends is abandoned"""
+        try:
+            return await asyncio.wait_for(self.handler(job), self.lease_seconds)
+        except asyncio.TimeoutError:
+            raise TimeoutError(f"no send result within the {self.lease_seconds}s lease") from None
+
+    async def _complete(self, job_ids: List[str], jobs: List[Dict[str, Any]]):
+        if not job_ids:
+            return
+        store = self._store()
+        await store.zrem(LEASE_KEY, *job_ids)
+        await store.hdel(JOBS_KEY, *job_ids)
+        by_lead: Dict[str, List[str]] = {}
+        for job in jobs:
+            by_lead.setdefault(job['email'], []).append(job['job_id'])
+        for email, ids in by_lead.items():
+            await store.hdel(_lead_key(email), *ids)
+
+    async def pending(self) -> Dict[str, int]:
+        store = self._store()
+        return {'due': await store.zcard(DUE_KEY), 'leased': await store.zcard(LEASE_KEY),
+                'in_wheel': len(self.wheel)}
+
+    async def run(self, until: Optional[Callable[[], bool]] = None):
+        """Poll and fire until stop() is called (or `until` returns True)"""
+        self._running = True
+        self._stopped = asyncio.Event()
+        next_poll = 0.0
+        try:
+            while self._running and not (until and until()):
+                now = self.clock()
+                if now >= next_poll:
+                    await self.poll()
+                    next_poll = now + self.poll_interval
+                await self.fire_due()
+                await asyncio.sleep(self.wheel.tick)
+        finally:
+            self._running = False
+            self._stopped.set()
+
+    def stop(self):
+        self._running = False
+
+    async def close(self):
+        """Stop run() and wait for the jobs it is firing to finish"""
+        self.stop()
+        if self._stopped is not None:
+            await self._stopped.wait()
@@ -0,0 +1,126 @@
+# scheduling/timer_wheel.py
+from typing import Dict, Hashable, List, Sequence, Tuple
+import math
+import time
+
+READY = -1
+
+
+class TimerWheel:
+    """Hierarchical timing wheel: O(1) add and cancel, expiry work proportional to what's due.
+
+    Level 0 has one slot per tick and each higher level's slot spans a
+    full revolution of the level below. A timer goes into the finest level
+    that can hold it and cascades down as its slot comes round, so it never
+    fires before its due time and at most one tick after it. Timers beyond
+    the top level wait in an overflow map until they come into range.
+    """
+
+    def __init__(self, tick: float = 0.1, slots: Sequence[int] = (256, 64, 64), start: float = None):
+        if tick <= 0 or not slots or min(slots) < 2:
+            raise ValueError("Timer wheel needs a positive tick and at least one level of 2+ slots")
+        self.tick = float(tick)
+        self._sizes = tuple(int(n) for n in slots)
+        self._spans = [1]
+        for size in self._sizes[:-1]:
+            self._spans.append(self._spans[-1] * size)
+        self._levels: List[List[Dict[Hashable, Tuple[int, float]]]] = [[{} for _ in range(n)] for n in self._sizes]
+        self._counts = [0] * len(self._sizes)
+        self._ready: Dict[Hashable, float] = {}
+        self._overflow: Dict[Hashable, Tuple[int, float]] = {}
+        self._where: Dict[Hashable, Tuple[int, int]] = {}
+        self._now = math.floor((time.time() if start is None else start) / self.tick)
+
+    def __len__(self) -> int:
+        return len(self._where)
+
+    def __contains__(self, key: Hashable) -> bool:
+        return key in self._where
+
+    def add(self, key: Hashable, due: float):
+        """Schedule key for `due` (seconds on the clock passed to advance); re-adding reschedules"""
+        self.cancel(key)
+        self._place(key, math.ceil(due / self.tick), due)
+
+    def cancel(self, key: Hashable) -> bool:
+        location = self._where.pop(key, None)
+        if location is None:
+            return False
+        level, slot = location
+        if level == READY:
+            del self._ready[key]
+        elif level == len(self._sizes):
+            del self._overflow[key]
+        else:
+            del self._levels[level][slot][key]
+            self._counts[level] -= 1
+        return True
+
+    def advance(self, now: float) -> List[Tuple[Hashable, float]]:
+        """Move the wheel to `now` and return the (key, due) pairs that expired, earliest first"""
+        target = math.floor(now / self.tick)
+        while self._now < target:
+            level = next((i for i, count in enumerate(self._counts) if count), None)
+            if level is None and not self._overflow:
+                self._now = target
+                break
+            if level != 0:
+                # Nothing can expire before the next boundary of the finest occupied level
+                span = self._spans[-1] if level is None else self._spans[level]
+                self._now = min(target - 1, (self._now // span + 1) * span - 1)
+            self._tick()
+
+        if not self._ready:
+            return []
+        expired = sorted(self._ready.items(), key=lambda item: item[1])
+        for key, _ in expired:
+            del self._where[key]
+        self._ready = {}
+        return expired
+
+    def _place(self, key: Hashable, tick: int, due: float):
+        now = self._now
+        if tick <= now:
+            self._ready[key] = due
+            self._where[key] = (READY, 0)
+            return
+        for level, (size, span) in enumerate(zip(self._sizes, self._spans)):
+            if tick // span - now // span < size:
+                slot = (tick // span) % size
+                self._levels[level][slot][key] = (tick, due)
+                self._counts[level] += 1
+                self._where[key] = (level, slot)
+                return
+        self._overflow[key] = (tick, due)
+        self._where[key] = (len(self._sizes), 0)
+
+    def _tick(self):
+        self._now += 1
+        now = self._now
+        top = len(self._sizes) - 1
+
+        if self._overflow and now % self._spans[top] == 0:
+            pending, self._overflow = self._overflow, {}
+            for key, (tick, due) in pending.items():
+                self._place(key, tick, due)
+
+        # Cascade coarse slots whose turn has come, top level first
+        for level in range(top, 0, -1):
+            if now % self._spans[level]:
+                continue
+            slot = (now // self._spans[level]) % self._sizes[level]
+            entries = self._levels[level][slot]
+            if entries:
+                self._levels[level][slot] = {}
+                self._counts[level] -= len(entries)
+                for key, (tick, due) in entries.items():
+                    self._place(key, tick, due)
+
+        slot = now % self._sizes[0]
+        entries = self._levels[0][slot]
+        if entries:
+            self._levels[0][slot] = {}
+            self._counts[0] -= len(entries)
+            for key, (_, due) in entries.items():
+                self._ready[key] = due
+                self._where[key] = (READY, 0)
@@ -30,4 +30,16 @@ async def db_manager_fixture():
     if connection.db_manager.redis_client:
         await connection.db_manager.redis_client.close()
     if connection.db_manager.pg_engine:
-        await connection.db_manager.pg_engine.dispose()
\ No newline at end of file
+        await connection.db_manager.pg_engine.dispose()
+
+
+@pytest.fixture
+def embedded_memory(monkeypatch):
+    """Switches every memory tier to fresh in-process backends for one test."""
+    from config import settings
+    from memory.backends import reset_embedded_backends
+
+    monkeypatch.setattr(settings, 'MEMORY_BACKEND', 'embedded')
+    reset_embedded_backends()
+    yield
+    reset_embedded_backends()
@@ -39,18 +39,27 @@ async def test_full_agent_workflow():
     # Check if the handoff to the Engagement Agent occurred
     if triage_result.get('handoff'):
         print("\n--- 2. EXECUTING ENGAGEMENT (HANDOFF DETECTED) ---")
-        # Construct the input for the engagement agent based on the handoff context
-        engagement_input = triage_result['handoff']['context']
-        engagement_result = await engagement_agent.process(engagement_input)
+        escalations = []
+
+        async def collect_escalation(handle):
+            escalations.append(handle)
+
+        engagement_agent.on_escalation = collect_escalation
+        # The handoff result is a handle; the engagement agent resolves the context it needs
+        engagement_result = await engagement_agent.process(triage_result['handoff'])
         print(f"Engagement Result: {engagement_result}")
         assert engagement_result is not None
         assert 'status' in engagement_result
 
+        # The send is only queued; wait for it (and any escalation) to complete
+        await engagement_agent.drain()
+        if escalations:
+            engagement_result['escalation'] = escalations[0]
+
         # Check if an escalation to the Campaign Optimization Agent occurred
         if engagement_result.get('escalation'):
             print("\n--- 3. EXECUTING CAMPAIGN OPTIMIZATION (ESCALATION DETECTED) ---")
-            optimization_input = engagement_result['escalation']['context']
-            optimization_result = await campaign_agent.process(optimization_input)
+            optimization_result = await campaign_agent.process(engagement_result['escalation'])
             print(f"Optimization Result: {optimization_result}")
             assert optimization_result is not None
             assert 'recommendations' in optimization_result
@@ -58,5 +67,6 @@ async def test_full_agent_workflow():
     else:
         print("\n--- SKIPPING ENGAGEMENT (NO HANDOFF TRIGGERED) ---")
 
+    await engagement_agent.close()
     await client.close()
     print("\n✅ Agent integration test complete.")
\ No newline at end of file
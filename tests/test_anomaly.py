@@ -0,0 +1,92 @@
+# tests/test_anomaly.py
+import asyncio
+import random
+from datetime import date, timedelta
+import pytest
+from agents.campaign_optimization.agent import CampaignOptimizationAgent
+from agents.campaign_optimization.monitor import CampaignMonitor
+from agents.campaign_optimization.sources import stream_campaign_daily_csv
+from analytics.anomaly import AnomalyDetector
+from analytics.kpi import KPIEngine
+
+
+def day_rows(campaign_id, days, ctr, start=date(2025, 6, 1), seed=0, revenue_per_cost=3.0):
+    rng = random.Random(seed)
+    for day in range(days):
+        impressions = rng.randint(4000, 6000)
+        cost = rng.uniform(180, 220)
+        yield {'campaign_id': campaign_id, 'date': (start + timedelta(days=day)).isoformat(),
+               'impressions': impressions, 'clicks': int(impressions * ctr(day) * rng.uniform(0.9, 1.1)),
+               'leads_created': rng.randint(18, 22), 'conversions': 2, 'cost_usd': cost,
+               'revenue_usd': cost * revenue_per_cost * rng.uniform(0.9, 1.1)}
+
+
+def test_detector_flags_a_sustained_drop_once_per_cooldown():
+    """Tests that steady noise stays quiet, a CTR drop alerts within days and repeats are suppressed."""
+    detector = AnomalyDetector(warmup=5, cooldown=timedelta(days=7))
+    drop_day = 20
+    alerts = []
+    for row in day_rows('C1', 40, lambda day: 0.04 if day < drop_day else 0.025):
+        alert = detector.observe(row)
+        if alert:
+            alerts.append((date.fromisoformat(row['date']) - date(2025, 6, 1)).days)
+            assert alert['issue'] == 'low_click_rate' and alert['drops'][0]['baseline'] > 0.035
+    for row in day_rows('C2', 40, lambda day: 0.04, seed=1):
+        assert detector.observe(row) is None
+
+    assert alerts and drop_day <= alerts[0] <= drop_day + 2
+    # The baseline adapts to the new level, and anything left is at least a cooldown apart
+    assert all(b - a >= 7 for a, b in zip(alerts, alerts[1:]))
+    assert len(detector) == 6  # ctr, cpl and roas for each campaign; no unsubscribe data
+
+
+@pytest.mark.usefixtures("embedded_memory")
+async def test_monitor_optimizes_only_flagged_campaigns():
+    """Tests that replaying daily metrics invokes the agent per alert, not per campaign-day."""
+    agent = CampaignOptimizationAgent(None, kpi_engine=KPIEngine())
+    monitor = CampaignMonitor(agent, max_concurrent=2)
+
+    stats = await monitor.run(stream_campaign_daily_csv('data/campaign_daily.csv'))
+
+    assert stats['observations'] == 1093
+    assert 0 < stats['invocations'] == stats['alerts'] - stats['coalesced'] < 50
+    assert stats['failed'] == 0 and len(monitor.results) == stats['invocations']
+    flagged = monitor.results[0]
+    assert flagged['anomaly']['issue'] in flagged['analysis']['issues'] or flagged['recommendations']
+    # The KPI engine had the day that tripped the alert
+    assert flagged['analysis']['as_of'] >= flagged['anomaly']['observed_at'][:10]
+
+
+async def test_alerts_during_a_run_trigger_one_rerun_with_the_latest():
+    """Tests that alerts arriving mid-optimization are held for one re-run, and close() cancels what's left."""
+    class SlowAgent:
+        def __init__(self):
+            self.calls, self.release = [], asyncio.Event()
+
+        async def process(self, request):
+            self.calls.append(request['issue'])
+            await self.release.wait()
+            return {}
+
+    agent = SlowAgent()
+    monitor = CampaignMonitor(agent, max_concurrent=1)
+    alerts = iter([{'campaign_id': 'C1', 'issue': issue, 'observed_at': '2025-06-01'}
+                   for issue in ('low_click_rate', 'high_cost_per_lead', 'low_roas')])
+    monitor.check = lambda row: next(alerts)
+    for _ in range(3):
+        await monitor.observe({})
+        await asyncio.sleep(0)
+    assert agent.calls == ['low_click_rate'] and monitor.stats['coalesced'] == 1
+
+    agent.release.set()
+    await monitor.drain()
+    assert agent.calls == ['low_click_rate', 'low_roas']
+    assert [r['anomaly']['issue'] for r in monitor.results] == ['low_click_rate', 'low_roas']
+
+    agent.release.clear()
+    monitor.check = lambda row: {'campaign_id': 'C2', 'issue': 'low_roas', 'observed_at': '2025-06-02'}
+    await monitor.observe({})
+    await asyncio.sleep(0)
+    await monitor.observe({})
+    await monitor.close()
+    assert not monitor._tasks and not monitor._pending and monitor.stats['invocations'] == 3
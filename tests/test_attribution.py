@@ -0,0 +1,73 @@
+# tests/test_attribution.py
+import csv
+import pytest
+from analytics.attribution import (MODELS, Attribution, attribute_conversions, attribute_csvs, attribute_stream,
+                                   campaign_attribution, merge_events, record_touch)
+from memory.backends import InMemoryTTLStore
+
+DAY = 86400.0
+
+
+def path_events():
+    touches = [
+        {'kind': 'touch', 'lead': 'a@example.com', 'at': 0 * DAY, 'campaign_id': 'C1', 'channel': 'Email',
+         'variant_id': 'V1', 'action': 'outreach'},
+        {'kind': 'touch', 'lead': 'a@example.com', 'at': 5 * DAY, 'campaign_id': 'C1', 'channel': 'SMS',
+         'action': 'follow_up'},
+        # No campaign on the touch: credited to the converting campaign
+        {'kind': 'touch', 'lead': 'a@example.com', 'at': 9 * DAY, 'channel': 'Web', 'action': 'escalate'},
+        # Outside the 30-day lookback of c's conversion
+        {'kind': 'touch', 'lead': 'c@example.com', 'at': 0 * DAY, 'campaign_id': 'C1', 'channel': 'Email'},
+    ]
+    conversions = [
+        {'kind': 'conversion', 'lead': 'a@example.com', 'at': 10 * DAY, 'campaign_id': 'C1', 'value': 100.0},
+        {'kind': 'conversion', 'lead': 'b@example.com', 'at': 3 * DAY, 'campaign_id': 'C2', 'value': 40.0},
+        {'kind': 'conversion', 'lead': 'c@example.com', 'at': 45 * DAY, 'campaign_id': 'C2', 'value': 10.0},
+    ]
+    return touches, conversions
+
+
+async def test_streaming_pass_and_live_updates_agree():
+    """Tests each model's split of a conversion, direct credit, and that live increments match the batch pass."""
+    touches, conversions = path_events()
+    order = lambda e: (e['lead'], e['at'])
+    attribution = attribute_stream(merge_events(sorted(touches, key=order), sorted(conversions, key=order)),
+                                   Attribution(half_life_days=7, lookback_days=30))
+
+    c1 = attribution.campaign('C1')
+    assert c1['models']['linear'] == pytest.approx({'conversions': 1.0, 'value': 100.0})
+    channels = {channel: {model: credit['conversions'] for model, credit in models.items()}
+                for channel, models in c1['channels'].items()}
+    assert channels['Email']['first_touch'] == channels['Web']['last_touch'] == 1.0
+    assert channels['SMS']['linear'] == pytest.approx(1 / 3)
+    assert channels['Email']['time_decay'] < channels['SMS']['time_decay'] < channels['Web']['time_decay']
+    assert c1['variants']['V1']['last_touch']['conversions'] == 1.0  # the only touch carrying a variant
+    assert attribution.campaign('C2')['models']['time_decay'] == pytest.approx({'conversions': 2.0, 'value': 50.0})
+
+    store = InMemoryTTLStore()
+    for touch in touches:
+        await record_touch(store, touch['lead'], touch)
+    assert await attribute_conversions(store, conversions, Attribution(half_life_days=7, lookback_days=30)) == 3
+    for campaign_id in ('C1', 'C2'):
+        stored = await store.hgetall(f"attribution:campaign:{campaign_id}")
+        assert {field: int(amount) / 1e6 for field, amount in stored.items()} == \
+            pytest.approx(attribution.credits[campaign_id], abs=1e-5)
+    live = await campaign_attribution(store, 'C1')
+    assert live['channels']['SMS']['linear'] == pytest.approx({'conversions': 1 / 3, 'value': 100 / 3})
+    # The conversion consumed the path
+    assert await store.zcard('attribution:path:a@example.com') == 0
+
+    with pytest.raises(ValueError):
+        attribute_stream(sorted(touches, key=lambda e: -e['at']))
+
+
+def test_history_attribution_conserves_conversions_and_value():
+    """Tests that over the bundled exports every model hands out exactly one conversion's value per conversion."""
+    with open('data/conversions.csv', newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    attribution = attribute_csvs('data/conversions.csv', 'data/agent_actions.csv')
+    assert attribution.conversions == len(rows)
+    for model in MODELS:
+        credited = [attribution.campaign(c)['models'][model] for c in attribution.campaigns()]
+        assert sum(c['conversions'] for c in credited) == pytest.approx(len(rows))
+        assert sum(c['value'] for c in credited) == pytest.approx(sum(float(r['conversion_value_usd']) for r in rows))
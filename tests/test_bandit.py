@@ -0,0 +1,50 @@
+# tests/test_bandit.py
+import numpy as np
+from analytics.bandit import VariantBandit, record_conversions, record_outcomes
+from memory.backends import InMemoryTTLStore
+
+VARIANTS = [
+    {'variant_id': 'V1', 'campaign_id': 'C1', 'channel': 'Email', 'subject_line': 'A'},
+    {'variant_id': 'V2', 'campaign_id': 'C1', 'channel': 'Email', 'subject_line': 'B'},
+    {'variant_id': 'V3', 'campaign_id': 'C1', 'channel': 'Email', 'subject_line': 'C'},
+    {'variant_id': 'V4', 'campaign_id': 'C1', 'channel': 'SMS', 'subject_line': 'D'},
+]
+
+
+async def test_traffic_shifts_to_the_winning_variant():
+    """Tests that Thompson sampling concentrates sends on the best click rate as outcomes arrive."""
+    click_rates = {'V1': 0.02, 'V2': 0.06, 'V3': 0.03}
+    rng = np.random.default_rng(0)
+    bandit = VariantBandit(VARIANTS, store=InMemoryTTLStore(), conversion_weight=0.0, sample_batch=64, seed=1)
+
+    shares = []
+    for _ in range(20):
+        sent = [bandit.assign('C1', 'email')['variant_id'] for _ in range(300)]
+        for variant_id in sent:
+            bandit.record(variant_id, sends=1, clicks=int(rng.random() < click_rates[variant_id]))
+        await bandit.flush()
+        shares.append(sent.count('V2') / len(sent))
+
+    assert all(variant_id != 'V4' for variant_id in sent)  # channel group respected
+    assert shares[-1] > 0.8 > shares[0]
+    assert bandit.winner('C1', 'email')['variant_id'] == 'V2'
+    assert bandit.assign('C1', 'web')['variant_id'] in {'V1', 'V2', 'V3', 'V4'}  # campaign-wide fallback
+    assert bandit.assign('C9') is None
+
+
+async def test_counts_are_shared_and_survive_restarts():
+    """Tests that flushed counts, tracked clicks and attributed conversions reach a fresh bandit."""
+    store = InMemoryTTLStore()
+    worker = VariantBandit(VARIANTS, store=store)
+    await worker.remember_send('lead@example.com', 'V3')
+    worker.record('V3', clicks=1)
+    await worker.flush()
+    await record_outcomes(store, [('V1', 'clicks'), ('V1', 'sends')])
+    assert await record_conversions(store, ['lead@example.com', 'nobody@example.com']) == 1
+
+    restarted = VariantBandit(VARIANTS, store=store)
+    await restarted.maybe_refresh()
+    counts = {row['variant_id']: row for row in restarted.summary('C1', 'email')}
+    assert (counts['V3']['sends'], counts['V3']['clicks'], counts['V3']['conversions']) == (1, 1, 1)
+    assert (counts['V1']['sends'], counts['V1']['clicks']) == (1, 1)
+    assert abs(sum(row['win_probability'] for row in counts.values()) - 1.0) < 1e-9
@@ -0,0 +1,74 @@
+# tests/test_columnar.py
+import csv
+import os
+import numpy as np
+import pytest
+from analytics.columnar import load_table
+from analytics.kpi import KPIEngine
+
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows(rows)
+
+
+def test_typed_columns_and_rebuild_on_change(tmp_path):
+    """Tests type inference, JSON flattening, memory-mapped reuse, and a rebuild once the source changes."""
+    source = str(tmp_path / 'events.csv')
+    cache = str(tmp_path / 'cache')
+    write_csv(source, [['id', 'at', 'count', 'score', 'ok', 'channel', 'context'],
+                       ['E1', '2025-01-01 10:00:00', '3', '0.5', 'true', 'Email', '{"confidence": 0.9, "tag": "a"}'],
+                       ['E2', '2025-01-02 11:30:00', '4', '', 'false', 'Email', '{"confidence": 0.4}'],
+                       ['E3', '2025-01-03 09:15:00', '5', '1.5', 'true', 'Email', '']])
+
+    table = load_table(source, cache)
+    assert {name: table.kind(name) for name in table.columns} == {
+        'id': 'string', 'at': 'datetime', 'count': 'int', 'score': 'float', 'ok': 'bool', 'channel': 'category',
+        'context': 'json', 'context.confidence': 'float', 'context.tag': 'string'}
+    assert table['count'].tolist() == [3, 4, 5] and np.isnan(table['score'][1])
+    assert table['channel'].tolist() == ['Email'] * 3 and table.raw('channel').dtype == np.uint8
+    assert table['at'][1] == np.datetime64('2025-01-02T11:30:00')
+    assert table.json('context') == [{'confidence': 0.9, 'tag': 'a'}, {'confidence': 0.4}, None]
+    assert table['context.confidence'][:2].tolist() == [0.9, 0.4] and table['context.tag'].tolist() == ['a', '', '']
+
+    cached = load_table(source, cache)
+    assert isinstance(cached.raw('count'), np.memmap)
+    assert cached.manifest == table.manifest
+
+    write_csv(source, [['id', 'count'], ['E1', '7']])
+    os.utime(source, ns=(1, 1))
+    changed = load_table(source, cache)
+    assert changed.columns == ['id', 'count'] and changed['count'].tolist() == [7]
+    assert sorted(os.listdir(cache)) == ['events']  # the old table was swapped out, not left behind
+
+
+def test_zero_padded_digits_stay_text(tmp_path):
+    """Tests that ids, zips and phone numbers keep their leading zeros while plain numbers are still typed."""
+    source = str(tmp_path / 'contacts.csv')
+    write_csv(source, [['lead_id', 'zip', 'phone', 'visits', 'spend'],
+                       ['0042', '02134', '+4420', '3', '1.50'],
+                       ['0043', '10001', '07700', '12', ''],
+                       ['1044', '', '07701', '0', '-2']])
+
+    table = load_table(source, str(tmp_path / 'cache'))
+    assert {name: table.kind(name) for name in table.columns} == {
+        'lead_id': 'string', 'zip': 'string', 'phone': 'string', 'visits': 'int', 'spend': 'float'}
+    assert table.values('lead_id') == ['0042', '0043', '1044'] and table.values('zip') == ['02134', '10001', '']
+    assert table.values('phone') == ['+4420', '07700', '07701'] and table.values('spend') == [1.5, None, -2.0]
+
+
+def test_kpi_engine_from_cache_matches_row_ingest(tmp_path, monkeypatch):
+    """Tests that the KPI engine loaded through the columnar cache equals one fed the parsed CSV rows."""
+    from config import settings
+    monkeypatch.setattr(settings, 'COLUMNAR_CACHE_DIR', str(tmp_path))
+    with open('data/campaign_daily.csv', newline='', encoding='utf-8') as f:
+        rows = list(csv.DictReader(f))
+    expected = KPIEngine(window=7)
+    expected.ingest(rows)
+
+    for _ in range(2):  # first call builds the cache, the second reads it
+        actual = KPIEngine.from_csv('data/campaign_daily.csv', window=7).analyze_many()
+        assert set(actual) == set(expected.analyze_many())
+        for campaign_id, analysis in expected.analyze_many().items():
+            assert actual[campaign_id]['metrics'] == pytest.approx(analysis['metrics'], nan_ok=True)
+            assert actual[campaign_id]['issues'] == analysis['issues']
@@ -0,0 +1,119 @@
+# tests/test_dispatcher.py
+import asyncio
+import random
+import time
+import pytest
+from agents.engagement.agent import EngagementAgent
+from agents.engagement.dispatcher import OutreachDispatcher, SimulatedSender
+from communication.rate_limit import TokenBucket
+
+
+class RecordingClient:
+    """Minimal MCP client that records requests instead of sending them."""
+
+    def __init__(self):
+        self.requests = []
+
+    async def request(self, method, params):
+        self.requests.append((method, params))
+        return {**params, 'status': 'completed'} if method == 'agent_handoff' else {'status': 'completed'}
+
+
+async def test_token_bucket_allows_burst_then_throttles_to_rate():
+    """Tests that a bucket serves its capacity at once and the rest at the refill rate."""
+    bucket = TokenBucket(rate=50, capacity=5)
+    start = time.perf_counter()
+    for _ in range(5):
+        await bucket.acquire()
+    assert time.perf_counter() - start < 0.05
+    for _ in range(10):
+        await bucket.acquire()
+    assert time.perf_counter() - start >= 10 / 50 * 0.9
+    with pytest.raises(ValueError):
+        await bucket.acquire(6)
+
+
+async def test_dispatcher_batches_bulk_channels_and_rate_limits_others():
+    """Tests bulk batching on email, throttling on sms and fallback for channels without a provider."""
+    sender = SimulatedSender(rng=random.Random(1))
+    dispatcher = OutreachDispatcher(sender, channels={
+        'email': {'rate': 1000, 'burst': 100, 'workers': 1, 'batch_size': 10},
+        'sms': {'rate': 20, 'burst': 2, 'workers': 2, 'batch_size': 1}
+    })
+    completed = []
+
+    async def on_complete(result):
+        completed.append(result)
+
+    tickets = [await dispatcher.submit('Email', {'n': n}, on_complete) for n in range(24)]
+    tickets.append(await dispatcher.submit('Ads', {'n': 24}, on_complete))
+    assert all(t['status'] == 'queued' and t['channel'] == 'email' for t in tickets)
+
+    start = time.perf_counter()
+    for n in range(10):
+        await dispatcher.submit('SMS', {'n': n}, on_complete)
+    await dispatcher.close()
+
+    assert [size for channel, size in sender.calls if channel == 'email'] == [10, 10, 5]
+    assert time.perf_counter() - start >= (10 - 2) / 20 * 0.9
+    assert len(completed) == 35 and {r['dispatch_id'] for r in completed} >= {t['dispatch_id'] for t in tickets}
+    stats = dispatcher.stats()
+    assert stats['email']['sent'] + stats['email']['failed'] == 25 and stats['sms']['requests'] == 10
+
+
+@pytest.mark.usefixtures("embedded_memory")
+async def test_engagement_queues_send_and_records_it_on_completion():
+    """Tests that process() returns once queued and logging happens when the send completes."""
+    client = RecordingClient()
+    agent = EngagementAgent(client, sender=SimulatedSender(rng=random.Random(3)))
+    lead = {'id': 5, 'email': "sms@example.com", 'preferred_channel': 'SMS'}
+
+    ticket = await agent.process({'lead': lead, 'category': 'Sales Qualified Lead'})
+    assert ticket['status'] == 'queued' and ticket['channel'] == 'sms'
+    assert not [m for m, _ in client.requests if m == 'log_interaction']
+
+    await agent.close()
+    logged = [params for m, params in client.requests if m == 'log_interaction']
+    assert len(logged) == 1 and logged[0]['outcome'] in ('sent', 'failed')
+    assert logged[0]['metadata']['channel'] == 'sms'
+
+
+async def test_slow_completion_handlers_do_not_hold_up_sends():
+    """Tests that completions run off the send workers and drain() waits for sends and completions."""
+    sender = SimulatedSender(rng=random.Random(2))
+    dispatcher = OutreachDispatcher(sender, channels={'email': {'rate': 1000, 'burst': 100, 'workers': 1}},
+                                    completion_workers=4)
+    completed = []
+
+    async def slow(result):
+        await asyncio.sleep(0.05)
+        if result['dispatch_id'] == tickets[0]['dispatch_id']:
+            raise RuntimeError("bookkeeping failed")
+        completed.append(result)
+
+    tickets = [await dispatcher.submit('email', {'n': n}, slow) for n in range(8)]
+    start = time.perf_counter()
+    await dispatcher.drain()
+    # Eight 50 ms handlers on four completion workers, not one after another on the send worker
+    assert time.perf_counter() - start < 8 * 0.05 * 0.75
+    assert len(sender.calls) == 8 and len(completed) == 7
+    assert dispatcher.stats()['email']['completion_errors'] == 1
+    await dispatcher.close()
+    assert not dispatcher._tasks
+
+
+@pytest.mark.usefixtures("embedded_memory")
+async def test_follow_up_handler_returns_the_send_result():
+    """Tests that a follow-up job resolves with the dispatched send's outcome, after it was sent."""
+    class Bouncing(SimulatedSender):
+        async def send(self, channel, messages):
+            return [{**result, 'status': 'failed'} for result in await super().send(channel, messages)]
+
+    client = RecordingClient()
+    agent = EngagementAgent(client, sender=Bouncing(rng=random.Random(4)))
+    job = {'step': 'day_3', 'payload': {'lead': {'id': 7, 'email': "f@example.com"},
+                                        'plan': {'channel': 'email', 'message_preview': 'Hi'}}}
+    result = await agent._send_follow_up(job)
+    assert result['status'] == 'failed' and result['channel'] == 'email'
+    await agent.close()
+    assert [params['outcome'] for m, params in client.requests if m == 'log_interaction'] == ['failed']
@@ -0,0 +1,141 @@
+# tests/test_mcp_auth.py
+import asyncio
+import pytest
+from fastapi.testclient import TestClient
+from starlette.websockets import WebSocketDisconnect
+from config import settings
+from mcp.auth import AuthError, Authenticator, Principal, encode_jwt
+from memory.backends import InMemoryTTLStore
+
+SECRET = 'test-secret'
+KEYS = {'engagement-key': {'principal': 'svc-engagement', 'scopes': ['leads:write', 'campaigns:read']}}
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1_750_000_000.0
+
+    def __call__(self):
+        return self.now
+
+
+async def rejected(call):
+    """HTTP status of the AuthError that a call (or the coroutine it returns) raises"""
+    with pytest.raises(AuthError) as error:
+        result = call()
+        if asyncio.iscoroutine(result):
+            await result
+    return error.value.status
+
+
+async def test_cached_verification_scopes_quotas_and_revocation():
+    """Tests API key and JWT verification, cache reuse until expiry, scopes, quotas and cross-process revocation."""
+    store, clock = InMemoryTTLStore(), Clock()
+    auth = Authenticator(store, api_keys=KEYS, jwt_secret=SECRET, cache_ttl=60, quota_rate=0.001, quota_burst=3,
+                         clock=clock)
+    token = encode_jwt({'sub': 'analyst-ui', 'scope': 'campaigns:write', 'iat': clock.now, 'exp': clock.now + 30},
+                       SECRET)
+
+    service = await auth.authenticate('engagement-key')
+    analyst = await auth.authenticate(token)
+    assert (service.name, analyst.name, analyst.mechanism) == ('svc-engagement', 'analyst-ui', 'jwt')
+    for _ in range(3):
+        assert await auth.authenticate(token) is analyst
+    assert auth.stats == {'cached': 3, 'verified': 2, 'rejected': 0}
+
+    auth.authorize(service, 'get_lead_data')  # leads:write implies leads:read
+    auth.authorize(analyst, 'get_campaign_metrics')
+    assert await rejected(lambda: auth.authorize(service, 'record_variant_outcome')) == 403
+    assert await rejected(lambda: auth.authorize(service, 'revoke_credentials')) == 403  # unlisted: admin-only
+    auth.authorize(service, 'update_lead_status')
+    auth.authorize(service, 'update_lead_status')
+    assert await rejected(lambda: auth.authorize(service, 'update_lead_status')) == 429  # burst of 3 used up
+
+    assert await rejected(lambda: auth.authenticate('wrong-key')) == 401
+    assert await rejected(lambda: auth.authenticate(token[:-2] + 'xx')) == 401
+    assert await rejected(lambda: auth.authenticate(None)) == 401
+    clock.now += 30 + settings.MCP_JWT_LEEWAY + 1  # the cached token expires with the token, not the cache TTL
+    assert await rejected(lambda: auth.authenticate(token)) == 401
+    assert await rejected(lambda: auth.authorize(analyst, 'get_campaign_metrics')) == 401
+
+    # Another server process sharing the store has the key cached; a revocation reaches it on its next verification
+    other = Authenticator(store, api_keys=KEYS, jwt_secret=SECRET, cache_ttl=60, clock=clock)
+    await other.authenticate('engagement-key')
+    assert await auth.revoke(principal='svc-engagement') == 1
+    assert await rejected(lambda: auth.authenticate('engagement-key')) == 401
+    assert (await other.authenticate('engagement-key')).name == 'svc-engagement'
+    clock.now += 61
+    assert await rejected(lambda: other.authenticate('engagement-key')) == 401
+
+    fresh = encode_jwt({'sub': 'svc-engagement', 'scope': 'leads:read', 'iat': clock.now + 1}, SECRET)
+    assert (await auth.authenticate(fresh)).name == 'svc-engagement'  # issued after the revocation
+    await auth.revoke(fresh)
+    assert await rejected(lambda: other.authenticate(fresh)) == 401
+
+
+def test_http_and_websocket_transports_require_credentials(embedded_memory, monkeypatch):
+    """Tests that /rpc checks every request and /ws authenticates once at the handshake, then per-method scopes."""
+    from mcp import server
+    monkeypatch.setattr(server, 'get_authenticator', lambda: auth)
+    auth = Authenticator(api_keys=KEYS)
+    client = TestClient(server.app)
+    handoff = {'jsonrpc': '2.0', 'method': 'agent_handoff', 'params': {'to_agent': 'engagement'}, 'id': '1'}
+
+    response = client.post('/rpc', json=handoff)
+    assert response.status_code == 401 and response.json()['error']['message'] == 'Missing credentials'
+    response = client.post('/rpc', json=handoff, headers={'X-API-KEY': 'engagement-key'})
+    assert response.status_code == 403 and response.json()['id'] == '1'
+    response = client.post('/rpc', json=handoff, headers={'Authorization': f"Bearer {server.settings.API_KEY}"})
+    assert response.status_code == 200 and response.json()['result']['status'] == 'completed'
+
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect('/ws?token=wrong-key') as ws:
+            ws.receive_text()
+    assert closed.value.code == 1008
+    with client.websocket_connect('/ws', headers={'X-API-KEY': 'engagement-key'}) as ws:
+        ws.send_json(handoff)
+        assert ws.receive_json()['error']['code'] == -32003
+        ws.send_json({**handoff, 'method': 'not_a_method'})
+        assert ws.receive_json()['error']['code'] == -32003
+        ws.send_text('not json')  # nothing to authorize: the handler reports it
+        assert ws.receive_json()['error']['code'] == -32700
+    assert auth.stats['verified'] == 2
+
+    # An open socket stops being served as soon as its principal is revoked
+    with pytest.raises(WebSocketDisconnect) as closed:
+        with client.websocket_connect('/ws', headers={'X-API-KEY': 'engagement-key'}) as ws:
+            ws.send_json(handoff)
+            assert ws.receive_json()['error']['code'] == -32003
+            asyncio.run(auth.revoke(principal='svc-engagement'))
+            ws.send_json(handoff)
+            assert ws.receive_json()['error']['code'] == -32001
+            ws.receive_text()
+    assert closed.value.code == 1008
+
+
+async def test_principal_revocation_covers_its_api_keys_but_not_later_ones():
+    """Tests that revoking a principal revokes the API keys it holds, not ones configured afterwards."""
+    store, clock = InMemoryTTLStore(), Clock()
+    auth = Authenticator(store, api_keys=KEYS, jwt_secret=SECRET, clock=clock)
+    await auth.revoke(principal='svc-engagement')
+    assert await rejected(lambda: auth.authenticate('engagement-key')) == 401
+
+    clock.now += 3600
+    rotated = Authenticator(store, api_keys={**KEYS, 'rotated-key': KEYS['engagement-key']}, jwt_secret=SECRET,
+                            clock=clock)
+    assert (await rotated.authenticate('rotated-key')).name == 'svc-engagement'
+    assert await rejected(lambda: rotated.authenticate('engagement-key')) == 401
+
+
+def test_idle_quota_buckets_are_evicted():
+    """Tests that a principal's bucket is dropped once it has refilled, but not while it is draining."""
+    clock = Clock()
+    auth = Authenticator(InMemoryTTLStore(), api_keys=KEYS, quota_rate=1, quota_burst=2, clock=clock)
+    callers = [Principal(f"svc-{n}", ['leads:read'], 'api_key') for n in range(3)]
+    for caller in callers:
+        auth.authorize(caller, 'get_lead_data')
+    assert list(auth._buckets) == ['svc-0', 'svc-1', 'svc-2']
+
+    clock.now += 1  # one token back: svc-0 and svc-1 are full again
+    auth.authorize(callers[2], 'get_lead_data')
+    assert list(auth._buckets) == ['svc-2']
@@ -0,0 +1,95 @@
+# tests/test_mcp_resources.py
+import csv
+import os
+import pytest
+from fastapi.testclient import TestClient
+from analytics.attribution import Attribution, attribute_conversions, record_touch
+from analytics.kpi import KPIEngine
+from analytics.segments import SegmentEngine, SegmentIndex
+from memory.backends import InMemoryTTLStore
+from mcp.resources import CampaignResources, DataResources, ResourceRegistry, SegmentResources
+
+
+def write_csv(path, rows):
+    with open(path, 'w', newline='', encoding='utf-8') as f:
+        csv.writer(f).writerows(rows)
+
+
+async def test_etags_follow_versions_and_reads_are_served_from_cache(tmp_path, monkeypatch):
+    """Tests conditional and range reads, and that each resource's ETag moves only when its data changes."""
+    from config import settings
+    monkeypatch.setattr(settings, 'COLUMNAR_CACHE_DIR', str(tmp_path / 'columnar'))
+    write_csv(tmp_path / 'events.csv', [['id', 'n']] + [[f"E{i}", str(i)] for i in range(25)])
+    store = InMemoryTTLStore()
+    engine = KPIEngine(window=2)
+    engine.ingest([{'campaign_id': 'C1', 'date': '2025-01-01', 'impressions': 100, 'clicks': 5}])
+    index = SegmentIndex(SegmentEngine([{'segment_id': 'EU', 'rules': {'regions': ['EU']}}]), store)
+    write_csv(tmp_path / 'secrets.csv', [['token'], ['abc']])
+    registry = ResourceRegistry([DataResources(str(tmp_path), exports=['events']), CampaignResources(store, engine),
+                                 SegmentResources(index)])
+    assert {entry['uri'] for entry in await registry.list()} == {
+        'data://events', 'analytics://campaigns/C1/kpis', 'analytics://campaigns/C1/attribution',
+        'analytics://segments/EU/members'}
+
+    page = await registry.read('data://events', offset=20, limit=10)
+    assert (page['total'], page['items']) == (25, [{'id': f"E{i}", 'n': i} for i in range(20, 25)])
+    assert (await registry.read('data://events', limit=3))['items'][-1] == {'id': 'E2', 'n': 2}
+    assert await registry.read('data://events', if_none_match=page['etag']) == {
+        'uri': 'data://events', 'etag': page['etag'], 'not_modified': True}
+    assert registry.stats == {'not_modified': 1, 'cached': 1, 'rendered': 1}
+    write_csv(tmp_path / 'events.csv', [['id', 'n'], ['E0', '7']])
+    os.utime(tmp_path / 'events.csv', ns=(1, 1))
+    changed = await registry.read('data://events', if_none_match=page['etag'])
+    assert changed['etag'] != page['etag'] and changed['items'] == [{'id': 'E0', 'n': 7}]
+
+    tags = {}
+    for uri in ('analytics://campaigns/C1/kpis', 'analytics://campaigns/C1/attribution',
+                'analytics://segments/EU/members'):
+        tags[uri] = (await registry.read(uri))['etag']
+    leads = [{'email': 'a@example.com', 'lead_score': 80, 'region': 'EU'}, {'email': 'b@example.com', 'region': 'US'}]
+    await index.update(leads)
+    await index.update(leads)  # unchanged memberships keep the version
+    members = await registry.read('analytics://segments/EU/members')
+    assert members['items'] == ['a@example.com'] and members['etag'] != tags['analytics://segments/EU/members']
+    assert (await registry.read('analytics://campaigns/C1/kpis', if_none_match=tags['analytics://campaigns/C1/kpis'])
+            )['not_modified']
+
+    await record_touch(store, 'a@example.com', {'at': 0.0, 'campaign_id': 'C1', 'channel': 'Email'})
+    await attribute_conversions(store, [{'lead': 'a@example.com', 'at': 60.0, 'campaign_id': 'C1', 'value': 10.0}],
+                                Attribution())
+    engine.ingest([{'campaign_id': 'C1', 'date': '2025-01-02', 'impressions': 100, 'clicks': 9}])
+    for uri in ('analytics://campaigns/C1/kpis', 'analytics://campaigns/C1/attribution'):
+        assert 'items' in await registry.read(uri, if_none_match=tags[uri])
+    report = (await registry.read('analytics://campaigns/C1/attribution'))['items'][0]
+    assert report['models']['linear'] == {'conversions': 1.0, 'value': 10.0}
+
+
+def test_rpc_resource_methods(embedded_memory, monkeypatch):
+    """Tests resources/list and resources/read over /rpc, including an empty not-modified answer and errors."""
+    from mcp import server
+    monkeypatch.setattr(server, 'get_resource_registry', lambda: registry)
+    registry = ResourceRegistry([DataResources('data')])
+    client = TestClient(server.app)
+    headers = {'X-API-KEY': server.settings.API_KEY}
+
+    def call(method, params):
+        request = {'jsonrpc': '2.0', 'method': method, 'params': params, 'id': '1'}
+        return client.post('/rpc', json=request, headers=headers).json()['result']
+
+    assert {'uri': 'data://segments', 'name': 'segments', 'description': 'Rows of segments.csv',
+            'mimeType': 'application/json'} in call('resources/list', {})['resources']
+    first = call('resources/read', {'uri': 'data://segments', 'limit': 5})
+    assert first['total'] == 15 and len(first['items']) == 5 and isinstance(first['items'][0]['rules_json'], dict)
+    assert call('resources/read', {'uri': 'data://segments', 'if_none_match': first['etag']}) == {
+        'uri': 'data://segments', 'etag': first['etag'], 'not_modified': True}
+    assert call('resources/read', {'uri': 'data://../config'}) == {'error': 'Unknown resource: data://../config'}
+    # Only the configured exports are served; auth and transport logs are not
+    assert 'data://security_auth_events' not in {entry['uri'] for entry in call('resources/list', {})['resources']}
+    assert call('resources/read', {'uri': 'data://security_auth_events'}) == {
+        'error': 'Unknown resource: data://security_auth_events'}
+
+
+async def test_data_resource_render_rejects_unknown_exports():
+    """Tests that rendering a data:// URI that isn't served raises ValueError, not TypeError."""
+    with pytest.raises(ValueError, match='Unknown resource'):
+        await DataResources('data').render('data://transport_http_requests')
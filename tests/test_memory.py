@@ -1,14 +1,27 @@
 # tests/test_memory.py
+import asyncio
+import time
 import pytest
 import uuid
+from datetime import datetime, timedelta
 
 # Import all memory classes
 from memory.short_term import ShortTermMemory
-from memory.long_term import LongTermMemory
+from memory.long_term import LongTermMemory, extract_profile_fields, decayed_importance, summarize_memories
 from memory.episodic import EpisodicMemory
 from memory.semantic import SemanticMemory
+from memory.embeddings import HashingEmbedder, VectorIndex
+from memory.graph_snapshot import GraphSnapshot
+from memory.serialization import flatten_properties, parse_metadata, to_json
+from memory.facade import MemoryFacade
+from memory.conversation import ConversationStore
+from memory.handoff import HandoffStore
+from memory.backends import InMemoryTTLStore, SQLiteLongTermBackend, InMemoryGraphBackend
+from memory.long_term import compact_long_term_memory
+
+# Every memory test runs against fresh in-process backends, no servers needed
+pytestmark = pytest.mark.usefixtures("embedded_memory")
 
-@pytest.mark.skip(reason="Temporarily disabled due to race condition/event loop issue")
 @pytest.mark.asyncio
 async def test_short_term_memory():
     """Tests adding to and retrieving from short-term memory."""
@@ -31,7 +44,6 @@ async def test_short_term_memory():
     assert important_items[0]['significant'] is True
     print("✅ Short-term memory test passed")
 
-@pytest.mark.skip(reason="Temporarily disabled due to race condition/event loop issue")
 @pytest.mark.asyncio
 async def test_long_term_memory():
     """Tests adding to and querying from long-term memory."""
@@ -86,4 +98,397 @@ async def test_semantic_memory():
     related_items = sm.find_related(entity, relationship_type="IMPROVED_BY")
     # Note: The structure of 'related_items' is a list of dicts with keys like 'related', 'r'
     assert len(related_items) >= 1
-    print("✅ Semantic memory test passed")
\ No newline at end of file
+    print("✅ Semantic memory test passed")
+
+def test_profile_field_extraction():
+    """Tests that preference fields are pulled from both flat and nested payloads."""
+    flat = extract_profile_fields({'channel': 'sms', 'time_preference': 'evening', 'interests': 'roi'})
+    assert flat['channel'] == 'sms'
+    assert flat['time_preference'] == 'evening'
+    assert flat['interests'] == ['roi']
+
+    nested = extract_profile_fields({'preferences': {
+        'best_contact_time': '09:00-11:00',
+        'preferred_channels': ['Ads', 'Web'],
+        'interests': ['roadmap', 'integration', 'roadmap']
+    }})
+    assert nested['channel'] == 'Ads'
+    assert nested['time_preference'] == '09:00-11:00'
+    assert nested['interests'] == ['integration', 'roadmap']
+
+    empty = extract_profile_fields({})
+    assert empty['channel'] is None and empty['interests'] == []
+    print("✅ Profile extraction test passed")
+
+@pytest.mark.asyncio
+async def test_long_term_memory_rejects_unknown_projection():
+    """Tests that query() only accepts known columns in its projection."""
+    ltm = LongTermMemory("test_ltm_agent")
+    with pytest.raises(ValueError):
+        await ltm.query("someone@example.com", 'lead', columns=('id', 'data; DROP TABLE leads'))
+
+
+def test_importance_decay():
+    """Tests that importance halves per half-life of idleness and reads slow the decay."""
+    now = datetime(2025, 9, 1)
+    assert decayed_importance(0.8, now, now=now, half_life_days=30) == 0.8
+    assert decayed_importance(0.8, now - timedelta(days=30), now=now, half_life_days=30) == 0.4
+    idle = decayed_importance(0.8, now - timedelta(days=90), now=now, half_life_days=30)
+    read_often = decayed_importance(0.8, now - timedelta(days=90), access_count=20, now=now, half_life_days=30)
+    assert idle < read_often <= 1.0
+
+def test_memory_summarization_merges_prior_summaries():
+    """Tests that compaction summaries fold raw rows and earlier summaries together."""
+    day = datetime(2025, 6, 1)
+    first = summarize_memories([
+        {'created_at': day, 'data': {'outcome': 'success', 'solution': 'email_outreach', 'channel': 'email'}},
+        {'created_at': day + timedelta(days=1), 'data': '{"outcome": "failed", "interests": ["roi"]}'},
+    ])
+    assert first['merged_count'] == 2
+    assert first['outcomes'] == {'success': 1, 'failed': 1}
+
+    second = summarize_memories([
+        {'created_at': day + timedelta(days=2), 'data': first},
+        {'created_at': day + timedelta(days=40), 'data': {'outcome': 'success', 'channel': 'sms'}},
+    ])
+    assert second['merged_count'] == 3
+    assert second['outcomes'] == {'success': 2, 'failed': 1}
+    assert second['channel'] == 'sms'
+    assert second['interests'] == ['roi']
+    assert second['first_seen'] == day.isoformat()
+
+@pytest.mark.asyncio
+async def test_long_term_memory_batches_access_updates():
+    """Tests that reads are buffered rather than written back one by one."""
+    ltm = LongTermMemory("test_ltm_agent")
+    ltm._last_access_flush = float('inf')  # keep the interval trigger from firing
+    ltm._record_access([1, 2, 2])
+    ltm._record_access([3])
+    assert ltm._flush_task is None
+    assert ltm._pending_access == {1: 1, 2: 2, 3: 1}
+
+
+class _AccessLog:
+    """Long-term backend double that returns two rows and records access flushes."""
+
+    def __init__(self):
+        self.flushed = []
+
+    async def query(self, entity_id, entity_type=None, columns=None):
+        return [{'id': 1}, {'id': 2}]
+
+    async def record_access(self, counts):
+        self.flushed.append(counts)
+
+@pytest.mark.asyncio
+async def test_long_term_memory_flushes_partial_access_batches(monkeypatch):
+    """Tests that a partial batch of access counts is written by the interval timer, and by close()."""
+    from config import settings
+    monkeypatch.setattr(settings, 'LTM_ACCESS_FLUSH_INTERVAL', 0.05)
+    backend = _AccessLog()
+    ltm = LongTermMemory("test_ltm_agent", backend=backend)
+    await ltm.query('lead-1')
+    assert backend.flushed == []
+    await asyncio.sleep(0.1)  # no further reads: the timer writes the batch
+    assert backend.flushed == [{1: 1, 2: 1}]
+
+    await ltm.query('lead-1')
+    await ltm.close()
+    assert backend.flushed == [{1: 1, 2: 1}, {1: 1, 2: 1}] and ltm._flush_timer is None
+
+
+def test_vector_index_ranks_and_persists(tmp_path):
+    """Tests that hashed embeddings rank related text first and survive a save/load."""
+    embedder = HashingEmbedder(dim=128)
+    index = VectorIndex(128, str(tmp_path / "episodes.npz"))
+    texts = {
+        'bounce': "High bounce rate on landing page",
+        'churn': "churn risk: great for re-engagement",
+        'security': "security review: requires security one-pager",
+    }
+    for key, text in texts.items():
+        index.add(key, embedder.embed(text))
+
+    assert index.search(embedder.embed("landing page bounce"), k=1)[0][0] == 'bounce'
+    assert index.search(embedder.embed("needs a security one-pager"), k=1)[0][0] == 'security'
+
+    index.save()
+    restored = VectorIndex.load(str(tmp_path / "episodes.npz"), 128)
+    assert len(restored) == 3
+    assert restored.search(embedder.embed("re-engagement for churn"), k=1)[0][0] == 'churn'
+
+def test_episode_index_rebuilds_from_store_when_saved_file_is_unusable(tmp_path):
+    """Tests that a saved index for another dimension, or a corrupt one, is rebuilt from stored embeddings."""
+    graph, path = InMemoryGraphBackend(), str(tmp_path / "agent.npz")
+    em = EpisodicMemory("agent", embedder=HashingEmbedder(dim=64), index_path=path, backend=graph)
+    em.add_episode("churn risk", "send case study", "success")
+    em.save_index()
+
+    resized = EpisodicMemory("agent", embedder=HashingEmbedder(dim=32), index_path=path, backend=graph)
+    assert resized.find_similar_episodes("churn", limit=1)[0]['problem'] == "churn risk"
+    assert VectorIndex.load(path, 32).dim == 32  # the rebuilt index replaced the stale file
+    with pytest.raises(ValueError):
+        VectorIndex.load(path, 64)
+
+    with open(path, 'wb') as f:
+        f.write(b"not an index")
+    corrupt = EpisodicMemory("agent", embedder=HashingEmbedder(dim=32), index_path=path, backend=graph)
+    assert corrupt.find_similar_episodes("churn", limit=1)[0]['problem'] == "churn risk"
+
+def test_semantic_memory_coalesces_buffered_triples():
+    """Tests that repeated triples collapse into one pending edge update."""
+    sm = SemanticMemory(batch_size=100, flush_interval=0)
+    sm.add_knowledge("lead@example.com", "has_history", "interactions", properties={'count': 1})
+    sm.add_knowledge("lead@example.com", "has_history", "interactions", properties={'count': 2}, weight=0.5)
+    sm.add_knowledge("lead@example.com", "prefers", "email")
+
+    assert len(sm._pending) == 2
+    row = sm._pending[("lead@example.com", "has_history", "interactions")]
+    assert row['count'] == 2
+    assert row['weight_sum'] == 1.5
+    assert row['properties'] == {'prop_count': 2}
+
+def test_graph_snapshot_k_hop_ranking():
+    """Tests snapshot traversal, relationship filters and incremental updates."""
+    snapshot = GraphSnapshot.from_triples([
+        ("Lead", "interested_in", "ProductA", 0.9),
+        ("ProductA", "requires", "Security", 0.5),
+        ("Lead", "interested_in", "ProductB", 0.2),
+        ("ProductB", "interested_in", "ROI", 1.0),
+    ], compact_threshold=2)
+
+    related = snapshot.neighbors("Lead", depth=2)
+    assert [r['related']['name'] for r in related] == ['ProductA', 'Security', 'ProductB', 'ROI']
+    assert related[1]['depth'] == 2 and related[1]['score'] == pytest.approx(0.45)
+
+    only_interest = snapshot.neighbors("Lead", relationship_type="interested_in", depth=2)
+    assert {r['related']['name'] for r in only_interest} == {'ProductA', 'ProductB', 'ROI'}
+    assert snapshot.neighbors("Lead", depth=1, limit=1)[0]['related']['name'] == 'ProductA'
+
+    # In-place weight update on an existing edge, plus new edges via the delta
+    snapshot.add_edge("Lead", "interested_in", "ProductB", 1.0)
+    snapshot.add_edge("Lead", "located_in", "APAC", 0.99)
+    assert snapshot.neighbors("Lead", depth=1)[0]['related']['name'] == 'APAC'
+    product_b = next(r for r in snapshot.neighbors("Lead", depth=1) if r['related']['name'] == 'ProductB')
+    assert product_b['score'] == pytest.approx(0.6)
+
+    snapshot.add_edge("APAC", "boosts", "Email", 1.0)  # crosses the threshold and compacts
+    assert snapshot._delta_size == 0
+    assert 'Email' in {r['related']['name'] for r in snapshot.neighbors("Lead", depth=2)}
+    assert snapshot.neighbors("Unknown") == []
+
+
+def test_metadata_serialization():
+    """Tests that metadata is stored as typed properties/JSON and legacy reprs still decode."""
+    flat = flatten_properties({
+        'entity_id': 'lead@example.com',
+        'importance': 0.9,
+        'tags': ['a', 'b'],
+        'mixed': [1, 'a'],
+        'nested': {'score': 3, 'when': datetime(2025, 8, 1)},
+        'skipped': None
+    }, prefix='meta_')
+    assert flat == {
+        'meta_entity_id': 'lead@example.com',
+        'meta_importance': 0.9,
+        'meta_tags': ['a', 'b'],
+        'meta_mixed': '[1, "a"]',
+        'meta_nested_score': 3,
+        'meta_nested_when': '2025-08-01T00:00:00'
+    }
+
+    assert parse_metadata(to_json({'outcome': 'success', 'at': datetime(2025, 8, 1)})) == \
+        {'outcome': 'success', 'at': '2025-08-01T00:00:00'}
+    assert parse_metadata(str({'significant': True, 'importance': 0.8})) == {'significant': True, 'importance': 0.8}
+    assert parse_metadata(None) == {}
+
+
+class _SlowTier:
+    """Minimal stand-in tier whose reads take a fixed time."""
+
+    def __init__(self, delay):
+        self.delay = delay
+
+    async def query(self, entity_id, entity_type=None, columns=None):
+        await asyncio.sleep(self.delay)
+        return [{'id': 1}]
+
+    async def get_profile(self, entity_id, entity_type='lead'):
+        await asyncio.sleep(self.delay)
+        return {'channel': 'sms'}
+
+    def query_episodes(self, entity_id=None, limit=10):
+        time.sleep(self.delay)
+        return [{'id': 'ep-1'}]
+
+@pytest.mark.asyncio
+async def test_memory_facade_recalls_tiers_concurrently():
+    """Tests that recall() costs the slowest tier, not the sum, and reports partial results."""
+    fast = MemoryFacade(None, _SlowTier(0.05), _SlowTier(0.05), None)
+    context = await fast.recall("lead@example.com", need=('history', 'profile', 'episodes'), deadline=1.0)
+    assert context['complete']
+    assert context['results']['profile'] == {'channel': 'sms'}
+    assert context['elapsed_ms'] < 140
+    assert set(context['latency_ms']) == {'history', 'profile', 'episodes'}
+
+    slow_graph = MemoryFacade(None, _SlowTier(0.01), _SlowTier(0.3), None)
+    context = await slow_graph.recall("lead@example.com", need=('history', 'episodes'), deadline=0.1)
+    assert not context['complete']
+    assert context['timed_out'] == ['episodes']
+    assert context['results'] == {'history': [{'id': 1}]}
+    assert context['latency_ms']['episodes'] >= 100
+
+    with pytest.raises(ValueError):
+        await fast.recall("lead@example.com", need=('everything',))
+
+
+class _Clock:
+    """Manually advanced monotonic clock."""
+
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+@pytest.mark.asyncio
+async def test_in_memory_store_expires_keys_and_orders_like_redis():
+    """Tests TTL expiry and Redis-style sorted-set ranges on the embedded STM store."""
+    clock = _Clock()
+    store = InMemoryTTLStore(clock=clock)
+    await store.set("a", "1", ttl=10)
+    await store.set("b", "2", ttl=30)
+    clock.now = 20
+    assert await store.mget(["a", "b", "missing"]) == [None, "2", None]
+
+    await store.zadd("idx", {"x": 3, "y": 1, "z": 2})
+    assert await store.zrange("idx", 0, -1) == ["y", "z", "x"]
+    assert await store.zrange("idx", 0, 1, desc=True) == ["x", "z"]
+    await store.zrem("idx", "z")
+    assert await store.zcard("idx") == 2
+
+    stm = ShortTermMemory("test_stm_agent", max_size=2, backend=store)
+    for i in range(3):
+        await stm.add({'id': str(i), 'significant': i == 2})
+        clock.now += 1
+    assert [item['id'] for item in await stm.get_recent(n=5)] == ['2', '1']
+
+@pytest.mark.asyncio
+async def test_sqlite_long_term_profiles_and_compaction():
+    """Tests profile upserts, ranking and compaction on the embedded SQLite store."""
+    backend = SQLiteLongTermBackend(':memory:')
+    ltm = LongTermMemory("test_ltm_agent", backend=backend)
+    await ltm.add("lead@example.com", 'lead', {'channel': 'sms', 'interests': ['roi']}, importance=0.1)
+    await ltm.bulk_add([
+        {'entity_id': "lead@example.com", 'entity_type': 'lead', 'importance': 0.9,
+         'data': {'outcome': 'success', 'interests': ['security', 'roi']}},
+    ])
+
+    profile = await ltm.get_profile("lead@example.com")
+    assert profile['channel'] == 'sms'
+    assert profile['interests'] == ['roi', 'security']
+    assert profile['interaction_count'] == 2
+
+    rows = await ltm.query("lead@example.com", 'lead', columns=('id', 'importance_score', 'data'))
+    assert [row['importance_score'] for row in rows] == [0.9, 0.1]
+    assert rows[0]['data']['outcome'] == 'success'
+
+    await ltm.flush_access()
+    stats = await compact_long_term_memory(min_age_days=-1, threshold=0.5, backend=backend)
+    assert stats == {'scanned': 2, 'rescored': 1, 'archived': 1, 'summaries': 1}
+    rows = await ltm.query("lead@example.com", 'lead')
+    assert sorted(row['memory_type'] for row in rows) == ['summary', 'test_ltm_agent']
+
+def test_in_memory_graph_episodes_and_paths():
+    """Tests episode filtering and path traversal on the embedded graph store."""
+    graph = InMemoryGraphBackend()
+    em = EpisodicMemory("test_em_agent", embedder=HashingEmbedder(dim=64), backend=graph)
+    em.add_episode("churn risk", "send case study", "success", {'entity_id': 'a@example.com', 'importance': 0.9})
+    em.add_episode("pricing question", "share pricing page", "failed", {'entity_id': 'a@example.com'})
+    assert [e['outcome'] for e in em.query_episodes(entity_id='a@example.com')] == ['failed', 'success']
+    assert [e['problem'] for e in em.query_episodes(min_importance=0.5)] == ['churn risk']
+    assert EpisodicMemory("test_em_agent", embedder=HashingEmbedder(dim=64), backend=graph) \
+        .find_similar_episodes("churn", limit=1)[0]['metadata']['importance'] == 0.9
+
+    sm = SemanticMemory(flush_interval=0, backend=graph)
+    sm.add_knowledge("Lead", "interested_in", "ProductA", weight=1.0)
+    sm.add_knowledge("Lead", "interested_in", "ProductA", weight=0.5)
+    sm.add_knowledge("ProductA", "requires", "Security")
+    related = sm.find_related("Lead", depth=2)
+    assert [r['related']['name'] for r in related] == ['ProductA', 'Security']
+    assert related[0]['r'][0]['weight'] == 0.75 and related[0]['r'][0]['count'] == 2
+    assert [r['related']['name'] for r in sm.find_related("Lead", relationship_type="interested_in")] == ['ProductA']
+    assert GraphSnapshot.from_backend(graph).neighbors("Lead", depth=2)[1]['related']['name'] == 'Security'
+
+@pytest.mark.asyncio
+async def test_conversation_store_partial_updates_and_sliding_ttl():
+    """Tests slot-level merges, sliding expiry on activity and bulk reads."""
+    clock = _Clock()
+    store = InMemoryTTLStore(clock=clock)
+    conversations = ConversationStore(ShortTermMemory("test_stm_agent", backend=store), ttl_seconds=60)
+
+    await conversations.update("C1", slots={'company': 'Acme Co.', 'employees': 50}, active_intent='book_demo')
+    await conversations.update("C1", slots={'employees': 1200})
+    await conversations.update("C2", slots={'tooling': ['HubSpot']}, lead_id='L2')
+    assert await conversations.get_slots("C1", ['employees', 'missing']) == {'employees': 1200}
+
+    state = await conversations.get("C1")
+    assert state['active_intent'] == 'book_demo'
+    assert state['slots'] == {'company': 'Acme Co.', 'employees': 1200}
+
+    # C1 stays alive through activity; C2 is only bulk-read, which doesn't slide it
+    clock.now = 50
+    await conversations.get_slots("C1", ['company'])
+    assert set(await conversations.get_many(["C1", "C2", "C3"])) == {"C1", "C2"}
+    clock.now = 100
+    states = await conversations.get_many(["C1", "C2"])
+    assert set(states) == {"C1"}
+
+    await conversations.clear_slots("C1", 'company')
+    assert await conversations.get_slots("C1") == {'employees': 1200}
+    with pytest.raises(ValueError):
+        await conversations.update("C1", unknown_field='x')
+
+
+@pytest.mark.asyncio
+async def test_handoff_store_passes_context_by_reference():
+    """Tests that a handoff travels as a small handle and resolves only the requested fields."""
+    clock = _Clock()
+    store = InMemoryTTLStore(clock=clock)
+    sender = ShortTermMemory("test_sender_agent", backend=store)
+    handoffs = HandoffStore(sender, ttl_seconds=60)
+    await sender.add({'type': 'note', 'text': 'before handoff'})
+
+    lead = {'id': 7, 'email': 'big@example.com', 'notes': 'x' * 5000}
+    handle = await handoffs.put("test_sender_agent", "engagement_agent",
+                                {'lead': lead, 'category': 'Campaign Qualified Lead', 'confidence': 0.91})
+
+    assert handle['fields'] == ['category', 'confidence', 'lead']
+    assert handle['confidence'] == 0.91 and 'Campaign Qualified Lead' in handle['summary']
+    assert 'x' * 100 not in str(handle)
+    assert await handoffs.fetch(handle, ['category']) == {'category': 'Campaign Qualified Lead'}
+    assert (await handoffs.fetch(handle))['lead'] == lead
+
+    # History is read from the sender's memory on demand, not copied at handoff time
+    history = (await handoffs.fetch(handle, ['conversation_history']))['conversation_history']
+    assert [item['text'] for item in history] == ['before handoff']
+
+    clock.now = 61
+    with pytest.raises(ValueError):
+        await handoffs.fetch(handle, ['lead'])
+
+def test_episode_index_picks_up_episodes_added_after_the_last_save(tmp_path):
+    """Tests that a loaded index is topped up with episodes the saved file missed, and close() saves."""
+    graph, path = InMemoryGraphBackend(), str(tmp_path / "agent.npz")
+    em = EpisodicMemory("agent", embedder=HashingEmbedder(dim=64), index_path=path, backend=graph)
+    em.add_episode("churn risk", "send case study", "success")
+    em.save_index()
+    em.add_episode("pricing objection", "offer annual discount", "success")  # below the save interval
+
+    restarted = EpisodicMemory("agent", embedder=HashingEmbedder(dim=64), index_path=path, backend=graph)
+    assert len(restarted.index) == 2
+    assert restarted.find_similar_episodes("pricing objection", limit=1)[0]['problem'] == "pricing objection"
+
+    em.add_episode("webinar no-show", "send the recording", "partial")
+    em.close()
+    assert len(VectorIndex.load(path, 64)) == 3
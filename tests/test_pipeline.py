@@ -0,0 +1,80 @@
+# tests/test_pipeline.py
+import asyncio
+import random
+import pytest
+from agents.lead_triage.agent import LeadTriageAgent
+from agents.engagement.agent import EngagementAgent
+from agents.campaign_optimization.agent import CampaignOptimizationAgent
+from agents.lead_triage.sources import load_leads_csv, stream_leads_csv
+from pipeline.runner import AgentPipeline
+
+
+class EchoClient:
+    """MCP client double that answers handoffs the way the server does (returning the handle)."""
+
+    async def request(self, method, params):
+        if method == 'agent_handoff':
+            return {**params, 'status': 'completed'}
+        return {'status': 'completed'}
+
+
+class StubAgent:
+    """Agent double that hands everything on, optionally slowly or failing on one input."""
+
+    def __init__(self, key, delay=0.0, fail_on=None):
+        self.key = key
+        self.delay = delay
+        self.fail_on = fail_on
+        self.seen = []
+
+    async def process(self, item):
+        if item.get('n') == self.fail_on:
+            raise ValueError("bad lead")
+        await asyncio.sleep(self.delay)
+        self.seen.append(item['n'])
+        return {self.key: {'n': item['n']}} if self.key else {}
+
+
+async def numbered(count):
+    for n in range(count):
+        yield {'n': n}
+
+
+@pytest.mark.usefixtures("embedded_memory")
+async def test_pipeline_routes_handoffs_between_real_agents():
+    """Tests that every handoff and escalation reaches the next stage and nothing else does."""
+    random.seed(7)
+    client = EchoClient()
+    triage = LeadTriageAgent(client)
+    # Prior history lets the rule-based score qualify the engaged, large-company leads for handoff
+    for lead in load_leads_csv('data/leads.csv')[:60]:
+        await triage.long_term_memory.add(lead['email'], 'lead', {'outcome': 'success'})
+    pipeline = AgentPipeline(
+        triage, EngagementAgent(client), CampaignOptimizationAgent(client),
+        workers={'triage': 2, 'engagement': 2, 'optimization': 1}, queue_size=5, triage_batch_size=8
+    )
+    stats = await pipeline.run(stream_leads_csv('data/leads.csv', limit=60))
+
+    stages = stats['stages']
+    assert stats['fed'] == 60
+    assert stages['triage']['processed'] == 60
+    assert stages['engagement']['processed'] == stages['triage']['routed'] > 0
+    assert stages['optimization']['processed'] == stages['engagement']['routed']
+    assert all(s['errors'] == 0 and s['queue_depth'] == 0 for s in stages.values())
+    assert all(s['max_queue_depth'] <= 5 for s in stages.values())
+
+
+async def test_pipeline_applies_backpressure_and_survives_failures():
+    """Tests that a slow stage bounds the queues and a failing item is counted, not fatal."""
+    triage = StubAgent('handoff', fail_on=3)
+    engagement = StubAgent('escalation', delay=0.01)
+    optimization = StubAgent(None)
+    pipeline = AgentPipeline(triage, engagement, optimization,
+                             workers={'triage': 1, 'engagement': 1, 'optimization': 1}, queue_size=2)
+
+    stats = await pipeline.run(numbered(20))
+
+    stages = stats['stages']
+    assert stages['triage']['errors'] == 1
+    assert sorted(optimization.seen) == [n for n in range(20) if n != 3]
+    assert all(s['max_queue_depth'] <= 2 for s in stages.values())
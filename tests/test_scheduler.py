@@ -0,0 +1,132 @@
+# tests/test_scheduler.py
+import asyncio
+import random
+import pytest
+from memory.backends import InMemoryTTLStore
+from scheduling.follow_ups import DUE_KEY, LEASE_KEY, FollowUpScheduler, parse_offset
+from scheduling.timer_wheel import TimerWheel
+
+
+class FakeClock:
+    def __init__(self, now=1_000_000.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def test_timer_wheel_fires_in_order_never_early_across_levels():
+    """Tests expiry order, lateness within one tick, cascading, overflow and cancellation."""
+    rng = random.Random(3)
+    wheel = TimerWheel(tick=0.5, slots=(8, 4, 4), start=0)  # levels cover 4s, 16s, 64s
+    due = {n: rng.uniform(0, 300) for n in range(400)}
+    for key, at in due.items():
+        wheel.add(key, at)
+    cancelled = set(rng.sample(sorted(due), 40))
+    for key in cancelled:
+        assert wheel.cancel(key)
+    assert not wheel.cancel('missing')
+
+    fired, now = [], 0.0
+    while now < 310:
+        now += 0.25
+        for key, at in wheel.advance(now):
+            assert at <= now < at + 0.5 + 0.25
+            fired.append(key)
+    assert sorted(fired) == sorted(set(due) - cancelled)
+    assert [due[key] for key in fired] == sorted(due[key] for key in fired)
+    assert len(wheel) == 0
+
+
+def test_parse_offset():
+    assert parse_offset('day_3') == 3 * 86400
+    assert parse_offset('hours_12') == 12 * 3600
+    with pytest.raises(ValueError):
+        parse_offset('tomorrow')
+
+
+async def test_workers_sharing_a_store_fire_each_job_exactly_once():
+    """Tests that concurrent schedulers claim due jobs without double-firing and cancel works."""
+    store, clock = InMemoryTTLStore(), FakeClock()
+    fired = []
+
+    async def handler(job):
+        fired.append(job['job_id'])
+
+    workers = [FollowUpScheduler(handler, store=store, horizon=3600, batch_size=7, tick=1.0, clock=clock)
+               for _ in range(3)]
+    jobs = []
+    for n in range(50):
+        jobs += await workers[n % 3].schedule_sequence(f"lead{n}@example.com", ['hour_1', 'day_1'], {'n': n})
+    assert await workers[0].cancel_lead('lead0@example.com') == 2
+
+    for _ in range(30):
+        clock.now += 3600
+        for worker in workers:
+            await worker.poll()
+        await asyncio.gather(*(worker.fire_due() for worker in workers))
+
+    assert sorted(fired) == sorted(jobs[2:])
+    assert sum(worker.stats['lost_claims'] for worker in workers) > 0
+    assert await workers[0].pending() == {'due': 0, 'leased': 0, 'in_wheel': 0}
+
+
+async def test_failed_job_is_retried_after_its_lease_expires():
+    """Tests at-least-once delivery: a handler failure leaves the lease to expire and the job re-queues."""
+    store, clock = InMemoryTTLStore(), FakeClock()
+    attempts = []
+
+    async def flaky(job):
+        attempts.append(job['step'])
+        if len(attempts) == 1:
+            raise ConnectionError("provider down")
+
+    scheduler = FollowUpScheduler(flaky, store=store, horizon=60, lease_seconds=120, tick=1.0, clock=clock)
+    await scheduler.schedule('lead@example.com', clock.now + 10, {}, step='day_0')
+    for _ in range(3):
+        clock.now += 100
+        await scheduler.poll()
+        await scheduler.fire_due()
+
+    assert attempts == ['day_0', 'day_0']
+    assert scheduler.stats == {'scheduled': 1, 'fired': 1, 'failed': 1, 'recovered': 1, 'lost_claims': 0}
+    assert await store.zcard(DUE_KEY) == 0
+
+
+async def test_undelivered_follow_up_stays_leased_until_it_is_sent():
+    """Tests that only a 'sent' result releases a job, and that claiming moves it atomically into the lease set."""
+    store, clock = InMemoryTTLStore(), FakeClock()
+    outcomes = [{'status': 'failed', 'error': 'bounced'}, {'status': 'sent'}]
+    attempts = []
+
+    async def send(job):
+        attempts.append(job['job_id'])
+        return outcomes[len(attempts) - 1]
+
+    scheduler = FollowUpScheduler(send, store=store, horizon=60, lease_seconds=120, tick=1.0, clock=clock)
+    job_id = await scheduler.schedule('lead@example.com', clock.now + 10, {}, step='day_0')
+    clock.now += 100
+    await scheduler.poll()
+    assert await scheduler.fire_due() == 0
+    assert await scheduler.pending() == {'due': 0, 'leased': 1, 'in_wheel': 0}
+    assert await store.zmove(DUE_KEY, LEASE_KEY, [job_id], 0.0) == []  # already claimed
+
+    for _ in range(2):
+        clock.now += 100
+        await scheduler.poll()
+        await scheduler.fire_due()
+    assert attempts == [job_id, job_id]
+    assert scheduler.stats == {'scheduled': 1, 'fired': 1, 'failed': 1, 'recovered': 1, 'lost_claims': 0}
+    assert await scheduler.pending() == {'due': 0, 'leased': 0, 'in_wheel': 0}
+
+
+async def test_close_stops_a_running_scheduler():
+    """Tests that close() ends run() and waits for it to exit."""
+    async def noop(job):
+        return None
+
+    scheduler = FollowUpScheduler(noop, store=InMemoryTTLStore(), tick=0.01)
+    runner = asyncio.create_task(scheduler.run())
+    await asyncio.sleep(0.05)
+    await scheduler.close()
+    assert runner.done()
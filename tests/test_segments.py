@@ -0,0 +1,72 @@
+# tests/test_segments.py
+import csv
+import random
+import pytest
+from analytics.segments import SegmentEngine, SegmentIndex
+from memory.backends import InMemoryTTLStore
+
+
+def matches_rules(lead, rules):
+    """Plain per-rule evaluation the compiled engine must agree with."""
+    score = lead.get('lead_score')
+    if rules.get('min_lead_score') is not None and (score in (None, '') or float(score) < rules['min_lead_score']):
+        return False
+    for rule, field in (('industry', 'industry'), ('preferred_channel', 'preferred_channel')):
+        if rules.get(rule) and (lead.get(field) or '').lower() != rules[rule].lower():
+            return False
+    return not rules.get('regions') or lead.get('region') in rules['regions']
+
+
+def test_compiled_segments_match_rule_by_rule_evaluation():
+    """Tests that one columnar pass gives every lead the segments its rules select, beyond 64 segments too."""
+    with open('data/leads.csv', newline='', encoding='utf-8') as f:
+        leads = [dict(row) for row in csv.DictReader(f)]
+    rng = random.Random(0)
+    segments = SegmentEngine.from_csv('data/segments.csv').segments + [
+        {'segment_id': f"GEN{i:03d}", 'rules': {
+            'industry': rng.choice([None, 'SaaS', 'retail', 'Unknown']),
+            'min_lead_score': rng.choice([None, 40, 65.5, 90]),
+            'regions': rng.sample(['US', 'EU', 'APAC', 'MEA', 'LATAM', 'India'], rng.randint(0, 3)),
+            'preferred_channel': rng.choice([None, 'Email', 'SMS'])}}
+        for i in range(100)
+    ]
+    leads += [{'industry': 'SaaS', 'region': 'US'}, {'lead_score': 95, 'preferred_channel': 'email'}]
+
+    engine = SegmentEngine(segments)
+    expected = [[s['segment_id'] for s in segments if matches_rules(lead, s['rules'])] for lead in leads]
+    assert engine.matches(leads) == expected
+    assert 0 < sum(map(len, expected)) < len(leads) * len(segments)
+
+    with pytest.raises(ValueError):
+        SegmentEngine([{'segment_id': 'BAD', 'rules': {'persona': 'Founder'}}])
+
+
+async def test_index_tracks_membership_changes_incrementally():
+    """Tests that updates move leads between segments, write only changes, and serve members by score."""
+    engine = SegmentEngine([
+        {'segment_id': 'HOT_EU', 'rules': {'min_lead_score': 70, 'regions': ['EU']}},
+        {'segment_id': 'EU', 'rules': {'regions': ['EU']}},
+        {'segment_id': 'SMS', 'rules': {'preferred_channel': 'SMS'}},
+    ])
+    index = SegmentIndex(engine, store=InMemoryTTLStore())
+    leads = [
+        {'email': 'a@example.com', 'lead_score': 80, 'region': 'EU'},
+        {'email': 'b@example.com', 'engagement_score': 90, 'region': 'EU', 'preferred_channel': 'SMS'},
+        {'email': 'c@example.com', 'lead_score': 50, 'region': 'US'},
+    ]
+    assert await index.update(leads) == [['HOT_EU', 'EU'], ['HOT_EU', 'EU', 'SMS'], []]
+    assert await index.members('HOT_EU') == ['b@example.com', 'a@example.com']
+
+    # Re-sending unchanged leads writes nothing; a changed lead moves
+    changed = index.stats['changed']
+    await index.update(leads)
+    assert index.stats['changed'] == changed
+    await index.update([{'email': 'A@example.com', 'lead_score': 60, 'region': 'EU', 'preferred_channel': 'sms'}])
+    assert await index.members('HOT_EU') == ['b@example.com']
+    assert await index.members('EU') == ['b@example.com', 'a@example.com']
+    assert await index.count('SMS') == 2
+
+    await index.remove(['b@example.com'])
+    assert await index.segments_of(['a@example.com', 'b@example.com', 'c@example.com']) == {
+        'a@example.com': ['EU', 'SMS'], 'b@example.com': [], 'c@example.com': []}
+    assert (await index.count('HOT_EU'), await index.count('EU')) == (0, 1)
@@ -0,0 +1,144 @@
+# tests/test_supervisor.py
+import asyncio
+import os
+import random
+from pipeline.supervisor import HashRing, ShardedSupervisor
+
+
+class EchoClient:
+    """MCP client double that answers handoffs the way the server does (returning the handle)."""
+
+    async def request(self, method, params):
+        if method == 'agent_handoff':
+            return {**params, 'status': 'completed'}
+        return {'status': 'completed'}
+
+
+class CrashOnceAgent:
+    """Kills its worker process the first time it sees lead 5 (tracked with a marker file)."""
+
+    async def process(self, item):
+        marker = os.environ['CRASH_MARKER']
+        if item.get('n') == 5 and not os.path.exists(marker):
+            open(marker, 'w').close()
+            os._exit(1)
+        with open(f"{marker}.log", 'a') as log:
+            log.write(f"{item['n']}\n")
+        return {}
+
+
+class AlwaysCrashAgent:
+    """Kills its worker process on every lead."""
+
+    async def process(self, item):
+        os._exit(1)
+
+
+class SlowLoggingAgent:
+    """Takes a random while per lead and logs the update it handled (in CRASH_MARKER's log file)."""
+
+    async def process(self, item):
+        await asyncio.sleep(random.uniform(0, 0.01))
+        with open(f"{os.environ['CRASH_MARKER']}.log", 'a') as log:
+            log.write(f"{item['email']} {item['n']}\n")
+        return {}
+
+
+def real_agents():
+    from agents.lead_triage.agent import LeadTriageAgent
+    from agents.engagement.agent import EngagementAgent
+    from agents.campaign_optimization.agent import CampaignOptimizationAgent
+    client = EchoClient()
+    return client, [LeadTriageAgent(client), EngagementAgent(client), CampaignOptimizationAgent(client)]
+
+
+def crashing_agents():
+    return EchoClient(), [CrashOnceAgent(), CrashOnceAgent(), CrashOnceAgent()]
+
+
+def always_crashing_agents():
+    return EchoClient(), [AlwaysCrashAgent(), AlwaysCrashAgent(), AlwaysCrashAgent()]
+
+
+def slow_agents():
+    return EchoClient(), [SlowLoggingAgent(), SlowLoggingAgent(), SlowLoggingAgent()]
+
+
+async def numbered(count):
+    for n in range(count):
+        yield {'n': n, 'email': f"lead{n}@example.com"}
+
+
+def test_hash_ring_is_stable_and_moves_few_keys_on_resize():
+    """Tests that routing is deterministic, balanced, and mostly unchanged when a shard is added."""
+    keys = [f"lead{i}@example.com" for i in range(2000)]
+    four, five = HashRing(4), HashRing(5)
+    before = [four.shard_for(key) for key in keys]
+
+    assert before == [HashRing(4).shard_for(key) for key in keys]
+    assert all(250 < before.count(shard) < 750 for shard in range(4))
+    moved = sum(a != five.shard_for(key) for a, key in zip(before, keys))
+    assert moved < 0.35 * len(keys)
+
+
+async def test_supervisor_shards_leads_across_worker_processes(monkeypatch):
+    """Tests that every lead is triaged once across two real agent processes."""
+    from agents.lead_triage.sources import stream_leads_csv
+    monkeypatch.setenv('MEMORY_BACKEND', 'embedded')
+
+    supervisor = ShardedSupervisor(num_workers=2, agent_factory=real_agents, stats_interval=0.1)
+    stats = await supervisor.run(stream_leads_csv('data/leads.csv', limit=40))
+
+    assert stats['submitted'] == stats['processed'] == 40
+    assert all(count > 0 for count in stats['per_shard'].values())
+    assert stats['stages']['engagement']['processed'] == stats['stages']['triage']['routed']
+    assert stats['restarts'] == 0
+
+
+async def test_supervisor_restarts_crashed_worker(monkeypatch, tmp_path):
+    """Tests that a crashed worker is replaced and keeps consuming its shard's queue."""
+    monkeypatch.setenv('CRASH_MARKER', str(tmp_path / 'crashed'))
+
+    supervisor = ShardedSupervisor(num_workers=1, agent_factory=crashing_agents, stats_interval=0.05,
+                                   pipeline_options={'workers': {'triage': 1, 'engagement': 1,
+                                                                 'optimization': 1}, 'queue_size': 1})
+    stats = await supervisor.run(numbered(20))
+
+    assert stats['restarts'] == 1
+    # Only lead 5 and whatever the crashed process had prefetched are lost
+    handled = {int(line) for line in open(tmp_path / 'crashed.log')}
+    lost = set(range(20)) - handled
+    assert 5 in lost and len(lost) <= 4
+    assert set(range(5)) <= handled and set(range(12, 20)) <= handled
+
+
+async def test_supervisor_keeps_each_leads_updates_in_order(monkeypatch, tmp_path):
+    """Tests that a lead's updates are triaged in arrival order even when more triage workers are asked for."""
+    monkeypatch.setenv('CRASH_MARKER', str(tmp_path / 'ordered'))
+
+    async def updates():
+        for n in range(120):
+            yield {'n': n, 'email': f"lead{n % 6}@example.com"}
+
+    supervisor = ShardedSupervisor(num_workers=2, agent_factory=slow_agents, stats_interval=0.05,
+                                   pipeline_options={'workers': {'triage': 4}})
+    assert supervisor.pipeline_options['workers'] == {'triage': 1}
+    await supervisor.run(updates())
+
+    seen = {}
+    for line in open(tmp_path / 'ordered.log'):
+        email, n = line.split()
+        seen.setdefault(email, []).append(int(n))
+    assert len(seen) == 6 and sum(map(len, seen.values())) == 120
+    assert all(ns == sorted(ns) for ns in seen.values())
+
+
+async def test_supervisor_returns_when_a_worker_exceeds_its_restart_limit():
+    """Tests that run() and stop() don't block on a failed shard's full inbox, and its leads are counted as dropped."""
+    supervisor = ShardedSupervisor(num_workers=1, agent_factory=always_crashing_agents, stats_interval=0.05,
+                                   inbox_size=2, max_restarts=1, pipeline_options={'queue_size': 1})
+    stats = await asyncio.wait_for(supervisor.run(numbered(30)), timeout=60)
+
+    assert supervisor.failed == {0} and stats['restarts'] == 1
+    assert stats['dropped'] > 0 and stats['submitted'] + stats['dropped'] == 30
+    assert not supervisor.processes[0].is_alive()